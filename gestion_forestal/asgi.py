@@ -2,6 +2,8 @@
 ASGI config para el proyecto gestion_forestal.
 
 Expone el callable ASGI como una variable a nivel de módulo llamada ``application``.
+Activa ``ASYNC_VIEWS``: el dashboard, los listados y los detalles usan las
+vistas asíncronas (p. ej. ``uvicorn gestion_forestal.asgi:application``).
 
 Para más información sobre este archivo, ver:
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
@@ -12,5 +14,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gestion_forestal.settings')
+os.environ.setdefault('ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
@@ -5,6 +5,7 @@ Gestión de Visitas de Seguridad y Checklists Operacionales
 """
 
 import os
+import sys
 from pathlib import Path
 
 # Build paths inside the project
@@ -31,15 +32,20 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'seguridad_app.middleware.PerformanceMiddleware',  # Server-Timing y métricas por vista
     'django.contrib.sessions.middleware.SessionMiddleware',  # Gestión de sesiones
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',  # Autenticación
+    'seguridad_app.middleware.AutenticacionCacheadaMiddleware',  # Autenticación (usuario en caché)
+    'seguridad_app.middleware.ReplicaMiddleware',  # Lectura de lo propio tras escribir
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'gestion_forestal.urls'
+# Bajo ASGI (asgi.py activa ASYNC_VIEWS) el dashboard, los listados y los
+# detalles se sirven con las vistas asíncronas de seguridad_app/vistas_async.py
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS', '') == '1'
+ROOT_URLCONF = 'gestion_forestal.urls_asgi' if ASYNC_VIEWS else 'gestion_forestal.urls'
 
 TEMPLATES = [
     {
@@ -60,20 +66,56 @@ TEMPLATES = [
 WSGI_APPLICATION = 'gestion_forestal.wsgi.application'
 
 # Database - MySQL Configuration
-# Configuración de conexión a MySQL (XAMPP)
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.mysql',
-        'NAME': 'gestion-forestal',  # Nombre de la base de datos
-        'USER': 'root',  # Usuario de MySQL (por defecto en XAMPP)
-        'PASSWORD': '',  # Sin contraseña por defecto en XAMPP
-        'HOST': 'localhost',  # Host de la base de datos
-        'PORT': '3306',  # Puerto de MySQL
-        'OPTIONS': {
-            'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
-        },
+# Configuración de conexión a MySQL (XAMPP); DB_ENGINE=sqlite usa SQLite local.
+# `manage.py test` usa SQLite salvo que DB_ENGINE indique otro motor.
+DB_ENGINE = os.environ.get('DB_ENGINE') or ('sqlite' if sys.argv[1:2] == ['test'] else 'mysql')
+
+if DB_ENGINE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3'),
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            # Backend MySQL con pool de conexiones por proceso
+            'ENGINE': 'seguridad_app.backends.mysql_pool',
+            'NAME': os.environ.get('DB_NAME', 'gestion-forestal'),  # Nombre de la base de datos
+            'USER': os.environ.get('DB_USER', 'root'),  # Usuario de MySQL (por defecto en XAMPP)
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),  # Sin contraseña por defecto en XAMPP
+            'HOST': os.environ.get('DB_HOST', 'localhost'),  # Host de la base de datos
+            'PORT': os.environ.get('DB_PORT', '3306'),  # Puerto de MySQL
+            'OPTIONS': {
+                'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
+            },
+            # Segundos que un hilo conserva su conexión (0: la devuelve al pool al final del request)
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 0)),
+            'CONN_HEALTH_CHECKS': True,
+            'POOL': {
+                'SIZE': int(os.environ.get('DB_POOL_SIZE', 10)),
+                'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 5)),
+                'RECYCLE': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+                'PRE_PING': True,
+            },
+        }
     }
-}
+
+# Réplicas de solo lectura (DB_REPLICAS: hosts MySQL o archivos SQLite separados por coma)
+DATABASE_REPLICAS = []
+for i, replica in enumerate(filter(None, os.environ.get('DB_REPLICAS', '').split(',')), start=1):
+    clave = 'NAME' if DB_ENGINE == 'sqlite' else 'HOST'
+    DATABASES[f'replica_{i}'] = {**DATABASES['default'], clave: replica.strip(), 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS.append(f'replica_{i}')
+
+if DB_ENGINE == 'sqlite' and sys.argv[1:2] == ['test']:
+    # Base separada que hace de réplica en las pruebas del router
+    DATABASES['replica'] = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': BASE_DIR / 'db_replica.sqlite3'}
+
+DATABASE_ROUTERS = ['seguridad_app.routers.ReplicaRouter']
+REPLICA_READ_YOUR_WRITES_SECONDS = 10  # ventana en que un usuario lee de la principal tras escribir
+REPLICA_RETRY_SECONDS = 30  # tiempo sin usar una réplica que no respondió
 
 # Password validation - Configuración de Hashing y Seguridad
 AUTH_PASSWORD_VALIDATORS = [
@@ -95,11 +137,22 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 # Password Hashers - Algoritmos de Hashing para contraseñas
+# El primero se usa para contraseñas nuevas; los demás solo verifican y los
+# usuarios se migran al primero en su próximo login
 PASSWORD_HASHERS = [
-    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'seguridad_app.hashers.Argon2PasswordHasher',
+    'seguridad_app.hashers.BCryptSHA256PasswordHasher',
+    'seguridad_app.hashers.PBKDF2PasswordHasher',
     'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
 ]
 
+# Costos de los hashers (calibrar con: python manage.py calibrar_hashers)
+PASSWORD_ARGON2_TIME_COST = int(os.environ.get('PASSWORD_ARGON2_TIME_COST', 2))
+PASSWORD_ARGON2_MEMORY_COST = int(os.environ.get('PASSWORD_ARGON2_MEMORY_COST', 65536))  # KiB
+PASSWORD_ARGON2_PARALLELISM = int(os.environ.get('PASSWORD_ARGON2_PARALLELISM', 2))
+PASSWORD_BCRYPT_ROUNDS = int(os.environ.get('PASSWORD_BCRYPT_ROUNDS', 12))
+PASSWORD_PBKDF2_ITERATIONS = int(os.environ.get('PASSWORD_PBKDF2_ITERATIONS', 600000))
+
 # Internationalization
 LANGUAGE_CODE = 'es-es'
 TIME_ZONE = 'America/Santiago'
@@ -112,6 +165,9 @@ STATICFILES_DIRS = [
     os.path.join(BASE_DIR, 'seguridad_app/static'),
 ]
 
+# Archivos subidos (fotos de evidencia); se sirven desde las vistas, con sesión
+MEDIA_ROOT = os.environ.get('MEDIA_ROOT', os.path.join(BASE_DIR, 'media'))
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -119,7 +175,99 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 SESSION_COOKIE_AGE = 3600  # 1 hora de sesión
 SESSION_COOKIE_SECURE = False  # Cambiar a True en producción con HTTPS
 SESSION_COOKIE_HTTPONLY = True  # Protección contra XSS
-SESSION_SAVE_EVERY_REQUEST = True
+SESSION_SAVE_EVERY_REQUEST = False
+# Sesiones en caché con escritura a la base de datos; la expiración deslizante
+# se renueva solo después de pasada esta fracción de SESSION_COOKIE_AGE
+SESSION_ENGINE = 'seguridad_app.sesiones'
+SESSION_REFRESH_FRACTION = 0.25
+
+# Caché (con varios procesos usar una compartida, p. ej. django.core.cache.backends.redis.RedisCache)
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'gestion-forestal'),
+    }
+}
+if CACHES['default']['BACKEND'].endswith('LocMemCache'):
+    # Sesiones, usuarios y fragmentos comparten la caché (300 entradas por defecto)
+    CACHES['default']['OPTIONS'] = {'MAX_ENTRIES': 20000}
+
+# Si la caché la comparten todos los procesos. Con LocMemCache cada proceso
+# tiene la suya: las sesiones se leen de la base de datos y el usuario
+# autenticado no se guarda en memoria, para que un logout o un cambio de
+# contraseña valgan en todos los procesos. `manage.py test` corre en un solo
+# proceso; con un único proceso de servidor se puede forzar CACHE_SHARED=1.
+_cache_local = CACHES['default']['BACKEND'].endswith('LocMemCache') and sys.argv[1:2] != ['test']
+CACHE_SHARED = os.environ.get('CACHE_SHARED', '0' if _cache_local else '1') == '1'
+
+# Vigencia (segundos) de los fragmentos renderizados de los detalles
+FRAGMENT_CACHE_TTL = 3600
+
+# Caché del usuario autenticado por sesión (entradas y vigencia en segundos)
+AUTH_USER_CACHE_SIZE = 1000
+AUTH_USER_CACHE_TTL = 60
+
+# Paginación por cursor de los listados (filas por página)
+LIST_PAGE_SIZE = 25
+
+# Búsqueda de texto completo (máximo de resultados ordenados por relevancia)
+SEARCH_MAX_RESULTS = 500
+
+# Vigencia (segundos) de los conteos por filtro de los listados, por texto de búsqueda
+FACET_CACHE_TTL = 30
+
+# Máximo de sugerencias del autocompletado de checklists
+AUTOCOMPLETE_LIMIT = 10
+
+# API de sincronización: filas por página y flujo, visitas por lote de subida,
+# segundos recientes que se dejan para la sincronización siguiente (más que
+# la transacción de escritura más larga) y días que se conservan las
+# eliminaciones (un cursor más antiguo obliga a resincronizar)
+SYNC_PAGE_SIZE = 500
+SYNC_MAX_UPLOAD = 500
+SYNC_MARGIN_SECONDS = int(os.environ.get('SYNC_MARGIN_SECONDS', '120'))
+SYNC_TOMBSTONE_DAYS = int(os.environ.get('SYNC_TOMBSTONE_DAYS', '90'))
+
+# Escáner de vencimientos (manage.py escanear_vencimientos): días de aviso
+# antes del vencimiento, segundos entre pasadas, responsables por lote de envío
+# y minutos de espera para reintentar un resumen que el servidor rechazó
+CHECKLIST_DUE_SOON_DAYS = int(os.environ.get('CHECKLIST_DUE_SOON_DAYS', '3'))
+CHECKLIST_SCAN_INTERVAL = int(os.environ.get('CHECKLIST_SCAN_INTERVAL', '300'))
+CHECKLIST_DIGEST_BATCH = 100
+CHECKLIST_DIGEST_RETRY_MINUTES = 60
+
+# Cola de seguimientos: minutos que un seguimiento tomado queda reservado
+FOLLOWUP_CLAIM_MINUTES = 30
+
+# Dashboard en vivo (Server-Sent Events, solo bajo ASGI): segundos entre
+# latidos, segundos que dura cada conexión antes de que el navegador se
+# reconecte, milisegundos de espera para reconectar y visitas críticas que
+# se guardan por conexión mientras el cliente no las recibe
+SSE_HEARTBEAT_SECONDS = 15
+SSE_MAX_SECONDS = 300
+SSE_RETRY_MS = 3000
+SSE_QUEUE_SIZE = 50
+
+# Fotos de evidencia de las visitas: bytes por archivo, archivos por subida,
+# procesos del pool que genera las versiones reducidas (0 = en el mismo hilo)
+# y caja máxima (ancho, alto) de la miniatura y de la versión web
+PHOTO_MAX_BYTES = 15 * 1024 * 1024
+PHOTO_MAX_PER_UPLOAD = 20
+PHOTO_WORKERS = int(os.environ.get('PHOTO_WORKERS', '2'))
+PHOTO_THUMB_SIZE = (320, 320)
+PHOTO_WEB_SIZE = (1280, 1280)
+
+# Correo de los resúmenes de vencimientos (por defecto se escriben en la consola)
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+EMAIL_HOST = os.environ.get('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.environ.get('EMAIL_PORT', '25'))
+EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = os.environ.get('EMAIL_USE_TLS', '') == '1'
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'seguridad@gestion-forestal.local')
+
+# Instrumentación de rendimiento (cabecera Server-Timing y /metricas/)
+PERFORMANCE_METRICS_ENABLED = True
 
 # Login/Logout URLs
 LOGIN_URL = '/login/'
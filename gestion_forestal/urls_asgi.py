@@ -0,0 +1,12 @@
+"""
+URL Configuration del proyecto gestion_forestal bajo ASGI.
+Sistema de Gestión de Seguridad Forestal
+Igual que ``urls.py``, con las vistas asíncronas de la aplicación principal
+"""
+from django.contrib import admin
+from django.urls import path, include
+
+urlpatterns = [
+    path('admin/', admin.site.urls),
+    path('', include('seguridad_app.urls_async')),  # Rutas de la aplicación con vistas asíncronas
+]
@@ -5,3 +5,7 @@ class SeguridadAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'seguridad_app'
     verbose_name = 'Aplicación de Seguridad Forestal'
+
+    def ready(self):
+        # Registrar las señales de los modelos
+        from . import signals  # noqa: F401
@@ -0,0 +1,149 @@
+"""
+Sistema de Gestión de Seguridad Forestal
+Caché en memoria del usuario autenticado
+
+``AuthenticationMiddleware`` consulta ``auth_user`` en cada request. Aquí se
+guarda el usuario ya verificado por (clave de sesión, id de usuario) en una
+caché LRU del proceso, con tamaño máximo ``AUTH_USER_CACHE_SIZE`` y vigencia
+``AUTH_USER_CACHE_TTL`` segundos. Las señales de ``User`` la invalidan cuando
+cambian la contraseña, el estado activo o el nombre, y al cerrar sesión.
+
+Para que la invalidación valga en todos los procesos, cada usuario tiene una
+versión en la caché compartida que cambia al invalidarlo; una entrada
+guardada con otra versión se descarta. Con una caché del proceso
+(``CACHE_SHARED`` falso) no hay forma de avisar a los demás y el usuario se
+consulta en cada request.
+"""
+
+import copy
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.core.cache import cache
+from django.utils.crypto import constant_time_compare
+
+
+# Campos de User cuyo cambio invalida la caché
+CAMPOS_INVALIDAN = frozenset({'password', 'is_active', 'first_name', 'last_name', 'username', 'email'})
+
+PREFIJO_VERSION = 'autenticacion.version.'
+
+
+class CacheUsuarios:
+    """
+    LRU con vencimiento, indexada también por id de usuario para invalidar
+    """
+
+    def __init__(self, tamano, ttl):
+        self.tamano = tamano
+        self.ttl = ttl
+        self._entradas = OrderedDict()  # (clave de sesión, user id) -> (vence_en, usuario, versión)
+        self._por_usuario = {}          # user id -> {claves}
+        self._lock = threading.Lock()
+
+    def obtener(self, clave, version):
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                return None
+            vence_en, usuario, version_guardada = entrada
+            if vence_en <= time.monotonic() or version_guardada != version:
+                self._quitar(clave)
+                return None
+            self._entradas.move_to_end(clave)
+        # Copia para que un request no modifique el objeto de otro
+        return copy.copy(usuario)
+
+    def guardar(self, clave, usuario, version):
+        with self._lock:
+            self._entradas[clave] = (time.monotonic() + self.ttl, copy.copy(usuario), version)
+            self._entradas.move_to_end(clave)
+            self._por_usuario.setdefault(clave[1], set()).add(clave)
+            while len(self._entradas) > self.tamano:
+                self._quitar(next(iter(self._entradas)))
+
+    def invalidar_usuario(self, user_id):
+        with self._lock:
+            for clave in list(self._por_usuario.get(str(user_id), ())):
+                self._quitar(clave)
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+            self._por_usuario.clear()
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def _quitar(self, clave):
+        self._entradas.pop(clave, None)
+        claves = self._por_usuario.get(clave[1])
+        if claves is not None:
+            claves.discard(clave)
+            if not claves:
+                del self._por_usuario[clave[1]]
+
+
+cache_usuarios = CacheUsuarios(
+    tamano=getattr(settings, 'AUTH_USER_CACHE_SIZE', 1000),
+    ttl=getattr(settings, 'AUTH_USER_CACHE_TTL', 60),
+)
+
+
+def _clave_version(user_id):
+    return f'{PREFIJO_VERSION}{user_id}'
+
+
+def version_usuario(user_id):
+    """
+    Versión vigente del usuario en la caché compartida (la crea si no está)
+    """
+    clave = _clave_version(user_id)
+    version = cache.get(clave)
+    if version is None:
+        cache.add(clave, uuid.uuid4().hex, None)
+        version = cache.get(clave)
+    return version
+
+
+def invalidar_usuario(user_id):
+    cache_usuarios.invalidar_usuario(user_id)
+    # Las entradas de los demás procesos quedan con una versión vencida
+    cache.set(_clave_version(user_id), uuid.uuid4().hex, None)
+
+
+def obtener_usuario(request):
+    """
+    Equivalente a ``django.contrib.auth.get_user`` con caché por sesión
+
+    Si el usuario está en caché se vuelve a comparar el hash de sesión (sin
+    consultar la base de datos); ante cualquier duda se delega en Django, que
+    también se encarga de cerrar sesiones inválidas.
+    """
+    session = request.session
+    user_id = session.get(SESSION_KEY)
+    if user_id is None or session.get(BACKEND_SESSION_KEY) not in settings.AUTHENTICATION_BACKENDS:
+        return auth.get_user(request)
+    if not getattr(settings, 'CACHE_SHARED', True):
+        return auth.get_user(request)
+
+    clave = (session.session_key, str(user_id))
+    version = version_usuario(user_id)
+    usuario = cache_usuarios.obtener(clave, version)
+    if usuario is not None:
+        if usuario.is_active and constant_time_compare(
+            session.get(HASH_SESSION_KEY) or '', usuario.get_session_auth_hash()
+        ):
+            return usuario
+        cache_usuarios.invalidar_usuario(user_id)
+
+    usuario = auth.get_user(request)
+    # get_user puede haber rotado la clave de sesión
+    if usuario.is_authenticated and session.session_key:
+        cache_usuarios.guardar((session.session_key, str(user_id)), usuario, version)
+    return usuario
@@ -0,0 +1,59 @@
+"""
+Sistema de Gestión de Seguridad Forestal
+Backend MySQL con pool de conexiones por proceso
+
+Igual al backend ``django.db.backends.mysql``, pero en lugar de abrir y
+cerrar una conexión TCP en cada request la toma de un ``PoolConexiones`` y
+la devuelve al cerrarla. Se configura con la clave ``POOL`` de la base de
+datos en ``DATABASES``::
+
+    'ENGINE': 'seguridad_app.backends.mysql_pool',
+    'CONN_MAX_AGE': 0,            # > 0 mantiene además la conexión en el hilo
+    'POOL': {
+        'SIZE': 10,               # máximo de conexiones del proceso
+        'TIMEOUT': 5,             # segundos de espera por una conexión libre
+        'RECYCLE': 1800,          # segundos de vida de una conexión
+        'PRE_PING': True,         # ping antes de entregar una conexión libre
+    },
+"""
+
+from django.db.backends.mysql import base as mysql_base
+
+from ..pool import PoolConexiones, pool_para
+
+
+class DatabaseWrapper(mysql_base.DatabaseWrapper):
+
+    def _pool(self, conn_params):
+        opciones = self.settings_dict.get('POOL') or {}
+        clave = (
+            self.alias,
+            conn_params.get('database') or conn_params.get('db'),
+            conn_params.get('host') or conn_params.get('unix_socket'),
+            conn_params.get('port'),
+        )
+        return pool_para(clave, lambda: PoolConexiones(
+            conectar=lambda: super(DatabaseWrapper, self).get_new_connection(dict(conn_params)),
+            tamano=opciones.get('SIZE', 10),
+            espera=opciones.get('TIMEOUT', 5),
+            reciclar=opciones.get('RECYCLE', 1800),
+            verificar=opciones.get('PRE_PING', True),
+            nombre=self.alias,
+        ))
+
+    def get_new_connection(self, conn_params):
+        pool = self._pool(conn_params)
+        conexion = pool.obtener()
+        self._pool_actual = pool
+        return conexion
+
+    def _close(self):
+        if self.connection is None:
+            return
+        pool = getattr(self, '_pool_actual', None)
+        if pool is None:
+            return super()._close()
+        if self.errors_occurred and not self.is_usable():
+            pool.descartar(self.connection)
+        else:
+            pool.devolver(self.connection)
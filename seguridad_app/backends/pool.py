@@ -0,0 +1,245 @@
+"""
+Sistema de Gestión de Seguridad Forestal
+Pool de conexiones a la base de datos por proceso
+
+El pool no depende del motor: recibe una función que abre una conexión nueva
+y solo usa ``ping``, ``rollback`` y ``close`` de la conexión, de modo que se
+puede probar con conexiones simuladas. Lo usa el backend
+``seguridad_app.backends.mysql_pool``.
+
+Cada pool tiene un máximo de conexiones abiertas; cuando están todas en uso,
+quien pide una espera hasta ``espera`` segundos. Al entregar una conexión
+ociosa se descarta si superó ``reciclar`` segundos de vida y, si
+``verificar`` está activo, se le hace ``ping``; una conexión muerta se
+reemplaza por una nueva (reconexión).
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+from django.db.utils import OperationalError
+
+from .. import metrics
+
+
+class PoolAgotado(OperationalError):
+    """
+    No se liberó ninguna conexión dentro del tiempo de espera
+    """
+
+
+class PoolConexiones:
+    """
+    Pool acotado de conexiones con verificación al prestarlas
+    """
+
+    def __init__(self, conectar, tamano=10, espera=5.0, reciclar=1800, verificar=True, nombre='default'):
+        self.conectar = conectar
+        self.tamano = tamano
+        self.espera = espera
+        self.reciclar = reciclar
+        self.verificar = verificar
+        self.nombre = nombre
+
+        self._libres = deque()   # (conexión, instante de creación)
+        self._creacion = {}      # id(conexión) -> instante de creación
+        self._abiertas = 0       # prestadas + libres + en proceso de apertura
+        self._cond = threading.Condition()
+
+        self.contadores = {
+            'checkouts': 0,      # conexiones entregadas
+            'esperas': 0,        # entregas que tuvieron que esperar
+            'tiempo_espera': 0.0,
+            'agotado': 0,        # esperas que vencieron sin conexión
+            'creadas': 0,
+            'reconexiones': 0,   # conexiones muertas reemplazadas
+            'recicladas': 0,     # conexiones cerradas por antigüedad
+            'descartadas': 0,    # conexiones devueltas en mal estado
+        }
+
+    # ---------------------------
+    # Préstamo y devolución
+    # ---------------------------
+
+    def obtener(self):
+        """
+        Entrega una conexión sana, reutilizando una libre si la hay
+        """
+        limite = time.monotonic() + self.espera
+        inicio_espera = None
+        with self._cond:
+            while True:
+                if self._libres:
+                    conexion, creada = self._libres.pop()
+                    break
+                if self._abiertas < self.tamano:
+                    self._abiertas += 1
+                    conexion, creada = None, None
+                    break
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    self.contadores['agotado'] += 1
+                    raise PoolAgotado(
+                        f'Pool "{self.nombre}" sin conexiones libres después de {self.espera} s '
+                        f'({self.tamano} en uso)'
+                    )
+                if inicio_espera is None:
+                    inicio_espera = time.monotonic()
+                self._cond.wait(restante)
+
+            self.contadores['checkouts'] += 1
+            if inicio_espera is not None:
+                self.contadores['esperas'] += 1
+                self.contadores['tiempo_espera'] += time.monotonic() - inicio_espera
+
+        # La verificación y la apertura se hacen fuera del lock
+        if conexion is not None:
+            if self.reciclar and time.monotonic() - creada > self.reciclar:
+                self._cerrar(conexion)
+                self._contar('recicladas')
+                conexion = None
+            elif self.verificar and not self._viva(conexion):
+                self._cerrar(conexion)
+                self._contar('reconexiones')
+                conexion = None
+
+        if conexion is None:
+            try:
+                conexion = self.conectar()
+            except BaseException:
+                with self._cond:
+                    self._abiertas -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._creacion[id(conexion)] = time.monotonic()
+                self.contadores['creadas'] += 1
+        return conexion
+
+    def devolver(self, conexion):
+        """
+        Deja la conexión libre para otro préstamo, o la cierra si quedó inutilizable
+        """
+        try:
+            # Descarta cualquier transacción abierta que haya quedado
+            conexion.rollback()
+        except Exception:
+            self.descartar(conexion)
+            return
+        with self._cond:
+            creada = self._creacion.get(id(conexion), time.monotonic())
+            self._libres.append((conexion, creada))
+            self._cond.notify()
+
+    def descartar(self, conexion):
+        self._cerrar(conexion)
+        with self._cond:
+            self.contadores['descartadas'] += 1
+            self._abiertas -= 1
+            self._cond.notify()
+
+    def cerrar_todas(self):
+        with self._cond:
+            libres, self._libres = list(self._libres), deque()
+            self._abiertas -= len(libres)
+        for conexion, _ in libres:
+            self._cerrar(conexion)
+
+    # ---------------------------
+    # Estado
+    # ---------------------------
+
+    def estado(self):
+        with self._cond:
+            return {
+                **self.contadores,
+                'tamano': self.tamano,
+                'abiertas': self._abiertas,
+                'libres': len(self._libres),
+                'en_uso': self._abiertas - len(self._libres),
+            }
+
+    def _viva(self, conexion):
+        try:
+            conexion.ping(False)
+        except Exception:
+            return False
+        return True
+
+    def _cerrar(self, conexion):
+        with self._cond:
+            self._creacion.pop(id(conexion), None)
+        try:
+            conexion.close()
+        except Exception:
+            pass
+
+    def _contar(self, contador):
+        # La conexión reemplazada sigue contando como abierta: se abre otra en su lugar
+        with self._cond:
+            self.contadores[contador] += 1
+
+
+# ---------------------------
+# Registro de pools del proceso
+# ---------------------------
+
+_pools = {}
+_lock_pools = threading.Lock()
+
+
+def pool_para(clave, crear):
+    """
+    Pool del proceso actual para ``clave``
+
+    La clave incluye el pid: tras un fork el proceso hijo abre sus propias
+    conexiones en lugar de compartir los sockets del padre.
+    """
+    clave = (os.getpid(), *clave)
+    with _lock_pools:
+        pool = _pools.get(clave)
+        if pool is None:
+            pool = _pools[clave] = crear()
+        return pool
+
+
+def pools():
+    """
+    Pools del proceso actual, por (alias, base de datos, host, puerto)
+    """
+    pid = os.getpid()
+    with _lock_pools:
+        return {clave[1:]: pool for clave, pool in _pools.items() if clave[0] == pid}
+
+
+# Métricas expuestas en /metricas/ (formato de texto de Prometheus)
+METRICAS_POOL = [
+    ('checkouts', 'counter', 'Conexiones entregadas por el pool'),
+    ('esperas', 'counter', 'Entregas que esperaron una conexión libre'),
+    ('tiempo_espera', 'counter', 'Segundos esperando una conexión libre'),
+    ('agotado', 'counter', 'Esperas que vencieron sin conexión libre'),
+    ('creadas', 'counter', 'Conexiones abiertas'),
+    ('reconexiones', 'counter', 'Conexiones muertas reemplazadas al verificarlas'),
+    ('recicladas', 'counter', 'Conexiones cerradas por antigüedad'),
+    ('descartadas', 'counter', 'Conexiones devueltas en mal estado'),
+    ('tamano', 'gauge', 'Máximo de conexiones del pool'),
+    ('en_uso', 'gauge', 'Conexiones prestadas'),
+    ('libres', 'gauge', 'Conexiones libres'),
+]
+
+
+def exponer_metricas():
+    estados = {clave: pool.estado() for clave, pool in pools().items()}
+    lineas = []
+    for campo, tipo, ayuda in METRICAS_POOL:
+        nombre = f'seguridad_db_pool_{campo}' + ('_total' if tipo == 'counter' else '')
+        lineas.append(f'# HELP {nombre} {ayuda}')
+        lineas.append(f'# TYPE {nombre} {tipo}')
+        for (alias, base, *_), estado in sorted(estados.items(), key=lambda item: str(item[0])):
+            lineas.append(f'{nombre}{{alias="{alias}",base="{base}"}} {estado[campo]}')
+    return lineas
+
+
+metrics.registro.agregar_colector(exponer_metricas)
@@ -0,0 +1,134 @@
+"""
+Sistema de Gestión de Seguridad Forestal
+GET condicional (ETag / Last-Modified) para detalles, listados y exportaciones
+
+La versión del contenido sale de lo que la vista ya obtuvo, sin consultas
+adicionales: en un listado, las filas de la página (clave y
+``fecha_actualizacion``), sus cursores y los conteos de los filtros; en un
+detalle, las fechas de actualización guardadas en su fragmento. Si el
+cliente ya tiene esa versión (``If-None-Match`` o ``If-Modified-Since``) se
+responde 304 sin renderizar el template. Las exportaciones recorren todas
+las filas filtradas, así que su versión (cantidad y última modificación) se
+consulta antes de generar el archivo.
+
+El ETag combina esa versión con el usuario, la cookie CSRF (la página
+incluye formularios), la URL completa y la versión global de
+``fragmentos.py``, que cambia con los nombres de usuario y las cargas
+masivas. Las respuestas llevan ``Cache-Control: private, no-cache`` para que
+el navegador guarde la copia pero la revalide en cada visita.
+
+Con una caché del proceso (``CACHE_SHARED`` falso) la versión global no se
+comparte entre procesos: un cambio de nombre de usuario en otro proceso no
+cambiaría el ETag, así que no se valida y se responde siempre el contenido.
+"""
+
+import calendar
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.crypto import md5
+from django.utils.http import http_date, quote_etag
+
+from . import fragmentos
+
+
+def _etag(request, partes):
+    usuario = getattr(request, 'user', None)
+    valores = [
+        getattr(usuario, 'pk', None),
+        # El valor de la cookie que el navegador envía (o enviará, si la vista la creó)
+        request.META.get('CSRF_COOKIE') or request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+        request.get_full_path(),
+        fragmentos.version_global(),
+        *partes,
+    ]
+    return quote_etag(md5(repr(valores).encode(), usedforsecurity=False).hexdigest())
+
+
+def _marca_unix(fecha):
+    return calendar.timegm(fecha.utctimetuple()) if fecha is not None else None
+
+
+def _validar(request, validacion):
+    """
+    ``(etag, ultima_modificacion)`` del contenido, o None si no corresponde validar
+    """
+    if validacion is None or request.method not in ('GET', 'HEAD'):
+        return None
+    if not getattr(settings, 'CACHE_SHARED', True):
+        return None
+    # Los mensajes pendientes se muestran en la próxima página completa
+    if len(get_messages(request)):
+        return None
+
+    partes, ultima_modificacion = validacion
+    return _etag(request, partes), _marca_unix(ultima_modificacion)
+
+
+def _csrf_renovado(request):
+    # La vista creó o renovó la cookie CSRF (p. ej. la página tiene un
+    # formulario y es la primera visita): el ETag debe usar la nueva
+    return request.META.get('CSRF_COOKIE_NEEDS_UPDATE', False)
+
+
+def _completar(response, etag, ultima_modificacion):
+    if response.status_code not in (200, 304):
+        return response
+    response.headers['ETag'] = etag
+    if ultima_modificacion is not None:
+        response.headers['Last-Modified'] = http_date(ultima_modificacion)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def responder(request, validacion, generar):
+    """
+    Respuesta de ``generar()`` con su ETag, o 304 si el cliente ya tiene el contenido
+
+    ``validacion`` es ``(partes, ultima_modificacion)``: ``partes`` son los
+    valores que identifican la versión del contenido y
+    ``ultima_modificacion`` un datetime o None (sin ``Last-Modified``, p. ej.
+    en un listado, donde quitar una fila no cambia la fecha máxima). Con
+    ``validacion`` None se responde sin validar.
+    """
+    validado = _validar(request, validacion)
+    if validado is None:
+        return generar()
+
+    etag, ultima_modificacion = validado
+    response = get_conditional_response(request, etag=etag, last_modified=ultima_modificacion)
+    if response is None:
+        response = generar()
+        if _csrf_renovado(request):
+            etag = _etag(request, validacion[0])
+    return _completar(response, etag, ultima_modificacion)
+
+
+async def responder_async(request, validacion, generar):
+    """
+    ``responder`` para vistas asíncronas: ``generar`` es una corrutina
+    """
+    validado = await sync_to_async(_validar)(request, validacion)
+    if validado is None:
+        return await generar()
+
+    etag, ultima_modificacion = validado
+    response = get_conditional_response(request, etag=etag, last_modified=ultima_modificacion)
+    if response is None:
+        response = await generar()
+        if _csrf_renovado(request):
+            etag = await sync_to_async(_etag)(request, validacion[0])
+    return _completar(response, etag, ultima_modificacion)
+
+
+def version_pagina(page, *extras):
+    """
+    Validación de una página de un listado: sus filas, sus cursores y ``extras``
+
+    Una fila editada cambia su fecha; una creada o eliminada, las claves de
+    la página o sus cursores.
+    """
+    filas = [(obj.pk, obj.fecha_actualizacion) for obj in page.object_list]
+    return (filas, page.next_cursor, page.prev_cursor, *extras), None
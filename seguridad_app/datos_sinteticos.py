@@ -0,0 +1,267 @@
+"""
+Sistema de Gestión de Seguridad Forestal
+Generación de datos sintéticos para pruebas de carga
+
+Crea usuarios, checklists y visitas con distribuciones sesgadas (pocas
+áreas concentran la mayoría de los registros, pocas visitas son críticas,
+etc.) e inserta en bloques con ``bulk_create``. Con la misma semilla se
+obtienen los mismos datos, para que las mediciones sean comparables.
+"""
+
+import datetime
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import Max
+from django.db.models.functions import Length
+from django.utils import timezone
+
+from . import fotos, fragmentos, search, seguimientos
+from .models import AvisoVencimiento, Checklist, FotoVisita, Seguimiento, Visita
+from .resumen import reconstruir_resumen
+
+
+# Tamaños predefinidos: (usuarios, checklists, visitas)
+TAMANOS = {
+    '1k': (20, 200, 1_000),
+    '10k': (50, 2_000, 10_000),
+    '100k': (200, 20_000, 100_000),
+    '1m': (1_000, 200_000, 1_000_000),
+}
+
+PREFIJO_USUARIO = 'sim_'
+
+AREAS = [
+    'Sector Norte', 'Sector Sur', 'Vivero Central', 'Aserradero', 'Cuartel 12',
+    'Predio Los Coigües', 'Planta de Astillado', 'Bodega de Combustible',
+    'Faena de Cosecha', 'Camino Forestal 5', 'Torre de Vigilancia', 'Campamento',
+    'Predio El Roble', 'Zona de Raleo', 'Patio de Trozos',
+]
+
+LUGARES = [
+    'Área de Tala', 'Cancha de Acopio', 'Taller Mecánico', 'Polvorín',
+    'Punto de Carguío', 'Quebrada', 'Estanque de Agua', 'Acceso Principal',
+]
+
+TITULOS = [
+    'Revisión de motosierras', 'Inspección de EPP', 'Control de extintores',
+    'Verificación de maquinaria pesada', 'Plan de emergencia', 'Revisión de caminos',
+    'Control de combustibles', 'Inspección de campamento', 'Señalética de faena',
+    'Revisión de botiquines', 'Control de cortafuegos', 'Mantención de skidder',
+]
+
+FRASES = [
+    'Se observa uso correcto de equipo de protección personal.',
+    'Extintor con carga vencida en la cabina del camión.',
+    'Riesgo crítico de caída de árboles en la pendiente.',
+    'Falta señalética en el acceso a la faena.',
+    'Derrame menor de aceite hidráulico junto al skidder.',
+    'Trabajadores sin casco en la zona de tala.',
+    'Cortafuegos despejado y en buen estado.',
+    'Botiquín incompleto, faltan vendas y antiséptico.',
+    'Motosierra sin freno de cadena operativo.',
+    'Camino con erosión que dificulta el tránsito de camiones.',
+]
+
+RECOMENDACIONES = [
+    'Reforzar la capacitación del personal.',
+    'Reemplazar el equipo defectuoso antes del próximo turno.',
+    'Programar una visita de seguimiento en 15 días.',
+    'Actualizar el plan de emergencia de la faena.',
+    'Sin recomendaciones adicionales.',
+]
+
+# Pesos de las distribuciones (sesgadas a propósito)
+PESOS_ESTADO = {'completado': 55, 'pendiente': 20, 'en_progreso': 15, 'cancelado': 10}
+PESOS_PRIORIDAD = {'media': 50, 'baja': 25, 'alta': 18, 'critica': 7}
+PESOS_TIPO = {'preventiva': 60, 'seguimiento': 20, 'correctiva': 15, 'emergencia': 5}
+PESOS_RESULTADO = {
+    'satisfactorio': 60, 'observaciones_menores': 25, 'observaciones_mayores': 10, 'critico': 5,
+}
+PROBABILIDAD_SEGUIMIENTO = {
+    'satisfactorio': 0.02, 'observaciones_menores': 0.2,
+    'observaciones_mayores': 0.6, 'critico': 0.95,
+}
+
+
+def _elegir(rng, pesos, k):
+    return rng.choices(list(pesos), weights=list(pesos.values()), k=k)
+
+
+def _pesos_zipf(n):
+    return [1 / (i + 1) for i in range(n)]
+
+
+def _ultimo_codigo(semilla):
+    """
+    Número del último código ``SIM-<semilla>-<n>`` de la base, o 0
+
+    Los números van con ceros a la izquierda, pero pueden superar el ancho:
+    se ordena primero por largo.
+    """
+    prefijo = f'SIM-{semilla}-'
+    codigo = (
+        Visita.objects.filter(codigo_visita__regex=rf'^SIM-{semilla}-[0-9]+$')
+        .order_by(Length('codigo_visita').desc(), '-codigo_visita')
+        .values_list('codigo_visita', flat=True).first()
+    )
+    return int(codigo[len(prefijo):]) if codigo else 0
+
+
+def limpiar(stdout=None):
+    """
+    Borra los usuarios sintéticos y sus checklists y visitas
+
+    Solo toca los registros de los usuarios ``PREFIJO_USUARIO`` (responsable
+    o inspector); los datos reales de la base quedan intactos. Las visitas y
+    los checklists se borran con un DELETE por tabla, sin cargar las filas en
+    memoria ni disparar las señales, y después se reconstruyen las
+    estructuras derivadas.
+    """
+    sinteticos = User.objects.filter(username__startswith=PREFIJO_USUARIO).values('pk')
+    visitas = Visita.objects.filter(inspector__in=sinteticos).values('pk')
+    checklists = Checklist.objects.filter(responsable__in=sinteticos).values('pk')
+    usuarios_sql, usuarios_params = sinteticos.query.sql_with_params()
+    qn = connection.ops.quote_name
+
+    with transaction.atomic():
+        # Primero las tablas que referencian a visitas y checklists
+        Seguimiento.objects.filter(visita__in=visitas).delete()
+        FotoVisita.objects.filter(visita__in=visitas).delete()
+        AvisoVencimiento.objects.filter(checklist__in=checklists).delete()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {qn(Visita._meta.db_table)} WHERE {qn("inspector_id")} IN ({usuarios_sql})',
+                usuarios_params,
+            )
+            # Visitas reales asociadas a un checklist sintético
+            Seguimiento.objects.filter(visita__checklist__in=checklists).update(area='')
+            Visita.objects.filter(checklist__in=checklists).update(
+                checklist=None, fecha_actualizacion=timezone.now(),
+            )
+            cursor.execute(
+                f'DELETE FROM {qn(Checklist._meta.db_table)} WHERE {qn("responsable_id")} IN ({usuarios_sql})',
+                usuarios_params,
+            )
+        User.objects.filter(username__startswith=PREFIJO_USUARIO).delete()
+    # Las fotos que solo estaban en visitas sintéticas y sus archivos
+    fotos.purgar()
+    reconstruir_resumen()
+    search.reiniciar_indices()
+    fragmentos.invalidar_todo()
+    if stdout:
+        stdout.write('Datos sintéticos anteriores eliminados.')
+
+
+def generar(usuarios, checklists, visitas, semilla=42, lote=5000, stdout=None):
+    """
+    Inserta los registros sintéticos y reconstruye las estructuras derivadas
+    """
+    rng = random.Random(semilla)
+    ahora = timezone.now()
+    hoy = timezone.localdate()
+    pesos_area = _pesos_zipf(len(AREAS))
+
+    def informar(mensaje):
+        if stdout:
+            stdout.write(mensaje)
+
+    # Usuarios
+    password = make_password(None)
+    existentes = set(
+        User.objects.filter(username__startswith=PREFIJO_USUARIO).values_list('username', flat=True)
+    )
+    nuevos = [
+        User(
+            username=f'{PREFIJO_USUARIO}inspector_{i}',
+            first_name='Inspector',
+            last_name=str(i),
+            email=f'{PREFIJO_USUARIO}inspector_{i}@example.com',
+            password=password,
+        )
+        for i in range(usuarios)
+        if f'{PREFIJO_USUARIO}inspector_{i}' not in existentes
+    ]
+    User.objects.bulk_create(nuevos, batch_size=lote)
+    usuario_ids = list(
+        User.objects.filter(username__startswith=PREFIJO_USUARIO)
+        .order_by('pk').values_list('pk', flat=True)[:usuarios]
+    )
+    pesos_usuario = _pesos_zipf(len(usuario_ids))
+    informar(f'Usuarios: {len(usuario_ids)}')
+
+    # Checklists
+    ultimo_checklist = Checklist.objects.aggregate(ultimo=Max('pk'))['ultimo'] or 0
+    creados = 0
+    while creados < checklists:
+        n = min(lote, checklists - creados)
+        estados = _elegir(rng, PESOS_ESTADO, n)
+        prioridades = _elegir(rng, PESOS_PRIORIDAD, n)
+        areas = rng.choices(AREAS, weights=pesos_area, k=n)
+        responsables = rng.choices(usuario_ids, weights=pesos_usuario, k=n)
+        filas = []
+        for i in range(n):
+            creacion = ahora - datetime.timedelta(minutes=rng.randint(0, 3 * 365 * 24 * 60))
+            filas.append(Checklist(
+                titulo=f'{rng.choice(TITULOS)} #{creados + i + 1}',
+                descripcion=' '.join(rng.sample(FRASES, 2)),
+                area=areas[i],
+                responsable_id=responsables[i],
+                estado=estados[i],
+                prioridad=prioridades[i],
+                fecha_creacion=creacion,
+                fecha_vencimiento=creacion.date() + datetime.timedelta(days=rng.randint(-30, 90)),
+                observaciones=rng.choice(['', rng.choice(RECOMENDACIONES)]),
+            ))
+        with transaction.atomic():
+            Checklist.objects.bulk_create(filas)
+        creados += n
+        informar(f'Checklists: {creados}/{checklists}')
+
+    # Las visitas se asocian solo a los checklists de esta ejecución (bulk_create
+    # no devuelve las claves en MySQL)
+    checklist_ids = list(
+        Checklist.objects.filter(pk__gt=ultimo_checklist, responsable_id__in=usuario_ids)
+        .order_by('pk').values_list('pk', flat=True)
+    )
+
+    # Visitas: la numeración sigue al último código sintético de la semilla
+    inicio_codigos = _ultimo_codigo(semilla)
+    creados = 0
+    while creados < visitas:
+        n = min(lote, visitas - creados)
+        tipos = _elegir(rng, PESOS_TIPO, n)
+        resultados = _elegir(rng, PESOS_RESULTADO, n)
+        inspectores = rng.choices(usuario_ids, weights=pesos_usuario, k=n)
+        filas = []
+        for i in range(n):
+            numero = inicio_codigos + creados + i + 1
+            inicio = datetime.time(rng.randint(7, 16), rng.choice((0, 15, 30, 45)))
+            fecha = hoy - datetime.timedelta(days=rng.randint(0, 3 * 365))
+            filas.append(Visita(
+                codigo_visita=f'SIM-{semilla}-{numero:07d}',
+                tipo_visita=tipos[i],
+                fecha_visita=fecha,
+                hora_inicio=inicio,
+                hora_fin=datetime.time(min(inicio.hour + rng.randint(1, 3), 23), inicio.minute),
+                lugar=f'{rng.choices(AREAS, weights=pesos_area)[0]} - {rng.choice(LUGARES)}',
+                inspector_id=inspectores[i],
+                checklist_id=rng.choice(checklist_ids) if checklist_ids and rng.random() < 0.7 else None,
+                hallazgos=' '.join(rng.sample(FRASES, 3)),
+                resultado=resultados[i],
+                recomendaciones=rng.choice(RECOMENDACIONES),
+                requiere_seguimiento=rng.random() < PROBABILIDAD_SEGUIMIENTO[resultados[i]],
+                fecha_creacion=ahora - datetime.timedelta(days=rng.randint(0, 3 * 365)),
+            ))
+        with transaction.atomic():
+            Visita.objects.bulk_create(filas)
+        creados += n
+        informar(f'Visitas: {creados}/{visitas}')
+
+    # bulk_create no emite señales
+    reconstruir_resumen()
+    search.reiniciar_indices()
+    fragmentos.invalidar_todo()
+    seguimientos.reconstruir()
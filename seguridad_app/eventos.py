@@ -0,0 +1,183 @@
+"""
+Sistema de Gestión de Seguridad Forestal
+Eventos en vivo del dashboard (Server-Sent Events)
+
+Un único publicador por proceso recibe de las señales y de la importación
+los cambios de los contadores del dashboard y las visitas críticas nuevas, y
+los reparte a las conexiones SSE abiertas
+(``vistas_async.dashboard_eventos_view``). Los contadores se leen una sola
+vez por cambio confirmado, sea cual sea la cantidad de clientes, y nada se
+lee si no hay clientes conectados.
+
+Las señales se disparan en hilos (vistas síncronas, ``sync_to_async``) y los
+suscriptores viven en el bucle de eventos del worker ASGI: por cada evento
+se hace un solo ``call_soon_threadsafe`` por bucle, y el reparto a los
+suscriptores de ese bucle ocurre dentro de él. Cada suscriptor guarda solo
+el último resumen (los cambios seguidos se combinan) y una cola acotada de
+visitas críticas.
+
+Es un sustituto local de un broker: solo llegan los cambios hechos en el
+mismo proceso. Con varios workers, o si se escribe desde procesos WSGI,
+``publicar`` es el punto donde se conecta un pub/sub externo.
+"""
+
+import asyncio
+import json
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.urls import reverse
+
+from . import resumen
+from .models import Visita
+
+
+RESULTADO_CRITICO = 'critico'
+
+
+class Suscriptor:
+    """
+    Conexión SSE abierta; se usa solo desde su bucle de eventos
+    """
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.resumen = None
+        self.criticas = deque(maxlen=getattr(settings, 'SSE_QUEUE_SIZE', 50))
+        self._hay_eventos = asyncio.Event()
+
+    def entregar(self, tipo, datos):
+        if tipo == 'resumen':
+            self.resumen = datos
+        else:
+            self.criticas.append(datos)
+        self._hay_eventos.set()
+
+    async def esperar(self, timeout):
+        """
+        Eventos pendientes como lista de ``(tipo, datos)``; vacía si vence ``timeout``
+        """
+        try:
+            await asyncio.wait_for(self._hay_eventos.wait(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        self._hay_eventos.clear()
+        eventos = []
+        if self.resumen is not None:
+            eventos.append(('resumen', self.resumen))
+            self.resumen = None
+        while self.criticas:
+            eventos.append(('critica', self.criticas.popleft()))
+        return eventos
+
+
+class Publicador:
+    """
+    Reparte cada evento a todos los suscriptores del proceso
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._por_bucle = {}
+
+    def suscribir(self):
+        loop = asyncio.get_running_loop()
+        suscriptor = Suscriptor(loop)
+        with self._lock:
+            self._por_bucle.setdefault(loop, set()).add(suscriptor)
+        return suscriptor
+
+    def desuscribir(self, suscriptor):
+        with self._lock:
+            suscriptores = self._por_bucle.get(suscriptor.loop)
+            if suscriptores is not None:
+                suscriptores.discard(suscriptor)
+                if not suscriptores:
+                    del self._por_bucle[suscriptor.loop]
+
+    def cantidad(self):
+        with self._lock:
+            return sum(len(suscriptores) for suscriptores in self._por_bucle.values())
+
+    def publicar(self, tipo, datos):
+        with self._lock:
+            bucles = list(self._por_bucle)
+        for loop in bucles:
+            try:
+                loop.call_soon_threadsafe(self._repartir, loop, tipo, datos)
+            except RuntimeError:
+                # El bucle ya se cerró: sus conexiones no existen
+                with self._lock:
+                    self._por_bucle.pop(loop, None)
+
+    def _repartir(self, loop, tipo, datos):
+        with self._lock:
+            suscriptores = list(self._por_bucle.get(loop, ()))
+        for suscriptor in suscriptores:
+            suscriptor.entregar(tipo, datos)
+
+
+publicador = Publicador()
+
+
+# ===========================
+# EVENTOS DEL DASHBOARD
+# ===========================
+
+def datos_resumen():
+    """
+    Contadores del dashboard que se envían a los clientes
+    """
+    valores = resumen.obtener_resumen()
+    valores.pop('id', None)
+    return valores
+
+
+def _publicar_resumen():
+    if publicador.cantidad():
+        publicador.publicar('resumen', datos_resumen())
+
+
+def _publicar_criticas(visitas):
+    if not publicador.cantidad():
+        return
+    sin_pk = [visita.codigo_visita for visita in visitas if visita.pk is None]
+    if sin_pk:
+        # bulk_create no devuelve las claves en MySQL
+        visitas = [visita for visita in visitas if visita.pk is not None] + list(
+            Visita.objects.filter(codigo_visita__in=sin_pk).only('codigo_visita', 'lugar', 'fecha_visita')
+        )
+    for visita in visitas:
+        publicador.publicar('critica', {
+            'id': visita.pk,
+            'codigo_visita': visita.codigo_visita,
+            'lugar': visita.lugar,
+            'fecha_visita': visita.fecha_visita,
+            'url': reverse('visita_detail', args=[visita.pk]),
+        })
+
+
+def resumen_modificado():
+    """
+    Publica los contadores cuando se confirme la transacción actual
+    """
+    transaction.on_commit(_publicar_resumen)
+
+
+def visitas_criticas(visitas):
+    """
+    Publica las visitas críticas nuevas cuando se confirme la transacción actual
+    """
+    criticas = [visita for visita in visitas if visita.resultado == RESULTADO_CRITICO]
+    if criticas:
+        transaction.on_commit(lambda: _publicar_criticas(criticas))
+
+
+def formatear(tipo, datos):
+    """
+    Mensaje SSE con el evento ``tipo`` y los datos en JSON
+    """
+    return f'event: {tipo}\ndata: {json.dumps(datos, cls=DjangoJSONEncoder)}\n\n'
@@ -0,0 +1,153 @@
+"""
+Sistema de Gestión de Seguridad Forestal
+Exportación en streaming de los listados de Visitas y Checklists
+
+Las filas se leen con ``values_list`` (incluyendo los JOIN necesarios) en
+lotes de ``CHUNK_SIZE`` por cursor sobre el orden del modelo (keyset, como
+``KeysetPaginator``) y se escriben a la respuesta a medida que se generan,
+así una exportación de un millón de filas no se carga completa en memoria
+ni espera a terminar antes de enviar el primer byte. Cada lote es una
+consulta acotada: no depende de que el driver soporte cursores del lado del
+servidor (PyMySQL trae el resultado completo de cada consulta).
+
+Con búsqueda se exportan todas las coincidencias, en las condiciones de
+``search.coincidencias``, por clave descendente.
+"""
+
+import csv
+import datetime
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .models import Checklist, Visita
+from .pagination import condicion_seek
+from .xlsx import CONTENT_TYPE as XLSX_CONTENT_TYPE, generar_xlsx
+
+
+FORMATOS = ('csv', 'xlsx')
+
+CHUNK_SIZE = 2000
+
+# (encabezado, ruta del valor en values_list)
+COLUMNAS_CHECKLIST = [
+    ('ID', 'pk'),
+    ('Título', 'titulo'),
+    ('Área', 'area'),
+    ('Responsable', 'responsable__username'),
+    ('Estado', 'estado'),
+    ('Prioridad', 'prioridad'),
+    ('Fecha de Creación', 'fecha_creacion'),
+    ('Fecha de Vencimiento', 'fecha_vencimiento'),
+]
+
+COLUMNAS_VISITA = [
+    ('ID', 'pk'),
+    ('Código', 'codigo_visita'),
+    ('Tipo', 'tipo_visita'),
+    ('Fecha', 'fecha_visita'),
+    ('Hora Inicio', 'hora_inicio'),
+    ('Hora Fin', 'hora_fin'),
+    ('Lugar', 'lugar'),
+    ('Inspector', 'inspector__username'),
+    ('Checklist', 'checklist__titulo'),
+    ('Resultado', 'resultado'),
+    ('Requiere Seguimiento', 'requiere_seguimiento'),
+]
+
+COLUMNAS = {
+    Checklist: COLUMNAS_CHECKLIST,
+    Visita: COLUMNAS_VISITA,
+}
+
+
+def _etiquetas(model):
+    """
+    Textos de los choices por campo, para exportar "En Progreso" y no "en_progreso"
+    """
+    return {
+        campo.name: dict(campo.flatchoices)
+        for campo in model._meta.concrete_fields if campo.choices
+    }
+
+
+def _por_lotes(queryset, rutas, campos):
+    """
+    Filas de ``values_list(*rutas)`` en orden descendente de ``campos``, de a ``CHUNK_SIZE``
+    """
+    # Los campos del orden van al final de cada fila para armar el cursor
+    filas = queryset.values_list(*rutas, *campos).order_by(*(f'-{campo}' for campo in campos))
+    lote = list(filas[:CHUNK_SIZE])
+    while lote:
+        for fila in lote:
+            yield fila[:len(rutas)]
+        if len(lote) < CHUNK_SIZE:
+            break
+        lote = list(filas.filter(condicion_seek(campos, lote[-1][len(rutas):], 'lt'))[:CHUNK_SIZE])
+
+
+def _filas(queryset, columnas, condiciones=None):
+    etiquetas = _etiquetas(queryset.model)
+    rutas = [ruta for _, ruta in columnas]
+    traducciones = [etiquetas.get(ruta) for ruta in rutas]
+    zona = timezone.get_current_timezone()
+
+    if condiciones is None:
+        campos = [campo.lstrip('-') for campo in queryset.model._meta.ordering] + ['pk']
+        filas = _por_lotes(queryset, rutas, campos)
+    else:
+        filas = (
+            fila for condicion in condiciones
+            for fila in _por_lotes(queryset.filter(condicion), rutas, ['pk'])
+        )
+    for fila in filas:
+        valores = []
+        for valor, traduccion in zip(fila, traducciones):
+            if traduccion is not None:
+                valor = traduccion.get(valor, valor)
+            elif isinstance(valor, datetime.datetime) and valor.tzinfo:
+                valor = valor.astimezone(zona).replace(tzinfo=None)
+            valores.append(valor)
+        yield valores
+
+
+class _Eco:
+    """Pseudo archivo para csv.writer: devuelve lo escrito en lugar de guardarlo"""
+
+    def write(self, valor):
+        return valor
+
+
+def _generar_csv(encabezados, filas):
+    writer = csv.writer(_Eco())
+    # BOM para que Excel detecte UTF-8
+    yield '﻿' + writer.writerow(encabezados)
+    for valores in filas:
+        yield writer.writerow(
+            ['Sí' if v is True else 'No' if v is False else v for v in valores]
+        )
+
+
+def exportar(queryset, formato, nombre, condiciones=None):
+    """
+    Devuelve la respuesta en streaming con el ``queryset`` en CSV o XLSX
+
+    ``condiciones`` son las de ``search.coincidencias`` cuando hay búsqueda.
+    """
+    columnas = COLUMNAS[queryset.model]
+    encabezados = [encabezado for encabezado, _ in columnas]
+    filas = _filas(queryset, columnas, condiciones)
+    archivo = f"{nombre}_{timezone.localdate():%Y%m%d}.{formato}"
+
+    if formato == 'xlsx':
+        response = StreamingHttpResponse(
+            generar_xlsx(encabezados, filas, nombre_hoja=nombre.capitalize()),
+            content_type=XLSX_CONTENT_TYPE,
+        )
+    else:
+        response = StreamingHttpResponse(
+            _generar_csv(encabezados, filas),
+            content_type='text/csv; charset=utf-8',
+        )
+    response['Content-Disposition'] = f'attachment; filename="{archivo}"'
+    return response
@@ -0,0 +1,95 @@
+"""
+Sistema de Gestión de Seguridad Forestal
+Conteos por opción de los filtros de los listados (facetas)
+
+Las visitas se cuentan con un solo GROUP BY por ``(tipo_visita, resultado)``
+sobre el resultado de la búsqueda; de esa tabla cruzada se obtienen los
+conteos de cada filtro combinados con el otro filtro activo. Los checklists
+sin búsqueda se cuentan desde ``ResumenDashboard``; con búsqueda, con un
+GROUP BY por ``estado``. Con búsqueda se cuentan todas las coincidencias
+(``search.coincidencias``), no solo las ``SEARCH_MAX_RESULTS`` que se
+pueden paginar.
+
+Las tablas se guardan en la caché por ``FACET_CACHE_TTL`` segundos para
+cada texto de búsqueda: los filtros se aplican sobre la tabla, así que
+cambiar de filtro no vuelve a consultar.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils.crypto import md5
+
+from . import search
+from .models import Checklist, Visita
+from .resumen import campo_estado, obtener_resumen
+
+
+PREFIJO = 'facetas'
+
+
+def _clave(modelo, query):
+    return f'{PREFIJO}.{modelo}.{md5(query.encode(), usedforsecurity=False).hexdigest()}'
+
+
+def _cacheada(modelo, query, calcular):
+    clave = _clave(modelo, query)
+    tabla = cache.get(clave)
+    if tabla is None:
+        tabla = calcular(query)
+        cache.set(clave, tabla, getattr(settings, 'FACET_CACHE_TTL', 30))
+    return tabla
+
+
+def _contar(queryset, query, campos):
+    """
+    Cantidad de filas por valores de ``campos``, sobre todas las coincidencias de ``query``
+    """
+    condiciones = search.coincidencias(queryset.model, query) if query else [Q()]
+    tabla = {}
+    for condicion in condiciones:
+        for *valores, total in queryset.filter(condicion).values_list(*campos).annotate(total=Count('pk')):
+            clave = tuple(valores) if len(valores) > 1 else valores[0]
+            tabla[clave] = tabla.get(clave, 0) + total
+    return tabla
+
+
+def _tabla_visitas(query):
+    return _contar(Visita.objects.order_by(), query, ('tipo_visita', 'resultado'))
+
+
+def _tabla_checklists(query):
+    if not query:
+        resumen = obtener_resumen()
+        return {estado: resumen[campo_estado(estado)] for estado, _ in Checklist.ESTADO_CHOICES}
+    return _contar(Checklist.objects.order_by(), query, ('estado',))
+
+
+def _opciones(choices, conteos):
+    return [(valor, etiqueta, conteos.get(valor, 0)) for valor, etiqueta in choices]
+
+
+def facetas_visitas(query, tipo_filter, resultado_filter):
+    """
+    Opciones ``(valor, etiqueta, cantidad)`` de los filtros de tipo y resultado
+
+    Cada filtro se cuenta con la búsqueda y el otro filtro aplicados.
+    """
+    tabla = _cacheada('visitas', query, _tabla_visitas)
+    tipos, resultados = {}, {}
+    for (tipo, resultado), total in tabla.items():
+        if not resultado_filter or resultado == resultado_filter:
+            tipos[tipo] = tipos.get(tipo, 0) + total
+        if not tipo_filter or tipo == tipo_filter:
+            resultados[resultado] = resultados.get(resultado, 0) + total
+    return {
+        'tipo_visita': _opciones(Visita.TIPO_CHOICES, tipos),
+        'resultado': _opciones(Visita.RESULTADO_CHOICES, resultados),
+    }
+
+
+def facetas_checklists(query):
+    """
+    Opciones ``(valor, etiqueta, cantidad)`` del filtro de estado
+    """
+    return {'estado': _opciones(Checklist.ESTADO_CHOICES, _cacheada('checklists', query, _tabla_checklists))}
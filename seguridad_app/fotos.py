@@ -0,0 +1,309 @@
+"""
+Sistema de Gestión de Seguridad Forestal
+Fotos de evidencia de las visitas
+
+La subida no arma los archivos en memoria: ``SubidaFotoHandler`` escribe
+cada trozo a un temporal dentro de ``MEDIA_ROOT/fotos`` a medida que llega
+y calcula el SHA-256 al mismo tiempo. El original se guarda con su hash como
+nombre (``os.replace`` desde el temporal, sin copiar), así una foto subida
+dos veces, a la misma o a otra visita, ocupa un solo archivo y una sola fila
+de ``Foto``.
+
+La miniatura y la versión web se generan en un pool de procesos
+(``PHOTO_WORKERS``, con ``imagenes.py``) después del commit: el request
+solo lee la cabecera de cada imagen e inserta las filas. Al terminar cada
+foto se marca su estado y se invalidan los detalles de sus visitas. Con
+``PHOTO_WORKERS = 0`` se generan en el mismo hilo (desarrollo y tests), y
+``manage.py procesar_fotos`` genera las que quedaron pendientes (por
+ejemplo, si el proceso se reinició con trabajos en el pool).
+"""
+
+import hashlib
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile
+from django.db import connections, transaction
+from django.utils import timezone
+from PIL import Image
+
+from . import fragmentos, imagenes
+from .models import Foto, FotoVisita, Visita
+
+
+# Campo del formulario con los archivos
+CAMPO = 'fotos'
+
+FORMATOS = {'JPEG', 'PNG', 'WEBP'}
+
+# Versiones que se sirven: caja máxima (ancho, alto) y calidad JPEG
+VERSIONES = {
+    'miniatura': ('PHOTO_THUMB_SIZE', (320, 320), 80),
+    'web': ('PHOTO_WEB_SIZE', (1280, 1280), 85),
+}
+
+
+def _raiz():
+    return Path(settings.MEDIA_ROOT) / 'fotos'
+
+
+def ruta(sha256, version='original'):
+    """
+    Archivo de una versión de la foto; el original no lleva extensión
+    """
+    if version == 'original':
+        return _raiz() / 'originales' / sha256[:2] / sha256
+    return _raiz() / version / sha256[:2] / f'{sha256}.jpg'
+
+
+def _versiones(sha256):
+    return [
+        (str(ruta(sha256, version)), tuple(getattr(settings, ajuste, caja)), calidad)
+        for version, (ajuste, caja, calidad) in VERSIONES.items()
+    ]
+
+
+# ===========================
+# SUBIDA
+# ===========================
+
+class FotoSubida:
+    """
+    Archivo recibido: temporal en disco, nombre original y SHA-256 del contenido
+    """
+    __slots__ = ('ruta', 'nombre', 'tamano', 'sha256')
+
+    def __init__(self, ruta, nombre, tamano, sha256):
+        self.ruta = ruta
+        self.nombre = nombre
+        self.tamano = tamano
+        self.sha256 = sha256
+
+    def close(self):
+        # Django lo llama al cerrar el request: borra el temporal si no se guardó
+        try:
+            os.unlink(self.ruta)
+        except FileNotFoundError:
+            pass
+
+
+class SubidaFotoHandler(FileUploadHandler):
+    """
+    Escribe los archivos de ``CAMPO`` a disco mientras llegan y calcula su hash
+
+    Reemplaza a los handlers por defecto, que guardan en memoria los archivos
+    de hasta ``FILE_UPLOAD_MAX_MEMORY_SIZE``. Los archivos de más de
+    ``PHOTO_MAX_BYTES`` y los que exceden ``PHOTO_MAX_PER_UPLOAD`` se
+    descartan sin guardarse; sus nombres quedan en ``omitidos``.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.omitidos = []
+        self.recibidos = 0
+        self.destino = None
+
+    def new_file(self, field_name, file_name, *args, **kwargs):
+        super().new_file(field_name, file_name, *args, **kwargs)
+        if field_name != CAMPO:
+            raise SkipFile
+        if self.recibidos >= getattr(settings, 'PHOTO_MAX_PER_UPLOAD', 20):
+            self.omitidos.append(file_name)
+            raise SkipFile
+        directorio = _raiz() / 'tmp'
+        directorio.mkdir(parents=True, exist_ok=True)
+        self.destino = tempfile.NamedTemporaryFile(dir=directorio, suffix='.subida', delete=False)
+        self.hash = hashlib.sha256()
+        self.tamano = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.tamano += len(raw_data)
+        if self.tamano > getattr(settings, 'PHOTO_MAX_BYTES', 15 * 1024 * 1024):
+            self.omitidos.append(self.file_name)
+            self._descartar()
+            raise SkipFile
+        self.hash.update(raw_data)
+        self.destino.write(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        self.destino.close()
+        self.recibidos += 1
+        subida = FotoSubida(self.destino.name, self.file_name, self.tamano, self.hash.hexdigest())
+        self.destino = None
+        return subida
+
+    def upload_interrupted(self):
+        self._descartar()
+
+    def _descartar(self):
+        if self.destino is not None:
+            self.destino.close()
+            os.unlink(self.destino.name)
+            self.destino = None
+
+
+def _marcar_visitas(pks):
+    # El detalle y su validador de GET condicional cambian con las fotos
+    pks = list(pks)
+    Visita.objects.filter(pk__in=pks).update(fecha_actualizacion=timezone.now())
+    fragmentos.invalidar('visita', *pks)
+
+
+def adjuntar(visita, subidas, usuario=None):
+    """
+    Guarda las fotos subidas en la visita; devuelve ``(adjuntadas, rechazadas)``
+
+    ``rechazadas`` son los nombres de los archivos que no son imágenes en un
+    formato admitido. Las fotos nuevas se envían a ``procesar`` al confirmarse
+    la transacción.
+    """
+    validas = {}
+    rechazadas = []
+    for subida in subidas:
+        try:
+            formato, ancho, alto = imagenes.inspeccionar(subida.ruta)
+        except (OSError, Image.DecompressionBombError):
+            formato = None
+        if formato not in FORMATOS:
+            rechazadas.append(subida.nombre)
+            continue
+        validas.setdefault(subida.sha256, (subida, formato, ancho, alto))
+    if not validas:
+        return 0, rechazadas
+
+    existentes = set(Foto.objects.filter(sha256__in=validas).values_list('sha256', flat=True))
+    nuevas = []
+    for sha256, (subida, formato, ancho, alto) in validas.items():
+        if sha256 in existentes:
+            continue
+        destino = ruta(sha256)
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        # Mismo sistema de archivos: se renombra, no se copia
+        os.replace(subida.ruta, destino)
+        nuevas.append(Foto(sha256=sha256, tamano=subida.tamano, formato=formato, ancho=ancho, alto=alto))
+
+    with transaction.atomic():
+        Foto.objects.bulk_create(nuevas, ignore_conflicts=True)
+        por_hash = Foto.objects.in_bulk(list(validas), field_name='sha256')
+        FotoVisita.objects.bulk_create(
+            [
+                FotoVisita(visita=visita, foto=por_hash[sha256], nombre=subida.nombre[:255], subida_por=usuario)
+                for sha256, (subida, *_) in validas.items()
+            ],
+            ignore_conflicts=True,
+        )
+        _marcar_visitas([visita.pk])
+        pendientes = [por_hash[foto.sha256] for foto in nuevas]
+        if pendientes:
+            transaction.on_commit(lambda: procesar(pendientes))
+    return len(validas), rechazadas
+
+
+# ===========================
+# VERSIONES REDUCIDAS
+# ===========================
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _obtener_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: los procesos no heredan los hilos ni las conexiones del servidor
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.PHOTO_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _pool
+
+
+def _descartar_pool(pool):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+
+
+def _terminar(foto_pk, error):
+    Foto.objects.filter(pk=foto_pk).update(estado='error' if error else 'lista')
+    _marcar_visitas(FotoVisita.objects.filter(foto_id=foto_pk).values_list('visita_id', flat=True))
+
+
+def _al_terminar(foto_pk, pool, futuro):
+    # Hilo de gestión del pool: usa su propia conexión y la cierra
+    try:
+        error = futuro.exception()
+        if isinstance(error, BrokenProcessPool):
+            _descartar_pool(pool)
+        _terminar(foto_pk, error)
+    finally:
+        connections.close_all()
+
+
+def procesar(fotos, esperar=False):
+    """
+    Genera la miniatura y la versión web de ``fotos``
+
+    Sin ``esperar`` vuelve enseguida y cada foto se marca al terminar, desde
+    el hilo de gestión del pool; con ``esperar`` (``procesar_fotos``) se
+    espera a todas y se marcan en este hilo. Devuelve las que fallaron.
+    """
+    if not getattr(settings, 'PHOTO_WORKERS', 2):
+        fallidas = []
+        for foto in fotos:
+            # Como en el pool, cualquier error deja la foto marcada para reintentar
+            try:
+                imagenes.generar_versiones(str(ruta(foto.sha256)), _versiones(foto.sha256))
+                error = None
+            except Exception as exc:
+                error = exc
+                fallidas.append(foto)
+            _terminar(foto.pk, error)
+        return fallidas
+
+    pool = _obtener_pool()
+    futuros = [
+        (foto, pool.submit(imagenes.generar_versiones, str(ruta(foto.sha256)), _versiones(foto.sha256)))
+        for foto in fotos
+    ]
+    if not esperar:
+        for foto, futuro in futuros:
+            futuro.add_done_callback(partial(_al_terminar, foto.pk, pool))
+        return []
+
+    fallidas = []
+    for foto, futuro in futuros:
+        error = futuro.exception()
+        if isinstance(error, BrokenProcessPool):
+            _descartar_pool(pool)
+        if error is not None:
+            fallidas.append(foto)
+        _terminar(foto.pk, error)
+    return fallidas
+
+
+def purgar():
+    """
+    Elimina las fotos que ya no están adjuntas a ninguna visita y sus archivos
+    """
+    eliminadas = 0
+    for pk, sha256 in Foto.objects.filter(usos__isnull=True).values_list('pk', 'sha256').iterator():
+        # Se vuelve a comprobar al borrar por si otra subida la reutilizó
+        if Foto.objects.filter(pk=pk, usos__isnull=True).delete()[0]:
+            for version in ('original', *VERSIONES):
+                try:
+                    os.unlink(ruta(sha256, version))
+                except FileNotFoundError:
+                    pass
+            eliminadas += 1
+    return eliminadas
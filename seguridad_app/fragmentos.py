@@ -0,0 +1,108 @@
+"""
+Sistema de Gestión de Seguridad Forestal
+Caché de fragmentos renderizados de los detalles
+
+El contenido de ``checklist_detail`` y ``visita_detail`` se guarda ya
+renderizado junto con las versiones con que se generó: la del objeto y una
+global. Las señales cambian la versión del objeto al guardarlo o eliminarlo
+(y la del checklist cuando cambia el FK de una de sus visitas); la global
+cambia ante modificaciones masivas o de nombres de usuario.
+
+Las versiones son fichas aleatorias, no contadores: si la caché descarta una
+versión, la siguiente es distinta y ningún fragmento anterior vuelve a ser
+válido. Un fragmento renderizado con datos de una réplica no se guarda: la
+réplica puede no tener aún el cambio que generó la versión vigente, y el
+fragmento atrasado quedaría como válido hasta el próximo cambio. Un acierto
+cuesta una lectura de caché (``get_many`` del fragmento y sus versiones),
+sin consultas ni renderizado del template.
+
+Las versiones solo sirven si todos los procesos las ven: con una caché del
+proceso (``CACHE_SHARED`` falso) un cambio atendido por otro proceso no
+vencería los fragmentos de este, así que no se guarda nada y cada detalle se
+renderiza en cada request.
+"""
+
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .routers import leyendo_de_replica
+
+
+PREFIJO = 'fragmentos'
+CLAVE_GLOBAL = f'{PREFIJO}.version.global'
+
+
+def _clave_version(tipo, pk):
+    return f'{PREFIJO}.version.{tipo}.{pk}'
+
+
+def _clave_fragmento(tipo, pk):
+    return f'{PREFIJO}.html.{tipo}.{pk}'
+
+
+def _nueva_version():
+    return uuid.uuid4().hex
+
+
+def obtener(tipo, pk):
+    """
+    Devuelve (fragmento o None, versiones vigentes)
+
+    Las versiones se deben pasar a ``guardar`` tras renderizar: si el objeto
+    cambia entretanto, el fragmento queda guardado con una versión ya vencida.
+    """
+    if not getattr(settings, 'CACHE_SHARED', True):
+        return None, (None, None)
+    clave_version = _clave_version(tipo, pk)
+    valores = cache.get_many([_clave_fragmento(tipo, pk), clave_version, CLAVE_GLOBAL])
+    versiones = (valores.get(clave_version), valores.get(CLAVE_GLOBAL))
+    fragmento = valores.get(_clave_fragmento(tipo, pk))
+    if None not in versiones and fragmento is not None and fragmento['versiones'] == versiones:
+        return fragmento, versiones
+
+    if None in versiones:
+        # Primera vez o versión descartada por la caché
+        cache.add(clave_version, _nueva_version(), None)
+        cache.add(CLAVE_GLOBAL, _nueva_version(), None)
+        valores = cache.get_many([clave_version, CLAVE_GLOBAL])
+        versiones = (valores.get(clave_version), valores.get(CLAVE_GLOBAL))
+    return None, versiones
+
+
+def guardar(tipo, pk, versiones, **datos):
+    """
+    Guarda el fragmento renderizado; sin versiones (o leído de una réplica) solo lo devuelve
+
+    Un fragmento sin guardar lleva las versiones en None y no se valida con
+    el GET condicional.
+    """
+    if leyendo_de_replica():
+        versiones = (None, None)
+    fragmento = {**datos, 'versiones': versiones}
+    if None not in versiones:
+        cache.set(_clave_fragmento(tipo, pk), fragmento, getattr(settings, 'FRAGMENT_CACHE_TTL', 3600))
+    return fragmento
+
+
+def version_global():
+    """
+    Versión global vigente (la crea si la caché no la tiene)
+    """
+    version = cache.get(CLAVE_GLOBAL)
+    if version is None:
+        cache.add(CLAVE_GLOBAL, _nueva_version(), None)
+        version = cache.get(CLAVE_GLOBAL)
+    return version
+
+
+def invalidar(tipo, *pks):
+    pks = {pk for pk in pks if pk is not None}
+    if pks and getattr(settings, 'CACHE_SHARED', True):
+        cache.set_many({_clave_version(tipo, pk): _nueva_version() for pk in pks}, None)
+
+
+def invalidar_todo():
+    if getattr(settings, 'CACHE_SHARED', True):
+        cache.set(CLAVE_GLOBAL, _nueva_version(), None)
@@ -0,0 +1,46 @@
+"""
+Sistema de Gestión de Seguridad Forestal
+Hashers de contraseñas con costo configurable
+
+Los hashers de Django fijan el costo en atributos de clase; estas subclases lo
+leen de settings (``PASSWORD_ARGON2_*``, ``PASSWORD_BCRYPT_ROUNDS``,
+``PASSWORD_PBKDF2_ITERATIONS``) para ajustarlo por servidor con los valores
+que recomienda ``manage.py calibrar_hashers``.
+
+Al iniciar sesión, ``check_password`` vuelve a generar el hash si el usuario
+tiene otro algoritmo que el primero de ``PASSWORD_HASHERS`` o un costo
+distinto del configurado (``must_update``), así los usuarios existentes se
+migran sin reiniciar contraseñas.
+"""
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+
+    @property
+    def time_cost(self):
+        return getattr(settings, 'PASSWORD_ARGON2_TIME_COST', hashers.Argon2PasswordHasher.time_cost)
+
+    @property
+    def memory_cost(self):
+        return getattr(settings, 'PASSWORD_ARGON2_MEMORY_COST', hashers.Argon2PasswordHasher.memory_cost)
+
+    @property
+    def parallelism(self):
+        return getattr(settings, 'PASSWORD_ARGON2_PARALLELISM', hashers.Argon2PasswordHasher.parallelism)
+
+
+class BCryptSHA256PasswordHasher(hashers.BCryptSHA256PasswordHasher):
+
+    @property
+    def rounds(self):
+        return getattr(settings, 'PASSWORD_BCRYPT_ROUNDS', hashers.BCryptSHA256PasswordHasher.rounds)
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+
+    @property
+    def iterations(self):
+        return getattr(settings, 'PASSWORD_PBKDF2_ITERATIONS', hashers.PBKDF2PasswordHasher.iterations)
@@ -0,0 +1,51 @@
+"""
+Sistema de Gestión de Seguridad Forestal
+Generación de las versiones reducidas de las fotos
+
+Se ejecuta en los procesos del pool de ``fotos.py``, que se inician con
+``spawn``: este módulo no importa Django, solo Pillow, para que cada proceso
+arranque rápido y sin configuración.
+"""
+
+import os
+
+from PIL import Image, ImageOps
+
+
+def inspeccionar(ruta):
+    """
+    ``(formato, ancho, alto)`` leídos de la cabecera, sin decodificar la imagen
+
+    Lanza ``OSError`` (``UnidentifiedImageError``) si el archivo no es una imagen.
+    """
+    with Image.open(ruta) as imagen:
+        return imagen.format, imagen.width, imagen.height
+
+
+def _guardar(imagen, destino, calidad):
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    temporal = f'{destino}.{os.getpid()}.tmp'
+    imagen.save(temporal, 'JPEG', quality=calidad, optimize=True, progressive=True)
+    # Quien lee la versión nunca ve un archivo a medio escribir
+    os.replace(temporal, destino)
+
+
+def generar_versiones(origen, versiones):
+    """
+    Escribe en JPEG las versiones reducidas de ``origen``
+
+    ``versiones`` es una lista de ``(destino, (ancho, alto), calidad)``; cada
+    versión entra en su caja conservando la proporción. Se generan de mayor
+    a menor, cada una a partir de la anterior, y el JPEG original se
+    decodifica ya reducido (``draft``) al tamaño de la mayor.
+    """
+    versiones = sorted(versiones, key=lambda version: version[1], reverse=True)
+    with Image.open(origen) as imagen:
+        imagen.draft('RGB', versiones[0][1])
+        imagen = ImageOps.exif_transpose(imagen)
+        if imagen.mode != 'RGB':
+            imagen = imagen.convert('RGB')
+        for destino, caja, calidad in versiones:
+            imagen.thumbnail(caja, Image.LANCZOS)
+            _guardar(imagen, destino, calidad)
+    return origen
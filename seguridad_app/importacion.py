@@ -0,0 +1,323 @@
+"""
+Sistema de Gestión de Seguridad Forestal
+Importación masiva de Visitas y Checklists desde CSV o JSON Lines
+
+El archivo se lee como flujo, fila a fila, y se procesa en bloques: por
+cada bloque se resuelven las referencias (usuarios, checklists, códigos
+repetidos) con una consulta por tipo y se inserta con ``bulk_create`` dentro
+de una transacción. Las filas inválidas se registran en el reporte de
+errores sin detener la importación.
+"""
+
+import csv
+import io
+import json
+from itertools import islice
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+
+from . import eventos, fragmentos, resumen, search, seguimientos
+from .models import Checklist, Visita
+
+
+FORMATOS = ('csv', 'jsonl')
+
+VALORES_VERDADEROS = {'1', 'true', 't', 'si', 'sí', 's', 'on', 'yes', 'y', 'x'}
+VALORES_FALSOS = {'', '0', 'false', 'f', 'no', 'n', 'off'}
+
+
+def detectar_formato(nombre):
+    """
+    Deduce el formato a partir de la extensión del archivo
+    """
+    nombre = (nombre or '').lower()
+    if nombre.endswith(('.jsonl', '.ndjson', '.json')):
+        return 'jsonl'
+    return 'csv'
+
+
+def leer_filas(archivo, formato):
+    """
+    Recorre el archivo (binario o de texto) devolviendo ``(línea, diccionario)`` por fila
+
+    La línea es la del archivo, contando la cabecera del CSV y las líneas en
+    blanco; en un registro CSV de varias líneas, la última.
+    """
+    if isinstance(archivo, io.TextIOBase):
+        texto = archivo
+    else:
+        texto = io.TextIOWrapper(archivo, encoding='utf-8-sig', newline='')
+
+    if formato == 'csv':
+        lector = csv.DictReader(texto)
+        for fila in lector:
+            yield lector.line_num, fila
+        return
+
+    for numero, linea in enumerate(texto, start=1):
+        linea = linea.strip()
+        if not linea:
+            continue
+        try:
+            fila = json.loads(linea)
+        except ValueError as exc:
+            fila = {'__error__': f'JSON inválido en la línea {numero}: {exc}'}
+        if not isinstance(fila, dict):
+            fila = {'__error__': f'La línea {numero} no es un objeto JSON'}
+        yield numero, fila
+
+
+class ResultadoImportacion:
+    """
+    Totales de la importación y reporte de errores por fila
+    """
+
+    def __init__(self):
+        self.procesadas = 0
+        self.creadas = 0
+        self.errores = []  # [(numero_fila, mensaje)]
+
+    def agregar_error(self, numero, mensaje):
+        self.errores.append((numero, mensaje))
+
+    def escribir_reporte(self, destino):
+        writer = csv.writer(destino)
+        writer.writerow(['fila', 'error'])
+        writer.writerows(self.errores)
+
+
+class Importador:
+    """
+    Importador genérico; las subclases definen el modelo y sus referencias
+    """
+    model = None
+    campo_usuario = None  # FK a User que se resuelve por username
+
+    def __init__(self, usuario_por_defecto=None, chunk_size=1000):
+        self.usuario_por_defecto = usuario_por_defecto
+        self.chunk_size = chunk_size
+        self.campos = [
+            f for f in self.model._meta.concrete_fields
+            if not f.primary_key and not f.is_relation and not getattr(f, 'auto_now', False)
+        ]
+
+    # ---------------------------
+    # Validación
+    # ---------------------------
+
+    def _valor(self, campo, fila):
+        crudo = fila.get(campo.name)
+        if isinstance(crudo, str):
+            crudo = crudo.strip()
+        if crudo in (None, ''):
+            if campo.has_default():
+                return campo.get_default()
+            if campo.null:
+                return None
+            crudo = ''
+        if campo.get_internal_type() == 'BooleanField' and isinstance(crudo, str):
+            texto = crudo.lower()
+            if texto in VALORES_VERDADEROS:
+                crudo = True
+            elif texto in VALORES_FALSOS:
+                crudo = False
+        return campo.clean(crudo, None)
+
+    def construir(self, fila, referencias):
+        """
+        Crea la instancia (sin guardar) o lanza ValidationError con los problemas
+        """
+        if '__error__' in fila:
+            raise ValidationError(fila['__error__'])
+
+        valores, errores = {}, []
+        for campo in self.campos:
+            try:
+                valores[campo.name] = self._valor(campo, fila)
+            except ValidationError as exc:
+                errores.append(f"{campo.name}: {' '.join(exc.messages)}")
+
+        username = str(fila.get(self.campo_usuario) or '').strip()
+        if username:
+            usuario = referencias['usuarios'].get(username)
+            if usuario is None:
+                errores.append(f'{self.campo_usuario}: el usuario "{username}" no existe')
+        else:
+            usuario = self.usuario_por_defecto
+            if usuario is None:
+                errores.append(f'{self.campo_usuario}: campo obligatorio')
+        valores[self.campo_usuario] = usuario
+
+        errores.extend(self.validar_referencias(fila, valores, referencias))
+
+        if errores:
+            raise ValidationError(errores)
+        return self.model(**valores)
+
+    def validar_referencias(self, fila, valores, referencias):
+        return []
+
+    def cargar_referencias(self, filas):
+        """
+        Resuelve en bloque las referencias del bloque de filas
+        """
+        usernames = {
+            str(fila.get(self.campo_usuario) or '').strip() for fila in filas
+        } - {''}
+        usuarios = User.objects.filter(username__in=usernames) if usernames else []
+        return {'usuarios': {u.username: u for u in usuarios}}
+
+    def delta_resumen(self, obj):
+        return {}
+
+    def encolar(self, creados):
+        """
+        Actualiza las tablas derivadas de los objetos insertados (en la misma transacción)
+        """
+
+    def publicar(self, creados):
+        """
+        Publica los cambios en el dashboard en vivo al confirmarse la transacción
+        """
+        eventos.resumen_modificado()
+
+    # ---------------------------
+    # Inserción
+    # ---------------------------
+
+    def _insertar(self, objetos, numeros, resultado):
+        # bulk_create no emite señales: los contadores del dashboard y la
+        # cola de seguimientos se actualizan en la misma transacción; el índice de búsqueda y los
+        # fragmentos de detalle, después, y el dashboard en vivo al confirmarse
+        deltas = {}
+        for obj in objetos:
+            for campo, delta in self.delta_resumen(obj).items():
+                deltas[campo] = deltas.get(campo, 0) + delta
+
+        try:
+            with transaction.atomic():
+                creados = self.model.objects.bulk_create(objetos)
+                resumen.aplicar_delta(deltas)
+                self.encolar(creados)
+                self.publicar(creados)
+        except IntegrityError:
+            # Otro proceso insertó una fila en conflicto: reintentar de a una
+            # (save() sí emite las señales)
+            for obj, numero in zip(objetos, numeros):
+                obj.pk = None
+                try:
+                    with transaction.atomic():
+                        obj.save(force_insert=True)
+                except IntegrityError as exc:
+                    resultado.agregar_error(numero, f'Error de integridad: {exc}')
+                else:
+                    resultado.creadas += 1
+            return
+
+        search.indexar(*(obj for obj in creados if obj.pk is not None))
+        # Las visitas nuevas cambian la tabla del detalle de su checklist
+        fragmentos.invalidar('checklist', *(getattr(obj, 'checklist_id', None) for obj in creados))
+        resultado.creadas += len(creados)
+
+    def procesar_bloque(self, bloque, resultado):
+        referencias = self.cargar_referencias([fila for _, fila in bloque])
+        objetos, numeros = [], []
+        for numero, fila in bloque:
+            resultado.procesadas += 1
+            try:
+                objetos.append(self.construir(fila, referencias))
+            except ValidationError as exc:
+                resultado.agregar_error(numero, '; '.join(exc.messages))
+            else:
+                numeros.append(numero)
+        if objetos:
+            self._insertar(objetos, numeros, resultado)
+
+    def importar(self, filas):
+        """
+        Importa un iterable de ``(número, fila)``, como el de ``leer_filas``, y devuelve el resultado
+        """
+        resultado = ResultadoImportacion()
+        numeradas = iter(filas)
+        while True:
+            bloque = list(islice(numeradas, self.chunk_size))
+            if not bloque:
+                break
+            self.procesar_bloque(bloque, resultado)
+        return resultado
+
+
+class ImportadorChecklist(Importador):
+    model = Checklist
+    campo_usuario = 'responsable'
+
+    def delta_resumen(self, obj):
+        return resumen.delta_checklist(None, {'estado': obj.estado})
+
+
+class ImportadorVisita(Importador):
+    model = Visita
+    campo_usuario = 'inspector'
+
+    def cargar_referencias(self, filas):
+        referencias = super().cargar_referencias(filas)
+
+        ids = set()
+        for fila in filas:
+            valor = str(fila.get('checklist') or '').strip()
+            if valor.isdigit():
+                ids.add(int(valor))
+        referencias['checklists'] = (
+            Checklist.objects.only('pk').in_bulk(ids) if ids else {}
+        )
+
+        codigos = {str(fila.get('codigo_visita') or '').strip() for fila in filas} - {''}
+        referencias['codigos_existentes'] = set(
+            Visita.objects.filter(codigo_visita__in=codigos).values_list('codigo_visita', flat=True)
+        ) if codigos else set()
+        referencias['codigos_bloque'] = set()
+        return referencias
+
+    def validar_referencias(self, fila, valores, referencias):
+        errores = []
+
+        valor = str(fila.get('checklist') or '').strip()
+        valores['checklist'] = None
+        if valor:
+            checklist = referencias['checklists'].get(int(valor)) if valor.isdigit() else None
+            if checklist is None:
+                errores.append(f'checklist: el checklist "{valor}" no existe')
+            valores['checklist'] = checklist
+
+        codigo = valores.get('codigo_visita')
+        if codigo:
+            if codigo in referencias['codigos_existentes']:
+                errores.append(f'codigo_visita: "{codigo}" ya existe')
+            elif codigo in referencias['codigos_bloque']:
+                errores.append(f'codigo_visita: "{codigo}" está repetido en el archivo')
+            else:
+                referencias['codigos_bloque'].add(codigo)
+        return errores
+
+    def delta_resumen(self, obj):
+        return resumen.delta_visita(None, {
+            'resultado': obj.resultado,
+            'requiere_seguimiento': obj.requiere_seguimiento,
+        })
+
+    def encolar(self, creados):
+        seguimientos.encolar_visitas(
+            obj.codigo_visita for obj in creados if obj.requiere_seguimiento
+        )
+
+    def publicar(self, creados):
+        super().publicar(creados)
+        eventos.visitas_criticas(creados)
+
+
+IMPORTADORES = {
+    'checklists': ImportadorChecklist,
+    'visitas': ImportadorVisita,
+}
@@ -0,0 +1,295 @@
+"""
+Benchmark del despliegue WSGI frente al ASGI con clientes lentos
+
+Crea la base de datos de pruebas, la puebla con ``datos_sinteticos`` y
+atiende la misma carga con los dos handlers de Django dentro del proceso:
+
+- WSGI: ``WSGIHandler`` con las vistas síncronas (``gestion_forestal.urls``)
+  en un pool de ``--hilos`` hilos, como un servidor WSGI con hilos
+  (gunicorn --threads, mod_wsgi). El hilo queda ocupado mientras el cliente
+  recibe la respuesta.
+- ASGI: ``ASGIHandler`` con las vistas asíncronas (``gestion_forestal.urls_asgi``)
+  en un bucle de eventos, como uvicorn con un worker. La entrega al cliente
+  lento es un ``await`` que no ocupa un hilo.
+
+``--clientes`` clientes concurrentes piden en bucle el dashboard, los
+listados y los detalles; ``--demora-cliente`` simula la conexión de campo
+(milisegundos que tarda cada cliente en recibir una respuesta). Se
+registran el rendimiento (requests por segundo) y los percentiles de
+latencia de cada despliegue en un archivo JSON.
+
+Uso: python manage.py benchmark_asgi --clientes 50 --hilos 8 --demora-cliente 200
+"""
+
+import asyncio
+import json
+import platform
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, RequestFactory
+from django.test.utils import (
+    override_settings, setup_databases, setup_test_environment,
+    teardown_databases, teardown_test_environment,
+)
+from django.urls import reverse
+from django.utils import timezone
+
+from seguridad_app import datos_sinteticos
+from seguridad_app.models import Checklist, Visita
+
+from .benchmark_vistas import PERCENTILES, _commit_actual, _percentil
+
+
+DESPLIEGUES = {
+    'wsgi': 'gestion_forestal.urls',
+    'asgi': 'gestion_forestal.urls_asgi',
+}
+
+
+class Command(BaseCommand):
+    help = 'Compara el despliegue WSGI (vistas síncronas) con el ASGI (vistas asíncronas) con clientes lentos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamano', default='10k',
+                            help='Tamaño de los datos (%s)' % ', '.join(datos_sinteticos.TAMANOS))
+        parser.add_argument('--clientes', type=int, default=50,
+                            help='Clientes concurrentes (por defecto 50)')
+        parser.add_argument('--requests', type=int, default=10,
+                            help='Requests por cliente (por defecto 10)')
+        parser.add_argument('--hilos', type=int, default=8,
+                            help='Hilos del servidor WSGI (por defecto 8)')
+        parser.add_argument('--demora-cliente', type=float, default=200,
+                            help='Milisegundos que tarda cada cliente en recibir una respuesta (por defecto 200)')
+        parser.add_argument('--semilla', type=int, default=42)
+        parser.add_argument('--salida', default='bench_asgi.json',
+                            help='Archivo JSON de resultados')
+        parser.add_argument('--keepdb', action='store_true',
+                            help='Conserva la base de datos de pruebas entre corridas')
+
+    def handle(self, *args, **options):
+        if options['tamano'] not in datos_sinteticos.TAMANOS:
+            raise CommandError(f'Tamaño desconocido: {options["tamano"]}')
+        if options['clientes'] < 1 or options['requests'] < 1 or options['hilos'] < 1:
+            raise CommandError('--clientes, --requests y --hilos deben ser mayores que cero')
+
+        setup_test_environment(debug=False)
+        configuracion = setup_databases(verbosity=0, interactive=False, keepdb=options['keepdb'])
+        try:
+            datos_sinteticos.limpiar()
+            usuarios, checklists, visitas = datos_sinteticos.TAMANOS[options['tamano']]
+            inicio = time.monotonic()
+            datos_sinteticos.generar(usuarios, checklists, visitas, semilla=options['semilla'])
+            self.stdout.write(f'Datos generados en {time.monotonic() - inicio:.1f} s')
+
+            urls, cookie = self._preparar()
+            resultados = {}
+            for despliegue, urlconf in DESPLIEGUES.items():
+                with override_settings(ROOT_URLCONF=urlconf):
+                    # Una pasada previa calienta el índice de búsqueda y las cachés
+                    medir = self._medir_wsgi if despliegue == 'wsgi' else self._medir_asgi
+                    medir(urls, cookie, dict(options, clientes=1, requests=len(urls), demora_cliente=0))
+                    latencias, errores, duracion = medir(urls, cookie, options)
+                resultados[despliegue] = self._resumen(latencias, errores, duracion)
+                self._informar(despliegue, resultados[despliegue])
+        finally:
+            teardown_databases(configuracion, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        if resultados['wsgi']['rps']:
+            self.stdout.write(
+                f'ASGI / WSGI: {resultados["asgi"]["rps"] / resultados["wsgi"]["rps"]:.2f}x requests por segundo'
+            )
+
+        reporte = {
+            'meta': {
+                'fecha': timezone.now().isoformat(),
+                'commit': _commit_actual(),
+                'motor': connection.vendor,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'tamano': options['tamano'],
+                'clientes': options['clientes'],
+                'requests_por_cliente': options['requests'],
+                'hilos_wsgi': options['hilos'],
+                'demora_cliente_ms': options['demora_cliente'],
+                'urls': urls,
+            },
+            'resultados': resultados,
+        }
+        with open(options['salida'], 'w', encoding='utf-8') as destino:
+            json.dump(reporte, destino, indent=2, ensure_ascii=False)
+        self.stdout.write(self.style.SUCCESS(f'Resultados guardados en {options["salida"]}'))
+
+    # ---------------------------
+    # Preparación
+    # ---------------------------
+
+    def _preparar(self):
+        usuario = User.objects.filter(username__startswith=datos_sinteticos.PREFIJO_USUARIO).first()
+        cliente = Client()
+        cliente.force_login(usuario)
+        cookie = f'{settings.SESSION_COOKIE_NAME}={cliente.cookies[settings.SESSION_COOKIE_NAME].value}'
+
+        checklist_pk = (
+            Visita.objects.exclude(checklist=None)
+            .order_by('-pk').values_list('checklist_id', flat=True).first()
+        ) or Checklist.objects.order_by('-pk').values_list('pk', flat=True).first()
+        visita_pk = Visita.objects.order_by('-pk').values_list('pk', flat=True).first()
+        urls = [
+            reverse('dashboard'),
+            reverse('checklist_list'),
+            reverse('visita_list') + '?resultado=critico',
+            reverse('checklist_detail', args=[checklist_pk]),
+            reverse('visita_detail', args=[visita_pk]),
+        ]
+        return urls, cookie
+
+    def _pedidos(self, urls, cliente, options):
+        return [urls[(cliente + i) % len(urls)] for i in range(options['requests'])]
+
+    # ---------------------------
+    # WSGI
+    # ---------------------------
+
+    def _medir_wsgi(self, urls, cookie, options):
+        handler = WSGIHandler()
+        fabrica = RequestFactory()
+        demora = options['demora_cliente'] / 1000
+
+        def atender(url):
+            environ = fabrica.get(url, HTTP_COOKIE=cookie).environ
+            estado = []
+            respuesta = handler(environ, lambda status, headers, exc_info=None: estado.append(status))
+            try:
+                for _ in respuesta:
+                    pass
+                # El hilo del servidor espera a que el cliente lento reciba la respuesta
+                time.sleep(demora)
+            finally:
+                respuesta.close()
+            return int(estado[0].split()[0])
+
+        latencias, errores = [], 0
+
+        with ThreadPoolExecutor(max_workers=options['hilos']) as servidor:
+            def cliente(numero):
+                resultados = []
+                for url in self._pedidos(urls, numero, options):
+                    inicio = time.perf_counter()
+                    codigo = servidor.submit(atender, url).result()
+                    resultados.append((time.perf_counter() - inicio, codigo))
+                return resultados
+
+            inicio = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['clientes']) as clientes:
+                for resultados in clientes.map(cliente, range(options['clientes'])):
+                    for latencia, codigo in resultados:
+                        latencias.append(latencia)
+                        errores += codigo != 200
+            duracion = time.perf_counter() - inicio
+        return latencias, errores, duracion
+
+    # ---------------------------
+    # ASGI
+    # ---------------------------
+
+    def _scope(self, url, cookie):
+        partes = urlsplit(url)
+        return {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': partes.path,
+            'raw_path': partes.path.encode(),
+            'query_string': partes.query.encode(),
+            'root_path': '',
+            'headers': [(b'host', b'testserver'), (b'cookie', cookie.encode())],
+            'client': ('127.0.0.1', 50000),
+            'server': ('testserver', 80),
+        }
+
+    def _medir_asgi(self, urls, cookie, options):
+        application = ASGIHandler()
+        demora = options['demora_cliente'] / 1000
+
+        async def pedir(url):
+            entregada = asyncio.get_running_loop().create_future()
+            estado = {}
+            cuerpo_enviado = False
+
+            async def receive():
+                nonlocal cuerpo_enviado
+                if not cuerpo_enviado:
+                    cuerpo_enviado = True
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                # El cliente se desconecta después de recibir la respuesta
+                await entregada
+                return {'type': 'http.disconnect'}
+
+            async def send(mensaje):
+                if mensaje['type'] == 'http.response.start':
+                    estado['codigo'] = mensaje['status']
+                elif mensaje['type'] == 'http.response.body' and not mensaje.get('more_body'):
+                    # La entrega al cliente lento no ocupa un hilo
+                    await asyncio.sleep(demora)
+                    if not entregada.done():
+                        entregada.set_result(None)
+
+            await application(self._scope(url, cookie), receive, send)
+            return estado.get('codigo', 500)
+
+        async def cliente(numero):
+            resultados = []
+            for url in self._pedidos(urls, numero, options):
+                inicio = time.perf_counter()
+                codigo = await pedir(url)
+                resultados.append((time.perf_counter() - inicio, codigo))
+            return resultados
+
+        async def carga():
+            return await asyncio.gather(*(cliente(numero) for numero in range(options['clientes'])))
+
+        inicio = time.perf_counter()
+        por_cliente = asyncio.run(carga())
+        duracion = time.perf_counter() - inicio
+
+        latencias, errores = [], 0
+        for resultados in por_cliente:
+            for latencia, codigo in resultados:
+                latencias.append(latencia)
+                errores += codigo != 200
+        return latencias, errores, duracion
+
+    # ---------------------------
+    # Resultados
+    # ---------------------------
+
+    def _resumen(self, latencias, errores, duracion):
+        fila = {
+            'requests': len(latencias),
+            'errores': errores,
+            'duracion_s': round(duracion, 3),
+            'rps': round(len(latencias) / duracion, 1) if duracion else 0,
+        }
+        milisegundos = [latencia * 1000 for latencia in latencias]
+        for p in PERCENTILES:
+            fila[f'p{p}_ms'] = round(_percentil(milisegundos, p), 2)
+        fila['max_ms'] = round(max(milisegundos), 2)
+        return fila
+
+    def _informar(self, despliegue, fila):
+        self.stdout.write(
+            f'  {despliegue.upper():<5} {fila["rps"]:>8.1f} req/s  p50={fila["p50_ms"]:>8.2f} ms  '
+            f'p95={fila["p95_ms"]:>8.2f} ms  p99={fila["p99_ms"]:>8.2f} ms  errores={fila["errores"]}'
+        )
@@ -0,0 +1,218 @@
+"""
+Benchmark de las vistas de seguridad_app a distintos tamaños de datos
+
+Crea la base de datos de pruebas (SQLite o MySQL según DATABASES), la puebla
+con ``datos_sinteticos`` en cada tamaño y recorre todas las URLs de
+``seguridad_app/urls.py`` con el cliente de pruebas, registrando percentiles
+de latencia y cantidad de consultas en un archivo JSON.
+
+Uso: python manage.py benchmark_vistas --tamanos 10k,100k --salida bench.json
+"""
+
+import json
+import platform
+import subprocess
+import time
+from urllib.parse import urlencode
+
+import django
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import (
+    CaptureQueriesContext, setup_databases, setup_test_environment,
+    teardown_databases, teardown_test_environment,
+)
+from django.urls import reverse
+from django.utils import timezone
+
+from seguridad_app import datos_sinteticos
+from seguridad_app.models import Checklist, Visita
+from seguridad_app.urls import urlpatterns
+
+
+# Variantes de parámetros GET por nombre de URL
+VARIANTES = {
+    'checklist_list': [{}, {'estado': 'pendiente'}, {'q': 'motosierras'}],
+    'visita_list': [{}, {'resultado': 'critico'}, {'q': 'critico'}],
+    'checklist_autocomplete': [{'q': 'rev'}],
+    'checklist_export': [{'estado': 'cancelado', 'formato': 'csv'}],
+    'visita_export': [{'resultado': 'critico', 'formato': 'csv'}],
+}
+
+# Vistas que se miden sin sesión iniciada
+ANONIMAS = {'home', 'login'}
+
+# Vistas con efectos secundarios que no se miden
+OMITIDAS = {'logout'}
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    indice = max(0, min(len(ordenados) - 1, round(p / 100 * len(ordenados) + 0.5) - 1))
+    return ordenados[indice]
+
+
+def _commit_actual():
+    try:
+        salida = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, timeout=5,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return salida.stdout.strip() or None
+
+
+class Command(BaseCommand):
+    help = 'Mide latencia y consultas de todas las vistas con datos sintéticos de distintos tamaños'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamanos', default='10k',
+                            help='Tamaños separados por coma (%s)' % ', '.join(datos_sinteticos.TAMANOS))
+        parser.add_argument('--repeticiones', type=int, default=20,
+                            help='Requests medidos por URL (por defecto 20)')
+        parser.add_argument('--calentamiento', type=int, default=2,
+                            help='Requests previos no medidos por URL (por defecto 2)')
+        parser.add_argument('--semilla', type=int, default=42)
+        parser.add_argument('--salida', default='bench_output.json',
+                            help='Archivo JSON de resultados')
+        parser.add_argument('--comparar', help='JSON de una corrida anterior para mostrar diferencias')
+        parser.add_argument('--excluir', default='',
+                            help='Nombres de URL a omitir, separados por coma')
+        parser.add_argument('--keepdb', action='store_true',
+                            help='Conserva la base de datos de pruebas entre corridas')
+
+    def handle(self, *args, **options):
+        tamanos = [t.strip() for t in options['tamanos'].split(',') if t.strip()]
+        desconocidos = [t for t in tamanos if t not in datos_sinteticos.TAMANOS]
+        if desconocidos:
+            raise CommandError(f'Tamaños desconocidos: {", ".join(desconocidos)}')
+        excluidas = OMITIDAS | {n.strip() for n in options['excluir'].split(',') if n.strip()}
+
+        setup_test_environment(debug=False)
+        configuracion = setup_databases(verbosity=0, interactive=False, keepdb=options['keepdb'])
+        try:
+            resultados = {}
+            for tamano in tamanos:
+                self.stdout.write(f'== Tamaño {tamano} ==')
+                datos_sinteticos.limpiar()
+                usuarios, checklists, visitas = datos_sinteticos.TAMANOS[tamano]
+                inicio = time.monotonic()
+                datos_sinteticos.generar(usuarios, checklists, visitas, semilla=options['semilla'])
+                self.stdout.write(f'Datos generados en {time.monotonic() - inicio:.1f} s')
+                resultados[tamano] = self._medir(options, excluidas)
+        finally:
+            teardown_databases(configuracion, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        reporte = {
+            'meta': {
+                'fecha': timezone.now().isoformat(),
+                'commit': _commit_actual(),
+                'motor': connection.vendor,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'semilla': options['semilla'],
+                'repeticiones': options['repeticiones'],
+                'calentamiento': options['calentamiento'],
+            },
+            'resultados': resultados,
+        }
+        with open(options['salida'], 'w', encoding='utf-8') as destino:
+            json.dump(reporte, destino, indent=2, ensure_ascii=False)
+        self.stdout.write(self.style.SUCCESS(f'Resultados guardados en {options["salida"]}'))
+
+        if options['comparar']:
+            self._comparar(options['comparar'], resultados)
+
+    # ---------------------------
+    # Medición
+    # ---------------------------
+
+    def _urls(self, excluidas):
+        checklist_pk = Checklist.objects.order_by('-pk').values_list('pk', flat=True).first()
+        visita_pk = Visita.objects.order_by('-pk').values_list('pk', flat=True).first()
+
+        for patron in urlpatterns:
+            nombre = patron.name
+            if not nombre or nombre in excluidas:
+                continue
+            kwargs = {}
+            if 'pk' in patron.pattern.converters:
+                pk = checklist_pk if nombre.startswith('checklist') else visita_pk
+                if pk is None:
+                    continue
+                kwargs['pk'] = pk
+            ruta = reverse(nombre, kwargs=kwargs)
+            for parametros in VARIANTES.get(nombre, [{}]):
+                clave = f'{nombre}?{urlencode(parametros)}' if parametros else nombre
+                url = f'{ruta}?{urlencode(parametros)}' if parametros else ruta
+                yield nombre, clave, url
+
+    def _medir(self, options, excluidas):
+        usuario = User.objects.filter(username__startswith=datos_sinteticos.PREFIJO_USUARIO).first()
+        autenticado = Client()
+        autenticado.force_login(usuario)
+        anonimo = Client()
+
+        resultados = {}
+        for nombre, clave, url in self._urls(excluidas):
+            cliente = anonimo if nombre in ANONIMAS else autenticado
+
+            for _ in range(options['calentamiento']):
+                self._get(cliente, url)
+
+            tiempos, consultas, estado = [], [], None
+            for _ in range(options['repeticiones']):
+                with CaptureQueriesContext(connection) as capturadas:
+                    inicio = time.perf_counter()
+                    estado = self._get(cliente, url)
+                    tiempos.append((time.perf_counter() - inicio) * 1000)
+                consultas.append(len(capturadas))
+
+            fila = {'url': url, 'estado': estado}
+            for p in PERCENTILES:
+                fila[f'p{p}_ms'] = round(_percentil(tiempos, p), 2)
+            fila['max_ms'] = round(max(tiempos), 2)
+            fila['media_ms'] = round(sum(tiempos) / len(tiempos), 2)
+            fila['consultas'] = max(consultas)
+            resultados[clave] = fila
+            self.stdout.write(
+                f'  {clave:<45} p50={fila["p50_ms"]:>8.2f} ms  p95={fila["p95_ms"]:>8.2f} ms  '
+                f'consultas={fila["consultas"]}'
+            )
+        return resultados
+
+    def _get(self, cliente, url):
+        response = cliente.get(url)
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        return response.status_code
+
+    # ---------------------------
+    # Comparación
+    # ---------------------------
+
+    def _comparar(self, ruta, resultados):
+        try:
+            with open(ruta, encoding='utf-8') as origen:
+                anterior = json.load(origen)['resultados']
+        except (OSError, ValueError, KeyError) as exc:
+            raise CommandError(f'No se pudo leer {ruta}: {exc}')
+
+        self.stdout.write(f'== Comparación con {ruta} (p50 ms / consultas) ==')
+        for tamano, filas in resultados.items():
+            for clave, fila in filas.items():
+                previa = anterior.get(tamano, {}).get(clave)
+                if previa is None:
+                    continue
+                cambio = (fila['p50_ms'] - previa['p50_ms']) / previa['p50_ms'] * 100 if previa['p50_ms'] else 0
+                self.stdout.write(
+                    f'  [{tamano}] {clave:<45} {previa["p50_ms"]:>8.2f} -> {fila["p50_ms"]:>8.2f} '
+                    f'({cambio:+.0f}%)  {previa["consultas"]} -> {fila["consultas"]}'
+                )
@@ -0,0 +1,224 @@
+"""
+Calibración de los hashers de contraseñas en el servidor actual
+
+Mide Argon2, bcrypt y PBKDF2 con distintos costos y recomienda, para cada
+uno, el mayor costo que cumple la latencia objetivo de un login y la
+cantidad de logins por segundo que debe soportar el servidor en una ráfaga
+(cambio de turno). Imprime las variables de entorno a configurar.
+
+Uso: python manage.py calibrar_hashers --objetivo-ms 250 --logins-por-segundo 20
+"""
+
+import os
+import statistics
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth import hashers as django_hashers
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+
+# Costos mínimos aceptables (recomendaciones OWASP para almacenamiento de contraseñas)
+MINIMO_PBKDF2_ITERACIONES = 600_000
+MINIMO_BCRYPT_ROUNDS = 10
+MINIMO_ARGON2_MEMORIA_KIB = 19 * 1024
+MINIMO_ARGON2_MEMORIA_UNA_PASADA_KIB = 46 * 1024
+MAXIMO_BCRYPT_ROUNDS = 16
+
+PASSWORD_PRUEBA = 'Calibracion-Forestal-2024'
+
+
+def _hasher(base, **atributos):
+    """
+    Instancia de un hasher de Django con los costos indicados
+    """
+    return type(f'Calibrado{base.__name__}', (base,), atributos)()
+
+
+def _memoria_argon2(memoria_kib):
+    # Múltiplos de 1 MiB
+    return max(1024, memoria_kib // 1024 * 1024)
+
+
+def _medir(hasher, muestras):
+    """
+    Mediana de la latencia y del tiempo de CPU (ms) de un hash
+    """
+    salt = hasher.salt()
+    latencias, cpu = [], []
+    for _ in range(muestras):
+        inicio, inicio_cpu = time.perf_counter(), time.process_time()
+        hasher.encode(PASSWORD_PRUEBA, salt)
+        latencias.append((time.perf_counter() - inicio) * 1000)
+        cpu.append((time.process_time() - inicio_cpu) * 1000)
+    return statistics.median(latencias), statistics.median(cpu)
+
+
+class Command(BaseCommand):
+    help = 'Mide los hashers de contraseñas y recomienda costos para una latencia y tasa de logins objetivo'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--objetivo-ms', type=float, default=250,
+                            help='Latencia máxima de un hash en un login (por defecto 250 ms)')
+        parser.add_argument('--logins-por-segundo', type=float, default=20,
+                            help='Logins por segundo que debe soportar una ráfaga (por defecto 20)')
+        parser.add_argument('--nucleos', type=int, default=os.cpu_count() or 1,
+                            help='Núcleos dedicados a la aplicación (por defecto todos)')
+        parser.add_argument('--memoria-mb', type=int, default=1024,
+                            help='Memoria disponible para hashes Argon2 simultáneos (por defecto 1024 MB)')
+        parser.add_argument('--paralelismo', type=int, default=1,
+                            help='Hilos por hash Argon2 (por defecto 1)')
+        parser.add_argument('--muestras', type=int, default=5)
+        parser.add_argument('--estado', action='store_true',
+                            help='Muestra cuántos usuarios tienen cada algoritmo y cuántos serán migrados')
+
+    def handle(self, *args, **options):
+        if options['objetivo_ms'] <= 0 or options['logins_por_segundo'] <= 0 or options['nucleos'] <= 0:
+            raise CommandError('Los objetivos y la cantidad de núcleos deben ser positivos')
+
+        # Presupuesto de CPU por hash para sostener la tasa pedida con los núcleos disponibles
+        presupuesto_cpu = options['nucleos'] * 1000 / options['logins_por_segundo']
+        limite = min(options['objetivo_ms'], presupuesto_cpu)
+        self.stdout.write(
+            f'Objetivo: {options["objetivo_ms"]:.0f} ms por login, {options["logins_por_segundo"]:g} logins/s '
+            f'con {options["nucleos"]} núcleo(s) -> hasta {limite:.0f} ms de CPU por hash'
+        )
+
+        recomendaciones = []
+        for calibrar in (self._calibrar_argon2, self._calibrar_bcrypt, self._calibrar_pbkdf2):
+            try:
+                recomendacion = calibrar(limite, options)
+            except ValueError as exc:
+                # Biblioteca no instalada (argon2-cffi o bcrypt)
+                self.stdout.write(self.style.WARNING(str(exc)))
+                continue
+            recomendaciones.append(recomendacion)
+            self._mostrar(recomendacion, options)
+
+        self._recomendar(recomendaciones)
+        if options['estado']:
+            self._estado_usuarios()
+
+    # ---------------------------
+    # Calibración por algoritmo
+    # ---------------------------
+
+    def _calibrar_argon2(self, limite, options):
+        # Memoria por hash limitada por los hashes que corren a la vez (uno por núcleo);
+        # se baja a la mitad hasta que el mínimo de pasadas quepa en el límite
+        memoria = _memoria_argon2(min(64 * 1024, options['memoria_mb'] * 1024 // options['nucleos']))
+        while True:
+            # OWASP: una pasada con 46 MiB o más, dos pasadas con 19 MiB o más
+            pasadas = 1 if memoria >= MINIMO_ARGON2_MEMORIA_UNA_PASADA_KIB else 2
+            latencia, cpu = _medir(_hasher(django_hashers.Argon2PasswordHasher, time_cost=pasadas,
+                                           memory_cost=memoria, parallelism=options['paralelismo']),
+                                   options['muestras'])
+            if cpu <= limite or memoria <= MINIMO_ARGON2_MEMORIA_KIB:
+                break
+            memoria = _memoria_argon2(max(MINIMO_ARGON2_MEMORIA_KIB, memoria // 2))
+
+        time_cost = max(pasadas, int(limite // max(cpu / pasadas, 0.01)))
+        if time_cost != pasadas:
+            latencia, cpu = _medir(_hasher(django_hashers.Argon2PasswordHasher, time_cost=time_cost,
+                                           memory_cost=memoria, parallelism=options['paralelismo']),
+                                   options['muestras'])
+        return {
+            'algoritmo': 'argon2',
+            'parametros': {
+                'PASSWORD_ARGON2_TIME_COST': time_cost,
+                'PASSWORD_ARGON2_MEMORY_COST': memoria,
+                'PASSWORD_ARGON2_PARALLELISM': options['paralelismo'],
+            },
+            'latencia_ms': latencia,
+            'cpu_ms': cpu,
+            'seguro': memoria >= MINIMO_ARGON2_MEMORIA_KIB,
+            'cumple': cpu <= limite,
+        }
+
+    def _calibrar_bcrypt(self, limite, options):
+        # Cada round adicional duplica el costo
+        rounds, medicion = None, None
+        for candidato in range(MINIMO_BCRYPT_ROUNDS, MAXIMO_BCRYPT_ROUNDS + 1):
+            actual = _medir(_hasher(django_hashers.BCryptSHA256PasswordHasher, rounds=candidato),
+                            options['muestras'])
+            if medicion is not None and actual[1] > limite:
+                break
+            rounds, medicion = candidato, actual
+        return {
+            'algoritmo': 'bcrypt_sha256',
+            'parametros': {'PASSWORD_BCRYPT_ROUNDS': rounds},
+            'latencia_ms': medicion[0],
+            'cpu_ms': medicion[1],
+            'seguro': rounds >= MINIMO_BCRYPT_ROUNDS,
+            'cumple': medicion[1] <= limite,
+        }
+
+    def _calibrar_pbkdf2(self, limite, options):
+        referencia = 100_000
+        _, cpu = _medir(_hasher(django_hashers.PBKDF2PasswordHasher, iterations=referencia),
+                        options['muestras'])
+        iteraciones = max(10_000, int(limite / cpu * referencia) // 10_000 * 10_000)
+        latencia, cpu = _medir(_hasher(django_hashers.PBKDF2PasswordHasher, iterations=iteraciones),
+                               options['muestras'])
+        return {
+            'algoritmo': 'pbkdf2_sha256',
+            'parametros': {'PASSWORD_PBKDF2_ITERATIONS': iteraciones},
+            'latencia_ms': latencia,
+            'cpu_ms': cpu,
+            'seguro': iteraciones >= MINIMO_PBKDF2_ITERACIONES,
+            'cumple': cpu <= limite,
+        }
+
+    # ---------------------------
+    # Reporte
+    # ---------------------------
+
+    def _mostrar(self, recomendacion, options):
+        capacidad = options['nucleos'] * 1000 / max(recomendacion['cpu_ms'], 0.01)
+        recomendacion['capacidad'] = capacidad
+        parametros = ', '.join(f'{k}={v}' for k, v in recomendacion['parametros'].items())
+        estilo = self.style.SUCCESS if recomendacion['seguro'] and recomendacion['cumple'] else self.style.WARNING
+        self.stdout.write(estilo(
+            f'  {recomendacion["algoritmo"]:<14} latencia={recomendacion["latencia_ms"]:>7.1f} ms  '
+            f'cpu={recomendacion["cpu_ms"]:>7.1f} ms  capacidad={capacidad:>7.1f} logins/s  {parametros}'
+        ))
+        if not recomendacion['seguro']:
+            self.stdout.write(self.style.WARNING(
+                '    El costo que cabe en el objetivo está bajo el mínimo recomendado; '
+                'agregue núcleos o reduzca la tasa de logins objetivo'
+            ))
+        elif not recomendacion['cumple']:
+            self.stdout.write(self.style.WARNING('    Aun con el costo mínimo no cumple el objetivo'))
+
+    def _recomendar(self, recomendaciones):
+        validas = [r for r in recomendaciones if r['seguro'] and r['cumple']]
+        if not validas:
+            raise CommandError('Ningún hasher cumple el objetivo con el costo mínimo recomendado')
+        elegida = validas[0]
+        self.stdout.write('')
+        self.stdout.write(f'Hasher recomendado: {elegida["algoritmo"]} (primero en PASSWORD_HASHERS)')
+        self.stdout.write('Variables de entorno:')
+        for clave, valor in elegida['parametros'].items():
+            self.stdout.write(f'  {clave}={valor}')
+
+    def _estado_usuarios(self):
+        preferido = django_hashers.get_hasher('default')
+        por_algoritmo, a_migrar = Counter(), 0
+        for encoded in User.objects.values_list('password', flat=True).iterator(chunk_size=2000):
+            try:
+                hasher = django_hashers.identify_hasher(encoded)
+            except ValueError:
+                por_algoritmo['sin contraseña utilizable'] += 1
+                continue
+            por_algoritmo[hasher.algorithm] += 1
+            if hasher.algorithm != preferido.algorithm or hasher.must_update(encoded):
+                a_migrar += 1
+
+        self.stdout.write('')
+        self.stdout.write(f'Usuarios por algoritmo (preferido: {preferido.algorithm}, '
+                          f'{settings.PASSWORD_HASHERS[0]}):')
+        for algoritmo, cantidad in por_algoritmo.most_common():
+            self.stdout.write(f'  {algoritmo:<28} {cantidad}')
+        self.stdout.write(f'Se volverán a hashear en su próximo login: {a_migrar}')
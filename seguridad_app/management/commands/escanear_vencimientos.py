@@ -0,0 +1,65 @@
+"""
+Escáner de checklists vencidos y por vencer
+
+Proceso de larga duración: cada ``--intervalo`` segundos registra los cruces
+nuevos de la fecha de aviso o de vencimiento y envía un resumen por correo a
+cada responsable. Termina limpiamente con SIGTERM o Ctrl+C.
+
+Uso: python manage.py escanear_vencimientos --intervalo 300
+     python manage.py escanear_vencimientos --una-vez   (p. ej. desde cron)
+"""
+
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from seguridad_app import vencimientos
+
+
+class Command(BaseCommand):
+    help = 'Detecta checklists vencidos o por vencer y envía un resumen por responsable'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--intervalo', type=float,
+                            default=getattr(settings, 'CHECKLIST_SCAN_INTERVAL', 300),
+                            help='Segundos entre pasadas (por defecto CHECKLIST_SCAN_INTERVAL)')
+        parser.add_argument('--dias-aviso', type=int,
+                            help='Días antes del vencimiento para avisar (por defecto CHECKLIST_DUE_SOON_DAYS)')
+        parser.add_argument('--lote', type=int,
+                            help='Responsables por lote de envío (por defecto CHECKLIST_DIGEST_BATCH)')
+        parser.add_argument('--una-vez', action='store_true',
+                            help='Hace una sola pasada y termina')
+
+    def handle(self, *args, **options):
+        detener = threading.Event()
+        if not options['una_vez']:
+            signal.signal(signal.SIGTERM, lambda *_: detener.set())
+
+        try:
+            while True:
+                self._pasada(options)
+                if options['una_vez'] or detener.wait(max(1.0, options['intervalo'])):
+                    break
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write('Escáner de vencimientos detenido.')
+
+    def _pasada(self, options):
+        # Conexiones cerradas por el servidor durante la espera se reabren
+        close_old_connections()
+        try:
+            revisados = vencimientos.escanear(dias_aviso=options['dias_aviso'])
+            correos, avisos = vencimientos.enviar_resumenes(lote=options['lote'])
+        except Exception as exc:
+            if options['una_vez']:
+                raise
+            self.stderr.write(f'Error en la pasada, se reintenta en la siguiente: {exc}')
+            return
+        finally:
+            close_old_connections()
+        self.stdout.write(
+            f'{revisados} checklists revisados; {avisos} avisos enviados en {correos} correos.'
+        )
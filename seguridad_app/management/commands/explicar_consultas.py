@@ -0,0 +1,221 @@
+"""
+Revisión de los planes de ejecución de las consultas de cada vista
+
+Recorre las vistas de lectura con el cliente de pruebas, captura las
+consultas SELECT que producen y ejecuta EXPLAIN sobre cada una. Se marcan
+los recorridos completos de tabla y los ordenamientos en archivo temporal
+(filesort en MySQL, "TEMP B-TREE" en SQLite, "Sort" en PostgreSQL).
+
+Por defecto crea la base de datos de pruebas y la puebla con
+``datos_sinteticos``; con ``--bd-actual`` usa los datos existentes.
+
+Uso: python manage.py explicar_consultas --tamano 10k
+"""
+
+import json
+from urllib.parse import urlencode
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import (
+    setup_databases, setup_test_environment,
+    teardown_databases, teardown_test_environment,
+)
+from django.urls import reverse
+
+from seguridad_app import datos_sinteticos
+from seguridad_app.models import Checklist, Visita
+
+
+# Vistas revisadas y sus variantes de parámetros GET
+VISTAS = {
+    'dashboard': [{}],
+    'checklist_list': [{}, {'estado': 'pendiente'}],
+    'checklist_detail': [{}],
+    'checklist_edit': [{}],
+    'checklist_autocomplete': [{'q': 'rev'}, {'q': 'sector'}],
+    'visita_list': [{}, {'tipo': 'preventiva'}, {'resultado': 'critico'}],
+    'visita_detail': [{}],
+    'visita_edit': [{}],
+    'visita_create': [{}],
+    'seguimiento_list': [{}],
+    'sync_cambios': [{}],
+}
+
+# Tablas pequeñas en las que un recorrido completo es esperable
+TABLAS_IGNORADAS = 'resumen_dashboard'
+
+
+class ConsultasCapturadas:
+    """
+    execute_wrapper que guarda las consultas SELECT con sus parámetros
+    """
+
+    def __init__(self):
+        self.consultas = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if not many and sql.lstrip().upper().startswith('SELECT'):
+            self.consultas.append((sql, params))
+        return execute(sql, params, many, context)
+
+
+# ---------------------------
+# EXPLAIN por motor
+# ---------------------------
+
+def _explicar_sqlite(cursor, sql, params):
+    cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+    plan, problemas = [], []
+    for fila in cursor.fetchall():
+        detalle = fila[-1]
+        plan.append(detalle)
+        if detalle.startswith('SCAN ') and ' USING ' not in detalle and 'CONSTANT ROW' not in detalle:
+            problemas.append(('scan', detalle.split()[1]))
+        elif 'USE TEMP B-TREE' in detalle:
+            problemas.append(('filesort', detalle))
+    return plan, problemas
+
+
+def _explicar_mysql(cursor, sql, params):
+    cursor.execute(f'EXPLAIN {sql}', params)
+    columnas = [col[0].lower() for col in cursor.description]
+    plan, problemas = [], []
+    for fila in cursor.fetchall():
+        datos = dict(zip(columnas, fila))
+        plan.append(
+            f'{datos.get("table")}: type={datos.get("type")} key={datos.get("key")} '
+            f'rows={datos.get("rows")} extra={datos.get("extra") or ""}'
+        )
+        if datos.get('type') == 'ALL':
+            problemas.append(('scan', datos.get('table')))
+        if 'filesort' in (datos.get('extra') or '').lower():
+            problemas.append(('filesort', datos.get('table')))
+    return plan, problemas
+
+
+def _explicar_postgresql(cursor, sql, params):
+    cursor.execute(f'EXPLAIN {sql}', params)
+    plan, problemas = [], []
+    for (detalle,) in cursor.fetchall():
+        plan.append(detalle)
+        nodo = detalle.strip().lstrip('-> ')
+        if nodo.startswith('Seq Scan on '):
+            problemas.append(('scan', nodo.split()[3]))
+        elif nodo.startswith('Sort '):
+            problemas.append(('filesort', nodo))
+    return plan, problemas
+
+
+EXPLICADORES = {
+    'sqlite': _explicar_sqlite,
+    'mysql': _explicar_mysql,
+    'postgresql': _explicar_postgresql,
+}
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta EXPLAIN sobre las consultas de cada vista y marca recorridos completos y filesorts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamano', default='10k',
+                            help='Tamaño de datos sintéticos (%s)' % ', '.join(datos_sinteticos.TAMANOS))
+        parser.add_argument('--semilla', type=int, default=42)
+        parser.add_argument('--bd-actual', action='store_true',
+                            help='Usa la base de datos configurada y sus datos, sin crear la de pruebas')
+        parser.add_argument('--ignorar-tablas', default=TABLAS_IGNORADAS,
+                            help='Tablas en las que no se marcan recorridos completos, separadas por coma')
+        parser.add_argument('--plan', action='store_true',
+                            help='Muestra el plan completo de cada consulta')
+        parser.add_argument('--salida', help='Archivo JSON con los planes y problemas encontrados')
+
+    def handle(self, *args, **options):
+        explicar = EXPLICADORES.get(connection.vendor)
+        if explicar is None:
+            raise CommandError(f'Motor no soportado: {connection.vendor}')
+        if options['tamano'] not in datos_sinteticos.TAMANOS:
+            raise CommandError(f'Tamaño desconocido: {options["tamano"]}')
+        ignoradas = {t.strip() for t in options['ignorar_tablas'].split(',') if t.strip()}
+
+        if options['bd_actual']:
+            reporte = self._revisar(explicar, ignoradas, options)
+        else:
+            setup_test_environment(debug=False)
+            configuracion = setup_databases(verbosity=0, interactive=False)
+            try:
+                usuarios, checklists, visitas = datos_sinteticos.TAMANOS[options['tamano']]
+                datos_sinteticos.generar(usuarios, checklists, visitas, semilla=options['semilla'])
+                reporte = self._revisar(explicar, ignoradas, options)
+            finally:
+                teardown_databases(configuracion, verbosity=0)
+                teardown_test_environment()
+
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8') as destino:
+                json.dump(reporte, destino, indent=2, ensure_ascii=False)
+
+        total = sum(len(c['problemas']) for vista in reporte.values() for c in vista)
+        if total:
+            raise CommandError(f'{total} problema(s) de plan de ejecución encontrados')
+        self.stdout.write(self.style.SUCCESS('Todas las consultas usan índices'))
+
+    # ---------------------------
+    # Revisión
+    # ---------------------------
+
+    def _urls(self):
+        checklist_pk = (
+            Visita.objects.exclude(checklist=None)
+            .order_by('-pk').values_list('checklist_id', flat=True).first()
+        ) or Checklist.objects.order_by('-pk').values_list('pk', flat=True).first()
+        visita_pk = Visita.objects.order_by('-pk').values_list('pk', flat=True).first()
+
+        for nombre, variantes in VISTAS.items():
+            kwargs = {}
+            if nombre.endswith(('_detail', '_edit')):
+                pk = checklist_pk if nombre.startswith('checklist') else visita_pk
+                if pk is None:
+                    continue
+                kwargs['pk'] = pk
+            ruta = reverse(nombre, kwargs=kwargs)
+            for parametros in variantes:
+                yield f'{ruta}?{urlencode(parametros)}' if parametros else ruta
+
+    def _revisar(self, explicar, ignoradas, options):
+        usuario = User.objects.filter(is_active=True).order_by('pk').first()
+        if usuario is None:
+            raise CommandError('No hay usuarios activos para iniciar sesión')
+        cliente = Client()
+        cliente.force_login(usuario)
+
+        reporte = {}
+        for url in self._urls():
+            capturadas = ConsultasCapturadas()
+            with connection.execute_wrapper(capturadas):
+                cliente.get(url)
+
+            resultados = []
+            with connection.cursor() as cursor:
+                for sql, params in capturadas.consultas:
+                    plan, problemas = explicar(cursor, sql, params)
+                    problemas = [
+                        (tipo, detalle) for tipo, detalle in problemas
+                        if not (tipo == 'scan' and detalle in ignoradas)
+                    ]
+                    resultados.append({'sql': sql, 'plan': plan, 'problemas': problemas})
+            reporte[url] = resultados
+
+            marcadas = [r for r in resultados if r['problemas']]
+            estilo = self.style.ERROR if marcadas else self.style.SUCCESS
+            self.stdout.write(estilo(f'{url}: {len(resultados)} consultas, {len(marcadas)} con problemas'))
+            for resultado in resultados:
+                if not (resultado['problemas'] or options['plan']):
+                    continue
+                self.stdout.write(f'    {resultado["sql"][:160]}')
+                for linea in resultado['plan']:
+                    self.stdout.write(f'      | {linea}')
+                for tipo, detalle in resultado['problemas']:
+                    self.stdout.write(self.style.WARNING(f'      ! {tipo}: {detalle}'))
+        return reporte
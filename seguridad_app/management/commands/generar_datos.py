@@ -0,0 +1,46 @@
+"""
+Genera datos sintéticos de usuarios, checklists y visitas
+
+Uso: python manage.py generar_datos --tamano 100k --limpiar
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from seguridad_app import datos_sinteticos
+
+
+class Command(BaseCommand):
+    help = 'Inserta datos sintéticos con distribuciones realistas para pruebas de carga'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamano', choices=sorted(datos_sinteticos.TAMANOS),
+                            help='Tamaño predefinido (cantidad de visitas)')
+        parser.add_argument('--usuarios', type=int, help='Cantidad de usuarios')
+        parser.add_argument('--checklists', type=int, help='Cantidad de checklists')
+        parser.add_argument('--visitas', type=int, help='Cantidad de visitas')
+        parser.add_argument('--semilla', type=int, default=42,
+                            help='Semilla del generador aleatorio (por defecto 42)')
+        parser.add_argument('--lote', type=int, default=5000,
+                            help='Filas por bulk_create (por defecto 5000)')
+        parser.add_argument('--limpiar', action='store_true',
+                            help='Elimina checklists, visitas y usuarios sintéticos antes de generar')
+
+    def handle(self, *args, **options):
+        usuarios, checklists, visitas = datos_sinteticos.TAMANOS.get(options['tamano'], (0, 0, 0))
+        usuarios = options['usuarios'] if options['usuarios'] is not None else usuarios
+        checklists = options['checklists'] if options['checklists'] is not None else checklists
+        visitas = options['visitas'] if options['visitas'] is not None else visitas
+
+        if not (usuarios and (checklists or visitas)):
+            raise CommandError('Indique --tamano o las cantidades de --usuarios y --checklists/--visitas')
+
+        if options['limpiar']:
+            datos_sinteticos.limpiar(stdout=self.stdout)
+
+        datos_sinteticos.generar(
+            usuarios, checklists, visitas,
+            semilla=options['semilla'],
+            lote=max(1, options['lote']),
+            stdout=self.stdout,
+        )
+        self.stdout.write(self.style.SUCCESS('Datos sintéticos generados.'))
@@ -0,0 +1,69 @@
+"""
+Importa visitas o checklists desde un archivo CSV o JSON Lines
+
+Uso: python manage.py importar_registros visitas datos.csv --usuario inspector1
+"""
+
+import sys
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from seguridad_app.importacion import FORMATOS, IMPORTADORES, detectar_formato, leer_filas
+
+
+class Command(BaseCommand):
+    help = 'Importación masiva de visitas o checklists desde CSV o JSON Lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('modelo', choices=sorted(IMPORTADORES))
+        parser.add_argument('archivo', help="Ruta del archivo a importar ('-' para stdin)")
+        parser.add_argument('--formato', choices=FORMATOS,
+                            help='Formato del archivo (por defecto según la extensión)')
+        parser.add_argument('--usuario',
+                            help='Username usado cuando la fila no indica inspector/responsable')
+        parser.add_argument('--chunk', type=int, default=1000,
+                            help='Filas por transacción (por defecto 1000)')
+        parser.add_argument('--errores', help='Ruta del reporte CSV de filas con error')
+
+    def handle(self, *args, **options):
+        usuario = None
+        if options['usuario']:
+            try:
+                usuario = User.objects.get(username=options['usuario'])
+            except User.DoesNotExist:
+                raise CommandError(f'El usuario "{options["usuario"]}" no existe')
+
+        formato = options['formato'] or detectar_formato(options['archivo'])
+        importador = IMPORTADORES[options['modelo']](
+            usuario_por_defecto=usuario,
+            chunk_size=max(1, options['chunk']),
+        )
+
+        inicio = time.monotonic()
+        if options['archivo'] == '-':
+            resultado = importador.importar(leer_filas(sys.stdin.buffer, formato))
+        else:
+            try:
+                archivo = open(options['archivo'], 'rb')
+            except OSError as exc:
+                raise CommandError(f'No se pudo abrir el archivo: {exc}')
+            with archivo:
+                resultado = importador.importar(leer_filas(archivo, formato))
+        duracion = time.monotonic() - inicio
+
+        if options['errores']:
+            with open(options['errores'], 'w', encoding='utf-8', newline='') as destino:
+                resultado.escribir_reporte(destino)
+
+        self.stdout.write(
+            f'Filas procesadas: {resultado.procesadas} - creadas: {resultado.creadas} '
+            f'- con error: {len(resultado.errores)} ({duracion:.1f} s)'
+        )
+        if resultado.errores and not options['errores']:
+            for numero, mensaje in resultado.errores[:20]:
+                self.stderr.write(f'  Fila {numero}: {mensaje}')
+            if len(resultado.errores) > 20:
+                self.stderr.write('  ... use --errores para obtener el reporte completo')
+        self.stdout.write(self.style.SUCCESS('Importación finalizada.'))
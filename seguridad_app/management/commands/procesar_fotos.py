@@ -0,0 +1,46 @@
+"""
+Genera las versiones reducidas de las fotos pendientes o con error
+
+Las subidas envían sus fotos al pool de procesos del servidor; si el proceso
+se reinicia con trabajos sin terminar, las fotos quedan pendientes hasta
+ejecutar este comando. Con --todas se regeneran todas (por ejemplo, tras
+cambiar PHOTO_THUMB_SIZE o PHOTO_WEB_SIZE) y con --purgar se eliminan las
+fotos que ya no están adjuntas a ninguna visita.
+
+Uso: python manage.py procesar_fotos [--todas] [--purgar]
+"""
+
+from django.core.management.base import BaseCommand
+
+from seguridad_app import fotos
+from seguridad_app.models import Foto
+
+
+LOTE = 100
+
+
+class Command(BaseCommand):
+    help = 'Genera las miniaturas y versiones web de las fotos pendientes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--todas', action='store_true',
+                            help='Regenera las versiones de todas las fotos')
+        parser.add_argument('--purgar', action='store_true',
+                            help='Elimina las fotos sin visitas y sus archivos')
+
+    def handle(self, *args, **options):
+        if options['purgar']:
+            self.stdout.write(f'Fotos sin visitas eliminadas: {fotos.purgar()}')
+
+        pendientes = Foto.objects.only('sha256').order_by('pk')
+        if not options['todas']:
+            pendientes = pendientes.exclude(estado='lista')
+        pendientes = list(pendientes)
+
+        fallidas = []
+        for inicio in range(0, len(pendientes), LOTE):
+            fallidas += fotos.procesar(pendientes[inicio:inicio + LOTE], esperar=True)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Fotos procesadas: {len(pendientes) - len(fallidas)} (con error: {len(fallidas)})'
+        ))
@@ -0,0 +1,23 @@
+"""
+Borra los registros de eliminaciones más antiguos que SYNC_TOMBSTONE_DAYS
+
+Los dispositivos con un cursor anterior reciben 410 y sincronizan desde cero.
+
+Uso: python manage.py purgar_eliminaciones
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from seguridad_app.sincronizacion import purgar_eliminaciones
+
+
+class Command(BaseCommand):
+    help = 'Borra los registros de eliminaciones que ya no necesita la API de sincronización'
+
+    def handle(self, *args, **options):
+        eliminadas = purgar_eliminaciones()
+        self.stdout.write(self.style.SUCCESS(
+            f'Se borraron {eliminadas} registros de eliminaciones '
+            f'(más de {settings.SYNC_TOMBSTONE_DAYS} días).'
+        ))
@@ -0,0 +1,22 @@
+"""
+Reconstruye desde cero la tabla de contadores del dashboard
+
+Uso: python manage.py reconstruir_resumen
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from seguridad_app.resumen import reconstruir_resumen
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los contadores materializados del dashboard'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            valores = reconstruir_resumen()
+        
+        for campo, valor in valores.items():
+            self.stdout.write(f'  {campo}: {valor}')
+        self.stdout.write(self.style.SUCCESS('Resumen del dashboard reconstruido.'))
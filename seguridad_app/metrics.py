@@ -0,0 +1,124 @@
+"""
+Sistema de Gestión de Seguridad Forestal
+Histogramas de rendimiento en memoria del proceso
+
+Los registra ``PerformanceMiddleware`` por cada request y los expone la vista
+``metricas_view`` en el formato de texto de Prometheus, junto con las
+métricas de los colectores registrados (p. ej. el pool de conexiones).
+"""
+
+import bisect
+import threading
+
+
+# Límites (en segundos) de los buckets de tiempo
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Límites de los buckets de cantidad de consultas SQL
+BUCKETS_CONSULTAS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+class Histograma:
+    """
+    Histograma acumulativo con etiquetas, al estilo de Prometheus
+    """
+
+    def __init__(self, nombre, ayuda, buckets, etiqueta='url_name'):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.buckets = tuple(buckets)
+        self.etiqueta = etiqueta
+        self._series = {}  # valor de la etiqueta -> [conteos por bucket, suma, total]
+        self._lock = threading.Lock()
+
+    def observar(self, valor_etiqueta, valor):
+        indice = bisect.bisect_left(self.buckets, valor)
+        with self._lock:
+            serie = self._series.get(valor_etiqueta)
+            if serie is None:
+                serie = self._series[valor_etiqueta] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            serie[0][indice] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    def reiniciar(self):
+        with self._lock:
+            self._series.clear()
+
+    def series(self):
+        with self._lock:
+            return {clave: ([*conteos], suma, total) for clave, (conteos, suma, total) in self._series.items()}
+
+    def exponer(self):
+        """
+        Líneas del formato de texto de Prometheus para este histograma
+        """
+        lineas = [
+            f'# HELP {self.nombre} {self.ayuda}',
+            f'# TYPE {self.nombre} histogram',
+        ]
+        for valor_etiqueta, (conteos, suma, total) in sorted(self.series().items()):
+            etiqueta = f'{self.etiqueta}="{_escapar(valor_etiqueta)}"'
+            acumulado = 0
+            for limite, conteo in zip(self.buckets, conteos):
+                acumulado += conteo
+                lineas.append(f'{self.nombre}_bucket{{{etiqueta},le="{limite}"}} {acumulado}')
+            lineas.append(f'{self.nombre}_bucket{{{etiqueta},le="+Inf"}} {total}')
+            lineas.append(f'{self.nombre}_sum{{{etiqueta}}} {suma:.6f}')
+            lineas.append(f'{self.nombre}_count{{{etiqueta}}} {total}')
+        return lineas
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Registro:
+    """
+    Conjunto de histogramas del proceso
+    """
+
+    def __init__(self):
+        self._histogramas = {}
+        self._colectores = []  # funciones que devuelven líneas ya formateadas
+        self._lock = threading.Lock()
+
+    def histograma(self, nombre, ayuda, buckets=BUCKETS_SEGUNDOS, etiqueta='url_name'):
+        with self._lock:
+            if nombre not in self._histogramas:
+                self._histogramas[nombre] = Histograma(nombre, ayuda, buckets, etiqueta)
+            return self._histogramas[nombre]
+
+    def agregar_colector(self, colector):
+        """
+        Registra una función que entrega métricas propias (contadores, gauges)
+        """
+        with self._lock:
+            if colector not in self._colectores:
+                self._colectores.append(colector)
+
+    def reiniciar(self):
+        for histograma in list(self._histogramas.values()):
+            histograma.reiniciar()
+
+    def exponer(self):
+        lineas = []
+        for nombre in sorted(self._histogramas):
+            lineas.extend(self._histogramas[nombre].exponer())
+        for colector in list(self._colectores):
+            lineas.extend(colector())
+        return '\n'.join(lineas) + '\n'
+
+
+registro = Registro()
+
+DURACION_REQUEST = registro.histograma(
+    'seguridad_request_duration_seconds', 'Tiempo total del request por vista')
+DURACION_SQL = registro.histograma(
+    'seguridad_request_sql_duration_seconds', 'Tiempo en consultas SQL por request')
+CONSULTAS_SQL = registro.histograma(
+    'seguridad_request_sql_queries', 'Consultas SQL por request', buckets=BUCKETS_CONSULTAS)
+DURACION_TEMPLATE = registro.histograma(
+    'seguridad_request_template_duration_seconds', 'Tiempo de renderizado de templates por request')
+DURACION_SESION = registro.histograma(
+    'seguridad_request_session_duration_seconds', 'Tiempo de escritura de la sesión por request')
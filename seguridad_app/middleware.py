@@ -0,0 +1,322 @@
+"""
+Sistema de Gestión de Seguridad Forestal
+Middleware de instrumentación de rendimiento y de autenticación con caché
+
+Por cada request mide el tiempo y la cantidad de consultas SQL, el tiempo de
+renderizado de templates, la escritura de la sesión y el tiempo total. Los
+valores se envían en la cabecera ``Server-Timing`` y se acumulan en los
+histogramas de ``metrics.py`` agrupados por nombre de URL.
+
+En las respuestas en streaming (exportaciones, eventos del dashboard) el
+contenido se genera después de enviar las cabeceras: se mide también la
+generación de cada parte y las métricas se registran al cerrar el flujo, sin
+``Server-Timing``, que a esa altura ya no se puede enviar.
+
+``AutenticacionCacheadaMiddleware`` reemplaza a ``AuthenticationMiddleware``
+y obtiene ``request.user`` desde la caché de ``autenticacion.py``;
+``ReplicaMiddleware`` abre la ventana de lectura de lo propio de ``routers.py``.
+
+Los tres admiten los modos síncrono y asíncrono, para que bajo ASGI las
+vistas de ``vistas_async.py`` no se vuelvan a ejecutar en un hilo.
+"""
+
+import contextvars
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.backends.django import Template as DjangoTemplate
+from django.utils.functional import SimpleLazyObject
+
+from . import autenticacion, metrics, routers
+
+
+_medicion_actual = contextvars.ContextVar('medicion_rendimiento', default=None)
+
+
+class Medicion:
+    """
+    Acumuladores de un request
+    """
+    __slots__ = ('consultas', 'sql', 'template', 'sesion')
+
+    def __init__(self):
+        self.consultas = 0
+        self.sql = 0.0
+        self.template = 0.0
+        self.sesion = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        # execute_wrapper de las conexiones
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql += time.perf_counter() - inicio
+            self.consultas += 1
+
+
+def _instrumentar_templates():
+    """
+    Envuelve una sola vez el render del backend de templates de Django
+    """
+    if getattr(DjangoTemplate.render, '_instrumentado', False):
+        return
+    render_original = DjangoTemplate.render
+
+    def render(self, context=None, request=None):
+        medicion = _medicion_actual.get()
+        if medicion is None:
+            return render_original(self, context, request)
+        inicio = time.perf_counter()
+        try:
+            return render_original(self, context, request)
+        finally:
+            medicion.template += time.perf_counter() - inicio
+
+    render._instrumentado = True
+    DjangoTemplate.render = render
+
+
+def _instrumentar_sesion(session, medicion):
+    """
+    Mide el ``save()`` que hace SessionMiddleware al procesar la respuesta
+    """
+    save_original = session.save
+
+    def save(*args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return save_original(*args, **kwargs)
+        finally:
+            medicion.sesion += time.perf_counter() - inicio
+
+    session.save = save
+
+
+def _conectar_medicion(medicion):
+    conexiones = [connections[alias] for alias in connections]
+    for conexion in conexiones:
+        conexion.execute_wrappers.append(medicion)
+    return conexiones
+
+
+def _desconectar_medicion(conexiones, medicion):
+    # Sobre las mismas conexiones: puede ejecutarse desde otro hilo
+    for conexion in conexiones:
+        conexion.execute_wrappers.remove(medicion)
+
+
+class _FlujoMedido:
+    """
+    ``streaming_content`` síncrono que mide cada parte y registra al cerrarse
+
+    Django llama a ``close()`` al cerrar la respuesta, aunque el cliente se
+    haya desconectado antes de terminar.
+    """
+
+    def __init__(self, partes, medicion, registrar):
+        self._partes = partes
+        self._medicion = medicion
+        self._registrar = registrar
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        token = _medicion_actual.set(self._medicion)
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(self._medicion))
+                return next(self._partes)
+        finally:
+            _medicion_actual.reset(token)
+
+    def close(self):
+        registrar, self._registrar = self._registrar, None
+        if registrar is not None:
+            registrar()
+
+
+async def _flujo_medido_async(partes, medicion, conexiones, registrar):
+    """
+    Igual que ``_FlujoMedido`` para un ``streaming_content`` asíncrono
+
+    La medición de SQL sigue conectada desde ``__acall__`` hasta que termina
+    el flujo (o el servidor lo descarta).
+    """
+    try:
+        while True:
+            token = _medicion_actual.set(medicion)
+            try:
+                parte = await partes.__anext__()
+            except StopAsyncIteration:
+                return
+            finally:
+                _medicion_actual.reset(token)
+            yield parte
+    finally:
+        _desconectar_medicion(conexiones, medicion)
+        registrar()
+
+
+class PerformanceMiddleware:
+    """
+    Instrumentación por request; se desactiva con ``PERFORMANCE_METRICS_ENABLED = False``
+
+    Debe ir antes de SessionMiddleware para incluir la escritura de la sesión.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PERFORMANCE_METRICS_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        _instrumentar_templates()
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        medicion = Medicion()
+        request._medicion_rendimiento = medicion
+        token = _medicion_actual.set(medicion)
+        inicio = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(medicion))
+                response = self.get_response(request)
+        finally:
+            _medicion_actual.reset(token)
+        if self._en_streaming(response) and not response.is_async:
+            return self._medir_flujo(request, response, medicion, inicio)
+        return self._registrar(request, response, medicion, time.perf_counter() - inicio)
+
+    async def __acall__(self, request):
+        medicion = Medicion()
+        request._medicion_rendimiento = medicion
+        token = _medicion_actual.set(medicion)
+        inicio = time.perf_counter()
+        try:
+            # Las conexiones son del hilo donde el ORM ejecuta las consultas del
+            # request, no del bucle de eventos
+            conexiones = await sync_to_async(_conectar_medicion)(medicion)
+            try:
+                response = await self.get_response(request)
+            except BaseException:
+                _desconectar_medicion(conexiones, medicion)
+                raise
+            # Un flujo asíncrono ejecuta sus consultas mientras se envía
+            if not (self._en_streaming(response) and response.is_async):
+                _desconectar_medicion(conexiones, medicion)
+        finally:
+            _medicion_actual.reset(token)
+        if self._en_streaming(response):
+            return self._medir_flujo(request, response, medicion, inicio, conexiones)
+        return self._registrar(request, response, medicion, time.perf_counter() - inicio)
+
+    @staticmethod
+    def _en_streaming(response):
+        # Los archivos (FileResponse) se envían tal cual, sin consultas, y
+        # envolverlos impediría que el servidor use sendfile
+        return response.streaming and getattr(response, 'file_to_stream', None) is None
+
+    def _medir_flujo(self, request, response, medicion, inicio, conexiones=()):
+        def registrar():
+            self._observar(request, medicion, time.perf_counter() - inicio)
+
+        if response.is_async:
+            response.streaming_content = _flujo_medido_async(
+                response.streaming_content.__aiter__(), medicion, conexiones, registrar,
+            )
+        else:
+            response.streaming_content = _FlujoMedido(iter(response.streaming_content), medicion, registrar)
+        return response
+
+    def _observar(self, request, medicion, total):
+        match = getattr(request, 'resolver_match', None)
+        url_name = (match.url_name if match else None) or 'sin_ruta'
+
+        metrics.DURACION_REQUEST.observar(url_name, total)
+        metrics.DURACION_SQL.observar(url_name, medicion.sql)
+        metrics.CONSULTAS_SQL.observar(url_name, medicion.consultas)
+        metrics.DURACION_TEMPLATE.observar(url_name, medicion.template)
+        metrics.DURACION_SESION.observar(url_name, medicion.sesion)
+
+    def _registrar(self, request, response, medicion, total):
+        self._observar(request, medicion, total)
+
+        response['Server-Timing'] = ', '.join([
+            f'sql;dur={medicion.sql * 1000:.1f};desc="{medicion.consultas} consultas"',
+            f'tpl;dur={medicion.template * 1000:.1f}',
+            f'sesion;dur={medicion.sesion * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ])
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        session = getattr(request, 'session', None)
+        medicion = getattr(request, '_medicion_rendimiento', None)
+        if session is not None and medicion is not None:
+            _instrumentar_sesion(session, medicion)
+        return None
+
+
+def _usuario_cacheado(request):
+    if not hasattr(request, '_cached_user'):
+        request._cached_user = autenticacion.obtener_usuario(request)
+    return request._cached_user
+
+
+class AutenticacionCacheadaMiddleware(AuthenticationMiddleware):
+    """
+    ``AuthenticationMiddleware`` que evita consultar ``auth_user`` en cada request
+    """
+
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: _usuario_cacheado(request))
+
+
+def _registrar_escrituras(request, response, escrituras):
+    usuario = getattr(request, 'user', None)
+    if escrituras and usuario is not None and usuario.is_authenticated:
+        routers.registrar_escritura(response, usuario.pk)
+
+
+class ReplicaMiddleware:
+    """
+    Después de un request que escribió, las lecturas del usuario van a la base principal
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        with routers.registro_escrituras() as escrituras:
+            response = self.get_response(request)
+        _registrar_escrituras(request, response, escrituras)
+        return response
+
+    async def __acall__(self, request):
+        with routers.registro_escrituras() as escrituras:
+            response = await self.get_response(request)
+        if escrituras:
+            await sync_to_async(_registrar_escrituras)(request, response, escrituras)
+        return response
@@ -0,0 +1,40 @@
+# Índices FULLTEXT para la búsqueda de texto completo (solo MySQL).
+# En otros motores la búsqueda usa el índice invertido en memoria de search.py.
+
+from django.db import migrations
+
+
+INDICES = [
+    ('checklists', 'checklists_busqueda_ft', ['titulo', 'area', 'descripcion']),
+    ('visitas', 'visitas_busqueda_ft', ['codigo_visita', 'lugar', 'hallazgos']),
+]
+
+
+def crear_indices(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    qn = schema_editor.quote_name
+    for tabla, nombre, columnas in INDICES:
+        schema_editor.execute(
+            f'ALTER TABLE {qn(tabla)} ADD FULLTEXT INDEX {qn(nombre)} '
+            f'({", ".join(qn(c) for c in columnas)})'
+        )
+
+
+def eliminar_indices(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    qn = schema_editor.quote_name
+    for tabla, nombre, _ in INDICES:
+        schema_editor.execute(f'ALTER TABLE {qn(tabla)} DROP INDEX {qn(nombre)}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('seguridad_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indices, eliminar_indices),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('seguridad_app', '0002_fulltext_busqueda'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenDashboard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('checklists_total', models.PositiveIntegerField(default=0)),
+                ('checklists_pendiente', models.PositiveIntegerField(default=0)),
+                ('checklists_en_progreso', models.PositiveIntegerField(default=0)),
+                ('checklists_completado', models.PositiveIntegerField(default=0)),
+                ('checklists_cancelado', models.PositiveIntegerField(default=0)),
+                ('visitas_total', models.PositiveIntegerField(default=0)),
+                ('visitas_satisfactorio', models.PositiveIntegerField(default=0)),
+                ('visitas_observaciones_menores', models.PositiveIntegerField(default=0)),
+                ('visitas_observaciones_mayores', models.PositiveIntegerField(default=0)),
+                ('visitas_critico', models.PositiveIntegerField(default=0)),
+                ('visitas_seguimiento', models.PositiveIntegerField(default=0)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, verbose_name='Última Actualización')),
+            ],
+            options={
+                'verbose_name': 'Resumen del Dashboard',
+                'verbose_name_plural': 'Resumen del Dashboard',
+                'db_table': 'resumen_dashboard',
+            },
+        ),
+    ]
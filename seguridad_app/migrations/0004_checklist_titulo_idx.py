@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('seguridad_app', '0003_resumen_dashboard'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='checklist',
+            index=models.Index(fields=['titulo'], name='checklists_titulo_idx'),
+        ),
+    ]
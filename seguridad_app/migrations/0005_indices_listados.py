@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('seguridad_app', '0004_checklist_titulo_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='checklist',
+            index=models.Index(fields=['fecha_creacion'], name='checklists_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='checklist',
+            index=models.Index(fields=['estado', 'fecha_creacion'], name='checklists_estado_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='visita',
+            index=models.Index(fields=['fecha_visita', 'hora_inicio'], name='visitas_fecha_hora_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='visita',
+            index=models.Index(fields=['tipo_visita', 'fecha_visita', 'hora_inicio'], name='visitas_tipo_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='visita',
+            index=models.Index(fields=['resultado', 'fecha_visita', 'hora_inicio'], name='visitas_resultado_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='visita',
+            index=models.Index(fields=['checklist', 'fecha_visita', 'hora_inicio'], name='visitas_checklist_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='visita',
+            index=models.Index(fields=['requiere_seguimiento', 'resultado'], name='visitas_seguimiento_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-18 14:05
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def copiar_fecha_creacion(apps, schema_editor):
+    # Los checklists existentes se consideran modificados por última vez al crearse
+    Checklist = apps.get_model('seguridad_app', 'Checklist')
+    Checklist.objects.update(fecha_actualizacion=models.F('fecha_creacion'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('seguridad_app', '0005_indices_listados'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='checklist',
+            name='fecha_actualizacion',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='Última Actualización'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(copiar_fecha_creacion, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='checklist',
+            index=models.Index(fields=['fecha_actualizacion'], name='checklists_actualizacion_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='visita',
+            index=models.Index(fields=['fecha_actualizacion'], name='visitas_actualizacion_idx'),
+        ),
+    ]
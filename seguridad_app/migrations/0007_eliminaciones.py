@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:55
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('seguridad_app', '0006_fecha_actualizacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Eliminacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modelo', models.CharField(choices=[('checklist', 'Checklist'), ('visita', 'Visita')], max_length=20, verbose_name='Modelo')),
+                ('objeto_id', models.PositiveIntegerField(verbose_name='ID del Registro')),
+                ('codigo', models.CharField(blank=True, default='', max_length=50, verbose_name='Código de Visita')),
+                ('fecha_eliminacion', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Fecha de Eliminación')),
+            ],
+            options={
+                'verbose_name': 'Eliminación',
+                'verbose_name_plural': 'Eliminaciones',
+                'db_table': 'eliminaciones',
+                'indexes': [models.Index(fields=['fecha_eliminacion'], name='eliminaciones_fecha_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('seguridad_app', '0007_eliminaciones'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='visita',
+            index=models.Index(fields=['tipo_visita', 'resultado'], name='visitas_tipo_resultado_idx'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('seguridad_app', '0008_indice_facetas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AvisoVencimiento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('proximo', 'Por Vencer'), ('vencido', 'Vencido')], max_length=20, verbose_name='Tipo de Aviso')),
+                ('fecha_vencimiento', models.DateField(verbose_name='Fecha de Vencimiento')),
+                ('fecha_deteccion', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Fecha de Detección')),
+                ('fecha_envio', models.DateTimeField(blank=True, null=True, verbose_name='Fecha de Envío')),
+            ],
+            options={
+                'verbose_name': 'Aviso de Vencimiento',
+                'verbose_name_plural': 'Avisos de Vencimiento',
+                'db_table': 'avisos_vencimiento',
+            },
+        ),
+        migrations.CreateModel(
+            name='EstadoVencimientos',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('vencido_hasta', models.DateField(blank=True, null=True)),
+                ('proximo_hasta', models.DateField(blank=True, null=True)),
+                ('ultima_pasada', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Estado del Escáner de Vencimientos',
+                'verbose_name_plural': 'Estado del Escáner de Vencimientos',
+                'db_table': 'estado_vencimientos',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='checklist',
+            index=models.Index(fields=['estado', 'fecha_vencimiento'], name='checklists_estado_venc_idx'),
+        ),
+        migrations.AddField(
+            model_name='avisovencimiento',
+            name='checklist',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='avisos_vencimiento', to='seguridad_app.checklist', verbose_name='Checklist'),
+        ),
+        migrations.AddIndex(
+            model_name='avisovencimiento',
+            index=models.Index(fields=['fecha_envio'], name='avisos_envio_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='avisovencimiento',
+            constraint=models.UniqueConstraint(fields=('checklist', 'tipo', 'fecha_vencimiento'), name='avisos_vencimiento_unico'),
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:02
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+PRIORIDAD_RESULTADO = {
+    'critico': 0,
+    'observaciones_mayores': 1,
+    'observaciones_menores': 2,
+    'satisfactorio': 3,
+}
+
+
+def poblar_cola(apps, schema_editor):
+    # Visitas que ya requerían seguimiento antes de existir la cola
+    Visita = apps.get_model('seguridad_app', 'Visita')
+    Seguimiento = apps.get_model('seguridad_app', 'Seguimiento')
+    filas = (
+        Visita.objects.filter(requiere_seguimiento=True)
+        .values_list('pk', 'resultado', 'fecha_visita', 'checklist__area')
+        .iterator(chunk_size=2000)
+    )
+    bloque = []
+    for pk, resultado, fecha_visita, area in filas:
+        bloque.append(Seguimiento(
+            visita_id=pk, prioridad=PRIORIDAD_RESULTADO.get(resultado, len(PRIORIDAD_RESULTADO)),
+            fecha_visita=fecha_visita, area=area or '',
+        ))
+        if len(bloque) >= 2000:
+            Seguimiento.objects.bulk_create(bloque)
+            bloque = []
+    Seguimiento.objects.bulk_create(bloque)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('seguridad_app', '0009_vencimientos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Seguimiento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prioridad', models.PositiveSmallIntegerField(verbose_name='Prioridad')),
+                ('fecha_visita', models.DateField(verbose_name='Fecha de Visita')),
+                ('area', models.CharField(blank=True, default='', max_length=100, verbose_name='Área Forestal')),
+                ('fecha_toma', models.DateTimeField(blank=True, null=True, verbose_name='Fecha de Toma')),
+                ('disponible_desde', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Disponible desde')),
+                ('tomado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='seguimientos_tomados', to=settings.AUTH_USER_MODEL, verbose_name='Tomado por')),
+                ('visita', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='seguimiento', to='seguridad_app.visita', verbose_name='Visita')),
+            ],
+            options={
+                'verbose_name': 'Seguimiento',
+                'verbose_name_plural': 'Seguimientos',
+                'db_table': 'seguimientos',
+                'ordering': ['prioridad', 'fecha_visita', 'area', 'id'],
+                'indexes': [models.Index(fields=['prioridad', 'fecha_visita', 'area', 'id'], name='seguimientos_cola_idx'), models.Index(fields=['tomado_por', 'prioridad', 'fecha_visita', 'area', 'id'], name='seguimientos_tomados_idx')],
+            },
+        ),
+        migrations.RunPython(poblar_cola, migrations.RunPython.noop),
+    ]
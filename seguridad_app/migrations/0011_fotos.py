@@ -0,0 +1,64 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:25
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('seguridad_app', '0010_seguimientos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Foto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True, verbose_name='SHA-256')),
+                ('tamano', models.PositiveIntegerField(verbose_name='Tamaño (bytes)')),
+                ('formato', models.CharField(max_length=10, verbose_name='Formato')),
+                ('ancho', models.PositiveIntegerField(verbose_name='Ancho')),
+                ('alto', models.PositiveIntegerField(verbose_name='Alto')),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('lista', 'Lista'), ('error', 'Error')], default='pendiente', max_length=20, verbose_name='Estado')),
+                ('fecha_creacion', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Fecha de Creación')),
+            ],
+            options={
+                'verbose_name': 'Foto',
+                'verbose_name_plural': 'Fotos',
+                'db_table': 'fotos',
+            },
+        ),
+        migrations.CreateModel(
+            name='FotoVisita',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(blank=True, default='', max_length=255, verbose_name='Nombre del Archivo')),
+                ('fecha_subida', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Fecha de Subida')),
+                ('foto', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='usos', to='seguridad_app.foto', verbose_name='Foto')),
+                ('subida_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='fotos_subidas', to=settings.AUTH_USER_MODEL, verbose_name='Subida por')),
+                ('visita', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fotos', to='seguridad_app.visita', verbose_name='Visita')),
+            ],
+            options={
+                'verbose_name': 'Foto de Visita',
+                'verbose_name_plural': 'Fotos de Visitas',
+                'db_table': 'fotos_visitas',
+                'ordering': ['fecha_subida', 'id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='foto',
+            index=models.Index(fields=['estado'], name='fotos_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fotovisita',
+            index=models.Index(fields=['visita', 'fecha_subida', 'id'], name='fotos_visitas_visita_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='fotovisita',
+            constraint=models.UniqueConstraint(fields=('visita', 'foto'), name='fotos_visitas_unica'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('seguridad_app', '0011_fotos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eliminacion',
+            name='propietario',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='ID del Responsable o Inspector'),
+        ),
+        migrations.AddIndex(
+            model_name='checklist',
+            index=models.Index(fields=['responsable', 'fecha_actualizacion', 'id'], name='checklists_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eliminacion',
+            index=models.Index(fields=['propietario', 'fecha_eliminacion', 'id'], name='eliminaciones_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='visita',
+            index=models.Index(fields=['inspector', 'fecha_actualizacion', 'id'], name='visitas_sync_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('seguridad_app', '0012_sincronizacion_por_usuario'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='avisovencimiento',
+            name='fallos',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Envíos Fallidos'),
+        ),
+        migrations.AddField(
+            model_name='avisovencimiento',
+            name='fecha_fallo',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Fecha del Último Fallo'),
+        ),
+        migrations.AddField(
+            model_name='avisovencimiento',
+            name='ultimo_error',
+            field=models.CharField(blank=True, default='', max_length=255, verbose_name='Último Error'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('seguridad_app', '0013_reintentos_avisos'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='checklist',
+            index=models.Index(fields=['area', 'titulo'], name='checklists_area_idx'),
+        ),
+    ]
@@ -4,15 +4,31 @@ Modelos de datos para Checklists y Visitas de Seguridad
 
 Incluye dos entidades principales:
 1. Checklist - Para registrar checklists operacionales
-2. Visita - Para registrar visitas de seguridad
+2. Visita - Para registrar visitas de seguridad (con sus fotos de evidencia)
 """
 
-from django.db import models
+from django.db import models, router, transaction
 from django.contrib.auth.models import User
 from django.utils import timezone
 
 
-class Checklist(models.Model):
+class GuardadoAtomico:
+    """
+    ``save()`` dentro de una transacción
+
+    Las señales leen la fila persistida con ``select_for_update`` antes de
+    guardarla y aplican el delta de los contadores del dashboard antes de
+    confirmar: dos guardados simultáneos del mismo registro no descuentan el
+    mismo valor anterior.
+    """
+
+    def save(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+
+
+class Checklist(GuardadoAtomico, models.Model):
     """
     Modelo para gestionar Checklists Operacionales
     """
@@ -54,18 +70,33 @@ class Checklist(models.Model):
     fecha_creacion = models.DateTimeField(default=timezone.now, verbose_name="Fecha de Creación")
     fecha_vencimiento = models.DateField(verbose_name="Fecha de Vencimiento")
     observaciones = models.TextField(blank=True, null=True, verbose_name="Observaciones")
+    fecha_actualizacion = models.DateTimeField(auto_now=True, verbose_name="Última Actualización")
     
     class Meta:
         db_table = 'checklists'
         verbose_name = 'Checklist'
         verbose_name_plural = 'Checklists'
         ordering = ['-fecha_creacion']
+        indexes = [
+            # Autocompletado por prefijo del título y del área
+            models.Index(fields=['titulo'], name='checklists_titulo_idx'),
+            models.Index(fields=['area', 'titulo'], name='checklists_area_idx'),
+            # Listado sin filtro y filtrado por estado, en el orden del modelo
+            models.Index(fields=['fecha_creacion'], name='checklists_fecha_idx'),
+            models.Index(fields=['estado', 'fecha_creacion'], name='checklists_estado_fecha_idx'),
+            # Cola de vencimientos: checklists abiertos por fecha de vencimiento
+            models.Index(fields=['estado', 'fecha_vencimiento'], name='checklists_estado_venc_idx'),
+            # Validación de GET condicional (última modificación de un listado)
+            models.Index(fields=['fecha_actualizacion'], name='checklists_actualizacion_idx'),
+            # Cursor de la sincronización de cada responsable
+            models.Index(fields=['responsable', 'fecha_actualizacion', 'id'], name='checklists_sync_idx'),
+        ]
     
     def __str__(self):
         return f"{self.titulo} - {self.area} ({self.estado})"
 
 
-class Visita(models.Model):
+class Visita(GuardadoAtomico, models.Model):
     """
     Modelo para gestionar Visitas de Seguridad
     """
@@ -123,6 +154,286 @@ class Visita(models.Model):
         verbose_name = 'Visita de Seguridad'
         verbose_name_plural = 'Visitas de Seguridad'
         ordering = ['-fecha_visita', '-hora_inicio']
+        indexes = [
+            # Listado sin filtro y filtrado por tipo o resultado, en el orden del modelo
+            models.Index(fields=['fecha_visita', 'hora_inicio'], name='visitas_fecha_hora_idx'),
+            models.Index(fields=['tipo_visita', 'fecha_visita', 'hora_inicio'], name='visitas_tipo_fecha_idx'),
+            models.Index(fields=['resultado', 'fecha_visita', 'hora_inicio'], name='visitas_resultado_fecha_idx'),
+            # Visitas de un checklist en su detalle
+            models.Index(fields=['checklist', 'fecha_visita', 'hora_inicio'], name='visitas_checklist_fecha_idx'),
+            # Facetas del listado (GROUP BY sobre el índice, sin leer la tabla)
+            models.Index(fields=['tipo_visita', 'resultado'], name='visitas_tipo_resultado_idx'),
+            # Conteos del dashboard por seguimiento y resultado
+            models.Index(fields=['requiere_seguimiento', 'resultado'], name='visitas_seguimiento_idx'),
+            # Validación de GET condicional (última modificación de un listado)
+            models.Index(fields=['fecha_actualizacion'], name='visitas_actualizacion_idx'),
+            # Cursor de la sincronización de cada inspector
+            models.Index(fields=['inspector', 'fecha_actualizacion', 'id'], name='visitas_sync_idx'),
+        ]
     
     def __str__(self):
         return f"{self.codigo_visita} - {self.lugar} ({self.fecha_visita})"
+
+
+class ResumenDashboard(models.Model):
+    """
+    Contadores materializados del dashboard
+
+    Tabla de una sola fila, mantenida de forma incremental por las señales de
+    Checklist y Visita y reconstruida con ``manage.py reconstruir_resumen``.
+    """
+    checklists_total = models.PositiveIntegerField(default=0)
+    checklists_pendiente = models.PositiveIntegerField(default=0)
+    checklists_en_progreso = models.PositiveIntegerField(default=0)
+    checklists_completado = models.PositiveIntegerField(default=0)
+    checklists_cancelado = models.PositiveIntegerField(default=0)
+    visitas_total = models.PositiveIntegerField(default=0)
+    visitas_satisfactorio = models.PositiveIntegerField(default=0)
+    visitas_observaciones_menores = models.PositiveIntegerField(default=0)
+    visitas_observaciones_mayores = models.PositiveIntegerField(default=0)
+    visitas_critico = models.PositiveIntegerField(default=0)
+    visitas_seguimiento = models.PositiveIntegerField(default=0)
+    fecha_actualizacion = models.DateTimeField(auto_now=True, verbose_name="Última Actualización")
+    
+    class Meta:
+        db_table = 'resumen_dashboard'
+        verbose_name = 'Resumen del Dashboard'
+        verbose_name_plural = 'Resumen del Dashboard'
+    
+    def __str__(self):
+        return f"Resumen ({self.checklists_total} checklists, {self.visitas_total} visitas)"
+
+
+class Eliminacion(models.Model):
+    """
+    Registro de un Checklist o Visita eliminado (tombstone)
+
+    Lo consulta la API de sincronización para que los dispositivos borren su
+    copia local; se purga con ``manage.py purgar_eliminaciones``. También se
+    registra para el responsable o inspector anterior cuando el registro se
+    reasigna a otro usuario, que deja de recibirlo.
+    """
+    MODELO_CHOICES = [
+        ('checklist', 'Checklist'),
+        ('visita', 'Visita'),
+    ]
+    
+    modelo = models.CharField(max_length=20, choices=MODELO_CHOICES, verbose_name="Modelo")
+    objeto_id = models.PositiveIntegerField(verbose_name="ID del Registro")
+    codigo = models.CharField(max_length=50, blank=True, default='', verbose_name="Código de Visita")
+    # Sin clave foránea: el usuario puede eliminarse junto con sus registros
+    propietario = models.PositiveIntegerField(
+        blank=True, null=True, verbose_name="ID del Responsable o Inspector"
+    )
+    fecha_eliminacion = models.DateTimeField(default=timezone.now, verbose_name="Fecha de Eliminación")
+    
+    class Meta:
+        db_table = 'eliminaciones'
+        verbose_name = 'Eliminación'
+        verbose_name_plural = 'Eliminaciones'
+        indexes = [
+            # Purga por antigüedad
+            models.Index(fields=['fecha_eliminacion'], name='eliminaciones_fecha_idx'),
+            # Recorrido por cursor de la sincronización de cada usuario
+            models.Index(fields=['propietario', 'fecha_eliminacion', 'id'], name='eliminaciones_sync_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.modelo} {self.objeto_id} ({self.fecha_eliminacion})"
+
+
+class AvisoVencimiento(models.Model):
+    """
+    Cruce de un checklist abierto por su fecha de aviso o de vencimiento
+
+    Las filas las crea ``vencimientos.escanear``; mientras ``fecha_envio``
+    está vacía esperan en la cola del resumen que se envía al responsable.
+    Si el servidor de correo rechaza el resumen, el fallo queda registrado y
+    el aviso se reintenta pasados ``CHECKLIST_DIGEST_RETRY_MINUTES``. Un
+    checklist recibe un aviso de cada tipo por fecha de vencimiento.
+    """
+    TIPO_CHOICES = [
+        ('proximo', 'Por Vencer'),
+        ('vencido', 'Vencido'),
+    ]
+    
+    checklist = models.ForeignKey(
+        Checklist,
+        on_delete=models.CASCADE,
+        related_name='avisos_vencimiento',
+        verbose_name="Checklist"
+    )
+    tipo = models.CharField(max_length=20, choices=TIPO_CHOICES, verbose_name="Tipo de Aviso")
+    fecha_vencimiento = models.DateField(verbose_name="Fecha de Vencimiento")
+    fecha_deteccion = models.DateTimeField(default=timezone.now, verbose_name="Fecha de Detección")
+    fecha_envio = models.DateTimeField(blank=True, null=True, verbose_name="Fecha de Envío")
+    fallos = models.PositiveSmallIntegerField(default=0, verbose_name="Envíos Fallidos")
+    fecha_fallo = models.DateTimeField(blank=True, null=True, verbose_name="Fecha del Último Fallo")
+    ultimo_error = models.CharField(max_length=255, blank=True, default='', verbose_name="Último Error")
+    
+    class Meta:
+        db_table = 'avisos_vencimiento'
+        verbose_name = 'Aviso de Vencimiento'
+        verbose_name_plural = 'Avisos de Vencimiento'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['checklist', 'tipo', 'fecha_vencimiento'], name='avisos_vencimiento_unico',
+            ),
+        ]
+        indexes = [
+            # Avisos pendientes de envío
+            models.Index(fields=['fecha_envio'], name='avisos_envio_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_tipo_display()}: {self.checklist_id} ({self.fecha_vencimiento})"
+
+
+class EstadoVencimientos(models.Model):
+    """
+    Avance del escáner de vencimientos (una sola fila)
+
+    Guarda hasta qué fecha se procesó cada tipo de cruce y el instante de la
+    última pasada, para que la siguiente solo revise lo nuevo.
+    """
+    vencido_hasta = models.DateField(blank=True, null=True)
+    proximo_hasta = models.DateField(blank=True, null=True)
+    ultima_pasada = models.DateTimeField(blank=True, null=True)
+    
+    class Meta:
+        db_table = 'estado_vencimientos'
+        verbose_name = 'Estado del Escáner de Vencimientos'
+        verbose_name_plural = 'Estado del Escáner de Vencimientos'
+    
+    def __str__(self):
+        return f"Vencimientos procesados hasta {self.vencido_hasta}"
+
+
+class Seguimiento(models.Model):
+    """
+    Cola de trabajo de las visitas que requieren seguimiento
+
+    Una fila por visita con ``requiere_seguimiento``, mantenida por las
+    señales de Visita y Checklist. Copia los campos del orden de la cola
+    (severidad del resultado, fecha de la visita y área) para que el índice
+    ``seguimientos_cola_idx`` entregue el siguiente sin ordenar la tabla.
+    Una fila tomada por un supervisor no está disponible hasta
+    ``disponible_desde`` (el plazo de la toma).
+    """
+    visita = models.OneToOneField(
+        Visita,
+        on_delete=models.CASCADE,
+        related_name='seguimiento',
+        verbose_name="Visita"
+    )
+    prioridad = models.PositiveSmallIntegerField(verbose_name="Prioridad")  # 0 = crítico
+    fecha_visita = models.DateField(verbose_name="Fecha de Visita")
+    area = models.CharField(max_length=100, blank=True, default='', verbose_name="Área Forestal")
+    tomado_por = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='seguimientos_tomados',
+        verbose_name="Tomado por"
+    )
+    fecha_toma = models.DateTimeField(blank=True, null=True, verbose_name="Fecha de Toma")
+    disponible_desde = models.DateTimeField(default=timezone.now, verbose_name="Disponible desde")
+    
+    class Meta:
+        db_table = 'seguimientos'
+        verbose_name = 'Seguimiento'
+        verbose_name_plural = 'Seguimientos'
+        ordering = ['prioridad', 'fecha_visita', 'area', 'id']
+        indexes = [
+            # Orden de la cola: el siguiente disponible es el primero del índice no tomado
+            models.Index(fields=['prioridad', 'fecha_visita', 'area', 'id'], name='seguimientos_cola_idx'),
+            # Seguimientos tomados por un supervisor, en el orden de la cola
+            models.Index(
+                fields=['tomado_por', 'prioridad', 'fecha_visita', 'area', 'id'],
+                name='seguimientos_tomados_idx',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"Seguimiento de la visita {self.visita_id} (prioridad {self.prioridad})"
+
+
+class Foto(models.Model):
+    """
+    Imagen de evidencia guardada una sola vez por contenido
+
+    Los archivos se nombran con el SHA-256 del original, así dos subidas
+    iguales comparten el mismo archivo. La miniatura y la versión web se
+    generan fuera del request (``fotos.py``); ``estado`` indica si ya
+    están disponibles.
+    """
+    ESTADO_CHOICES = [
+        ('pendiente', 'Pendiente'),
+        ('lista', 'Lista'),
+        ('error', 'Error'),
+    ]
+    
+    sha256 = models.CharField(max_length=64, unique=True, verbose_name="SHA-256")
+    tamano = models.PositiveIntegerField(verbose_name="Tamaño (bytes)")
+    formato = models.CharField(max_length=10, verbose_name="Formato")
+    ancho = models.PositiveIntegerField(verbose_name="Ancho")
+    alto = models.PositiveIntegerField(verbose_name="Alto")
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='pendiente', verbose_name="Estado")
+    fecha_creacion = models.DateTimeField(default=timezone.now, verbose_name="Fecha de Creación")
+    
+    class Meta:
+        db_table = 'fotos'
+        verbose_name = 'Foto'
+        verbose_name_plural = 'Fotos'
+        indexes = [
+            # Fotos cuyas versiones reducidas faltan generar
+            models.Index(fields=['estado'], name='fotos_estado_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.formato}, {self.ancho}x{self.alto})"
+
+
+class FotoVisita(models.Model):
+    """
+    Foto adjunta a una visita como evidencia de los hallazgos
+    """
+    visita = models.ForeignKey(
+        Visita,
+        on_delete=models.CASCADE,
+        related_name='fotos',
+        verbose_name="Visita"
+    )
+    foto = models.ForeignKey(
+        Foto,
+        on_delete=models.PROTECT,
+        related_name='usos',
+        verbose_name="Foto"
+    )
+    nombre = models.CharField(max_length=255, blank=True, default='', verbose_name="Nombre del Archivo")
+    subida_por = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='fotos_subidas',
+        verbose_name="Subida por"
+    )
+    fecha_subida = models.DateTimeField(default=timezone.now, verbose_name="Fecha de Subida")
+    
+    class Meta:
+        db_table = 'fotos_visitas'
+        verbose_name = 'Foto de Visita'
+        verbose_name_plural = 'Fotos de Visitas'
+        ordering = ['fecha_subida', 'id']
+        constraints = [
+            models.UniqueConstraint(fields=['visita', 'foto'], name='fotos_visitas_unica'),
+        ]
+        indexes = [
+            # Fotos de una visita en su detalle, en el orden del modelo
+            models.Index(fields=['visita', 'fecha_subida', 'id'], name='fotos_visitas_visita_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Foto {self.foto_id} de la visita {self.visita_id}"
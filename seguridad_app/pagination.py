@@ -0,0 +1,219 @@
+"""
+Sistema de Gestión de Seguridad Forestal
+Paginación por cursor (keyset) para los listados
+
+A diferencia de OFFSET/LIMIT, cada página se obtiene filtrando a partir de
+los valores de la última fila vista, por lo que el costo de la consulta es
+el mismo en la página 1 que en la página 5000.
+
+Los resultados de búsqueda, que se ordenan por relevancia y no por el orden
+del modelo, se paginan con ``RankedPaginator`` sobre la lista acotada de
+claves que devuelve el motor de búsqueda.
+"""
+
+import base64
+import json
+
+from django.conf import settings
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    """El cursor recibido no se puede decodificar"""
+
+
+def _codificar(payload):
+    texto = json.dumps(payload, separators=(',', ':'))
+    return base64.urlsafe_b64encode(texto.encode()).decode().rstrip('=')
+
+
+def _decodificar(cursor):
+    try:
+        padding = '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(cursor + padding))
+    except Exception as exc:
+        raise InvalidCursor(cursor) from exc
+    if not isinstance(payload, dict):
+        raise InvalidCursor(cursor)
+    return payload
+
+
+def condicion_seek(campos, valores, lookup):
+    """
+    Construye (a < va) OR (a = va AND b < vb) OR ... para la tupla de campos
+    """
+    condicion = Q()
+    for i, campo in enumerate(campos):
+        termino = Q(**{f'{campo}__{lookup}': valores[i]})
+        for previo, valor in zip(campos[:i], valores[:i]):
+            termino &= Q(**{previo: valor})
+        condicion |= termino
+    return condicion
+
+
+class KeysetPage:
+    """
+    Página de resultados con cursores hacia la página siguiente y anterior
+    """
+
+    def __init__(self, object_list, next_cursor=None, prev_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.prev_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    """
+    Paginador por cursor sobre un orden descendente de campos
+
+    ``ordering`` es la lista de campos del ``Meta.ordering`` del modelo (con
+    el prefijo ``-``); se agrega ``pk`` como desempate para que el orden sea
+    total y los cursores sean estables aunque existan valores repetidos.
+    """
+
+    def __init__(self, queryset, ordering, page_size=None):
+        self.queryset = queryset
+        self.fields = [campo.lstrip('-') for campo in ordering] + ['pk']
+        self.page_size = page_size or getattr(settings, 'LIST_PAGE_SIZE', 25)
+
+    # ---------------------------
+    # Codificación del cursor
+    # ---------------------------
+
+    def _field(self, name):
+        model = self.queryset.model
+        return model._meta.pk if name == 'pk' else model._meta.get_field(name)
+
+    def encode_cursor(self, obj, direction):
+        valores = [self._field(campo).value_to_string(obj) for campo in self.fields]
+        return _codificar({'d': direction, 'v': valores})
+
+    def decode_cursor(self, cursor):
+        payload = _decodificar(cursor)
+        try:
+            direction = payload['d']
+            valores = payload['v']
+            if direction not in ('next', 'prev') or len(valores) != len(self.fields):
+                raise InvalidCursor(cursor)
+            valores = [
+                self._field(campo).to_python(valor)
+                for campo, valor in zip(self.fields, valores)
+            ]
+        except InvalidCursor:
+            raise
+        except Exception as exc:
+            raise InvalidCursor(cursor) from exc
+        return direction, valores
+
+    # ---------------------------
+    # Consulta de la página
+    # ---------------------------
+
+    def _seek_filter(self, valores, lookup):
+        return condicion_seek(self.fields, valores, lookup)
+
+    def get_page(self, cursor=None):
+        """
+        Devuelve la página que sigue (o precede) al cursor dado
+
+        Un cursor vacío o inválido devuelve la primera página.
+        """
+        direction, valores = 'next', None
+        if cursor:
+            try:
+                direction, valores = self.decode_cursor(cursor)
+            except InvalidCursor:
+                direction, valores = 'next', None
+
+        descendente = [f'-{campo}' for campo in self.fields]
+        ascendente = list(self.fields)
+
+        if valores is None:
+            qs = self.queryset.order_by(*descendente)
+        elif direction == 'next':
+            qs = self.queryset.filter(self._seek_filter(valores, 'lt')).order_by(*descendente)
+        else:
+            qs = self.queryset.filter(self._seek_filter(valores, 'gt')).order_by(*ascendente)
+
+        filas = list(qs[:self.page_size + 1])
+        hay_mas = len(filas) > self.page_size
+        filas = filas[:self.page_size]
+
+        if direction == 'prev':
+            filas.reverse()
+            has_next = valores is not None
+            has_previous = hay_mas
+        else:
+            has_next = hay_mas
+            has_previous = valores is not None
+
+        next_cursor = prev_cursor = None
+        if filas:
+            if has_next:
+                next_cursor = self.encode_cursor(filas[-1], 'next')
+            if has_previous:
+                prev_cursor = self.encode_cursor(filas[0], 'prev')
+
+        return KeysetPage(filas, next_cursor=next_cursor, prev_cursor=prev_cursor)
+
+
+class RankedPaginator:
+    """
+    Paginador para resultados ordenados por relevancia
+
+    ``ranked_pks`` es la lista de claves ya ordenada por el motor de búsqueda
+    (y acotada por ``SEARCH_MAX_RESULTS``). Los filtros del ``queryset`` se
+    aplican con una sola consulta sobre esa lista y luego se carga solo la
+    página pedida, conservando el orden de relevancia.
+    """
+
+    def __init__(self, queryset, ranked_pks, page_size=None):
+        self.queryset = queryset
+        self.ranked_pks = list(ranked_pks)
+        self.page_size = page_size or getattr(settings, 'LIST_PAGE_SIZE', 25)
+
+    def _offset(self, cursor):
+        if not cursor:
+            return 0
+        try:
+            offset = _decodificar(cursor).get('o')
+        except InvalidCursor:
+            return 0
+        return offset if isinstance(offset, int) and offset > 0 else 0
+
+    def get_page(self, cursor=None):
+        offset = self._offset(cursor)
+
+        if not self.ranked_pks:
+            return KeysetPage([])
+
+        permitidos = set(
+            self.queryset.filter(pk__in=self.ranked_pks).values_list('pk', flat=True)
+        )
+        ordenados = [pk for pk in self.ranked_pks if pk in permitidos]
+        ventana = ordenados[offset:offset + self.page_size]
+
+        objetos = self.queryset.in_bulk(ventana) if ventana else {}
+        filas = [objetos[pk] for pk in ventana if pk in objetos]
+
+        next_cursor = prev_cursor = None
+        if offset + self.page_size < len(ordenados):
+            next_cursor = _codificar({'o': offset + self.page_size})
+        if offset > 0:
+            prev_cursor = _codificar({'o': max(0, offset - self.page_size)})
+
+        return KeysetPage(filas, next_cursor=next_cursor, prev_cursor=prev_cursor)
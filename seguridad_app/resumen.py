@@ -0,0 +1,139 @@
+"""
+Sistema de Gestión de Seguridad Forestal
+Contadores del dashboard
+
+El dashboard lee una sola fila de ``ResumenDashboard``. Mientras la tabla no
+esté poblada, los contadores se calculan con una sola consulta: la
+agregación condicional de cada tabla, unidas con CROSS JOIN.
+"""
+
+from django.db import connections, router
+from django.db.models import Count, F, Q, Value
+
+from .models import Checklist, ResumenDashboard, Visita
+
+
+RESUMEN_PK = 1
+
+
+def campo_estado(estado):
+    return f'checklists_{estado}'
+
+
+def campo_resultado(resultado):
+    return f'visitas_{resultado}'
+
+
+_CAMPOS = {f.name for f in ResumenDashboard._meta.get_fields()}
+
+
+def _conteos(model, alias, **conteos):
+    """
+    SQL y parámetros de una fila con los ``conteos`` de toda la tabla
+    """
+    # Agrupar por una constante da una sola fila sin GROUP BY, como aggregate()
+    queryset = (
+        model.objects.order_by()
+        .annotate(fila=Value(1)).values('fila')
+        .annotate(**conteos).values(*conteos)
+    )
+    return queryset.query.get_compiler(using=alias).as_sql()
+
+
+def calcular_resumen():
+    """
+    Calcula los contadores desde las tablas de origen, en una consulta
+    """
+    alias = router.db_for_read(Checklist)
+    sql_checklists, params_checklists = _conteos(
+        Checklist, alias,
+        checklists_total=Count('pk'),
+        **{
+            campo_estado(estado): Count('pk', filter=Q(estado=estado))
+            for estado, _ in Checklist.ESTADO_CHOICES
+        },
+    )
+    sql_visitas, params_visitas = _conteos(
+        Visita, alias,
+        visitas_total=Count('pk'),
+        visitas_seguimiento=Count('pk', filter=Q(requiere_seguimiento=True)),
+        **{
+            campo_resultado(resultado): Count('pk', filter=Q(resultado=resultado))
+            for resultado, _ in Visita.RESULTADO_CHOICES
+        },
+    )
+    with connections[alias].cursor() as cursor:
+        cursor.execute(
+            f'SELECT * FROM ({sql_checklists}) c CROSS JOIN ({sql_visitas}) v',
+            (*params_checklists, *params_visitas),
+        )
+        columnas = [columna[0] for columna in cursor.description]
+        return dict(zip(columnas, cursor.fetchone()))
+
+
+def obtener_resumen():
+    """
+    Devuelve los contadores del dashboard como diccionario
+    """
+    fila = ResumenDashboard.objects.filter(pk=RESUMEN_PK).values().first()
+    if fila is None:
+        return calcular_resumen()
+    return fila
+
+
+def reconstruir_resumen():
+    """
+    Recalcula y guarda la fila del resumen
+    """
+    valores = calcular_resumen()
+    ResumenDashboard.objects.update_or_create(pk=RESUMEN_PK, defaults=valores)
+    return valores
+
+
+def aplicar_delta(deltas):
+    """
+    Suma los incrementos al resumen con un UPDATE atómico
+
+    Si la tabla aún no está poblada no hace nada: el dashboard usa la
+    agregación directa hasta la próxima reconstrucción.
+    """
+    cambios = {
+        campo: F(campo) + delta
+        for campo, delta in deltas.items()
+        if delta and campo in _CAMPOS
+    }
+    if cambios:
+        ResumenDashboard.objects.filter(pk=RESUMEN_PK).update(**cambios)
+
+
+def delta_checklist(anterior, actual):
+    """
+    Incrementos producidos al pasar de ``anterior`` a ``actual``
+
+    Cada argumento es un diccionario con ``estado`` o ``None`` si el registro
+    no existía (alta) o dejó de existir (baja).
+    """
+    deltas = {}
+    for fila, signo in ((anterior, -1), (actual, 1)):
+        if fila is None:
+            continue
+        deltas['checklists_total'] = deltas.get('checklists_total', 0) + signo
+        campo = campo_estado(fila['estado'])
+        deltas[campo] = deltas.get(campo, 0) + signo
+    return deltas
+
+
+def delta_visita(anterior, actual):
+    """
+    Igual que ``delta_checklist`` para ``resultado`` y ``requiere_seguimiento``
+    """
+    deltas = {}
+    for fila, signo in ((anterior, -1), (actual, 1)):
+        if fila is None:
+            continue
+        deltas['visitas_total'] = deltas.get('visitas_total', 0) + signo
+        campo = campo_resultado(fila['resultado'])
+        deltas[campo] = deltas.get(campo, 0) + signo
+        if fila['requiere_seguimiento']:
+            deltas['visitas_seguimiento'] = deltas.get('visitas_seguimiento', 0) + signo
+    return deltas
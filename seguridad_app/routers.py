@@ -0,0 +1,183 @@
+"""
+Sistema de Gestión de Seguridad Forestal
+Router de bases de datos con réplicas de lectura
+
+Las vistas marcadas con ``@lectura_en_replica`` (dashboard, listados y
+detalles) leen desde una de las réplicas de ``DATABASE_REPLICAS``; todo lo
+demás, y todas las escrituras, van a ``default``.
+
+Lectura de lo propio: cuando un request escribe en un modelo de la
+aplicación, ``middleware.ReplicaMiddleware`` envía una cookie firmada que vale
+``REPLICA_READ_YOUR_WRITES_SECONDS``; mientras dure esa ventana las lecturas
+de ese usuario van a la base principal, para que vea sus cambios aunque la
+réplica esté atrasada. La marca viaja con el navegador y no depende de la
+caché, así que vale aunque el request siguiente lo atienda otro proceso. Una réplica que no responde se deja de usar durante
+``REPLICA_RETRY_SECONDS`` y se lee desde la principal.
+
+El estado del request vive en variables de contexto, que ``sync_to_async``
+copia al hilo donde el ORM asíncrono ejecuta las consultas; así el mismo
+decorador sirve para las vistas de ``vistas_async.py``.
+"""
+
+import contextvars
+import itertools
+import logging
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+
+logger = logging.getLogger(__name__)
+
+COOKIE_ESCRITURA = 'lectura_propia'
+SAL_ESCRITURA = 'seguridad_app.routers.escritura'
+
+# Estado del request en curso: réplica elegida (o None) y si hubo escrituras
+_lectura = contextvars.ContextVar('lectura_en_replica', default=None)
+_escrituras = contextvars.ContextVar('escrituras_request', default=None)
+
+_turno = itertools.count()
+_caidas = {}  # alias -> instante (monotonic) hasta el que no se usa
+
+
+def replicas():
+    return list(getattr(settings, 'DATABASE_REPLICAS', []))
+
+
+def _ventana():
+    return getattr(settings, 'REPLICA_READ_YOUR_WRITES_SECONDS', 10)
+
+
+def escritura_reciente(request, user_id):
+    """
+    True si la cookie firmada de ``user_id`` sigue dentro de la ventana
+    """
+    valor = request.get_signed_cookie(
+        COOKIE_ESCRITURA, default=None, salt=SAL_ESCRITURA, max_age=_ventana(),
+    )
+    return valor == str(user_id)
+
+
+def registrar_escritura(response, user_id):
+    response.set_signed_cookie(
+        COOKIE_ESCRITURA, str(user_id), salt=SAL_ESCRITURA, max_age=_ventana(),
+        secure=settings.SESSION_COOKIE_SECURE, httponly=True, samesite='Lax',
+    )
+
+
+def leyendo_de_replica():
+    """
+    True si el request en curso leyó desde una réplica
+    """
+    estado = _lectura.get()
+    return estado is not None and estado['alias'] is not None
+
+
+def elegir_replica():
+    """
+    Alias de una réplica que responde, en turnos rotativos, o None
+    """
+    candidatas = replicas()
+    if not candidatas:
+        return None
+    inicio = next(_turno)
+    ahora = time.monotonic()
+    for i in range(len(candidatas)):
+        alias = candidatas[(inicio + i) % len(candidatas)]
+        if _caidas.get(alias, 0) > ahora:
+            continue
+        try:
+            connections[alias].ensure_connection()
+        except DatabaseError as exc:
+            _caidas[alias] = ahora + getattr(settings, 'REPLICA_RETRY_SECONDS', 30)
+            logger.warning('Réplica %s no disponible, se lee desde la principal: %s', alias, exc)
+            continue
+        return alias
+    return None
+
+
+@contextmanager
+def registro_escrituras():
+    """
+    Junta los modelos de la aplicación escritos dentro del bloque
+    """
+    escrituras = set()
+    token = _escrituras.set(escrituras)
+    try:
+        yield escrituras
+    finally:
+        _escrituras.reset(token)
+
+
+def _escritura_propia(request):
+    if COOKIE_ESCRITURA not in request.COOKIES:
+        return False
+    usuario = getattr(request, 'user', None)
+    return usuario is not None and usuario.is_authenticated and escritura_reciente(request, usuario.pk)
+
+
+def lectura_en_replica(view_func):
+    """
+    Decorador para vistas de solo lectura que pueden leer desde una réplica
+
+    Debe ir después de ``@login_required`` para que el usuario ya esté cargado.
+    """
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def _wrapped_view_async(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or not replicas():
+                return await view_func(request, *args, **kwargs)
+            # Cargar el usuario puede consultar la caché o la base de datos
+            if COOKIE_ESCRITURA in request.COOKIES and await sync_to_async(_escritura_propia)(request):
+                return await view_func(request, *args, **kwargs)
+
+            token = _lectura.set({'alias': None, 'elegida': False})
+            try:
+                return await view_func(request, *args, **kwargs)
+            finally:
+                _lectura.reset(token)
+        return _wrapped_view_async
+
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD') or not replicas():
+            return view_func(request, *args, **kwargs)
+        if _escritura_propia(request):
+            return view_func(request, *args, **kwargs)
+
+        token = _lectura.set({'alias': None, 'elegida': False})
+        try:
+            return view_func(request, *args, **kwargs)
+        finally:
+            _lectura.reset(token)
+    return _wrapped_view
+
+
+class ReplicaRouter:
+    """
+    Lecturas de las vistas marcadas a una réplica; escrituras a ``default``
+    """
+
+    def db_for_read(self, model, **hints):
+        estado = _lectura.get()
+        if estado is None:
+            return None
+        if not estado['elegida']:
+            estado['alias'] = elegir_replica()
+            estado['elegida'] = True
+        return estado['alias'] or 'default'
+
+    def db_for_write(self, model, **hints):
+        escrituras = _escrituras.get()
+        if escrituras is not None and model._meta.app_label == 'seguridad_app':
+            escrituras.add(model._meta.label)
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Réplicas y principal tienen los mismos datos
+        return True
+
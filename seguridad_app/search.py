@@ -0,0 +1,420 @@
+"""
+Sistema de Gestión de Seguridad Forestal
+Motor de búsqueda de texto completo para Checklists y Visitas
+
+Incluye dos implementaciones con la misma interfaz:
+1. MySQL - índices FULLTEXT (migración 0002) consultados con MATCH ... AGAINST
+2. Índice invertido en memoria - respaldo para SQLite y las pruebas
+
+Ambas ignoran tildes ("critico" encuentra "crítico"), tratan la última
+palabra como prefijo para la búsqueda mientras se escribe y devuelven las
+claves ordenadas por relevancia. ``coincidencias`` da en cambio el
+resultado completo, sin orden ni tope, para contarlo o exportarlo.
+
+Los códigos ("VIS-00") y las consultas sin palabras indexables (solo
+stopwords o palabras más cortas que las que indexa InnoDB) se buscan además
+como prefijo literal de ``CAMPO_PREFIJO``, y esas coincidencias van primero.
+
+El índice en memoria es de cada proceso. Se actualiza al confirmarse la
+transacción (un cambio revertido no queda indexado) y cada cambio confirmado
+incrementa un contador por modelo en la caché compartida: un proceso que ve
+un contador distinto del suyo, porque otro proceso escribió, recarga su
+índice en la próxima búsqueda.
+"""
+
+import bisect
+import functools
+import math
+import operator
+import random
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, router, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Checklist, Visita
+
+
+# Campos indexados por modelo y su peso en la relevancia del índice en memoria.
+# El índice FULLTEXT de MySQL debe cubrir exactamente estas columnas.
+CAMPOS_BUSQUEDA = {
+    Checklist: {'titulo': 3, 'area': 2, 'descripcion': 1},
+    Visita: {'codigo_visita': 3, 'lugar': 2, 'hallazgos': 1},
+}
+
+# Campo que se busca también como prefijo literal (códigos y títulos)
+CAMPO_PREFIJO = {
+    Checklist: 'titulo',
+    Visita: 'codigo_visita',
+}
+
+STOPWORDS = frozenset({
+    'a', 'al', 'con', 'de', 'del', 'el', 'en', 'la', 'las', 'los',
+    'o', 'para', 'por', 'se', 'un', 'una', 'y',
+})
+
+# Largo mínimo de palabra que indexa InnoDB (innodb_ft_min_token_size)
+MYSQL_MIN_TOKEN = 3
+
+_PALABRA = re.compile(r'\w+')
+
+# Claves por condición ``pk__in`` de ``coincidencias`` (límite de parámetros de SQLite)
+LOTE_CLAVES = 500
+
+
+def normalizar(texto):
+    """
+    Pasa a minúsculas y elimina tildes y diacríticos
+    """
+    descompuesto = unicodedata.normalize('NFKD', texto or '')
+    sin_marcas = ''.join(c for c in descompuesto if not unicodedata.combining(c))
+    return sin_marcas.lower()
+
+
+def tokenizar(texto):
+    """
+    Divide el texto normalizado en palabras, descartando stopwords
+    """
+    return [t for t in _PALABRA.findall(normalizar(texto)) if t not in STOPWORDS]
+
+
+# ===========================
+# ÍNDICE INVERTIDO EN MEMORIA
+# ===========================
+
+class IndiceInvertido:
+    """
+    Índice invertido por proceso para un modelo
+
+    Se construye la primera vez que se consulta (una lectura de las columnas
+    indexadas) y luego se mantiene con los cambios confirmados de este
+    proceso. ``_version`` es el contador compartido con que se cargó o se
+    aplicó el último cambio; si el de la caché es otro, se recarga.
+    """
+
+    def __init__(self, model, campos):
+        self.model = model
+        self.campos = campos
+        self._lock = threading.Lock()
+        self._cargado = False
+        self._version = None
+        self._postings = defaultdict(dict)  # palabra -> {pk: peso}
+        self._documentos = {}  # pk -> conjunto de palabras
+        self._vocabulario = []  # palabras ordenadas para búsqueda por prefijo
+        self._vocabulario_sucio = False
+
+    def _pesos(self, valores):
+        pesos = defaultdict(int)
+        for campo, valor in zip(self.campos, valores):
+            for palabra in tokenizar(valor):
+                pesos[palabra] += self.campos[campo]
+        return pesos
+
+    def _agregar(self, pk, valores):
+        self._quitar(pk)
+        pesos = self._pesos(valores)
+        for palabra, peso in pesos.items():
+            if palabra not in self._postings:
+                self._vocabulario_sucio = True
+            self._postings[palabra][pk] = peso
+        self._documentos[pk] = set(pesos)
+
+    def _quitar(self, pk):
+        for palabra in self._documentos.pop(pk, ()):
+            docs = self._postings.get(palabra)
+            if docs is None:
+                continue
+            docs.pop(pk, None)
+            if not docs:
+                del self._postings[palabra]
+                self._vocabulario_sucio = True
+
+    def _vaciar(self):
+        self._cargado = False
+        self._version = None
+        self._postings.clear()
+        self._documentos.clear()
+        self._vocabulario = []
+
+    def cargar(self, using=None):
+        # Leída antes de cargar: un cambio confirmado durante la carga la vuelve a cambiar
+        version = version_compartida(self.model)
+        with self._lock:
+            if self._cargado and self._version == version:
+                return
+            self._vaciar()
+            filas = (
+                self.model._default_manager.using(using)
+                .order_by()
+                .values_list('pk', *self.campos)
+                .iterator(chunk_size=2000)
+            )
+            for pk, *valores in filas:
+                self._agregar(pk, valores)
+            self._cargado = True
+            self._version = version
+
+    def aplicar(self, cambios, version):
+        """
+        Aplica cambios confirmados ``(pk, valores)``; ``valores`` None quita la clave
+
+        ``version`` es el contador compartido tras estos cambios. Si no sigue
+        al del índice, hubo otros cambios que este proceso no conoce y el
+        índice se descarta.
+        """
+        with self._lock:
+            if not self._cargado:
+                return
+            if version is None or version != self._version + 1:
+                self._vaciar()
+                return
+            for pk, valores in cambios:
+                if valores is None:
+                    self._quitar(pk)
+                else:
+                    self._agregar(pk, valores)
+            self._version = version
+
+    def reiniciar(self):
+        with self._lock:
+            self._vaciar()
+
+    def _palabras_con_prefijo(self, prefijo):
+        if self._vocabulario_sucio:
+            self._vocabulario = sorted(self._postings)
+            self._vocabulario_sucio = False
+        inicio = bisect.bisect_left(self._vocabulario, prefijo)
+        for palabra in self._vocabulario[inicio:]:
+            if not palabra.startswith(prefijo):
+                break
+            yield palabra
+
+    def buscar(self, query, limite, using=None):
+        """
+        Devuelve las claves que contienen todas las palabras, por relevancia
+        """
+        palabras = tokenizar(query)
+        if not palabras:
+            return []
+        self.cargar(using)
+
+        with self._lock:
+            total = len(self._documentos) or 1
+            puntajes = None
+            for i, palabra in enumerate(palabras):
+                if i == len(palabras) - 1:
+                    variantes = list(self._palabras_con_prefijo(palabra))
+                else:
+                    variantes = [palabra] if palabra in self._postings else []
+
+                encontrados = defaultdict(float)
+                for variante in variantes:
+                    docs = self._postings[variante]
+                    idf = math.log(1 + total / len(docs))
+                    for pk, peso in docs.items():
+                        encontrados[pk] += peso * idf
+
+                if puntajes is None:
+                    puntajes = dict(encontrados)
+                else:
+                    puntajes = {
+                        pk: puntaje + encontrados[pk]
+                        for pk, puntaje in puntajes.items() if pk in encontrados
+                    }
+                if not puntajes:
+                    return []
+
+        ranking = sorted(puntajes.items(), key=lambda item: (-item[1], -item[0]))
+        return [pk for pk, _ in ranking[:limite]]
+
+
+_indices = {model: IndiceInvertido(model, campos) for model, campos in CAMPOS_BUSQUEDA.items()}
+
+
+def _clave_version(model):
+    return f'search.version.{model._meta.label_lower}'
+
+
+def version_compartida(model):
+    """
+    Contador de cambios confirmados del modelo en la caché compartida
+    """
+    clave = _clave_version(model)
+    version = cache.get(clave)
+    if version is None:
+        # Base aleatoria: si la caché descarta la clave, el contador no repite valores ya vistos
+        cache.add(clave, random.randrange(1 << 30), None)
+        version = cache.get(clave)
+    return version
+
+
+def _incrementar_version(model):
+    version_compartida(model)
+    try:
+        return cache.incr(_clave_version(model))
+    except ValueError:
+        # La caché descartó la clave entre ambas llamadas
+        return None
+
+
+# ===========================
+# BÚSQUEDA FULLTEXT EN MYSQL
+# ===========================
+
+def _palabras_mysql(query):
+    return [p for p in tokenizar(query) if len(p) >= MYSQL_MIN_TOKEN]
+
+
+def _consulta_booleana(query):
+    """
+    Arma la expresión BOOLEAN MODE: todas las palabras requeridas, la última como prefijo
+    """
+    palabras = _palabras_mysql(query)
+    if not palabras:
+        return ''
+    terminos = [f'+{p}' for p in palabras[:-1]] + [f'+{palabras[-1]}*']
+    return ' '.join(terminos)
+
+
+def _columnas_mysql(connection, model):
+    qn = connection.ops.quote_name
+    return ', '.join(qn(model._meta.get_field(c).column) for c in CAMPOS_BUSQUEDA[model])
+
+
+def _buscar_mysql(connection, model, query, limite):
+    expresion = _consulta_booleana(query)
+    if not expresion:
+        return []
+    qn = connection.ops.quote_name
+    columnas = _columnas_mysql(connection, model)
+    pk = qn(model._meta.pk.column)
+    sql = (
+        f'SELECT {pk}, MATCH({columnas}) AGAINST (%s IN BOOLEAN MODE) AS relevancia '
+        f'FROM {qn(model._meta.db_table)} '
+        f'WHERE MATCH({columnas}) AGAINST (%s IN BOOLEAN MODE) '
+        f'ORDER BY relevancia DESC, {pk} DESC LIMIT %s'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [expresion, expresion, limite])
+        return [fila[0] for fila in cursor.fetchall()]
+
+
+# ===========================
+# API PÚBLICA
+# ===========================
+
+def _condicion_prefijo(model, query, palabras):
+    """
+    Prefijo literal de ``CAMPO_PREFIJO`` para códigos y consultas sin palabras indexables, o None
+    """
+    texto = query.strip()
+    if not texto or (palabras and (texto.isalpha() or len(texto.split()) > 1)):
+        return None
+    return Q(**{f'{CAMPO_PREFIJO[model]}__istartswith': texto})
+
+
+def buscar(model, query, limite=None):
+    """
+    Busca ``query`` en los campos indexados de ``model``
+
+    Devuelve la lista de claves primarias ordenada por relevancia, acotada a
+    ``SEARCH_MAX_RESULTS``; las coincidencias de prefijo literal van primero.
+    """
+    limite = limite or getattr(settings, 'SEARCH_MAX_RESULTS', 500)
+    alias = router.db_for_read(model)
+    connection = connections[alias]
+    if connection.vendor == 'mysql':
+        pks = _buscar_mysql(connection, model, query, limite)
+        palabras = _palabras_mysql(query)
+    else:
+        pks = _indices[model].buscar(query, limite, using=alias)
+        palabras = tokenizar(query)
+
+    prefijo = _condicion_prefijo(model, query, palabras)
+    if prefijo is None:
+        return pks
+    literales = list(
+        model._default_manager.using(alias).filter(prefijo)
+        .order_by(CAMPO_PREFIJO[model], 'pk').values_list('pk', flat=True)[:limite]
+    )
+    vistos = set(literales)
+    return (literales + [pk for pk in pks if pk not in vistos])[:limite]
+
+
+def coincidencias(model, query):
+    """
+    Condiciones ``Q`` que juntas cubren todas las coincidencias de ``query``
+
+    A diferencia de ``buscar`` no se acotan a ``SEARCH_MAX_RESULTS`` ni se
+    ordenan por relevancia. En MySQL es una sola condición con el MATCH como
+    subconsulta; con el índice en memoria, las claves en lotes de
+    ``LOTE_CLAVES``, de mayor a menor. Sin coincidencias, la lista es vacía.
+    """
+    alias = router.db_for_read(model)
+    connection = connections[alias]
+    if connection.vendor == 'mysql':
+        prefijo = _condicion_prefijo(model, query, _palabras_mysql(query))
+        condiciones = [] if prefijo is None else [prefijo]
+        expresion = _consulta_booleana(query)
+        if expresion:
+            qn = connection.ops.quote_name
+            sql = (
+                f'SELECT {qn(model._meta.pk.column)} FROM {qn(model._meta.db_table)} '
+                f'WHERE MATCH({_columnas_mysql(connection, model)}) AGAINST (%s IN BOOLEAN MODE)'
+            )
+            condiciones.append(Q(pk__in=RawSQL(sql, [expresion])))
+        return [functools.reduce(operator.or_, condiciones)] if condiciones else []
+
+    pks = set(_indices[model].buscar(query, None, using=alias))
+    prefijo = _condicion_prefijo(model, query, tokenizar(query))
+    if prefijo is not None:
+        pks.update(model._default_manager.using(alias).filter(prefijo).values_list('pk', flat=True))
+    pks = sorted(pks, reverse=True)
+    return [Q(pk__in=pks[inicio:inicio + LOTE_CLAVES]) for inicio in range(0, len(pks), LOTE_CLAVES)]
+
+
+def _al_confirmar(model, cambios):
+    """
+    Aplica ``cambios`` al índice en memoria cuando la transacción se confirma
+    """
+    indice = _indices.get(model)
+    alias = router.db_for_write(model)
+    # En MySQL la búsqueda usa FULLTEXT y el índice en memoria no se carga
+    if indice is None or not cambios or connections[alias].vendor == 'mysql':
+        return
+    transaction.on_commit(lambda: indice.aplicar(cambios, _incrementar_version(model)), using=alias)
+
+
+def _por_modelo(instances):
+    grupos = {}
+    for instance in instances:
+        grupos.setdefault(type(instance), []).append(instance)
+    return grupos.items()
+
+
+def indexar(*instances):
+    """Actualiza el índice en memoria con instancias guardadas"""
+    for model, grupo in _por_modelo(instances):
+        campos = CAMPOS_BUSQUEDA.get(model, ())
+        _al_confirmar(model, [(obj.pk, [getattr(obj, campo) for campo in campos]) for obj in grupo])
+
+
+def desindexar(*instances):
+    """Quita instancias borradas del índice en memoria"""
+    for model, grupo in _por_modelo(instances):
+        _al_confirmar(model, [(obj.pk, None) for obj in grupo])
+
+
+def reiniciar_indices():
+    """
+    Descarta los índices en memoria de todos los procesos; se reconstruyen en la próxima búsqueda
+    """
+    for model, indice in _indices.items():
+        indice.reiniciar()
+        _incrementar_version(model)
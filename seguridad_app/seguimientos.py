@@ -0,0 +1,198 @@
+"""
+Sistema de Gestión de Seguridad Forestal
+Cola de trabajo de las visitas que requieren seguimiento
+
+La tabla ``Seguimiento`` tiene una fila por visita pendiente de seguimiento
+con los campos del orden de la cola: severidad del resultado (crítico
+primero), fecha de la visita (la más antigua primero) y área. Las señales
+la mantienen al guardar o eliminar visitas; la importación masiva y los
+datos sintéticos la completan con ``encolar_visitas`` y ``reconstruir``.
+
+Tomar el siguiente recorre el índice de la cola desde el principio y se
+detiene en la primera fila disponible, así que cuesta lo mismo con mil o
+con un millón de pendientes. Con varios supervisores a la vez:
+
+- MySQL / PostgreSQL: ``SELECT ... FOR UPDATE SKIP LOCKED``; cada uno bloquea
+  una fila distinta sin esperar a los demás.
+- SQLite (sin bloqueos por fila): se elige el primero disponible y se toma
+  con un UPDATE condicionado a que siga disponible; si otro lo tomó antes,
+  se intenta con el siguiente.
+
+Una toma vence a los ``FOLLOWUP_CLAIM_MINUTES`` minutos y la fila vuelve a
+estar disponible.
+"""
+
+import datetime
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from .models import Checklist, Seguimiento, Visita
+
+
+PRIORIDAD_RESULTADO = {
+    'critico': 0,
+    'observaciones_mayores': 1,
+    'observaciones_menores': 2,
+    'satisfactorio': 3,
+}
+
+# Campos de la visita que cambian la fila de la cola
+CAMPOS_COLA = ('requiere_seguimiento', 'resultado', 'fecha_visita', 'checklist_id')
+
+INTENTOS_TOMA = 10
+
+CHUNK_SIZE = 2000
+
+
+def prioridad(resultado):
+    return PRIORIDAD_RESULTADO.get(resultado, len(PRIORIDAD_RESULTADO))
+
+
+def _area(visita):
+    if visita.checklist_id is None:
+        return ''
+    if Visita.checklist.is_cached(visita) and 'area' not in visita.checklist.get_deferred_fields():
+        return visita.checklist.area
+    return Checklist.objects.filter(pk=visita.checklist_id).values_list('area', flat=True).first() or ''
+
+
+# ---------------------------
+# Mantenimiento de la cola
+# ---------------------------
+
+def actualizar(visita, anterior=None):
+    """
+    Agrega, actualiza o quita la fila de la visita según ``requiere_seguimiento``
+
+    ``anterior`` son los valores persistidos antes de guardar (None en un
+    alta); si no cambió ningún campo de la cola no hace consultas.
+    """
+    if anterior is not None and all(anterior.get(campo) == getattr(visita, campo) for campo in CAMPOS_COLA):
+        return
+    if not visita.requiere_seguimiento:
+        if anterior is None or anterior.get('requiere_seguimiento'):
+            Seguimiento.objects.filter(visita_id=visita.pk).delete()
+        return
+    # La toma en curso se conserva
+    Seguimiento.objects.update_or_create(visita_id=visita.pk, defaults={
+        'prioridad': prioridad(visita.resultado),
+        'fecha_visita': visita.fecha_visita,
+        'area': _area(visita),
+    })
+
+
+def _insertar(filas):
+    bloque = []
+    for pk, resultado, fecha_visita, area in filas:
+        bloque.append(Seguimiento(
+            visita_id=pk, prioridad=prioridad(resultado), fecha_visita=fecha_visita, area=area or '',
+        ))
+        if len(bloque) >= CHUNK_SIZE:
+            Seguimiento.objects.bulk_create(bloque, ignore_conflicts=True)
+            bloque = []
+    Seguimiento.objects.bulk_create(bloque, ignore_conflicts=True)
+
+
+def encolar_visitas(codigos):
+    """
+    Agrega a la cola las visitas insertadas con ``bulk_create`` (por código, ya
+    que MySQL no devuelve los ids)
+    """
+    codigos = list(codigos)
+    for inicio in range(0, len(codigos), CHUNK_SIZE // 4):
+        _insertar(
+            Visita.objects.filter(
+                codigo_visita__in=codigos[inicio:inicio + CHUNK_SIZE // 4], requiere_seguimiento=True,
+            ).values_list('pk', 'resultado', 'fecha_visita', 'checklist__area')
+        )
+
+
+def reconstruir():
+    """
+    Vuelve a llenar la cola desde las visitas (se pierden las tomas en curso)
+    """
+    with transaction.atomic():
+        Seguimiento.objects.all().delete()
+        _insertar(
+            Visita.objects.filter(requiere_seguimiento=True).order_by()
+            .values_list('pk', 'resultado', 'fecha_visita', 'checklist__area')
+            .iterator(chunk_size=CHUNK_SIZE)
+        )
+
+
+# ---------------------------
+# Consulta y toma
+# ---------------------------
+
+def disponibles(ahora=None):
+    """
+    Pendientes no tomados (o con la toma vencida), en el orden de la cola
+    """
+    return Seguimiento.objects.filter(disponible_desde__lte=ahora or timezone.now())
+
+
+def _plazo():
+    return datetime.timedelta(minutes=getattr(settings, 'FOLLOWUP_CLAIM_MINUTES', 30))
+
+
+def tomar(usuario, ahora=None):
+    """
+    Asigna al usuario el siguiente seguimiento disponible y lo devuelve (o None)
+    """
+    ahora = ahora or timezone.now()
+    valores = {'tomado_por': usuario, 'fecha_toma': ahora, 'disponible_desde': ahora + _plazo()}
+    alias = router.db_for_write(Seguimiento)
+
+    if connections[alias].features.has_select_for_update_skip_locked:
+        with transaction.atomic(using=alias):
+            seguimiento = (
+                disponibles(ahora).using(alias)
+                .select_for_update(skip_locked=True)
+                .first()
+            )
+            if seguimiento is None:
+                return None
+            for campo, valor in valores.items():
+                setattr(seguimiento, campo, valor)
+            seguimiento.save(update_fields=list(valores))
+            return seguimiento
+
+    for _ in range(INTENTOS_TOMA):
+        candidato = disponibles(ahora).using(alias).values_list('pk', flat=True).first()
+        if candidato is None:
+            return None
+        tomado = (
+            Seguimiento.objects.using(alias)
+            .filter(pk=candidato, disponible_desde__lte=ahora)
+            .update(**valores)
+        )
+        if tomado:
+            return Seguimiento.objects.using(alias).get(pk=candidato)
+    return None
+
+
+def tomados_por(usuario, ahora=None):
+    """
+    Seguimientos con una toma vigente del usuario
+    """
+    return Seguimiento.objects.filter(tomado_por=usuario, disponible_desde__gt=ahora or timezone.now())
+
+
+def liberar(seguimiento):
+    """
+    Devuelve el seguimiento a la cola sin resolverlo
+    """
+    Seguimiento.objects.filter(pk=seguimiento.pk).update(
+        tomado_por=None, fecha_toma=None, disponible_desde=timezone.now(),
+    )
+
+
+def resolver(seguimiento):
+    """
+    Marca la visita como sin seguimiento pendiente; la señal la quita de la cola
+    """
+    visita = Visita.objects.get(pk=seguimiento.visita_id)
+    visita.requiere_seguimiento = False
+    visita.save()
@@ -0,0 +1,53 @@
+"""
+Sistema de Gestión de Seguridad Forestal
+Backend de sesiones en caché con escritura a la base de datos
+
+Extiende el backend ``cached_db`` de Django: las lecturas se sirven desde la
+caché y cada escritura va a la caché y a ``django_session``. En lugar de
+guardar la sesión en cada request (``SESSION_SAVE_EVERY_REQUEST``), la
+expiración deslizante se renueva solo cuando ya pasó la fracción
+``SESSION_REFRESH_FRACTION`` de ``SESSION_COOKIE_AGE`` desde la última
+escritura. Cerrar sesión borra la caché y la fila en el mismo request.
+
+Con varios procesos la caché de sesiones debe ser compartida (Redis o
+Memcached). Con una caché del proceso (``CACHE_SHARED`` falso, el valor con
+``LocMemCache``) un logout en otro proceso no borraría la copia de este, así
+que las sesiones se leen de ``django_session`` como con el backend ``db``.
+"""
+
+import time
+
+from django.conf import settings
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+
+
+# Clave interna con el instante (epoch) de la última escritura de la sesión
+CLAVE_RENOVACION = '_renovada_en'
+
+
+class SessionStore(CachedDBStore):
+    """
+    Sesión ``cached_db`` con renovación de la expiración limitada en frecuencia
+    """
+
+    cache_key_prefix = 'seguridad_app.sesiones'
+
+    def _umbral_renovacion(self):
+        fraccion = getattr(settings, 'SESSION_REFRESH_FRACTION', 0.25)
+        return settings.SESSION_COOKIE_AGE * fraccion
+
+    def load(self):
+        if getattr(settings, 'CACHE_SHARED', True):
+            datos = super().load()
+        else:
+            datos = DBStore.load(self)
+        renovada = datos.get(CLAVE_RENOVACION)
+        # SessionMiddleware guarda la sesión (y reenvía la cookie) si está modificada
+        if renovada is not None and time.time() - renovada >= self._umbral_renovacion():
+            self.modified = True
+        return datos
+
+    def save(self, must_create=False):
+        self._get_session(no_load=must_create)[CLAVE_RENOVACION] = int(time.time())
+        super().save(must_create)
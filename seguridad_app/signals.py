@@ -0,0 +1,227 @@
+"""
+Sistema de Gestión de Seguridad Forestal
+Señales de los modelos Checklist y Visita
+
+Mantienen al día las estructuras derivadas (índice de búsqueda en memoria,
+contadores del dashboard, versiones de los fragmentos de detalle y cola de
+seguimientos) cada vez que se guarda o elimina un registro, publican los
+cambios del dashboard en vivo, registran las eliminaciones para la API de
+sincronización e invalidan la caché del usuario autenticado cuando cambia un
+User.
+"""
+
+from django.contrib.auth.models import User
+from django.contrib.auth.signals import user_logged_out
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import autenticacion, eventos, fragmentos, resumen, search, seguimientos
+from .models import Checklist, Eliminacion, Seguimiento, Visita
+
+
+# Campos de cada modelo que alimentan los contadores del dashboard
+CAMPOS_RESUMEN = {
+    Checklist: ('estado',),
+    Visita: ('resultado', 'requiere_seguimiento'),
+}
+
+# Usuario que recibe cada registro en la sincronización
+CAMPO_PROPIETARIO = {
+    Checklist: 'responsable_id',
+    Visita: 'inspector_id',
+}
+
+# Valores persistidos que se recuerdan antes de guardar: los del resumen,
+# los que afectan a fragmentos de otros objetos (título del checklist en el
+# detalle de sus visitas, checklist de la visita en la tabla del checklist)
+# o a la cola de seguimientos, y el usuario de la sincronización
+CAMPOS_ANTERIORES = {
+    Checklist: CAMPOS_RESUMEN[Checklist] + ('titulo', 'area', CAMPO_PROPIETARIO[Checklist]),
+    Visita: CAMPOS_RESUMEN[Visita] + ('checklist_id', 'fecha_visita', CAMPO_PROPIETARIO[Visita]),
+}
+
+# Campos de User que aparecen en los fragmentos de detalle
+CAMPOS_NOMBRE_USUARIO = frozenset({'username', 'first_name', 'last_name'})
+
+DELTAS_RESUMEN = {
+    Checklist: resumen.delta_checklist,
+    Visita: resumen.delta_visita,
+}
+
+
+def _valores_resumen(sender, instance):
+    return {campo: getattr(instance, campo) for campo in CAMPOS_RESUMEN[sender]}
+
+
+@receiver(post_save, sender=Checklist)
+@receiver(post_save, sender=Visita)
+def actualizar_indice_busqueda(sender, instance, **kwargs):
+    search.indexar(instance)
+
+
+@receiver(post_delete, sender=Checklist)
+@receiver(post_delete, sender=Visita)
+def quitar_del_indice_busqueda(sender, instance, **kwargs):
+    search.desindexar(instance)
+
+
+@receiver(pre_save, sender=Checklist)
+@receiver(pre_save, sender=Visita)
+def recordar_valores_anteriores(sender, instance, using=None, **kwargs):
+    """
+    Guarda en la instancia los valores persistidos antes de la modificación
+    """
+    anterior = None
+    if not instance._state.adding and instance.pk is not None:
+        anterior = _valores_persistidos(sender, instance, using, CAMPOS_ANTERIORES[sender])
+    instance._valores_anteriores = anterior
+
+
+def _valores_persistidos(sender, instance, using, campos):
+    filas = sender._default_manager.db_manager(using).filter(pk=instance.pk)
+    # Bloqueada hasta que se confirme el delta del resumen (save() y delete()
+    # ejecutan en una transacción): otro guardado espera y lee el valor nuevo
+    if transaction.get_connection(using).in_atomic_block:
+        filas = filas.select_for_update()
+    return filas.values(*campos).first()
+
+
+@receiver(pre_delete, sender=Checklist)
+@receiver(pre_delete, sender=Visita)
+def recordar_valores_eliminados(sender, instance, using=None, **kwargs):
+    # La instancia puede estar desactualizada: se descuenta el valor persistido
+    instance._valores_eliminados = _valores_persistidos(sender, instance, using, CAMPOS_RESUMEN[sender])
+
+
+@receiver(post_save, sender=Checklist)
+@receiver(post_save, sender=Visita)
+def actualizar_resumen(sender, instance, **kwargs):
+    anterior = getattr(instance, '_valores_anteriores', None)
+    resumen.aplicar_delta(DELTAS_RESUMEN[sender](anterior, _valores_resumen(sender, instance)))
+
+
+@receiver(post_delete, sender=Checklist)
+@receiver(post_delete, sender=Visita)
+def descontar_resumen(sender, instance, **kwargs):
+    eliminados = getattr(instance, '_valores_eliminados', None) or _valores_resumen(sender, instance)
+    resumen.aplicar_delta(DELTAS_RESUMEN[sender](eliminados, None))
+
+
+@receiver(post_save, sender=Checklist)
+@receiver(post_save, sender=Visita)
+@receiver(post_delete, sender=Checklist)
+@receiver(post_delete, sender=Visita)
+def publicar_resumen(sender, instance, **kwargs):
+    eventos.resumen_modificado()
+
+
+@receiver(post_save, sender=Visita)
+def publicar_visita_critica(sender, instance, created=False, **kwargs):
+    anterior = getattr(instance, '_valores_anteriores', None)
+    # Solo la primera vez que la visita queda como crítica
+    if anterior is None or anterior['resultado'] != instance.resultado:
+        eventos.visitas_criticas([instance])
+
+
+@receiver(post_save, sender=Checklist)
+def invalidar_fragmentos_checklist(sender, instance, created=False, **kwargs):
+    fragmentos.invalidar('checklist', instance.pk)
+    anterior = getattr(instance, '_valores_anteriores', None)
+    # El detalle de cada visita muestra el título de su checklist
+    if anterior is not None and anterior['titulo'] != instance.titulo:
+        fragmentos.invalidar('visita', *instance.visitas.values_list('pk', flat=True))
+
+
+@receiver(pre_delete, sender=Checklist)
+def invalidar_fragmentos_checklist_eliminado(sender, instance, **kwargs):
+    # Antes del borrado, mientras las visitas aún apuntan al checklist (SET_NULL)
+    fragmentos.invalidar('checklist', instance.pk)
+    fragmentos.invalidar('visita', *instance.visitas.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Visita)
+def invalidar_fragmentos_visita(sender, instance, **kwargs):
+    anterior = getattr(instance, '_valores_anteriores', None)
+    fragmentos.invalidar('visita', instance.pk)
+    # La tabla de visitas del checklist anterior y del nuevo cambia
+    fragmentos.invalidar('checklist', instance.checklist_id, anterior and anterior['checklist_id'])
+
+
+@receiver(post_delete, sender=Visita)
+def invalidar_fragmentos_visita_eliminada(sender, instance, **kwargs):
+    fragmentos.invalidar('visita', instance.pk)
+    fragmentos.invalidar('checklist', instance.checklist_id)
+
+
+@receiver(post_save, sender=Visita)
+def actualizar_cola_seguimientos(sender, instance, **kwargs):
+    seguimientos.actualizar(instance, getattr(instance, '_valores_anteriores', None))
+
+
+@receiver(post_save, sender=Checklist)
+def actualizar_area_seguimientos(sender, instance, created=False, **kwargs):
+    anterior = getattr(instance, '_valores_anteriores', None)
+    if anterior is not None and anterior['area'] != instance.area:
+        Seguimiento.objects.filter(visita__checklist=instance).update(area=instance.area)
+
+
+@receiver(pre_delete, sender=Checklist)
+def quitar_area_seguimientos(sender, instance, **kwargs):
+    # Las visitas quedan sin checklist (SET_NULL) y por lo tanto sin área
+    Seguimiento.objects.filter(visita__checklist=instance).update(area='')
+
+
+@receiver(post_delete, sender=Checklist)
+@receiver(post_delete, sender=Visita)
+def registrar_eliminacion(sender, instance, **kwargs):
+    Eliminacion.objects.create(
+        modelo=sender._meta.model_name,
+        objeto_id=instance.pk,
+        codigo=getattr(instance, 'codigo_visita', ''),
+        propietario=getattr(instance, CAMPO_PROPIETARIO[sender]),
+    )
+
+
+@receiver(post_save, sender=Checklist)
+@receiver(post_save, sender=Visita)
+def registrar_reasignacion(sender, instance, **kwargs):
+    # El dispositivo del usuario anterior borra su copia
+    anterior = getattr(instance, '_valores_anteriores', None)
+    campo = CAMPO_PROPIETARIO[sender]
+    if anterior is not None and anterior[campo] != getattr(instance, campo):
+        Eliminacion.objects.create(
+            modelo=sender._meta.model_name,
+            objeto_id=instance.pk,
+            codigo=getattr(instance, 'codigo_visita', ''),
+            propietario=anterior[campo],
+        )
+
+
+@receiver(pre_delete, sender=Checklist)
+def marcar_visitas_del_checklist_eliminado(sender, instance, **kwargs):
+    # SET_NULL se aplica con un UPDATE que no toca fecha_actualizacion; se
+    # marca antes para que la sincronización envíe las visitas sin checklist
+    instance.visitas.update(fecha_actualizacion=timezone.now())
+
+
+@receiver(post_save, sender=User)
+def invalidar_usuario_modificado(sender, instance, created=False, update_fields=None, **kwargs):
+    # Guardar solo last_login (en cada login) no invalida
+    if update_fields is None or autenticacion.CAMPOS_INVALIDAN.intersection(update_fields):
+        autenticacion.invalidar_usuario(instance.pk)
+    # Los detalles muestran el nombre del responsable o del inspector
+    if not created and (update_fields is None or CAMPOS_NOMBRE_USUARIO.intersection(update_fields)):
+        fragmentos.invalidar_todo()
+
+
+@receiver(post_delete, sender=User)
+def invalidar_usuario_eliminado(sender, instance, **kwargs):
+    autenticacion.invalidar_usuario(instance.pk)
+
+
+@receiver(user_logged_out)
+def invalidar_usuario_al_salir(sender, user=None, **kwargs):
+    if user is not None:
+        autenticacion.invalidar_usuario(user.pk)
@@ -0,0 +1,279 @@
+"""
+Sistema de Gestión de Seguridad Forestal
+Sincronización incremental para dispositivos de inspección sin conexión
+
+Descarga: el dispositivo envía el cursor de su última sincronización y
+recibe solo los Checklist de los que el usuario es responsable y las Visita
+de las que es inspector modificados después (por ``fecha_actualizacion``),
+y sus eliminaciones registradas en ``Eliminacion``. Cada flujo se recorre
+por cursor sobre ``(fecha, id)``, en páginas de ``SYNC_PAGE_SIZE`` filas;
+el cursor es opaco para el cliente.
+
+La fecha de una fila se fija al guardarla, no al confirmar la transacción:
+una fila que confirma después de entregado un cursor posterior a su fecha
+no se enviaría nunca. Por eso las filas de los últimos
+``SYNC_MARGIN_SECONDS`` quedan para una sincronización siguiente; el margen
+debe superar la transacción de escritura más larga (los bloques de la
+importación confirman por separado y duran segundos). Las lecturas van
+siempre a la base principal: con una réplica atrasada más que el margen,
+el cursor avanzaría sobre filas que la réplica todavía no tiene.
+
+Subida: las visitas creadas sin conexión se reciben en lotes y se insertan
+con el importador de ``importacion.py``, siempre a nombre del usuario que
+las sube. Una visita válida cuyo ``codigo_visita`` ya existe se informa como
+conflicto junto con la versión del servidor; si además tiene errores, se
+informan los errores.
+"""
+
+import base64
+import binascii
+import datetime
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils import timezone
+
+from .importacion import ImportadorVisita, ResultadoImportacion
+from .models import Checklist, Eliminacion, Visita
+
+
+VERSION_CURSOR = 1
+
+CAMPOS_CHECKLIST = (
+    'id', 'titulo', 'descripcion', 'area', 'responsable__username', 'estado', 'prioridad',
+    'fecha_creacion', 'fecha_vencimiento', 'observaciones', 'fecha_actualizacion',
+)
+
+CAMPOS_VISITA = (
+    'id', 'codigo_visita', 'tipo_visita', 'fecha_visita', 'hora_inicio', 'hora_fin', 'lugar',
+    'inspector__username', 'checklist', 'hallazgos', 'resultado', 'recomendaciones',
+    'requiere_seguimiento', 'fecha_creacion', 'fecha_actualizacion',
+)
+
+# Nombre de cada campo en el JSON (los usuarios se envían por username)
+NOMBRES_JSON = {
+    'responsable__username': 'responsable',
+    'inspector__username': 'inspector',
+}
+
+# Flujos del cursor: (clave, queryset del usuario, campo de fecha, campos)
+FLUJOS = (
+    ('checklists', lambda usuario: Checklist.objects.filter(responsable=usuario),
+     'fecha_actualizacion', CAMPOS_CHECKLIST),
+    ('visitas', lambda usuario: Visita.objects.filter(inspector=usuario),
+     'fecha_actualizacion', CAMPOS_VISITA),
+    ('eliminados', lambda usuario: Eliminacion.objects.filter(propietario=usuario.pk),
+     'fecha_eliminacion', ('id', 'modelo', 'objeto_id', 'codigo', 'fecha_eliminacion')),
+)
+
+
+class CursorInvalido(ValueError):
+    """
+    El cursor no se puede leer
+    """
+
+
+class CursorVencido(CursorInvalido):
+    """
+    El cursor es anterior a las eliminaciones conservadas: hay que sincronizar desde cero
+    """
+
+
+# ---------------------------
+# Cursor
+# ---------------------------
+
+def codificar_cursor(posiciones):
+    datos = {
+        'v': VERSION_CURSOR,
+        **{
+            clave: [fecha.isoformat(), pk] if fecha is not None else None
+            for clave, (fecha, pk) in posiciones.items()
+        },
+    }
+    return base64.urlsafe_b64encode(json.dumps(datos, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    """
+    Posiciones ``{flujo: (fecha, id)}`` de un cursor; un cursor vacío es una sincronización completa
+    """
+    if not cursor:
+        return None
+    try:
+        datos = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if datos.get('v') != VERSION_CURSOR:
+            raise CursorInvalido('Versión de cursor no soportada')
+        posiciones = {}
+        for clave, *_ in FLUJOS:
+            valor = datos[clave]
+            posiciones[clave] = (
+                (datetime.datetime.fromisoformat(valor[0]), int(valor[1])) if valor else (None, 0)
+            )
+    except CursorInvalido:
+        raise
+    except (binascii.Error, UnicodeDecodeError, ValueError, KeyError, TypeError, IndexError, AttributeError) as exc:
+        raise CursorInvalido('Cursor inválido') from exc
+
+    fecha_eliminados = posiciones['eliminados'][0]
+    if fecha_eliminados is not None and fecha_eliminados < _inicio_retencion():
+        raise CursorVencido('El cursor es anterior a las eliminaciones conservadas; sincronice desde cero')
+    return posiciones
+
+
+def _inicio_retencion():
+    return timezone.now() - datetime.timedelta(days=getattr(settings, 'SYNC_TOMBSTONE_DAYS', 90))
+
+
+# ---------------------------
+# Descarga de cambios
+# ---------------------------
+
+def _fila_json(fila):
+    return {NOMBRES_JSON.get(campo, campo): valor for campo, valor in fila.items()}
+
+
+def _pagina(queryset, campo_fecha, campos, posicion, corte, limite):
+    fecha, pk = posicion
+    queryset = queryset.filter(**{f'{campo_fecha}__lt': corte})
+    if fecha is not None:
+        queryset = queryset.filter(
+            Q(**{f'{campo_fecha}__gt': fecha}) | Q(**{campo_fecha: fecha, 'pk__gt': pk})
+        )
+    filas = list(queryset.order_by(campo_fecha, 'pk').values(*campos)[:limite + 1])
+    hay_mas = len(filas) > limite
+    filas = filas[:limite]
+    if hay_mas:
+        posicion = (filas[-1][campo_fecha], filas[-1]['id'])
+    else:
+        # Todo lo anterior al corte ya se entregó; el cursor avanza aunque no haya
+        # cambios, para que no quede más viejo que la retención de eliminaciones
+        posicion = (corte, 0)
+    return filas, posicion, hay_mas
+
+
+def cambios(usuario, cursor=None, limite=None):
+    """
+    Página de cambios de ``usuario`` posteriores a ``cursor``
+
+    Devuelve el diccionario de la respuesta: las filas de cada flujo, el
+    cursor siguiente y si quedan páginas. Lanza ``CursorInvalido``.
+    """
+    limite = limite or getattr(settings, 'SYNC_PAGE_SIZE', 500)
+    corte = timezone.now() - datetime.timedelta(seconds=getattr(settings, 'SYNC_MARGIN_SECONDS', 120))
+    posiciones = decodificar_cursor(cursor)
+    if posiciones is None:
+        # Sincronización completa: basta con las eliminaciones desde que comenzó
+        posiciones = {clave: (None, 0) for clave, *_ in FLUJOS}
+        posiciones['eliminados'] = (corte, 0)
+
+    respuesta, hay_mas = {}, False
+    for clave, queryset, campo_fecha, campos in FLUJOS:
+        filas, posiciones[clave], mas = _pagina(
+            queryset(usuario), campo_fecha, campos, posiciones[clave], corte, limite,
+        )
+        hay_mas = hay_mas or mas
+        respuesta[clave] = filas
+
+    respuesta['checklists'] = [_fila_json(fila) for fila in respuesta['checklists']]
+    respuesta['visitas'] = [_fila_json(fila) for fila in respuesta['visitas']]
+    respuesta['eliminados'] = [
+        {'modelo': fila['modelo'], 'id': fila['objeto_id'], 'codigo_visita': fila['codigo'] or None}
+        for fila in respuesta['eliminados']
+    ]
+    respuesta['cursor'] = codificar_cursor(posiciones)
+    respuesta['hay_mas'] = hay_mas
+    return respuesta
+
+
+# ---------------------------
+# Subida de visitas
+# ---------------------------
+
+class ImportadorSubida(ImportadorVisita):
+    """
+    Importador de las visitas que sube un dispositivo
+
+    El inspector es siempre el usuario autenticado: una fila que indica otro
+    se rechaza. El código repetido se revisa después de validar la fila.
+    """
+
+    def __init__(self, usuario):
+        super().__init__(usuario_por_defecto=usuario)
+        self.conflictos = set()  # id() de las filas válidas cuyo código ya existe
+
+    def cargar_referencias(self, filas):
+        referencias = super().cargar_referencias([{**fila, 'inspector': ''} for fila in filas])
+        referencias['conflictos'] = referencias['codigos_existentes']
+        referencias['codigos_existentes'] = set()
+        return referencias
+
+    def construir(self, fila, referencias):
+        errores = []
+        inspector = str(fila.get('inspector') or '').strip()
+        if inspector and inspector != self.usuario_por_defecto.get_username():
+            errores.append(f'inspector: solo se pueden subir visitas propias, no de "{inspector}"')
+        try:
+            obj = super().construir({**fila, 'inspector': ''}, referencias)
+        except ValidationError as exc:
+            raise ValidationError(errores + exc.messages)
+        if errores:
+            raise ValidationError(errores)
+
+        if obj.codigo_visita in referencias['conflictos']:
+            self.conflictos.add(id(fila))
+            raise ValidationError(f'codigo_visita: "{obj.codigo_visita}" ya existe')
+        return obj
+
+
+def recibir_visitas(filas, usuario):
+    """
+    Inserta un lote de visitas creadas sin conexión
+
+    Devuelve un resultado por fila, en el mismo orden: ``creada`` con su id,
+    ``conflicto`` con la visita del servidor que tiene el mismo
+    ``codigo_visita`` (solo si la fila es válida), o ``error`` con los
+    mensajes de validación.
+    """
+    importador = ImportadorSubida(usuario)
+    resultado = ResultadoImportacion()
+    bloque = [
+        (numero, fila if isinstance(fila, dict) else {'__error__': 'La visita no es un objeto JSON'})
+        for numero, fila in enumerate(filas)
+    ]
+    importador.procesar_bloque(bloque, resultado)
+
+    errores = {}
+    for numero, mensaje in resultado.errores:
+        errores.setdefault(numero, []).append(mensaje)
+
+    codigos = {
+        str(fila.get('codigo_visita') or '').strip() for _, fila in bloque if '__error__' not in fila
+    } - {''}
+    servidor = {
+        visita['codigo_visita']: _fila_json(visita)
+        for visita in Visita.objects.filter(codigo_visita__in=codigos).values(*CAMPOS_VISITA)
+    } if codigos else {}
+
+    respuestas = []
+    for numero, fila in bloque:
+        codigo = str(fila.get('codigo_visita') or '').strip()
+        if numero not in errores:
+            respuestas.append({
+                'codigo_visita': codigo, 'estado': 'creada', 'id': servidor.get(codigo, {}).get('id'),
+            })
+        elif id(fila) in importador.conflictos and codigo in servidor:
+            respuestas.append({'codigo_visita': codigo, 'estado': 'conflicto', 'servidor': servidor[codigo]})
+        else:
+            respuestas.append({'codigo_visita': codigo or None, 'estado': 'error', 'errores': errores[numero]})
+    return respuestas
+
+
+def purgar_eliminaciones():
+    """
+    Borra las eliminaciones anteriores a ``SYNC_TOMBSTONE_DAYS`` y devuelve cuántas
+    """
+    eliminadas, _ = Eliminacion.objects.filter(fecha_eliminacion__lt=_inicio_retencion()).delete()
+    return eliminadas
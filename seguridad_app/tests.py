@@ -1,3 +1,2360 @@
-from django.test import TestCase
+"""
+Sistema de Gestión de Seguridad Forestal
+Pruebas de rendimiento: consultas por vista, sesiones y latencia
 
-# Create your tests here.
+Cada vista tiene un máximo de consultas SQL por request (incluidas las de
+sesión y usuario). Las vistas se miden con dos tamaños de datos: si la
+cantidad de consultas crece con el número de filas, hay un N+1.
+"""
+
+import asyncio
+import csv
+import gzip
+import html
+import io
+import json
+import re
+import shutil
+import smtplib
+import statistics
+import tempfile
+import threading
+import time
+import zipfile
+from datetime import timedelta
+from unittest import mock
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core import mail
+from django.core.cache import cache, caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, OperationalError, connection, connections, transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
+from PIL import Image
+
+from . import (
+    autenticacion, datos_sinteticos, eventos, exportacion, facetas, fotos, fragmentos, metrics, routers, search,
+    seguimientos, sesiones, sincronizacion, vencimientos,
+)
+from .backends.pool import PoolAgotado, PoolConexiones
+from .management.commands import explicar_consultas
+from .importacion import ImportadorVisita
+from .models import AvisoVencimiento, Checklist, Eliminacion, Foto, FotoVisita, Seguimiento, Visita
+from .resumen import calcular_resumen, obtener_resumen, reconstruir_resumen
+
+
+# Máximo de consultas por request, por vista (y variante de parámetros)
+# El GET condicional de listados y detalles no suma consultas: su ETag sale
+# de las filas ya cargadas
+PRESUPUESTO_CONSULTAS = {
+    'dashboard': 3,
+    'checklist_list': 1,
+    'checklist_list?estado': 1,
+    'checklist_list?q': 2,
+    'checklist_create': 0,
+    'checklist_detail': 2,
+    'checklist_edit': 1,
+    'checklist_delete': 1,
+    'visita_list': 1,
+    'visita_list?tipo': 1,
+    'visita_list?q': 2,
+    'visita_create': 0,
+    'visita_detail': 2,  # visita y fotos
+    'visita_edit': 1,
+    'visita_delete': 1,
+}
+
+# Consultas del POST de login (usuario, last_login y creación de la sesión)
+PRESUPUESTO_LOGIN = 9
+
+# Carga del usuario por id (no los JOIN de los listados)
+CONSULTA_USUARIO = re.compile(r'FROM [`"]auth_user[`"] WHERE')
+
+# Techo de latencia (mediana, en ms) de los listados con 10k visitas
+LATENCIA_MAXIMA_MS = 1000
+
+
+def _crear_usuario(username='supervisor', password='clave-segura-123'):
+    return User.objects.create_user(username=username, email=f'{username}@example.com', password=password)
+
+
+class PresupuestoConsultasTests(TestCase):
+    """
+    Las consultas por vista no dependen del volumen de datos
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        # Menos filas que una página, para que la segunda medición renderice más filas
+        datos_sinteticos.generar(usuarios=3, checklists=4, visitas=6, semilla=1)
+        cls.usuario = _crear_usuario()
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def _urls(self):
+        checklist_pk = (
+            Visita.objects.exclude(checklist=None)
+            .values_list('checklist_id', flat=True).order_by('checklist_id').first()
+        )
+        visita_pk = Visita.objects.order_by('pk').values_list('pk', flat=True).first()
+        return {
+            'dashboard': reverse('dashboard'),
+            'checklist_list': reverse('checklist_list'),
+            'checklist_list?estado': reverse('checklist_list') + '?estado=completado',
+            'checklist_list?q': reverse('checklist_list') + '?q=revision',
+            'checklist_create': reverse('checklist_create'),
+            'checklist_detail': reverse('checklist_detail', args=[checklist_pk]),
+            'checklist_edit': reverse('checklist_edit', args=[checklist_pk]),
+            'checklist_delete': reverse('checklist_delete', args=[checklist_pk]),
+            'visita_list': reverse('visita_list'),
+            'visita_list?tipo': reverse('visita_list') + '?tipo=preventiva',
+            'visita_list?q': reverse('visita_list') + '?q=critico',
+            'visita_create': reverse('visita_create'),
+            'visita_detail': reverse('visita_detail', args=[visita_pk]),
+            'visita_edit': reverse('visita_edit', args=[visita_pk]),
+            'visita_delete': reverse('visita_delete', args=[visita_pk]),
+        }
+
+    def _contar_consultas(self, url):
+        # El primer request calienta estructuras perezosas (índice de búsqueda);
+        # los fragmentos de detalle se invalidan para medir el renderizado
+        self.client.get(url)
+        fragmentos.invalidar_todo()
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return len(consultas)
+
+    def test_consultas_constantes_y_dentro_del_presupuesto(self):
+        urls = self._urls()
+        pequeno = {clave: self._contar_consultas(url) for clave, url in urls.items()}
+
+        datos_sinteticos.generar(usuarios=10, checklists=60, visitas=300, semilla=2)
+        grande = {clave: self._contar_consultas(url) for clave, url in urls.items()}
+
+        self.assertEqual(set(urls), set(PRESUPUESTO_CONSULTAS))
+        for clave, presupuesto in PRESUPUESTO_CONSULTAS.items():
+            with self.subTest(vista=clave):
+                self.assertEqual(
+                    pequeno[clave], grande[clave],
+                    f'{clave}: las consultas crecen con los datos ({pequeno[clave]} -> {grande[clave]})',
+                )
+                self.assertLessEqual(grande[clave], presupuesto)
+
+    def test_listados_con_join_y_sin_columnas_largas(self):
+        urls = self._urls()
+        # Columnas que cada vista no muestra: los TEXT de las tablas y la contraseña del usuario
+        excluidas = {
+            'dashboard': ('"hallazgos"', '"recomendaciones"', '"descripcion"', '"observaciones"'),
+            'checklist_list': ('"descripcion"', '"observaciones"', '"password"'),
+            'checklist_detail': ('"hallazgos"', '"recomendaciones"'),
+            'visita_list': ('"hallazgos"', '"recomendaciones"', '"password"'),
+            'visita_detail': ('"checklists"."descripcion"', '"checklists"."observaciones"'),
+        }
+        for clave, columnas in excluidas.items():
+            with self.subTest(vista=clave):
+                self.client.get(urls[clave])
+                fragmentos.invalidar_todo()
+                with CaptureQueriesContext(connection) as consultas:
+                    self.client.get(urls[clave])
+                sql = '\n'.join(consulta['sql'] for consulta in consultas).replace('`', '"')
+                for columna in columnas:
+                    self.assertNotIn(columna, sql)
+
+        # El usuario de cada fila llega en la misma consulta de la página
+        for clave in ('checklist_list', 'visita_list'):
+            with CaptureQueriesContext(connection) as consultas:
+                self.client.get(urls[clave])
+            self.assertEqual(len(consultas), 1)
+            self.assertIn('JOIN "auth_user"', consultas[0]['sql'].replace('`', '"'))
+
+    def test_login(self):
+        self.client.logout()
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(reverse('login'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(consultas), 0)
+
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.post(reverse('login'), {
+                'username': 'supervisor', 'password': 'clave-segura-123',
+            })
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+        self.assertLessEqual(len(consultas), PRESUPUESTO_LOGIN)
+
+
+@override_settings(LIST_PAGE_SIZE=3)
+class PaginacionCursorTests(TestCase):
+    """
+    Listados por cursor: filtros en los enlaces, empates y páginas estables
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = _crear_usuario()
+        # Misma fecha y hora en todas: el orden lo decide el desempate por pk
+        for i in range(10):
+            Visita.objects.create(
+                codigo_visita=f'VIS-{i:04d}', tipo_visita='preventiva' if i % 3 else 'correctiva',
+                fecha_visita='2024-05-01', hora_inicio='09:00', hora_fin='10:00', lugar='Cancha de Acopio',
+                inspector=cls.usuario, hallazgos='-', resultado='satisfactorio', recomendaciones='-',
+            )
+        cls.preventivas = list(
+            Visita.objects.filter(tipo_visita='preventiva').order_by('-pk').values_list('codigo_visita', flat=True)
+        )
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def _pagina(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        patron = r'<a href="(\?[^"]*cursor=[^"]*)"[^>]*>(← Anterior|Siguiente →)</a>'
+        enlaces = {texto: html.unescape(href) for href, texto in re.findall(patron, response.content.decode())}
+        codigos = [visita.codigo_visita for visita in response.context['visitas']]
+        return codigos, enlaces.get('Siguiente →'), enlaces.get('← Anterior')
+
+    def test_recorre_todas_las_filas_filtradas_sin_repetir(self):
+        url = reverse('visita_list')
+        codigos, siguiente, anterior = self._pagina(url + '?tipo=preventiva')
+        self.assertIsNone(anterior)
+        paginas = [codigos]
+        while siguiente:
+            self.assertIn('tipo=preventiva', siguiente)
+            codigos, siguiente, anterior = self._pagina(url + siguiente)
+            self.assertIn('tipo=preventiva', anterior)
+            paginas.append(codigos)
+        self.assertEqual([len(pagina) for pagina in paginas], [3, 3])
+        self.assertEqual(sum(paginas, []), self.preventivas)
+
+        # Volver desde la última página entrega la primera
+        self.assertEqual(self._pagina(url + anterior)[0], paginas[0])
+
+    def test_pagina_siguiente_estable_ante_altas(self):
+        url = reverse('visita_list')
+        _, siguiente, _ = self._pagina(url + '?tipo=preventiva')
+        segunda, _, _ = self._pagina(url + siguiente)
+
+        # Una visita nueva entra al comienzo del orden y no desplaza la página ya pedida
+        Visita.objects.create(
+            codigo_visita='VIS-0100', tipo_visita='preventiva', fecha_visita='2024-05-01',
+            hora_inicio='09:00', hora_fin='10:00', lugar='Cancha de Acopio', inspector=self.usuario,
+            hallazgos='-', resultado='satisfactorio', recomendaciones='-',
+        )
+        self.assertEqual(self._pagina(url + siguiente)[0], segunda)
+        self.assertEqual(self._pagina(url + '?tipo=preventiva')[0][0], 'VIS-0100')
+
+    def test_cursor_invalido_devuelve_la_primera_pagina(self):
+        codigos, _, _ = self._pagina(reverse('visita_list') + '?tipo=preventiva&cursor=no-es-un-cursor')
+        self.assertEqual(codigos, self.preventivas[:3])
+
+
+class ResumenTests(TestCase):
+    """
+    Contadores del dashboard: cálculo en una consulta y deltas de las señales
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = _crear_usuario()
+
+    def setUp(self):
+        reconstruir_resumen()
+
+    def _checklist(self, estado='pendiente'):
+        return Checklist.objects.create(
+            titulo='Revisión de motosierras', descripcion='-', area='Aserradero', estado=estado,
+            responsable=self.usuario, fecha_vencimiento='2030-01-01',
+        )
+
+    def _visita(self, resultado='critico', requiere_seguimiento=True):
+        return Visita.objects.create(
+            codigo_visita=f'VIS-{Visita.objects.count():04d}', tipo_visita='preventiva', fecha_visita='2024-05-01',
+            hora_inicio='09:00', hora_fin='10:00', lugar='Cancha de Acopio', inspector=self.usuario,
+            hallazgos='-', resultado=resultado, recomendaciones='-', requiere_seguimiento=requiere_seguimiento,
+        )
+
+    def _resumen(self):
+        fila = obtener_resumen()
+        self.assertEqual({campo: fila[campo] for campo in calcular_resumen()}, calcular_resumen())
+        return fila
+
+    def test_calculo_en_una_consulta(self):
+        self._checklist()
+        self._checklist('completado')
+        self._visita()
+        with self.assertNumQueries(1):
+            valores = calcular_resumen()
+        self.assertEqual(valores['checklists_total'], 2)
+        self.assertEqual(valores['checklists_pendiente'], 1)
+        self.assertEqual(valores['checklists_completado'], 1)
+        self.assertEqual(valores['visitas_total'], 1)
+        self.assertEqual(valores['visitas_critico'], 1)
+        self.assertEqual(valores['visitas_seguimiento'], 1)
+
+    def test_deltas_al_crear_editar_y_eliminar(self):
+        checklist = self._checklist()
+        self.assertEqual(self._resumen()['checklists_pendiente'], 1)
+
+        checklist.estado = 'completado'
+        checklist.save()
+        resumen = self._resumen()
+        self.assertEqual((resumen['checklists_pendiente'], resumen['checklists_completado']), (0, 1))
+
+        visita = self._visita()
+        visita.resultado = 'satisfactorio'
+        visita.requiere_seguimiento = False
+        visita.save()
+        resumen = self._resumen()
+        self.assertEqual((resumen['visitas_critico'], resumen['visitas_seguimiento']), (0, 0))
+
+        visita.delete()
+        checklist.delete()
+        resumen = self._resumen()
+        self.assertEqual((resumen['checklists_total'], resumen['visitas_total']), (0, 0))
+
+    def test_instancia_desactualizada_descuenta_el_valor_persistido(self):
+        desactualizada = self._checklist()
+        actual = Checklist.objects.get(pk=desactualizada.pk)
+        actual.estado = 'completado'
+        actual.save()
+
+        # Eliminar la copia vieja descuenta "completado", no "pendiente" otra vez
+        desactualizada.delete()
+        resumen = self._resumen()
+        self.assertEqual((resumen['checklists_pendiente'], resumen['checklists_completado']), (0, 0))
+
+
+class DatosSinteticosTests(TestCase):
+    """
+    Generación reproducible y limpieza acotada a los registros sintéticos
+    """
+
+    def setUp(self):
+        self.usuario = _crear_usuario()
+        self.checklist = Checklist.objects.create(
+            titulo='Revisión real', descripcion='-', area='Vivero Central', responsable=self.usuario,
+            fecha_vencimiento='2024-06-30',
+        )
+        self.visita = Visita.objects.create(
+            codigo_visita='VIS-REAL-1', tipo_visita='preventiva', fecha_visita='2024-05-01',
+            hora_inicio='09:00', hora_fin='10:00', lugar='Cancha de Acopio', inspector=self.usuario,
+            checklist=self.checklist, hallazgos='-', resultado='satisfactorio', recomendaciones='-',
+        )
+
+    def _firma(self):
+        return list(
+            Visita.objects.filter(codigo_visita__startswith='SIM-').order_by('codigo_visita')
+            .values_list('codigo_visita', 'tipo_visita', 'resultado', 'inspector__username')
+        )
+
+    def test_misma_semilla_mismos_datos(self):
+        datos_sinteticos.generar(usuarios=4, checklists=10, visitas=30, semilla=7)
+        primera = self._firma()
+        self.assertEqual(len(primera), 30)
+        self.assertEqual(User.objects.filter(username__startswith=datos_sinteticos.PREFIJO_USUARIO).count(), 4)
+
+        datos_sinteticos.limpiar()
+        datos_sinteticos.generar(usuarios=4, checklists=10, visitas=30, semilla=7)
+        self.assertEqual(self._firma(), primera)
+
+        resumen = reconstruir_resumen()
+        self.assertEqual(resumen['checklists_total'], 11)
+        self.assertEqual(resumen['visitas_total'], 31)
+
+    def test_limpiar_conserva_los_datos_reales(self):
+        datos_sinteticos.generar(usuarios=3, checklists=5, visitas=20, semilla=1)
+        sintetico = Checklist.objects.filter(responsable__username__startswith='sim_').first()
+        enlazada = Visita.objects.create(
+            codigo_visita='VIS-REAL-2', tipo_visita='seguimiento', fecha_visita='2024-05-02',
+            hora_inicio='09:00', hora_fin='10:00', lugar='Quebrada', inspector=self.usuario,
+            checklist=sintetico, hallazgos='-', resultado='critico', recomendaciones='-',
+            requiere_seguimiento=True,
+        )
+
+        datos_sinteticos.limpiar()
+
+        self.assertFalse(User.objects.filter(username__startswith='sim_').exists())
+        self.assertEqual(list(Checklist.objects.all()), [self.checklist])
+        self.assertEqual(
+            set(Visita.objects.values_list('codigo_visita', flat=True)), {'VIS-REAL-1', 'VIS-REAL-2'},
+        )
+        enlazada.refresh_from_db()
+        self.assertIsNone(enlazada.checklist_id)
+        self.assertTrue(Seguimiento.objects.filter(visita=enlazada, area='').exists())
+        resumen = reconstruir_resumen()
+        self.assertEqual((resumen['checklists_total'], resumen['visitas_total']), (1, 2))
+
+    def test_generar_de_nuevo_continua_los_codigos_y_usa_sus_checklists(self):
+        datos_sinteticos.generar(usuarios=3, checklists=5, visitas=20, semilla=1)
+        primeros = set(Checklist.objects.exclude(pk=self.checklist.pk).values_list('pk', flat=True))
+        # Un código sintético suelto más alto que los generados
+        Visita.objects.filter(codigo_visita='VIS-REAL-1').update(codigo_visita='SIM-1-0000050')
+
+        datos_sinteticos.generar(usuarios=3, checklists=5, visitas=20, semilla=1)
+
+        codigos = Visita.objects.filter(codigo_visita__startswith='SIM-1-')
+        self.assertEqual(codigos.count(), 41)
+        self.assertEqual(
+            codigos.order_by('-codigo_visita').values_list('codigo_visita', flat=True)[0], 'SIM-1-0000070',
+        )
+        segunda = Visita.objects.filter(codigo_visita__gt='SIM-1-0000050', checklist__isnull=False)
+        self.assertTrue(segunda.exists())
+        self.assertFalse(segunda.filter(checklist__in=[self.checklist.pk, *primeros]).exists())
+
+
+class SesionesTests(TestCase):
+    """
+    Sesiones en caché: sin escrituras por request, renovación limitada y logout inmediato
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = _crear_usuario()
+
+    def setUp(self):
+        self.client.post(reverse('login'), {'username': 'supervisor', 'password': 'clave-segura-123'})
+        self.session_key = self.client.cookies[settings.SESSION_COOKIE_NAME].value
+
+    def _consultas_sesion(self, url):
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(url)
+        return response, [q['sql'] for q in consultas if 'django_session' in q['sql']]
+
+    def test_request_de_lectura_no_toca_la_tabla_de_sesiones(self):
+        response, consultas = self._consultas_sesion(reverse('checklist_list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(consultas, [])
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+
+    def test_renueva_la_expiracion_pasada_la_fraccion_de_la_ventana(self):
+        expiracion = Session.objects.get(session_key=self.session_key).expire_date
+        umbral = settings.SESSION_COOKIE_AGE * settings.SESSION_REFRESH_FRACTION
+        with mock.patch.object(sesiones.time, 'time', return_value=time.time() + umbral + 60):
+            response, consultas = self._consultas_sesion(reverse('checklist_list'))
+        self.assertEqual(len(consultas), 1)
+        self.assertIn(settings.SESSION_COOKIE_NAME, response.cookies)
+        self.assertGreater(Session.objects.get(session_key=self.session_key).expire_date, expiracion)
+
+    def test_logout_invalida_la_sesion_inmediatamente(self):
+        cookie = self.client.cookies[settings.SESSION_COOKIE_NAME].value
+        self.client.get(reverse('logout'))
+        self.assertFalse(Session.objects.filter(session_key=cookie).exists())
+
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = cookie
+        response = self.client.get(reverse('dashboard'))
+        self.assertRedirects(response, f"{reverse('login')}?next={reverse('dashboard')}")
+
+    def test_sesion_expirada_en_la_base_de_datos_se_rechaza(self):
+        Session.objects.filter(session_key=self.session_key).update(expire_date=timezone.now())
+        caches[settings.SESSION_CACHE_ALIAS].delete(sesiones.SessionStore.cache_key_prefix + self.session_key)
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 302)
+
+    @override_settings(CACHE_SHARED=False)
+    def test_cache_del_proceso_lee_la_sesion_de_la_base_de_datos(self):
+        response, consultas = self._consultas_sesion(reverse('checklist_list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(consultas), 1)
+
+        # Un logout en otro proceso borra la fila pero no la copia de esta caché
+        Session.objects.filter(session_key=self.session_key).delete()
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 302)
+
+
+class UsuarioCacheadoTests(TestCase):
+    """
+    El usuario autenticado se sirve desde la caché y se invalida al cambiar
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = _crear_usuario()
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+        self.client.get(reverse('checklist_list'))
+
+    def _consultas_usuario(self, url):
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(url)
+        return response, [q['sql'] for q in consultas if CONSULTA_USUARIO.search(q['sql'])]
+
+    def test_request_autenticado_no_consulta_auth_user(self):
+        response, consultas = self._consultas_usuario(reverse('checklist_list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(consultas, [])
+
+    def test_cambio_de_nombre_se_refleja_en_el_siguiente_request(self):
+        self.usuario.first_name = 'Ana'
+        self.usuario.save(update_fields=['first_name'])
+        response, consultas = self._consultas_usuario(reverse('checklist_list'))
+        self.assertEqual(len(consultas), 1)
+        self.assertEqual(response.context['user'].first_name, 'Ana')
+
+    def test_cambio_de_contrasena_cierra_la_sesion(self):
+        self.usuario.set_password('otra-clave-segura-456')
+        self.usuario.save()
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_usuario_desactivado_pierde_el_acceso(self):
+        usuario = User.objects.get(pk=self.usuario.pk)
+        usuario.is_active = False
+        usuario.save(update_fields=['is_active'])
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_guardar_last_login_no_invalida(self):
+        usuario = User.objects.get(pk=self.usuario.pk)
+        usuario.last_login = timezone.now()
+        usuario.save(update_fields=['last_login'])
+        _, consultas = self._consultas_usuario(reverse('checklist_list'))
+        self.assertEqual(consultas, [])
+
+    def test_invalidacion_desde_otro_proceso(self):
+        # Otro proceso solo cambia la versión en la caché compartida
+        User.objects.filter(pk=self.usuario.pk).update(first_name='Ana')
+        cache.set(autenticacion._clave_version(self.usuario.pk), 'otra-version', None)
+        response, consultas = self._consultas_usuario(reverse('checklist_list'))
+        self.assertEqual(len(consultas), 1)
+        self.assertEqual(response.context['user'].first_name, 'Ana')
+
+    @override_settings(CACHE_SHARED=False)
+    def test_cache_del_proceso_consulta_el_usuario_en_cada_request(self):
+        for _ in range(2):
+            _, consultas = self._consultas_usuario(reverse('checklist_list'))
+            self.assertEqual(len(consultas), 1)
+
+
+class RehashAlIniciarSesionTests(TestCase):
+    """
+    Los usuarios se migran al hasher preferido y a su costo actual al iniciar sesión
+    """
+
+    def _login(self):
+        return self.client.post(reverse('login'), {'username': 'supervisor', 'password': 'clave-segura-123'})
+
+    def test_usuario_pbkdf2_pasa_a_argon2(self):
+        User.objects.create(username='supervisor', password=make_password('clave-segura-123', hasher='pbkdf2_sha256'))
+        self.assertRedirects(self._login(), reverse('dashboard'), fetch_redirect_response=False)
+        self.assertTrue(User.objects.get(username='supervisor').password.startswith('argon2$'))
+
+        self.client.logout()
+        self.assertRedirects(self._login(), reverse('dashboard'), fetch_redirect_response=False)
+
+    def test_cambio_de_costo_vuelve_a_hashear(self):
+        _crear_usuario()
+        anterior = User.objects.get(username='supervisor').password
+        with override_settings(PASSWORD_ARGON2_TIME_COST=settings.PASSWORD_ARGON2_TIME_COST + 1):
+            self._login()
+        actual = User.objects.get(username='supervisor').password
+        self.assertNotEqual(actual, anterior)
+        self.assertIn(f't={settings.PASSWORD_ARGON2_TIME_COST + 1}', actual)
+
+
+class ConexionSimulada:
+    """
+    Conexión de prueba con la interfaz que usa el pool
+    """
+
+    def __init__(self):
+        self.viva = True
+        self.cerrada = False
+        self.encoders = {}
+
+    def ping(self, reconnect=False):
+        if not self.viva:
+            raise OSError('conexión perdida')
+
+    def rollback(self):
+        if not self.viva:
+            raise OSError('conexión perdida')
+
+    def close(self):
+        self.cerrada = True
+
+
+class PoolConexionesTests(SimpleTestCase):
+    """
+    Pool de conexiones con conexiones simuladas (sin servidor MySQL)
+    """
+
+    def _pool(self, **opciones):
+        self.abiertas = []
+
+        def conectar():
+            conexion = ConexionSimulada()
+            self.abiertas.append(conexion)
+            return conexion
+
+        return PoolConexiones(conectar, **{'tamano': 2, 'espera': 0.2, **opciones})
+
+    def test_reutiliza_conexiones_devueltas(self):
+        pool = self._pool()
+        primera = pool.obtener()
+        pool.devolver(primera)
+        self.assertIs(pool.obtener(), primera)
+        estado = pool.estado()
+        self.assertEqual((estado['checkouts'], estado['creadas'], estado['en_uso']), (2, 1, 1))
+
+    def test_espera_una_conexion_libre_y_se_agota(self):
+        pool = self._pool()
+        a, b = pool.obtener(), pool.obtener()
+        with self.assertRaises(PoolAgotado):
+            pool.obtener()
+
+        threading.Timer(0.05, pool.devolver, args=[a]).start()
+        self.assertIs(pool.obtener(), a)
+        estado = pool.estado()
+        self.assertEqual((estado['esperas'], estado['agotado'], estado['abiertas']), (1, 1, 2))
+        self.assertEqual(len(self.abiertas), 2)
+        pool.devolver(b)
+
+    def test_reemplaza_conexiones_muertas(self):
+        pool = self._pool()
+        conexion = pool.obtener()
+        pool.devolver(conexion)
+        conexion.viva = False
+        nueva = pool.obtener()
+        self.assertIsNot(nueva, conexion)
+        self.assertTrue(conexion.cerrada)
+        self.assertEqual(pool.estado()['reconexiones'], 1)
+
+    def test_descarta_la_conexion_que_falla_al_devolverla(self):
+        pool = self._pool()
+        conexion = pool.obtener()
+        conexion.viva = False
+        pool.devolver(conexion)
+        estado = pool.estado()
+        self.assertEqual((estado['descartadas'], estado['abiertas'], estado['libres']), (1, 0, 0))
+
+    def test_recicla_conexiones_antiguas(self):
+        pool = self._pool(reciclar=0.01)
+        conexion = pool.obtener()
+        pool.devolver(conexion)
+        time.sleep(0.02)
+        self.assertIsNot(pool.obtener(), conexion)
+        self.assertEqual(pool.estado()['recicladas'], 1)
+
+    def test_backend_mysql_usa_el_pool(self):
+        from django.db.backends.mysql import base as mysql_base
+        from .backends.mysql_pool.base import DatabaseWrapper
+
+        wrapper = DatabaseWrapper({
+            **settings.DATABASES['default'],
+            'ENGINE': 'seguridad_app.backends.mysql_pool', 'NAME': 'pool_prueba', 'HOST': 'stub', 'PORT': '3306',
+            'USER': 'u', 'PASSWORD': '', 'OPTIONS': {}, 'POOL': {'SIZE': 1},
+        }, alias='pool_prueba')
+        with mock.patch.object(mysql_base.Database, 'connect', side_effect=lambda **kw: ConexionSimulada()) as connect:
+            primera = wrapper.get_new_connection(wrapper.get_connection_params())
+            wrapper.connection = primera
+            wrapper._close()
+            segunda = wrapper.get_new_connection(wrapper.get_connection_params())
+        self.assertIs(segunda, primera)
+        self.assertEqual(connect.call_count, 1)
+        self.assertIn('seguridad_db_pool_checkouts_total{alias="pool_prueba",base="pool_prueba"} 2',
+                      metrics.registro.exponer())
+
+
+class MetricasRendimientoTests(TestCase):
+    """
+    Server-Timing por request y histogramas de /metricas/, también en streaming
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = _crear_usuario()
+        for i in range(5):
+            Visita.objects.create(
+                codigo_visita=f'VIS-{i:04d}', tipo_visita='preventiva', fecha_visita='2024-05-01',
+                hora_inicio='09:00', hora_fin='10:00', lugar='Cancha de Acopio', inspector=cls.usuario,
+                hallazgos='-', resultado='satisfactorio', recomendaciones='-',
+            )
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+        metrics.registro.reiniciar()
+
+    def _serie(self, histograma, url_name):
+        return histograma.series().get(url_name)
+
+    def test_server_timing_y_exposicion(self):
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(reverse('visita_list'))
+        tiempos = dict(re.findall(r'(\w+);dur=([\d.]+)', response['Server-Timing']))
+        self.assertEqual(set(tiempos), {'sql', 'tpl', 'sesion', 'total'})
+        self.assertGreater(float(tiempos['tpl']), 0)
+        self.assertIn(f'desc="{len(consultas)} consultas"', response['Server-Timing'])
+
+        _, suma, total = self._serie(metrics.CONSULTAS_SQL, 'visita_list')
+        self.assertEqual((suma, total), (len(consultas), 1))
+
+        response = self.client.get(reverse('metricas'))
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        texto = response.content.decode()
+        self.assertIn('# TYPE seguridad_request_duration_seconds histogram', texto)
+        self.assertIn('seguridad_request_duration_seconds_count{url_name="visita_list"} 1', texto)
+        self.assertIn('seguridad_request_sql_queries_bucket{url_name="visita_list",le="+Inf"} 1', texto)
+
+    def test_streaming_se_registra_al_cerrar_el_flujo(self):
+        with mock.patch.object(exportacion, 'CHUNK_SIZE', 2):
+            response = self.client.get(reverse('visita_export'))
+            self.assertNotIn('Server-Timing', response)
+            # Las consultas de la exportación aún no se ejecutaron
+            self.assertIsNone(self._serie(metrics.DURACION_REQUEST, 'visita_export'))
+
+            with CaptureQueriesContext(connection) as consultas:
+                contenido = b''.join(response.streaming_content).decode('utf-8')
+        self.assertEqual(len(contenido.splitlines()), 6)
+        # El cliente de pruebas cierra la respuesta al terminar de leerla
+        _, consultas_flujo, total = self._serie(metrics.CONSULTAS_SQL, 'visita_export')
+        self.assertEqual(total, 1)
+        self.assertGreaterEqual(consultas_flujo, len(consultas))
+        self.assertGreaterEqual(len(consultas), 3)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTests(TestCase):
+    """
+    Router de réplicas con dos bases SQLite: ``default`` (principal) y ``replica``
+    """
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = _crear_usuario()
+        # La réplica tiene una copia atrasada: el mismo usuario y un checklist propio
+        responsable = User.objects.using('replica').create(pk=cls.usuario.pk, username='supervisor')
+        Checklist.objects.using('replica').create(
+            titulo='Solo en la réplica', descripcion='-', area='Sector Norte', responsable=responsable,
+            fecha_vencimiento='2030-01-01',
+        )
+
+    def setUp(self):
+        routers._caidas.clear()
+        self.client.force_login(self.usuario)
+
+    def _titulos_listados(self):
+        response = self.client.get(reverse('checklist_list'))
+        return [c.titulo for c in response.context['checklists']]
+
+    def test_listado_lee_desde_la_replica(self):
+        self.assertEqual(self._titulos_listados(), ['Solo en la réplica'])
+
+    @override_settings(SYNC_MARGIN_SECONDS=0)
+    def test_sincronizacion_lee_desde_la_principal(self):
+        Checklist.objects.create(
+            titulo='En la principal', descripcion='-', area='Aserradero', responsable=self.usuario,
+            fecha_vencimiento='2030-01-01',
+        )
+        datos = self.client.get(reverse('sync_cambios')).json()
+        self.assertEqual([fila['titulo'] for fila in datos['checklists']], ['En la principal'])
+
+    def test_detalle_leido_de_la_replica_no_se_guarda_ni_se_valida(self):
+        fragmentos.invalidar_todo()
+        checklist = Checklist.objects.using('replica').get()
+        url = reverse('checklist_detail', args=[checklist.pk])
+        response = self.client.get(url)
+        self.assertContains(response, 'Solo en la réplica')
+        self.assertNotIn('ETag', response)
+        self.assertEqual(fragmentos.obtener('checklist', checklist.pk)[0], None)
+
+    def test_escritura_abre_la_ventana_de_lectura_propia(self):
+        self.client.post(reverse('checklist_create'), {
+            'titulo': 'Recién creado', 'descripcion': '-', 'area': 'Vivero Central',
+            'estado': 'pendiente', 'prioridad': 'media', 'fecha_vencimiento': '2030-01-01',
+        })
+        self.assertFalse(Checklist.objects.using('replica').filter(titulo='Recién creado').exists())
+        # La marca viaja en la cookie: no depende de la caché del proceso que atendió la escritura
+        cache.clear()
+        self.assertEqual(self._titulos_listados(), ['Recién creado'])
+
+        # Vencida la ventana se vuelve a leer desde la réplica
+        with mock.patch('django.core.signing.time.time', return_value=time.time() + 60):
+            self.assertEqual(self._titulos_listados(), ['Solo en la réplica'])
+
+        # Una cookie sin firma válida no cuenta
+        self.client.cookies[routers.COOKIE_ESCRITURA] = 'supervisor'
+        self.assertEqual(self._titulos_listados(), ['Solo en la réplica'])
+
+    def test_replica_caida_lee_desde_la_principal(self):
+        Checklist.objects.create(
+            titulo='En la principal', descripcion='-', area='Aserradero', responsable=self.usuario,
+            fecha_vencimiento='2030-01-01',
+        )
+        with mock.patch.object(connections['replica'], 'ensure_connection', side_effect=OperationalError('caída')), \
+                self.assertLogs('seguridad_app.routers', 'WARNING'):
+            self.assertEqual(self._titulos_listados(), ['En la principal'])
+        # Mientras dure la espera no se vuelve a intentar
+        self.assertIn('replica', routers._caidas)
+        self.assertEqual(self._titulos_listados(), ['En la principal'])
+
+    def test_vistas_no_marcadas_y_escrituras_van_a_la_principal(self):
+        router = routers.ReplicaRouter()
+        self.assertEqual(router.db_for_write(Checklist), 'default')
+        self.assertIsNone(router.db_for_read(Checklist))
+
+
+class FragmentosDetalleTests(TestCase):
+    """
+    Caché de fragmentos de los detalles e invalidación por versiones
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = _crear_usuario()
+        cls.checklist = Checklist.objects.create(
+            titulo='Revisión de motosierras', descripcion='-', area='Aserradero',
+            responsable=cls.usuario, fecha_vencimiento='2030-01-01',
+        )
+        cls.otro_checklist = Checklist.objects.create(
+            titulo='Control de extintores', descripcion='-', area='Vivero Central',
+            responsable=cls.usuario, fecha_vencimiento='2030-01-01',
+        )
+        cls.visita = Visita.objects.create(
+            codigo_visita='VIS-0001', tipo_visita='preventiva', fecha_visita='2024-05-01',
+            hora_inicio='09:00', hora_fin='10:00', lugar='Cancha de Acopio', inspector=cls.usuario,
+            checklist=cls.checklist, hallazgos='-', resultado='satisfactorio', recomendaciones='-',
+        )
+
+    def setUp(self):
+        fragmentos.invalidar_todo()
+        self.client.force_login(self.usuario)
+
+    def _detalle(self, nombre, pk):
+        return self.client.get(reverse(nombre, args=[pk]))
+
+    def test_acierto_sin_consultas_ni_renderizado_del_contenido(self):
+        self._detalle('checklist_detail', self.checklist.pk)
+        with CaptureQueriesContext(connection) as consultas:
+            response = self._detalle('checklist_detail', self.checklist.pk)
+        self.assertEqual(len(consultas), 0)
+        self.assertTemplateNotUsed(response, 'checklist_detail_contenido.html')
+        self.assertContains(response, 'VIS-0001')
+
+    def test_editar_checklist_actualiza_su_detalle_y_el_de_sus_visitas(self):
+        self._detalle('checklist_detail', self.checklist.pk)
+        self._detalle('visita_detail', self.visita.pk)
+        checklist = Checklist.objects.get(pk=self.checklist.pk)
+        checklist.titulo = 'Revisión de motosierras y EPP'
+        checklist.save()
+        self.assertContains(self._detalle('checklist_detail', self.checklist.pk), 'Revisión de motosierras y EPP')
+        self.assertContains(self._detalle('visita_detail', self.visita.pk), 'Revisión de motosierras y EPP')
+
+    def test_cambio_de_checklist_de_una_visita_actualiza_ambas_tablas(self):
+        self._detalle('checklist_detail', self.checklist.pk)
+        self._detalle('checklist_detail', self.otro_checklist.pk)
+        visita = Visita.objects.get(pk=self.visita.pk)
+        visita.checklist = self.otro_checklist
+        visita.save()
+        self.assertNotContains(self._detalle('checklist_detail', self.checklist.pk), 'VIS-0001')
+        self.assertContains(self._detalle('checklist_detail', self.otro_checklist.pk), 'VIS-0001')
+
+    def test_eliminar_visita_y_checklist(self):
+        self._detalle('checklist_detail', self.checklist.pk)
+        self._detalle('visita_detail', self.visita.pk)
+        Checklist.objects.get(pk=self.checklist.pk).delete()
+        self.assertEqual(self._detalle('checklist_detail', self.checklist.pk).status_code, 404)
+        self.assertContains(self._detalle('visita_detail', self.visita.pk), 'Sin checklist asociado')
+
+        Visita.objects.get(pk=self.visita.pk).delete()
+        self.assertEqual(self._detalle('visita_detail', self.visita.pk).status_code, 404)
+
+    def test_cambio_de_nombre_del_inspector(self):
+        self._detalle('visita_detail', self.visita.pk)
+        usuario = User.objects.get(pk=self.usuario.pk)
+        usuario.first_name, usuario.last_name = 'Ana', 'Rojas'
+        usuario.save(update_fields=['first_name', 'last_name'])
+        self.assertContains(self._detalle('visita_detail', self.visita.pk), 'Ana Rojas')
+
+    @override_settings(CACHE_SHARED=False)
+    def test_cache_del_proceso_no_guarda_fragmentos_ni_etag(self):
+        cache.delete(fragmentos._clave_fragmento('checklist', self.checklist.pk))
+        response = self._detalle('checklist_detail', self.checklist.pk)
+        self.assertNotIn('ETag', response)
+        self.assertIsNone(cache.get(fragmentos._clave_fragmento('checklist', self.checklist.pk)))
+        self.assertNotIn('ETag', self.client.get(reverse('checklist_list')))
+
+        # Un cambio hecho en otro proceso no invalida nada en este: se vuelve a renderizar
+        Checklist.objects.filter(pk=self.checklist.pk).update(titulo='Revisión de motosierras y EPP')
+        with CaptureQueriesContext(connection) as consultas:
+            response = self._detalle('checklist_detail', self.checklist.pk)
+        self.assertGreater(len(consultas), 0)
+        self.assertContains(response, 'Revisión de motosierras y EPP')
+
+
+class GetCondicionalTests(TestCase):
+    """
+    ETag / Last-Modified y respuestas 304 en detalles, listados y exportaciones
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = _crear_usuario()
+        cls.checklist = Checklist.objects.create(
+            titulo='Revisión de motosierras', descripcion='-', area='Aserradero',
+            responsable=cls.usuario, fecha_vencimiento='2030-01-01',
+        )
+        cls.visita = Visita.objects.create(
+            codigo_visita='VIS-0001', tipo_visita='preventiva', fecha_visita='2024-05-01',
+            hora_inicio='09:00', hora_fin='10:00', lugar='Cancha de Acopio', inspector=cls.usuario,
+            checklist=cls.checklist, hallazgos='-', resultado='satisfactorio', recomendaciones='-',
+        )
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def _etag(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def _estado(self, url, etag):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code
+
+    def test_detalle_sin_cambios_responde_304_sin_consultas(self):
+        url = reverse('visita_detail', args=[self.visita.pk])
+        response = self.client.get(url)
+        self.assertIn('Last-Modified', response)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(len(consultas), 0)
+
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_editar_visita_cambia_su_detalle_y_el_del_checklist(self):
+        url_visita = reverse('visita_detail', args=[self.visita.pk])
+        url_checklist = reverse('checklist_detail', args=[self.checklist.pk])
+        etag_visita, etag_checklist = self._etag(url_visita), self._etag(url_checklist)
+
+        visita = Visita.objects.get(pk=self.visita.pk)
+        visita.lugar = 'Vivero Central'
+        visita.save()
+        self.assertEqual(self._estado(url_visita, etag_visita), 200)
+        self.assertEqual(self._estado(url_checklist, etag_checklist), 200)
+
+    def test_eliminar_visita_cambia_el_detalle_del_checklist(self):
+        url = reverse('checklist_detail', args=[self.checklist.pk])
+        etag = self._etag(url)
+        Visita.objects.filter(pk=self.visita.pk).delete()
+        self.assertEqual(self._estado(url, etag), 200)
+
+    def test_editar_checklist_cambia_el_detalle_de_sus_visitas(self):
+        url = reverse('visita_detail', args=[self.visita.pk])
+        etag = self._etag(url)
+        checklist = Checklist.objects.get(pk=self.checklist.pk)
+        checklist.titulo = 'Revisión de motosierras y EPP'
+        checklist.save()
+        self.assertEqual(self._estado(url, etag), 200)
+
+    def test_cambio_de_nombre_de_usuario_cambia_el_etag(self):
+        url = reverse('checklist_list')
+        etag = self._etag(url)
+        self.assertEqual(self._estado(url, etag), 304)
+        usuario = User.objects.get(pk=self.usuario.pk)
+        usuario.username = 'supervisora'
+        usuario.save(update_fields=['username'])
+        self.assertEqual(self._estado(url, etag), 200)
+
+    def test_listados_y_exportaciones(self):
+        for nombre in ('checklist_list', 'checklist_export', 'visita_list', 'visita_export'):
+            with self.subTest(vista=nombre):
+                url = reverse(nombre)
+                etag = self._etag(url)
+                self.assertEqual(self._estado(url, etag), 304)
+                # Otro formato u otros filtros son otro recurso
+                self.assertEqual(self._estado(f'{url}?formato=xlsx', etag), 200)
+
+        url = reverse('checklist_export')
+        etag = self._etag(url)
+        Checklist.objects.create(
+            titulo='Control de extintores', descripcion='-', area='Vivero Central',
+            responsable=self.usuario, fecha_vencimiento='2030-01-01',
+        )
+        self.assertEqual(self._estado(url, etag), 200)
+
+    def test_listado_sin_consultas_de_validacion(self):
+        # El ETag sale de las filas de la página: sin COUNT ni MAX sobre todo el filtro
+        for url in (reverse('checklist_list'), reverse('visita_list'), f'{reverse("visita_list")}?q=acopio'):
+            with self.subTest(url=url):
+                etag = self._etag(url)
+                with CaptureQueriesContext(connection) as consultas:
+                    self.assertEqual(self._estado(url, etag), 304)
+                for consulta in consultas:
+                    self.assertNotIn('COUNT(', consulta['sql'])
+                    self.assertNotIn('MAX(', consulta['sql'])
+
+    def test_listado_cambia_con_las_filas_de_la_pagina(self):
+        url = reverse('visita_list')
+        etag = self._etag(url)
+        Visita.objects.filter(pk=self.visita.pk).update(lugar='Vivero Central', fecha_actualizacion=timezone.now())
+        self.assertEqual(self._estado(url, etag), 200)
+        etag = self._etag(url)
+        Visita.objects.filter(pk=self.visita.pk).delete()
+        self.assertEqual(self._estado(url, etag), 200)
+
+    def test_otro_usuario_no_reutiliza_el_etag(self):
+        url = reverse('checklist_detail', args=[self.checklist.pk])
+        etag = self._etag(url)
+        self.client.force_login(_crear_usuario('inspector'))
+        self.assertEqual(self._estado(url, etag), 200)
+
+    def test_inexistente_responde_404(self):
+        response = self.client.get(reverse('checklist_detail', args=[999999]))
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn('ETag', response)
+
+
+@override_settings(ROOT_URLCONF='gestion_forestal.urls_asgi')
+class VistasAsincronasTests(TestCase):
+    """
+    Vistas asíncronas (ASGI) del dashboard, listados y detalles con el AsyncClient
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = _crear_usuario()
+        cls.checklist = Checklist.objects.create(
+            titulo='Revisión de motosierras', descripcion='-', area='Aserradero',
+            responsable=cls.usuario, fecha_vencimiento='2030-01-01',
+        )
+        cls.visita = Visita.objects.create(
+            codigo_visita='VIS-0001', tipo_visita='preventiva', fecha_visita='2024-05-01',
+            hora_inicio='09:00', hora_fin='10:00', lugar='Cancha de Acopio', inspector=cls.usuario,
+            checklist=cls.checklist, hallazgos='-', resultado='critico', recomendaciones='-',
+        )
+        reconstruir_resumen()
+
+    def setUp(self):
+        self.async_client.force_login(self.usuario)
+        fragmentos.invalidar_todo()
+        search.reiniciar_indices()
+
+    def _get(self, url, **extra):
+        # El ORM asíncrono vuelve a este hilo, así se cuentan sus consultas
+        async def pedir():
+            return await self.async_client.get(url, **extra)
+        return async_to_sync(pedir)()
+
+    def test_rutas_asincronas(self):
+        self.assertTrue(asyncio.iscoroutinefunction(resolve(reverse('dashboard')).func))
+        self.assertFalse(asyncio.iscoroutinefunction(resolve(reverse('visita_create')).func))
+
+    def test_redirige_al_login_sin_sesion(self):
+        self.async_client.logout()
+        response = self._get(reverse('visita_list'))
+        self.assertRedirects(
+            response, f"{settings.LOGIN_URL}?next={reverse('visita_list')}", fetch_redirect_response=False,
+        )
+
+    def test_mismo_contenido_y_presupuesto_que_las_vistas_sincronas(self):
+        urls = {
+            'dashboard': (reverse('dashboard'), 'VIS-0001'),
+            'checklist_list': (reverse('checklist_list'), 'Revisión de motosierras'),
+            'checklist_list?q': (reverse('checklist_list') + '?q=motosierras', 'Revisión de motosierras'),
+            'checklist_detail': (reverse('checklist_detail', args=[self.checklist.pk]), 'VIS-0001'),
+            'visita_list': (reverse('visita_list'), 'VIS-0001'),
+            'visita_list?tipo': (reverse('visita_list') + '?tipo=preventiva', 'VIS-0001'),
+            'visita_detail': (reverse('visita_detail', args=[self.visita.pk]), 'Revisión de motosierras'),
+        }
+        for clave, (url, texto) in urls.items():
+            with self.subTest(url=url):
+                # Como en PresupuestoConsultasTests: primero se calientan la sesión y el índice
+                self._get(url)
+                fragmentos.invalidar_todo()
+                with CaptureQueriesContext(connection) as consultas:
+                    response = self._get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertLessEqual(len(consultas), PRESUPUESTO_CONSULTAS[clave])
+                self.assertIn('Server-Timing', response)
+                self.assertIn(texto, response.content.decode())
+
+    def test_detalle_inexistente_y_get_condicional(self):
+        response = self._get(reverse('visita_detail', args=[self.visita.pk + 100]))
+        self.assertEqual(response.status_code, 404)
+
+        url = reverse('checklist_detail', args=[self.checklist.pk])
+        response = self._get(url)
+        self.assertIn('VIS-0001', response.content.decode())
+        response = self._get(url, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+
+@override_settings(ROOT_URLCONF='gestion_forestal.urls_asgi')
+class EventosDashboardTests(TestCase):
+    """
+    Dashboard en vivo: publicador en proceso y flujo Server-Sent Events
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = _crear_usuario()
+        reconstruir_resumen()
+
+    def setUp(self):
+        self.async_client.force_login(self.usuario)
+
+    def _crear_visita(self, codigo, resultado):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Visita.objects.create(
+                codigo_visita=codigo, tipo_visita='preventiva', fecha_visita='2024-05-01',
+                hora_inicio='09:00', hora_fin='10:00', lugar='Cancha de Acopio', inspector=self.usuario,
+                hallazgos='-', resultado=resultado, recomendaciones='-',
+            )
+
+    def test_publicador_reparte_desde_otro_hilo_y_combina_resumenes(self):
+        async def escenario():
+            publicador = eventos.Publicador()
+            suscriptores = [publicador.suscribir() for _ in range(300)]
+
+            def publicar():
+                publicador.publicar('resumen', {'visitas_total': 1})
+                publicador.publicar('resumen', {'visitas_total': 2})
+                publicador.publicar('critica', {'id': 7})
+
+            hilo = threading.Thread(target=publicar)
+            hilo.start()
+            hilo.join()
+            recibidos = [await suscriptor.esperar(1) for suscriptor in suscriptores]
+            for suscriptor in suscriptores:
+                publicador.desuscribir(suscriptor)
+            return recibidos, publicador.cantidad()
+
+        recibidos, restantes = async_to_sync(escenario)()
+        esperado = [('resumen', {'visitas_total': 2}), ('critica', {'id': 7})]
+        self.assertTrue(all(eventos_recibidos == esperado for eventos_recibidos in recibidos))
+        self.assertEqual(restantes, 0)
+
+    def test_sin_suscriptores_no_lee_los_contadores(self):
+        with mock.patch.object(eventos, 'datos_resumen') as datos_resumen:
+            self._crear_visita('VIS-0001', 'critico')
+        datos_resumen.assert_not_called()
+
+    def test_flujo_envia_contadores_y_visitas_criticas(self):
+        metrics.registro.reiniciar()
+
+        async def escenario():
+            response = await self.async_client.get(reverse('dashboard_eventos'))
+            flujo = aiter(response.streaming_content)
+            mensajes = [await anext(flujo), await anext(flujo)]
+            # Los dos cambios llegan antes de que el flujo lea: los resúmenes se combinan
+            await sync_to_async(self._crear_visita)('VIS-0002', 'satisfactorio')
+            await sync_to_async(self._crear_visita)('VIS-0003', 'critico')
+            for _ in range(2):
+                mensajes.append(await asyncio.wait_for(anext(flujo), 5))
+            return response, [m.decode() for m in mensajes]
+
+        response, mensajes = async_to_sync(escenario)()
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertTrue(mensajes[0].startswith('retry: '))
+        eventos_recibidos = [
+            (tipo, json.loads(datos))
+            for tipo, datos in (re.match(r'event: (\w+)\ndata: (.*)\n\n', m).groups() for m in mensajes[1:])
+        ]
+        self.assertEqual(eventos_recibidos[0][0], 'resumen')
+        self.assertEqual(eventos_recibidos[0][1]['visitas_total'], 0)
+        self.assertEqual([tipo for tipo, _ in eventos_recibidos[1:]], ['resumen', 'critica'])
+        self.assertEqual(eventos_recibidos[1][1]['visitas_total'], 2)
+        self.assertEqual(eventos_recibidos[1][1]['visitas_critico'], 1)
+        self.assertEqual(eventos_recibidos[2][1]['codigo_visita'], 'VIS-0003')
+        # Al cerrarse la conexión el suscriptor se quita y se registran las métricas
+        self.assertEqual(eventos.publicador.cantidad(), 0)
+        self.assertNotIn('Server-Timing', response)
+        _, consultas, total = metrics.CONSULTAS_SQL.series()['dashboard_eventos']
+        self.assertEqual(total, 1)
+        self.assertGreaterEqual(consultas, 1)
+
+    def test_requiere_sesion(self):
+        self.async_client.logout()
+
+        async def pedir():
+            return await self.async_client.get(reverse('dashboard_eventos'))
+
+        self.assertEqual(async_to_sync(pedir)().status_code, 302)
+
+
+@override_settings(PHOTO_WORKERS=0)
+class FotosTests(TestCase):
+    """
+    Fotos de evidencia: subida a disco con deduplicación, versiones reducidas y su caché
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = _crear_usuario()
+        cls.visita = Visita.objects.create(
+            codigo_visita='VIS-0001', tipo_visita='preventiva', fecha_visita='2024-05-01',
+            hora_inicio='09:00', hora_fin='10:00', lugar='Cancha de Acopio', inspector=cls.usuario,
+            hallazgos='-', resultado='critico', recomendaciones='-',
+        )
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        ajustes = override_settings(MEDIA_ROOT=self.media)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.client.force_login(self.usuario)
+        fragmentos.invalidar_todo()
+
+    def _imagen(self, nombre, color):
+        contenido = io.BytesIO()
+        Image.new('RGB', (1600, 1200), color).save(contenido, 'JPEG')
+        return SimpleUploadedFile(nombre, contenido.getvalue(), content_type='image/jpeg')
+
+    def _subir(self, *archivos, visita=None):
+        url = reverse('visita_fotos', args=[(visita or self.visita).pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(url, {'fotos': list(archivos)})
+
+    def _temporales(self):
+        directorio = fotos.ruta('0' * 64).parents[2] / 'tmp'
+        return list(directorio.iterdir()) if directorio.exists() else []
+
+    def test_subida_deduplica_por_contenido_y_genera_versiones(self):
+        response = self._subir(
+            self._imagen('roja.jpg', 'red'), self._imagen('roja_copia.jpg', 'red'), self._imagen('verde.jpg', 'green'),
+        )
+        self.assertRedirects(response, reverse('visita_detail', args=[self.visita.pk]), fetch_redirect_response=False)
+        self.assertEqual(Foto.objects.count(), 2)
+        self.assertEqual(self.visita.fotos.count(), 2)
+        self.assertEqual(self._temporales(), [])
+
+        otra = Visita.objects.create(
+            codigo_visita='VIS-0002', tipo_visita='preventiva', fecha_visita='2024-05-02',
+            hora_inicio='09:00', hora_fin='10:00', lugar='Vivero', inspector=self.usuario,
+            hallazgos='-', resultado='satisfactorio', recomendaciones='-',
+        )
+        self._subir(self._imagen('roja.jpg', 'red'), visita=otra)
+        self.assertEqual(Foto.objects.count(), 2)
+        self.assertEqual(FotoVisita.objects.count(), 3)
+
+        for foto in Foto.objects.all():
+            self.assertEqual(foto.estado, 'lista')
+            self.assertEqual((foto.formato, foto.ancho, foto.alto), ('JPEG', 1600, 1200))
+            self.assertTrue(fotos.ruta(foto.sha256).exists())
+            with Image.open(fotos.ruta(foto.sha256, 'miniatura')) as miniatura:
+                self.assertEqual(miniatura.size, (320, 240))
+            with Image.open(fotos.ruta(foto.sha256, 'web')) as web:
+                self.assertEqual(web.size, (1280, 960))
+
+    @override_settings(PHOTO_MAX_PER_UPLOAD=2)
+    def test_rechaza_archivos_que_no_son_imagenes_y_los_que_exceden_el_limite(self):
+        texto = SimpleUploadedFile('notas.txt', b'no es una imagen', content_type='text/plain')
+        response = self._subir(texto, self._imagen('roja.jpg', 'red'), self._imagen('verde.jpg', 'green'))
+        mensajes = [str(m) for m in response.wsgi_request._messages]
+        self.assertTrue(any('notas.txt' in m for m in mensajes))
+        self.assertTrue(any('verde.jpg' in m for m in mensajes))
+        self.assertEqual(Foto.objects.count(), 1)
+        self.assertEqual(self._temporales(), [])
+
+    def test_detalle_muestra_miniaturas_servidas_con_cache_larga(self):
+        url = reverse('visita_detail', args=[self.visita.pk])
+        etag = self.client.get(url)['ETag']
+        self._subir(self._imagen('roja.jpg', 'red'))
+        # Las fotos cambian la versión del detalle
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        sha256 = Foto.objects.get().sha256
+        miniatura = reverse('foto', args=[sha256, 'miniatura'])
+        contenido = response.content.decode()
+        self.assertIn(miniatura, contenido)
+        self.assertIn(reverse('foto', args=[sha256, 'web']), contenido)
+        self.assertNotIn('originales', contenido)
+
+        response = self.client.get(miniatura)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertIn('max-age=31536000', response['Cache-Control'])
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'\xff\xd8'))
+        response = self.client.get(miniatura, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+        self.assertEqual(self.client.get(reverse('foto', args=['0' * 64, 'web'])).status_code, 404)
+        self.assertEqual(self.client.get(f'/fotos/{sha256}/original.jpg').status_code, 404)
+
+    @override_settings(PHOTO_WORKERS=1)
+    def test_versiones_en_el_pool_de_procesos_fuera_del_request(self):
+        def cerrar_pool():
+            pool = fotos._pool
+            if pool is not None:
+                pool.shutdown()
+                fotos._descartar_pool(pool)
+
+        self.addCleanup(cerrar_pool)
+        # La subida solo encola las fotos nuevas; no genera nada en el request
+        with mock.patch.object(fotos, 'procesar') as procesar:
+            self._subir(self._imagen('roja.jpg', 'red'), self._imagen('verde.jpg', 'green'))
+        pendientes = procesar.call_args.args[0]
+        self.assertEqual(len(pendientes), 2)
+        self.assertEqual({foto.estado for foto in pendientes}, {'pendiente'})
+        self.assertFalse(fotos.ruta(pendientes[0].sha256, 'miniatura').exists())
+
+        with mock.patch.object(fotos, 'procesar') as procesar:
+            self._subir(self._imagen('roja.jpg', 'red'))
+        procesar.assert_not_called()
+
+        call_command('procesar_fotos', stdout=io.StringIO())
+        self.assertEqual(Foto.objects.filter(estado='lista').count(), 2)
+        self.assertTrue(fotos.ruta(pendientes[0].sha256, 'miniatura').exists())
+
+    def test_purgar_quita_fotos_sin_visitas(self):
+        self._subir(self._imagen('roja.jpg', 'red'))
+        sha256 = Foto.objects.get().sha256
+        self.visita.delete()
+        self.assertEqual(fotos.purgar(), 1)
+        self.assertFalse(Foto.objects.exists())
+        self.assertFalse(fotos.ruta(sha256).exists())
+        self.assertFalse(fotos.ruta(sha256, 'miniatura').exists())
+
+    def test_limpiar_datos_sinteticos_con_fotos(self):
+        datos_sinteticos.generar(usuarios=2, checklists=3, visitas=5, semilla=1)
+        sintetica = Visita.objects.filter(codigo_visita__startswith='SIM-').first()
+        self._subir(self._imagen('roja.jpg', 'red'), self._imagen('verde.jpg', 'green'), visita=sintetica)
+        self._subir(self._imagen('roja.jpg', 'red'))
+        verde = Foto.objects.exclude(usos__visita=self.visita).get()
+
+        datos_sinteticos.limpiar()
+        connection.check_constraints()
+
+        self.assertEqual(list(FotoVisita.objects.values_list('visita_id', flat=True)), [self.visita.pk])
+        self.assertEqual(Foto.objects.count(), 1)
+        self.assertFalse(fotos.ruta(verde.sha256).exists())
+        self.assertFalse(fotos.ruta(verde.sha256, 'miniatura').exists())
+
+
+@override_settings(SYNC_MARGIN_SECONDS=0)
+class SincronizacionTests(TestCase):
+    """
+    API de sincronización incremental: cursores, eliminaciones y subida de visitas
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = _crear_usuario()
+        cls.checklists = [
+            Checklist.objects.create(
+                titulo=f'Checklist {i}', descripcion='-', area='Aserradero',
+                responsable=cls.usuario, fecha_vencimiento='2030-01-01',
+            )
+            for i in range(3)
+        ]
+        cls.visita = Visita.objects.create(
+            codigo_visita='VIS-0001', tipo_visita='preventiva', fecha_visita='2024-05-01',
+            hora_inicio='09:00', hora_fin='10:00', lugar='Cancha de Acopio', inspector=cls.usuario,
+            checklist=cls.checklists[0], hallazgos='-', resultado='satisfactorio', recomendaciones='-',
+        )
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def _cambios(self, cursor=None, **params):
+        if cursor:
+            params['cursor'] = cursor
+        response = self.client.get(reverse('sync_cambios'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def _sincronizar(self, cursor=None, **params):
+        """Recorre todas las páginas y devuelve (filas por flujo, cursor final, páginas)"""
+        filas = {'checklists': [], 'visitas': [], 'eliminados': []}
+        paginas = 0
+        while True:
+            datos = self._cambios(cursor, **params)
+            paginas += 1
+            for clave in filas:
+                filas[clave] += datos[clave]
+            cursor = datos['cursor']
+            if not datos['hay_mas']:
+                return filas, cursor, paginas
+
+    def _subir(self, visitas, comprimir=False):
+        cuerpo = json.dumps({'visitas': visitas}).encode()
+        extra = {}
+        if comprimir:
+            cuerpo = gzip.compress(cuerpo)
+            extra['HTTP_CONTENT_ENCODING'] = 'gzip'
+        return self.client.post(reverse('sync_visitas'), cuerpo, content_type='application/json', **extra)
+
+    def _visita_nueva(self, codigo, **campos):
+        return {
+            'codigo_visita': codigo, 'tipo_visita': 'correctiva', 'fecha_visita': '2024-06-01',
+            'hora_inicio': '08:00', 'hora_fin': '09:30', 'lugar': 'Vivero Central',
+            'hallazgos': 'Sin señalética', 'resultado': 'observaciones_menores',
+            'recomendaciones': 'Instalar letreros', **campos,
+        }
+
+    def test_sincronizacion_completa_por_paginas_y_luego_vacia(self):
+        filas, cursor, paginas = self._sincronizar(limite=2)
+        self.assertEqual(paginas, 2)
+        self.assertEqual(
+            sorted(fila['id'] for fila in filas['checklists']),
+            sorted(checklist.pk for checklist in self.checklists),
+        )
+        visita = filas['visitas'][0]
+        self.assertEqual(visita['codigo_visita'], 'VIS-0001')
+        self.assertEqual(visita['inspector'], 'supervisor')
+        self.assertEqual(visita['checklist'], self.checklists[0].pk)
+
+        datos = self._cambios(cursor)
+        self.assertEqual((datos['checklists'], datos['visitas'], datos['eliminados']), ([], [], []))
+        self.assertFalse(datos['hay_mas'])
+
+    def test_delta_con_modificaciones_y_eliminaciones(self):
+        _, cursor, _ = self._sincronizar()
+
+        checklist = Checklist.objects.get(pk=self.checklists[1].pk)
+        checklist.estado = 'completado'
+        checklist.save()
+        # Eliminar el checklist de la visita la deja sin checklist
+        Checklist.objects.get(pk=self.checklists[0].pk).delete()
+
+        filas, _, _ = self._sincronizar(cursor)
+        self.assertEqual([fila['id'] for fila in filas['checklists']], [self.checklists[1].pk])
+        self.assertEqual([(fila['id'], fila['checklist']) for fila in filas['visitas']], [(self.visita.pk, None)])
+        self.assertEqual(filas['eliminados'], [
+            {'modelo': 'checklist', 'id': self.checklists[0].pk, 'codigo_visita': None},
+        ])
+
+    def test_eliminacion_desde_la_vista(self):
+        _, cursor, _ = self._sincronizar()
+        self.client.post(reverse('visita_delete', args=[self.visita.pk]))
+        filas, _, _ = self._sincronizar(cursor)
+        self.assertEqual(filas['eliminados'], [
+            {'modelo': 'visita', 'id': self.visita.pk, 'codigo_visita': 'VIS-0001'},
+        ])
+
+    def test_solo_registros_del_usuario_y_reasignaciones(self):
+        otro = _crear_usuario('inspector_2')
+        ajena = Visita.objects.create(
+            codigo_visita='VIS-0002', tipo_visita='preventiva', fecha_visita='2024-05-02',
+            hora_inicio='09:00', hora_fin='10:00', lugar='Quebrada', inspector=otro,
+            hallazgos='-', resultado='satisfactorio', recomendaciones='-',
+        )
+        Checklist.objects.create(
+            titulo='Ajeno', descripcion='-', area='Aserradero', responsable=otro, fecha_vencimiento='2030-01-01',
+        ).delete()
+        filas, cursor, _ = self._sincronizar()
+        self.assertEqual([fila['codigo_visita'] for fila in filas['visitas']], ['VIS-0001'])
+        self.assertEqual(len(filas['checklists']), 3)
+        self.assertEqual(filas['eliminados'], [])
+
+        # La visita reasignada se elimina del dispositivo anterior y llega al nuevo
+        self.visita.inspector = otro
+        self.visita.save()
+        ajena.inspector = self.usuario
+        ajena.save()
+        filas, _, _ = self._sincronizar(cursor)
+        self.assertEqual([fila['codigo_visita'] for fila in filas['visitas']], ['VIS-0002'])
+        self.assertEqual(filas['eliminados'], [
+            {'modelo': 'visita', 'id': self.visita.pk, 'codigo_visita': 'VIS-0001'},
+        ])
+
+    @override_settings(SYNC_MARGIN_SECONDS=120)
+    def test_margen_para_transacciones_que_confirman_tarde(self):
+        _, cursor, _ = self._sincronizar()
+        ahora = timezone.now()
+        # Guardada hace un minuto por una transacción que recién confirma
+        Visita.objects.filter(pk=self.visita.pk).update(fecha_actualizacion=ahora - timedelta(seconds=60))
+        filas, cursor, _ = self._sincronizar(cursor)
+        self.assertEqual(filas['visitas'], [])
+
+        with mock.patch('seguridad_app.sincronizacion.timezone.now', return_value=ahora + timedelta(seconds=90)):
+            filas, _, _ = self._sincronizar(cursor)
+        self.assertEqual([fila['id'] for fila in filas['visitas']], [self.visita.pk])
+
+    def test_respuesta_comprimida(self):
+        response = self.client.get(reverse('sync_cambios'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('VIS-0001', gzip.decompress(response.content).decode())
+
+    def test_cursor_invalido_y_vencido(self):
+        response = self.client.get(reverse('sync_cambios'), {'cursor': 'no-es-un-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+        antiguo = timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_DAYS + 1)
+        cursor = sincronizacion.codificar_cursor({
+            'checklists': (antiguo, 0), 'visitas': (antiguo, 0), 'eliminados': (antiguo, 0),
+        })
+        response = self.client.get(reverse('sync_cambios'), {'cursor': cursor})
+        self.assertEqual(response.status_code, 410)
+        self.assertTrue(response.json()['resincronizar'])
+
+    def test_subida_con_conflictos_y_errores(self):
+        response = self._subir([
+            self._visita_nueva('VIS-0100', checklist=self.checklists[2].pk),
+            self._visita_nueva('VIS-0001'),
+            self._visita_nueva('VIS-0101', resultado='desconocido'),
+        ], comprimir=True)
+        self.assertEqual(response.status_code, 200)
+        creada, conflicto, error = response.json()['resultados']
+
+        visita = Visita.objects.get(codigo_visita='VIS-0100')
+        self.assertEqual(creada, {'codigo_visita': 'VIS-0100', 'estado': 'creada', 'id': visita.pk})
+        self.assertEqual(visita.inspector, self.usuario)
+        self.assertEqual(visita.checklist_id, self.checklists[2].pk)
+
+        self.assertEqual(conflicto['estado'], 'conflicto')
+        self.assertEqual(conflicto['servidor']['id'], self.visita.pk)
+        self.assertEqual(conflicto['servidor']['lugar'], 'Cancha de Acopio')
+
+        self.assertEqual(error['estado'], 'error')
+        self.assertIn('resultado', error['errores'][0])
+        self.assertFalse(Visita.objects.filter(codigo_visita='VIS-0101').exists())
+
+        # Reintentar el mismo lote no duplica: la visita ya creada es un conflicto
+        response = self._subir([self._visita_nueva('VIS-0100')])
+        self.assertEqual(response.json()['resultados'][0]['estado'], 'conflicto')
+        self.assertEqual(Visita.objects.filter(codigo_visita='VIS-0100').count(), 1)
+
+    def test_subida_siempre_a_nombre_del_usuario(self):
+        otro = _crear_usuario('inspector2')
+        response = self._subir([
+            self._visita_nueva('VIS-0100', inspector='inspector2'),
+            self._visita_nueva('VIS-0101', inspector=self.usuario.username),
+        ])
+        rechazada, creada = response.json()['resultados']
+        self.assertEqual(rechazada['estado'], 'error')
+        self.assertIn('inspector2', rechazada['errores'][0])
+        self.assertFalse(Visita.objects.filter(codigo_visita='VIS-0100').exists())
+        self.assertEqual(creada['estado'], 'creada')
+        self.assertEqual(Visita.objects.get(codigo_visita='VIS-0101').inspector, self.usuario)
+        self.assertFalse(Visita.objects.filter(inspector=otro).exists())
+
+    def test_codigo_existente_con_errores_informa_los_errores(self):
+        response = self._subir([
+            self._visita_nueva('VIS-0001', resultado='desconocido'),
+            self._visita_nueva('VIS-0001', inspector='inspector2'),
+        ])
+        for resultado in response.json()['resultados']:
+            self.assertEqual(resultado['estado'], 'error')
+            self.assertNotIn('servidor', resultado)
+        errores = [resultado['errores'][0] for resultado in response.json()['resultados']]
+        self.assertIn('resultado', errores[0])
+        self.assertIn('inspector2', errores[1])
+        self.assertEqual(Visita.objects.get(codigo_visita='VIS-0001').lugar, 'Cancha de Acopio')
+
+    @override_settings(SYNC_MAX_UPLOAD=1)
+    def test_lote_demasiado_grande_o_mal_formado(self):
+        response = self._subir([self._visita_nueva('VIS-0100'), self._visita_nueva('VIS-0101')])
+        self.assertEqual(response.status_code, 413)
+        response = self.client.post(reverse('sync_visitas'), b'{', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_purgar_eliminaciones(self):
+        Checklist.objects.get(pk=self.checklists[2].pk).delete()
+        Eliminacion.objects.update(
+            fecha_eliminacion=timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_DAYS + 1),
+        )
+        self.assertEqual(sincronizacion.purgar_eliminaciones(), 1)
+        self.assertFalse(Eliminacion.objects.exists())
+
+
+class AutocompletadoTests(TestCase):
+    """
+    Selector de checklist: prefijo del título y luego del área, sin la descripción
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = _crear_usuario()
+        for titulo, descripcion, area in (
+            ('Revisión de motosierras', '-', 'Aserradero'),
+            ('Control de EPP', 'Revisión de cascos', 'Vivero Central'),
+            ('Inspección de caminos', '-', 'Revisión Norte'),
+            ('revisión de extintores', '-', 'Campamento'),
+        ):
+            Checklist.objects.create(
+                titulo=titulo, descripcion=descripcion, area=area,
+                responsable=cls.usuario, fecha_vencimiento='2030-01-01',
+            )
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+        self.client.get(reverse('dashboard'))
+
+    def _textos(self, query, consultas=None):
+        with CaptureQueriesContext(connection) as capturadas:
+            response = self.client.get(reverse('checklist_autocomplete'), {'q': query})
+        if consultas is not None:
+            self.assertEqual(len(capturadas), consultas)
+        for consulta in capturadas:
+            self.assertNotIn('descripcion', consulta['sql'])
+        return [resultado['texto'] for resultado in response.json()['resultados']]
+
+    def test_titulos_y_luego_areas_por_prefijo(self):
+        self.assertEqual(self._textos('revisi', consultas=2), [
+            'Revisión de motosierras - Aserradero',
+            'revisión de extintores - Campamento',
+            'Inspección de caminos - Revisión Norte',
+        ])
+        self.assertEqual(self._textos('vivero'), ['Control de EPP - Vivero Central'])
+        self.assertEqual(self._textos('cascos'), [])
+        self.assertEqual(self._textos('  '), [])
+
+    @override_settings(AUTOCOMPLETE_LIMIT=2)
+    def test_limite_sin_consultar_las_areas(self):
+        self.assertEqual(self._textos('revisi', consultas=1), [
+            'Revisión de motosierras - Aserradero',
+            'revisión de extintores - Campamento',
+        ])
+
+
+class BusquedaTests(TestCase):
+    """
+    Búsqueda de texto: tildes, relevancia, códigos y vigencia del índice en memoria
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = _crear_usuario()
+        cls.titulo = Checklist.objects.create(
+            titulo='Revisión de motosierras', descripcion='-', area='Aserradero',
+            responsable=cls.usuario, fecha_vencimiento='2030-01-01',
+        )
+        cls.descripcion = Checklist.objects.create(
+            titulo='Control de EPP', descripcion='Incluye las motosierras del galpón', area='Vivero Central',
+            responsable=cls.usuario, fecha_vencimiento='2030-01-01',
+        )
+        for codigo, hallazgos in (('VIS-0010', 'Riesgo crítico en la cancha'), ('VIS-0011', '-'), ('AB-7', '-')):
+            Visita.objects.create(
+                codigo_visita=codigo, tipo_visita='preventiva', fecha_visita='2024-05-01',
+                hora_inicio='09:00', hora_fin='10:00', lugar='Cancha de Acopio', inspector=cls.usuario,
+                hallazgos=hallazgos, resultado='satisfactorio', recomendaciones='-',
+            )
+
+    def setUp(self):
+        search.reiniciar_indices()
+
+    def _codigos(self, query):
+        pks = search.buscar(Visita, query)
+        visitas = Visita.objects.in_bulk(pks)
+        return [visitas[pk].codigo_visita for pk in pks]
+
+    def test_ignora_tildes_y_ordena_por_relevancia(self):
+        self.assertEqual(search.buscar(Checklist, 'REVISION'), [self.titulo.pk])
+        self.assertEqual(self._codigos('critico'), ['VIS-0010'])
+        # El título pesa más que la descripción; la última palabra es prefijo
+        self.assertEqual(search.buscar(Checklist, 'motosie'), [self.titulo.pk, self.descripcion.pk])
+
+    def test_codigos_y_consultas_sin_palabras_indexables(self):
+        self.assertEqual(self._codigos('vis-0010'), ['VIS-0010'])
+        self.assertEqual(set(self._codigos('VIS-001')), {'VIS-0010', 'VIS-0011'})
+        self.assertEqual(self._codigos('ab-7'), ['AB-7'])
+        # Solo stopwords: el prefijo literal del título
+        self.assertEqual(search.buscar(Checklist, 'Control de'), [self.descripcion.pk])
+        self.assertEqual(search.buscar(Checklist, 'de la'), [])
+
+        # En MySQL "01" es más corto que el mínimo de InnoDB: el código va por prefijo
+        self.assertEqual(search._consulta_booleana('VIS-01'), '+vis*')
+        self.assertIsNotNone(search._condicion_prefijo(Visita, 'VIS-01', search._palabras_mysql('VIS-01')))
+        self.assertIsNone(search._condicion_prefijo(Visita, 'cancha acopio', ['cancha', 'acopio']))
+        self.assertEqual(search.coincidencias(Checklist, 'zzz'), [])
+
+    def test_el_indice_cambia_solo_al_confirmar(self):
+        search.buscar(Checklist, 'poda')
+        try:
+            with transaction.atomic():
+                Checklist.objects.create(
+                    titulo='Poda revertida', descripcion='-', area='Vivero Norte',
+                    responsable=self.usuario, fecha_vencimiento='2030-01-01',
+                )
+                raise IntegrityError
+        except IntegrityError:
+            pass
+        self.assertEqual(search.buscar(Checklist, 'poda'), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            checklist = Checklist.objects.create(
+                titulo='Poda de raleo', descripcion='-', area='Vivero Norte',
+                responsable=self.usuario, fecha_vencimiento='2030-01-01',
+            )
+        self.assertEqual(search.buscar(Checklist, 'poda'), [checklist.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            checklist.delete()
+        self.assertEqual(search.buscar(Checklist, 'poda'), [])
+
+    def test_cambio_confirmado_en_otro_proceso_recarga_el_indice(self):
+        self.assertEqual(search.buscar(Checklist, 'extintores'), [])
+        # Otro proceso guarda y confirma: este no recibe la señal, solo ve el contador
+        Checklist.objects.filter(pk=self.descripcion.pk).update(titulo='Control de extintores')
+        self.assertEqual(search.buscar(Checklist, 'extintores'), [])
+        search._incrementar_version(Checklist)
+        self.assertEqual(search.buscar(Checklist, 'extintores'), [self.descripcion.pk])
+
+
+class ExportacionTests(TestCase):
+    """
+    Contenido de las exportaciones CSV / XLSX, lotes por cursor y búsqueda completa
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = _crear_usuario()
+        cls.checklist = Checklist.objects.create(
+            titulo='Revisión de motosierras', descripcion='-', area='Aserradero', estado='en_progreso',
+            responsable=cls.usuario, fecha_vencimiento='2030-01-01',
+        )
+        for i, lugar in enumerate(('Vivero Central', 'Vivero Norte', 'Aserradero', 'Vivero Sur', 'Vivero Este')):
+            Visita.objects.create(
+                codigo_visita=f'VIS-{i:04d}', tipo_visita='preventiva', fecha_visita=f'2024-05-{i + 1:02d}',
+                hora_inicio='09:00', hora_fin='10:00', lugar=lugar, inspector=cls.usuario,
+                checklist=cls.checklist if i == 0 else None, hallazgos='-', resultado='critico',
+                recomendaciones='-', requiere_seguimiento=i == 0,
+            )
+
+    def setUp(self):
+        search.reiniciar_indices()
+        self.client.force_login(self.usuario)
+
+    def _csv(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        contenido = b''.join(response.streaming_content).decode('utf-8')
+        self.assertTrue(contenido.startswith('\ufeff'))
+        return list(csv.reader(io.StringIO(contenido[1:])))
+
+    def test_csv_con_etiquetas_y_orden_del_listado(self):
+        filas = self._csv(reverse('visita_export'))
+        self.assertEqual(filas[0], [encabezado for encabezado, _ in exportacion.COLUMNAS_VISITA])
+        self.assertEqual([fila[1] for fila in filas[1:]], ['VIS-0004', 'VIS-0003', 'VIS-0002', 'VIS-0001', 'VIS-0000'])
+        ultima = dict(zip(filas[0], filas[-1]))
+        self.assertEqual(ultima['Tipo'], 'Preventiva')
+        self.assertEqual(ultima['Resultado'], 'Crítico')
+        self.assertEqual(ultima['Checklist'], 'Revisión de motosierras')
+        self.assertEqual(ultima['Requiere Seguimiento'], 'Sí')
+        self.assertEqual(dict(zip(filas[0], filas[1]))['Requiere Seguimiento'], 'No')
+
+        filas = self._csv(reverse('checklist_export'))
+        self.assertEqual(dict(zip(filas[0], filas[1]))['Estado'], 'En Progreso')
+
+    def test_xlsx(self):
+        response = self.client.get(f'{reverse("visita_export")}?formato=xlsx')
+        self.assertEqual(response['Content-Type'], exportacion.XLSX_CONTENT_TYPE)
+        with zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content))) as libro:
+            hoja = libro.read('xl/worksheets/sheet1.xml').decode()
+        self.assertIn('Código', hoja)
+        self.assertIn('Revisión de motosierras', hoja)
+        self.assertLess(hoja.index('VIS-0004'), hoja.index('VIS-0000'))
+
+    def test_lotes_por_cursor_acotados(self):
+        completas = self._csv(reverse('visita_export'))
+        with mock.patch.object(exportacion, 'CHUNK_SIZE', 2), \
+                CaptureQueriesContext(connection) as consultas:
+            por_lotes = self._csv(reverse('visita_export'))
+        self.assertEqual(por_lotes, completas)
+        lotes = [c['sql'] for c in consultas if 'codigo_visita' in c['sql']]
+        self.assertEqual(len(lotes), 3)
+        for sql in lotes:
+            self.assertIn('LIMIT 2', sql)
+
+    @override_settings(SEARCH_MAX_RESULTS=1)
+    def test_busqueda_exporta_todas_las_coincidencias(self):
+        filas = self._csv(f'{reverse("visita_export")}?q=vivero')
+        self.assertEqual([fila[1] for fila in filas[1:]], ['VIS-0004', 'VIS-0003', 'VIS-0001', 'VIS-0000'])
+
+
+class FacetasTests(TestCase):
+    """
+    Conteos por opción de los filtros, combinados con la búsqueda y con el otro filtro
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = _crear_usuario()
+        visitas = [
+            ('preventiva', 'satisfactorio', 'Vivero Central'),
+            ('preventiva', 'critico', 'Vivero Norte'),
+            ('correctiva', 'critico', 'Vivero Central'),
+            ('correctiva', 'satisfactorio', 'Aserradero'),
+            ('emergencia', 'critico', 'Aserradero'),
+        ]
+        for i, (tipo, resultado, lugar) in enumerate(visitas):
+            Visita.objects.create(
+                codigo_visita=f'VIS-{i:04d}', tipo_visita=tipo, fecha_visita='2024-05-01',
+                hora_inicio='09:00', hora_fin='10:00', lugar=lugar, inspector=cls.usuario,
+                hallazgos='-', resultado=resultado, recomendaciones='-',
+            )
+        for titulo, estado in (('Poda de raleo', 'pendiente'), ('Poda de formación', 'completado'),
+                               ('Extintores', 'pendiente')):
+            Checklist.objects.create(
+                titulo=titulo, descripcion='-', area='Aserradero', estado=estado,
+                responsable=cls.usuario, fecha_vencimiento='2030-01-01',
+            )
+
+    def setUp(self):
+        cache.clear()
+        search.reiniciar_indices()
+
+    def _conteos(self, opciones):
+        return {valor: total for valor, _, total in opciones if total}
+
+    def test_visitas_con_busqueda_y_filtros(self):
+        resultado = facetas.facetas_visitas('', '', '')
+        self.assertEqual(self._conteos(resultado['tipo_visita']), {'preventiva': 2, 'correctiva': 2, 'emergencia': 1})
+        self.assertEqual(self._conteos(resultado['resultado']), {'satisfactorio': 2, 'critico': 3})
+
+        resultado = facetas.facetas_visitas('vivero', '', 'critico')
+        # Los tipos se cuentan con el filtro de resultado; los resultados, sin él
+        self.assertEqual(self._conteos(resultado['tipo_visita']), {'preventiva': 1, 'correctiva': 1})
+        self.assertEqual(self._conteos(resultado['resultado']), {'satisfactorio': 1, 'critico': 2})
+
+        resultado = facetas.facetas_visitas('vivero', 'correctiva', '')
+        self.assertEqual(self._conteos(resultado['resultado']), {'critico': 1})
+
+    @override_settings(SEARCH_MAX_RESULTS=2)
+    def test_con_busqueda_cuenta_todas_las_coincidencias(self):
+        # El tope de resultados paginables no acota los conteos
+        resultado = facetas.facetas_visitas('vivero', '', '')
+        self.assertEqual(self._conteos(resultado['resultado']), {'satisfactorio': 1, 'critico': 2})
+        resultado = facetas.facetas_checklists('aserradero')
+        self.assertEqual(self._conteos(resultado['estado']), {'pendiente': 2, 'completado': 1})
+
+    def test_una_consulta_y_luego_cache_por_busqueda(self):
+        facetas.facetas_visitas('', '', '')
+        with CaptureQueriesContext(connection) as consultas:
+            facetas.facetas_visitas('aserradero', '', '')
+        self.assertEqual(len([c for c in consultas if 'GROUP BY' in c['sql']]), 1)
+        with self.assertNumQueries(0):
+            facetas.facetas_visitas('aserradero', 'emergencia', '')
+            facetas.facetas_visitas('', '', 'critico')
+
+    def test_checklists_desde_el_resumen_y_con_busqueda(self):
+        reconstruir_resumen()
+        with CaptureQueriesContext(connection) as consultas:
+            resultado = facetas.facetas_checklists('')
+        self.assertNotIn('GROUP BY', consultas[0]['sql'])
+        self.assertEqual(self._conteos(resultado['estado']), {'pendiente': 2, 'completado': 1})
+        resultado = facetas.facetas_checklists('poda')
+        self.assertEqual(self._conteos(resultado['estado']), {'pendiente': 1, 'completado': 1})
+
+    def test_conteos_en_el_listado(self):
+        self.client.force_login(self.usuario)
+        response = self.client.get(reverse('visita_list'), {'q': 'vivero', 'resultado': 'critico'})
+        self.assertContains(response, 'Preventiva (1)')
+        self.assertContains(response, 'Emergencia (0)')
+        self.assertContains(response, 'Satisfactorio (1)')
+        response = self.client.get(reverse('checklist_list'), {'estado': 'pendiente'})
+        self.assertContains(response, 'Completado (1)')
+
+
+@override_settings(CHECKLIST_DUE_SOON_DAYS=3)
+class VencimientosTests(TestCase):
+    """
+    Escáner de vencimientos: solo cruces nuevos y un resumen por responsable
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ahora = timezone.now()
+        hoy = timezone.localdate(cls.ahora)
+        cls.jefe_aserradero = _crear_usuario('jefe_aserradero')
+        cls.jefe_vivero = _crear_usuario('jefe_vivero')
+
+        def checklist(titulo, responsable, dias, estado='pendiente'):
+            return Checklist.objects.create(
+                titulo=titulo, descripcion='-', area='Aserradero', estado=estado,
+                responsable=responsable, fecha_vencimiento=hoy + timedelta(days=dias),
+            )
+
+        cls.vencido = checklist('Revisión de motosierras', cls.jefe_aserradero, -2)
+        cls.por_vencer = checklist('Control de extintores', cls.jefe_aserradero, 1, 'en_progreso')
+        cls.lejano = checklist('Señalética del vivero', cls.jefe_vivero, 10)
+        cls.cerrado = checklist('Inspección de caminos', cls.jefe_vivero, -9, 'completado')
+
+    def _pasada(self, ahora):
+        vencimientos.escanear(ahora=ahora)
+        return vencimientos.enviar_resumenes()
+
+    def test_primera_pasada_y_resumen_por_responsable(self):
+        self.assertEqual(self._pasada(self.ahora), (1, 2))
+        self.assertEqual(len(mail.outbox), 1)
+        correo = mail.outbox[0]
+        self.assertEqual(correo.to, ['jefe_aserradero@example.com'])
+        self.assertIn('Checklists vencidos (1)', correo.body)
+        self.assertIn('Revisión de motosierras', correo.body)
+        self.assertIn('Checklists por vencer (1)', correo.body)
+        self.assertNotIn('Inspección de caminos', correo.body)
+
+        # Una pasada sin cruces nuevos no vuelve a avisar
+        self.assertEqual(self._pasada(self.ahora + timedelta(minutes=5)), (0, 0))
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_solo_cruces_nuevos_por_el_paso_del_tiempo(self):
+        self._pasada(self.ahora)
+        mail.outbox.clear()
+
+        # Diez días después: el que estaba por vencer venció y el lejano está por vencer
+        self.assertEqual(self._pasada(self.ahora + timedelta(days=10)), (2, 2))
+        cuerpos = {correo.to[0]: correo.body for correo in mail.outbox}
+        self.assertIn('Checklists vencidos (1)', cuerpos['jefe_aserradero@example.com'])
+        self.assertNotIn('Revisión de motosierras', cuerpos['jefe_aserradero@example.com'])
+        self.assertIn('Checklists por vencer (1)', cuerpos['jefe_vivero@example.com'])
+        self.assertEqual(
+            set(AvisoVencimiento.objects.values_list('checklist_id', 'tipo')),
+            {(self.vencido.pk, 'vencido'), (self.por_vencer.pk, 'proximo'),
+             (self.por_vencer.pk, 'vencido'), (self.lejano.pk, 'proximo')},
+        )
+
+    def test_registros_modificados_desde_la_pasada_anterior(self):
+        self._pasada(self.ahora)
+        mail.outbox.clear()
+
+        # Creado ya vencido y reabierto: no cruzan por el paso del tiempo
+        Checklist.objects.create(
+            titulo='Botiquines', descripcion='-', area='Vivero Central', responsable=self.jefe_vivero,
+            fecha_vencimiento=timezone.localdate(self.ahora) - timedelta(days=30),
+        )
+        cerrado = Checklist.objects.get(pk=self.cerrado.pk)
+        cerrado.estado = 'pendiente'
+        cerrado.save()
+
+        self.assertEqual(self._pasada(timezone.now()), (1, 2))
+        self.assertIn('Botiquines', mail.outbox[0].body)
+        self.assertIn('Inspección de caminos', mail.outbox[0].body)
+
+    def test_avisos_de_checklists_cerrados_o_sin_correo_no_se_envian(self):
+        vencimientos.escanear(ahora=self.ahora)
+        Checklist.objects.filter(pk=self.vencido.pk).update(estado='completado')
+        User.objects.filter(pk=self.jefe_aserradero.pk).update(email='')
+        with self.assertLogs('seguridad_app.vencimientos', 'WARNING') as registros:
+            self.assertEqual(vencimientos.enviar_resumenes(), (0, 0))
+        self.assertEqual(
+            registros.output,
+            ['WARNING:seguridad_app.vencimientos:El usuario jefe_aserradero no tiene correo; se omiten 1 avisos'],
+        )
+        self.assertFalse(AvisoVencimiento.objects.filter(fecha_envio__isnull=True).exists())
+
+    def test_destinatario_rechazado_no_detiene_la_cola(self):
+        Checklist.objects.create(
+            titulo='Botiquines', descripcion='-', area='Vivero Central', responsable=self.jefe_vivero,
+            fecha_vencimiento=timezone.localdate(self.ahora) - timedelta(days=1),
+        )
+        vencimientos.escanear(ahora=self.ahora)
+        enviar = mail.backends.locmem.EmailBackend.send_messages
+
+        def rechazar(backend, mensajes):
+            if mensajes[0].to == ['jefe_aserradero@example.com']:
+                raise smtplib.SMTPRecipientsRefused({'jefe_aserradero@example.com': (550, b'Mailbox unavailable')})
+            return enviar(backend, mensajes)
+
+        with mock.patch.object(mail.backends.locmem.EmailBackend, 'send_messages', rechazar), \
+                self.assertLogs('seguridad_app.vencimientos', 'WARNING'):
+            self.assertEqual(vencimientos.enviar_resumenes(lote=1, ahora=self.ahora), (1, 1))
+        self.assertEqual([correo.to for correo in mail.outbox], [['jefe_vivero@example.com']])
+        rechazados = AvisoVencimiento.objects.filter(checklist__responsable=self.jefe_aserradero)
+        self.assertEqual(
+            set(rechazados.values_list('fecha_envio', 'fallos')), {(None, 1)},
+        )
+        self.assertIn('Mailbox unavailable', rechazados.first().ultimo_error)
+
+        # Se reintenta recién pasado el plazo
+        self.assertEqual(vencimientos.enviar_resumenes(ahora=self.ahora + timedelta(minutes=5)), (0, 0))
+        self.assertEqual(vencimientos.enviar_resumenes(ahora=self.ahora + timedelta(minutes=61)), (1, 2))
+        self.assertFalse(AvisoVencimiento.objects.filter(fecha_envio__isnull=True).exists())
+
+    def test_comando_una_pasada(self):
+        salida = io.StringIO()
+        call_command('escanear_vencimientos', '--una-vez', stdout=salida)
+        self.assertIn('2 avisos enviados en 1 correos', salida.getvalue())
+
+
+class SeguimientosTests(TestCase):
+    """
+    Cola de seguimientos: orden por severidad, antigüedad y área, y toma sin repetidos
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = _crear_usuario()
+        cls.otro = _crear_usuario('supervisor_vivero')
+        cls.aserradero = Checklist.objects.create(
+            titulo='Revisión de motosierras', descripcion='-', area='Aserradero',
+            responsable=cls.usuario, fecha_vencimiento='2024-06-01',
+        )
+        cls.vivero = Checklist.objects.create(
+            titulo='Control de extintores', descripcion='-', area='Vivero Central',
+            responsable=cls.usuario, fecha_vencimiento='2024-06-01',
+        )
+
+        def visita(codigo, resultado, fecha, checklist, seguimiento=True):
+            return Visita.objects.create(
+                codigo_visita=codigo, tipo_visita='preventiva', fecha_visita=fecha,
+                hora_inicio='09:00', hora_fin='10:00', lugar='Cancha de Acopio', inspector=cls.usuario,
+                checklist=checklist,
+                hallazgos='-', resultado=resultado, recomendaciones='-', requiere_seguimiento=seguimiento,
+            )
+
+        cls.menor = visita('VIS-0001', 'observaciones_menores', '2024-01-01', cls.aserradero)
+        cls.critica_reciente = visita('VIS-0002', 'critico', '2024-05-01', cls.aserradero)
+        cls.critica_vivero = visita('VIS-0003', 'critico', '2024-03-01', cls.vivero)
+        cls.critica_aserradero = visita('VIS-0004', 'critico', '2024-03-01', cls.aserradero)
+        cls.sin_seguimiento = visita('VIS-0005', 'critico', '2024-01-01', cls.vivero, seguimiento=False)
+
+    def _orden(self):
+        return list(seguimientos.disponibles().values_list('visita__codigo_visita', flat=True))
+
+    def test_orden_de_la_cola(self):
+        self.assertEqual(self._orden(), ['VIS-0004', 'VIS-0003', 'VIS-0002', 'VIS-0001'])
+
+    def test_las_senales_mantienen_la_cola(self):
+        visita = Visita.objects.get(pk=self.menor.pk)
+        visita.resultado = 'critico'
+        visita.save()
+        self.assertEqual(self._orden()[0], 'VIS-0001')
+
+        visita = Visita.objects.get(pk=self.sin_seguimiento.pk)
+        visita.requiere_seguimiento = True
+        visita.save()
+        # Misma severidad y fecha que VIS-0001: desempata el área
+        self.assertEqual(self._orden()[:2], ['VIS-0001', 'VIS-0005'])
+
+        checklist = Checklist.objects.get(pk=self.vivero.pk)
+        checklist.area = 'Aserradero Norte'
+        checklist.save()
+        self.assertEqual(Seguimiento.objects.get(visita=self.critica_vivero).area, 'Aserradero Norte')
+
+        Visita.objects.get(pk=self.critica_reciente.pk).delete()
+        self.assertNotIn('VIS-0002', self._orden())
+
+    def test_toma_no_repite_y_vence(self):
+        ahora = timezone.now()
+        primero = seguimientos.tomar(self.usuario, ahora)
+        segundo = seguimientos.tomar(self.otro, ahora)
+        self.assertEqual(primero.visita_id, self.critica_aserradero.pk)
+        self.assertEqual(segundo.visita_id, self.critica_vivero.pk)
+        self.assertEqual(list(seguimientos.tomados_por(self.usuario, ahora)), [primero])
+
+        # Pasado el plazo, el seguimiento vuelve a estar disponible
+        despues = ahora + timedelta(minutes=settings.FOLLOWUP_CLAIM_MINUTES + 1)
+        self.assertEqual(seguimientos.tomar(self.otro, despues).pk, primero.pk)
+
+    def test_tomas_concurrentes_no_se_repiten(self):
+        ahora = timezone.now()
+        tomados = [seguimientos.tomar(self.usuario, ahora) for _ in range(5)]
+        self.assertEqual(len({s.pk for s in tomados if s}), 4)
+        self.assertIsNone(tomados[-1])
+
+    def test_vistas_tomar_y_resolver(self):
+        self.client.force_login(self.usuario)
+        response = self.client.get(reverse('seguimiento_list'))
+        self.assertEqual(
+            [s.visita_id for s in response.context['seguimientos']][:2],
+            [self.critica_aserradero.pk, self.critica_vivero.pk],
+        )
+
+        response = self.client.post(reverse('seguimiento_tomar'))
+        self.assertRedirects(response, reverse('visita_detail', args=[self.critica_aserradero.pk]))
+        seguimiento = Seguimiento.objects.get(visita=self.critica_aserradero)
+        self.assertEqual(seguimiento.tomado_por, self.usuario)
+
+        # Otro supervisor no puede resolver un seguimiento ajeno
+        self.client.force_login(self.otro)
+        response = self.client.post(reverse('seguimiento_resolver', args=[seguimiento.pk]))
+        self.assertEqual(response.status_code, 404)
+
+        self.client.force_login(self.usuario)
+        self.client.post(reverse('seguimiento_resolver', args=[seguimiento.pk]))
+        self.assertFalse(Seguimiento.objects.filter(pk=seguimiento.pk).exists())
+        self.assertFalse(Visita.objects.get(pk=self.critica_aserradero.pk).requiere_seguimiento)
+
+    def test_api_tomar_y_cola_vacia(self):
+        self.client.force_login(self.usuario)
+        datos = self.client.post(reverse('api_seguimiento_tomar')).json()
+        self.assertEqual(datos['codigo_visita'], 'VIS-0004')
+        self.assertEqual(datos['tomado_por'], self.usuario.username)
+
+        datos = self.client.get(reverse('api_seguimientos')).json()
+        self.assertEqual([s['codigo_visita'] for s in datos['tomados']], ['VIS-0004'])
+        self.assertEqual(len(datos['disponibles']), 3)
+
+        Seguimiento.objects.all().delete()
+        self.assertEqual(self.client.post(reverse('api_seguimiento_tomar')).status_code, 204)
+
+    def test_importacion_masiva_encola(self):
+        resultado = ImportadorVisita(usuario_por_defecto=self.usuario).importar(enumerate([{
+            'codigo_visita': 'VIS-0100', 'tipo_visita': 'correctiva', 'fecha_visita': '2023-12-01',
+            'hora_inicio': '08:00', 'hora_fin': '09:00', 'lugar': 'Vivero', 'hallazgos': '-', 'resultado': 'critico',
+            'recomendaciones': '-', 'requiere_seguimiento': 'si', 'checklist': str(self.vivero.pk),
+        }], start=2))
+        self.assertEqual(resultado.creadas, 1)
+        self.assertEqual(self._orden()[0], 'VIS-0100')
+        self.assertEqual(Seguimiento.objects.get(visita__codigo_visita='VIS-0100').area, 'Vivero Central')
+
+
+class ImportacionTests(TestCase):
+    """
+    Importación masiva: validación por fila, reporte de errores y consultas por bloque
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = _crear_usuario()
+        cls.inspector = _crear_usuario('inspector1')
+        cls.checklist = Checklist.objects.create(
+            titulo='Revisión de motosierras', descripcion='-', area='Aserradero',
+            responsable=cls.usuario, fecha_vencimiento='2030-01-01',
+        )
+        Visita.objects.create(
+            codigo_visita='VIS-0001', tipo_visita='preventiva', fecha_visita='2024-05-01',
+            hora_inicio='09:00', hora_fin='10:00', lugar='Cancha de Acopio', inspector=cls.usuario,
+            hallazgos='-', resultado='satisfactorio', recomendaciones='-',
+        )
+        reconstruir_resumen()
+
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio, ignore_errors=True)
+
+    def _fila(self, codigo, **valores):
+        return {
+            'codigo_visita': codigo, 'tipo_visita': 'preventiva', 'fecha_visita': '2024-06-01',
+            'hora_inicio': '08:00', 'hora_fin': '09:00', 'lugar': 'Vivero Central', 'inspector': '',
+            'checklist': '', 'hallazgos': '-', 'resultado': 'satisfactorio', 'recomendaciones': '-',
+            'requiere_seguimiento': '', **valores,
+        }
+
+    def _csv(self, filas):
+        ruta = f'{self.directorio}/visitas.csv'
+        with open(ruta, 'w', encoding='utf-8', newline='') as archivo:
+            writer = csv.DictWriter(archivo, fieldnames=list(filas[0]))
+            writer.writeheader()
+            writer.writerows(filas)
+        return ruta
+
+    def test_comando_valida_cada_fila_y_escribe_el_reporte(self):
+        ruta = self._csv([
+            self._fila('VIS-0100', inspector='inspector1', checklist=str(self.checklist.pk), resultado='critico'),
+            self._fila('VIS-0101', tipo_visita='rutinaria'),
+            self._fila('VIS-0102', inspector='nadie'),
+            self._fila('VIS-0103', checklist='999999'),
+            self._fila('VIS-0001'),
+            self._fila('VIS-0104', fecha_visita='2024-13-45', requiere_seguimiento='sí'),
+            self._fila('VIS-0105', requiere_seguimiento='sí'),
+            # Repetida en otro bloque: ya quedó insertada por el bloque anterior
+            self._fila('VIS-0100'),
+        ])
+        reporte = f'{self.directorio}/errores.csv'
+        salida = io.StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('importar_registros', 'visitas', ruta, usuario='supervisor', chunk=4,
+                         errores=reporte, stdout=salida)
+
+        self.assertIn('Filas procesadas: 8 - creadas: 2 - con error: 6', salida.getvalue())
+        creadas = {visita.codigo_visita: visita for visita in Visita.objects.filter(codigo_visita__gte='VIS-0100')}
+        self.assertEqual(set(creadas), {'VIS-0100', 'VIS-0105'})
+        self.assertEqual(creadas['VIS-0100'].inspector, self.inspector)
+        self.assertEqual(creadas['VIS-0100'].checklist, self.checklist)
+        self.assertEqual(creadas['VIS-0105'].inspector, self.usuario)
+        self.assertTrue(creadas['VIS-0105'].requiere_seguimiento)
+
+        with open(reporte, encoding='utf-8', newline='') as archivo:
+            errores = list(csv.reader(archivo))
+        self.assertEqual(errores[0], ['fila', 'error'])
+        self.assertEqual([numero for numero, _ in errores[1:]], ['3', '4', '5', '6', '7', '9'])
+        mensajes = dict(errores[1:])
+        self.assertIn('tipo_visita', mensajes['3'])
+        self.assertIn('el usuario "nadie" no existe', mensajes['4'])
+        self.assertIn('el checklist "999999" no existe', mensajes['5'])
+        self.assertIn('"VIS-0001" ya existe', mensajes['6'])
+        self.assertIn('fecha_visita', mensajes['7'])
+        self.assertIn('"VIS-0100" ya existe', mensajes['9'])
+
+        # Los contadores del dashboard suman solo las filas insertadas
+        resumen = obtener_resumen()
+        self.assertEqual((resumen['visitas_total'], resumen['visitas_critico']), (3, 1))
+        self.assertEqual(resumen['visitas_seguimiento'], 1)
+
+    def test_repetida_en_el_mismo_bloque(self):
+        resultado = ImportadorVisita(usuario_por_defecto=self.usuario).importar(enumerate([
+            self._fila('VIS-0200'), self._fila('VIS-0200'),
+        ], start=2))
+        self.assertEqual(resultado.creadas, 1)
+        self.assertEqual(resultado.errores, [(3, 'codigo_visita: "VIS-0200" está repetido en el archivo')])
+
+    def test_referencias_con_una_consulta_por_bloque(self):
+        def consultas(cantidad):
+            filas = [
+                self._fila(f'VIS-{cantidad}-{i:04d}', inspector='inspector1', checklist=str(self.checklist.pk))
+                for i in range(cantidad)
+            ]
+            with CaptureQueriesContext(connection) as capturadas:
+                resultado = ImportadorVisita(chunk_size=100).importar(enumerate(filas, start=2))
+            self.assertEqual(resultado.creadas, cantidad)
+            return len(capturadas)
+
+        self.assertEqual(consultas(3), consultas(60))
+
+    def test_vista_con_json_lines(self):
+        self.client.force_login(self.usuario)
+        lineas = [
+            json.dumps(self._fila('VIS-0300')),
+            '{no es json',
+            '[1, 2]',
+            '',
+            json.dumps(self._fila('VIS-0301', resultado='desconocido')),
+        ]
+        archivo = SimpleUploadedFile('visitas.jsonl', '\n'.join(lineas).encode(), content_type='application/jsonl')
+        response = self.client.post(reverse('importar'), {'modelo': 'visitas', 'archivo': archivo})
+
+        self.assertEqual(response.status_code, 200)
+        resultado = response.context['resultado']
+        self.assertEqual((resultado.procesadas, resultado.creadas), (4, 1))
+        self.assertEqual([numero for numero, _ in resultado.errores], [2, 3, 5])
+        self.assertIn('JSON inválido en la línea 2', resultado.errores[0][1])
+        self.assertIn('no es un objeto JSON', resultado.errores[1][1])
+        self.assertIn('resultado', resultado.errores[2][1])
+        self.assertContains(response, '3 fila(s) con errores')
+        self.assertTrue(Visita.objects.filter(codigo_visita='VIS-0300', inspector=self.usuario).exists())
+
+
+class CursorExplain:
+    """
+    Cursor con las filas de EXPLAIN de otro motor
+    """
+
+    def __init__(self, columnas, filas):
+        self.description = [(columna,) for columna in columnas]
+        self.filas = filas
+        self.ejecutadas = []
+
+    def execute(self, sql, params):
+        self.ejecutadas.append(sql)
+
+    def fetchall(self):
+        return self.filas
+
+
+class ExplicarConsultasTests(TestCase):
+    """
+    Verificador de planes: pasa con los índices del modelo y marca recorridos y ordenamientos
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        datos_sinteticos.generar(usuarios=3, checklists=10, visitas=30, semilla=1)
+
+    def _explicar(self, *opciones):
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio, ignore_errors=True)
+        salida = f'{directorio}/planes.json'
+        stdout = io.StringIO()
+        try:
+            call_command('explicar_consultas', '--bd-actual', '--salida', salida, *opciones, stdout=stdout)
+            error = None
+        except CommandError as exc:
+            error = exc
+        with open(salida, encoding='utf-8') as archivo:
+            return json.load(archivo), stdout.getvalue(), error
+
+    def test_todas_las_vistas_usan_indices(self):
+        reporte, salida, error = self._explicar()
+        self.assertIsNone(error)
+        self.assertIn('Todas las consultas usan índices', salida)
+        self.assertIn(reverse('visita_list') + '?tipo=preventiva', reporte)
+        self.assertTrue(all(consulta['plan'] for vista in reporte.values() for consulta in vista))
+
+    def test_sin_el_indice_del_listado_se_marca_la_vista(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DROP INDEX visitas_fecha_hora_idx')
+        reporte, salida, error = self._explicar()
+        self.assertIn('problema(s) de plan de ejecución', str(error))
+        problemas = [tuple(p) for consulta in reporte[reverse('visita_list')] for p in consulta['problemas']]
+        self.assertTrue(any(tipo in ('scan', 'filesort') for tipo, _ in problemas), problemas)
+        self.assertIn(f'{reverse("visita_list")}: ', salida)
+
+    def test_explicadores_por_motor(self):
+        with connection.cursor() as cursor:
+            self.assertEqual(explicar_consultas._explicar_sqlite(
+                cursor, 'SELECT id FROM visitas WHERE lugar = %s', ['x'])[1], [('scan', 'visitas')])
+            _, problemas = explicar_consultas._explicar_sqlite(cursor, 'SELECT id FROM visitas ORDER BY lugar', [])
+            self.assertEqual([tipo for tipo, _ in problemas], ['scan', 'filesort'])
+            self.assertEqual(explicar_consultas._explicar_sqlite(
+                cursor, 'SELECT id FROM visitas WHERE id = %s', [1])[1], [])
+
+        mysql = CursorExplain(['table', 'type', 'key', 'rows', 'Extra'], [
+            ('visitas', 'ALL', None, 30, 'Using where; Using filesort'),
+            ('auth_user', 'eq_ref', 'PRIMARY', 1, None),
+        ])
+        plan, problemas = explicar_consultas._explicar_mysql(mysql, 'SELECT 1', [])
+        self.assertEqual(problemas, [('scan', 'visitas'), ('filesort', 'visitas')])
+        self.assertEqual(len(plan), 2)
+
+        postgresql = CursorExplain(['QUERY PLAN'], [
+            ('Limit  (cost=0.1..1.2 rows=26 width=8)',),
+            ('  ->  Sort  (cost=0.1..1.1 rows=30 width=8)',),
+            ('        ->  Seq Scan on visitas  (cost=0.00..1.30 rows=30 width=8)',),
+        ])
+        _, problemas = explicar_consultas._explicar_postgresql(postgresql, 'SELECT 1', [])
+        self.assertEqual([tipo for tipo, _ in problemas], ['filesort', 'scan'])
+        self.assertEqual(problemas[1], ('scan', 'visitas'))
+
+
+class LatenciaListadosTests(TestCase):
+    """
+    Techos gruesos de latencia de los listados con 10k visitas
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        usuarios, checklists, visitas = datos_sinteticos.TAMANOS['10k']
+        datos_sinteticos.generar(usuarios, checklists, visitas, semilla=3)
+        cls.usuario = _crear_usuario()
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def _mediana_ms(self, url, repeticiones=5):
+        self.client.get(url)
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            response = self.client.get(url)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+            self.assertEqual(response.status_code, 200, url)
+        return statistics.median(tiempos)
+
+    def test_listados_bajo_el_techo_de_latencia(self):
+        urls = [
+            reverse('visita_list'),
+            reverse('visita_list') + '?resultado=critico',
+            reverse('visita_list') + '?q=critico',
+            reverse('checklist_list'),
+            reverse('checklist_list') + '?estado=pendiente',
+            reverse('checklist_list') + '?q=motosierras',
+        ]
+        self.assertEqual(Visita.objects.count(), datos_sinteticos.TAMANOS['10k'][2])
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertLess(self._mediana_ms(url), LATENCIA_MAXIMA_MS)
+
+    def test_pagina_profunda_cuesta_lo_mismo_que_la_primera(self):
+        url = reverse('visita_list')
+        response = self.client.get(url)
+        for _ in range(20):
+            response = self.client.get(url, {'cursor': response.context['page'].next_cursor})
+        with CaptureQueriesContext(connection) as profunda:
+            self.client.get(url, {'cursor': response.context['page'].next_cursor})
+        with CaptureQueriesContext(connection) as primera:
+            self.client.get(url)
+        self.assertEqual(len(profunda), len(primera))
+        self.assertTrue(Checklist.objects.exists())
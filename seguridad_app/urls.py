@@ -2,32 +2,73 @@
 Sistema de Gestión de Seguridad Forestal
 Configuración de URLs para la aplicación de seguridad
 
-Incluye rutas protegidas para las operaciones CRUD
+Incluye rutas protegidas para las operaciones CRUD. El dashboard, los
+listados y los detalles se sirven con las vistas de ``views.py`` (WSGI) o con
+las asíncronas de ``vistas_async.py`` (ASGI, ver ``urls_async.py``).
 """
 
-from django.urls import path
+from django.urls import path, re_path
 from . import views
 
-urlpatterns = [
-    # Rutas de autenticación
-    path('', views.login_view, name='home'),
-    path('login/', views.login_view, name='login'),
-    path('logout/', views.logout_view, name='logout'),
-    
-    # Dashboard (ruta protegida)
-    path('dashboard/', views.dashboard_view, name='dashboard'),
-    
-    # CRUD de Checklists (rutas protegidas)
-    path('checklists/', views.checklist_list_view, name='checklist_list'),
-    path('checklists/crear/', views.checklist_create_view, name='checklist_create'),
-    path('checklists/<int:pk>/', views.checklist_detail_view, name='checklist_detail'),
-    path('checklists/<int:pk>/editar/', views.checklist_edit_view, name='checklist_edit'),
-    path('checklists/<int:pk>/eliminar/', views.checklist_delete_view, name='checklist_delete'),
-    
-    # CRUD de Visitas (rutas protegidas)
-    path('visitas/', views.visita_list_view, name='visita_list'),
-    path('visitas/crear/', views.visita_create_view, name='visita_create'),
-    path('visitas/<int:pk>/', views.visita_detail_view, name='visita_detail'),
-    path('visitas/<int:pk>/editar/', views.visita_edit_view, name='visita_edit'),
-    path('visitas/<int:pk>/eliminar/', views.visita_delete_view, name='visita_delete'),
-]
+
+def rutas(lectura):
+    """
+    Rutas de la aplicación; ``lectura`` es el módulo del dashboard, los listados y los detalles
+    """
+    return [
+        # Rutas de autenticación
+        path('', views.login_view, name='home'),
+        path('login/', views.login_view, name='login'),
+        path('logout/', views.logout_view, name='logout'),
+        
+        # Dashboard (ruta protegida)
+        path('dashboard/', lectura.dashboard_view, name='dashboard'),
+        
+        # CRUD de Checklists (rutas protegidas)
+        path('checklists/', lectura.checklist_list_view, name='checklist_list'),
+        path('checklists/autocompletar/', views.checklist_autocomplete_view, name='checklist_autocomplete'),
+        path('checklists/exportar/', views.checklist_export_view, name='checklist_export'),
+        path('checklists/crear/', views.checklist_create_view, name='checklist_create'),
+        path('checklists/<int:pk>/', lectura.checklist_detail_view, name='checklist_detail'),
+        path('checklists/<int:pk>/editar/', views.checklist_edit_view, name='checklist_edit'),
+        path('checklists/<int:pk>/eliminar/', views.checklist_delete_view, name='checklist_delete'),
+        
+        # CRUD de Visitas (rutas protegidas)
+        path('visitas/', lectura.visita_list_view, name='visita_list'),
+        path('visitas/exportar/', views.visita_export_view, name='visita_export'),
+        path('visitas/crear/', views.visita_create_view, name='visita_create'),
+        path('visitas/<int:pk>/', lectura.visita_detail_view, name='visita_detail'),
+        path('visitas/<int:pk>/editar/', views.visita_edit_view, name='visita_edit'),
+        path('visitas/<int:pk>/eliminar/', views.visita_delete_view, name='visita_delete'),
+        
+        # Fotos de evidencia (rutas protegidas; solo miniatura y versión web)
+        path('visitas/<int:pk>/fotos/', views.visita_fotos_view, name='visita_fotos'),
+        re_path(
+            r'^fotos/(?P<sha256>[0-9a-f]{64})/(?P<version>miniatura|web)\.jpg$',
+            views.foto_view,
+            name='foto',
+        ),
+        
+        # Cola de seguimientos (rutas protegidas)
+        path('seguimientos/', views.seguimiento_list_view, name='seguimiento_list'),
+        path('seguimientos/tomar/', views.seguimiento_tomar_view, name='seguimiento_tomar'),
+        path('seguimientos/<int:pk>/liberar/', views.seguimiento_liberar_view, name='seguimiento_liberar'),
+        path('seguimientos/<int:pk>/resolver/', views.seguimiento_resolver_view, name='seguimiento_resolver'),
+        
+        # Importación masiva (ruta protegida)
+        path('importar/', views.importar_view, name='importar'),
+        
+        # Sincronización de dispositivos sin conexión (API JSON)
+        path('api/sync/', views.sync_cambios_view, name='sync_cambios'),
+        path('api/sync/visitas/', views.sync_visitas_view, name='sync_visitas'),
+        
+        # Cola de seguimientos (API JSON)
+        path('api/seguimientos/', views.api_seguimientos_view, name='api_seguimientos'),
+        path('api/seguimientos/tomar/', views.api_seguimiento_tomar_view, name='api_seguimiento_tomar'),
+        
+        # Métricas de rendimiento (ruta protegida)
+        path('metricas/', views.metricas_view, name='metricas'),
+    ]
+
+
+urlpatterns = rutas(views)
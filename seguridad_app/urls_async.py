@@ -0,0 +1,17 @@
+"""
+Sistema de Gestión de Seguridad Forestal
+Configuración de URLs de la aplicación bajo ASGI
+
+Las mismas rutas que ``urls.py``, con las vistas asíncronas de
+``vistas_async.py`` en el dashboard, los listados y los detalles, más los
+eventos en vivo del dashboard.
+"""
+
+from django.urls import path
+
+from . import vistas_async
+from .urls import rutas
+
+urlpatterns = rutas(vistas_async) + [
+    path('dashboard/eventos/', vistas_async.dashboard_eventos_view, name='dashboard_eventos'),
+]
@@ -0,0 +1,252 @@
+"""
+Sistema de Gestión de Seguridad Forestal
+Escáner de checklists vencidos y por vencer
+
+Un checklist abierto (pendiente o en progreso) cruza dos umbrales: queda
+"por vencer" ``CHECKLIST_DUE_SOON_DAYS`` días antes de su fecha de
+vencimiento y "vencido" al día siguiente de ella. Cada pasada de
+``escanear`` revisa solo los cruces nuevos desde la anterior:
+
+- por el paso del tiempo: los vencimientos entre la fecha procesada en la
+  pasada anterior y la de hoy, un rango del índice ``(estado, fecha_vencimiento)``;
+- por cambios en los registros: los checklists creados, reabiertos o con la
+  fecha modificada desde la pasada anterior, por el índice de
+  ``fecha_actualizacion``.
+
+Cada cruce queda como un ``AvisoVencimiento`` pendiente (la restricción
+única evita duplicados) y ``enviar_resumenes`` vacía la cola en lotes, con
+un solo correo por responsable; un destinatario rechazado no detiene la
+cola de los demás.
+"""
+
+import datetime
+import logging
+import smtplib
+
+from django.conf import settings
+from django.core import mail
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import AvisoVencimiento, Checklist, EstadoVencimientos
+
+
+logger = logging.getLogger(__name__)
+
+ESTADOS_ABIERTOS = ('pendiente', 'en_progreso')
+
+ESTADO_PK = 1
+
+# Las filas modificadas poco antes de la pasada anterior se vuelven a revisar,
+# por si su transacción confirmó después de esa pasada
+MARGEN_ACTUALIZACION = datetime.timedelta(minutes=1)
+
+CHUNK_SIZE = 2000
+
+
+def _dias_aviso(dias_aviso):
+    return dias_aviso if dias_aviso is not None else getattr(settings, 'CHECKLIST_DUE_SOON_DAYS', 3)
+
+
+def cola(hoy=None, dias_aviso=None):
+    """
+    Checklists abiertos vencidos o por vencer, del más atrasado al más próximo
+    """
+    hoy = hoy or timezone.localdate()
+    limite = hoy + datetime.timedelta(days=_dias_aviso(dias_aviso))
+    return Checklist.objects.filter(
+        estado__in=ESTADOS_ABIERTOS, fecha_vencimiento__lt=limite,
+    ).order_by('fecha_vencimiento', 'pk')
+
+
+def _tipo(fecha_vencimiento, hoy):
+    return 'vencido' if fecha_vencimiento < hoy else 'proximo'
+
+
+def _registrar(filas, hoy, ahora):
+    """
+    Crea los avisos de las filas ``(pk, fecha_vencimiento)`` en bloques; devuelve cuántas revisó
+    """
+    revisadas, bloque = 0, []
+    for pk, fecha_vencimiento in filas:
+        bloque.append(AvisoVencimiento(
+            checklist_id=pk, tipo=_tipo(fecha_vencimiento, hoy),
+            fecha_vencimiento=fecha_vencimiento, fecha_deteccion=ahora,
+        ))
+        if len(bloque) >= CHUNK_SIZE:
+            AvisoVencimiento.objects.bulk_create(bloque, ignore_conflicts=True)
+            revisadas += len(bloque)
+            bloque = []
+    if bloque:
+        AvisoVencimiento.objects.bulk_create(bloque, ignore_conflicts=True)
+        revisadas += len(bloque)
+    return revisadas
+
+
+def escanear(ahora=None, dias_aviso=None):
+    """
+    Registra los cruces nuevos desde la pasada anterior y devuelve cuántos checklists revisó
+    """
+    ahora = ahora or timezone.now()
+    hoy = timezone.localdate(ahora)
+    limite_proximo = hoy + datetime.timedelta(days=_dias_aviso(dias_aviso))
+
+    with transaction.atomic():
+        # Bloquea la fila de estado: dos escáneres no procesan el mismo rango
+        estado, _ = EstadoVencimientos.objects.select_for_update().get_or_create(pk=ESTADO_PK)
+        abiertos = Checklist.objects.filter(estado__in=ESTADOS_ABIERTOS).order_by()
+
+        # Cruces por el paso del tiempo (en la primera pasada, todo lo ya cruzado)
+        vencidos = abiertos.filter(fecha_vencimiento__lt=hoy)
+        if estado.vencido_hasta is not None:
+            vencidos = vencidos.filter(fecha_vencimiento__gte=estado.vencido_hasta)
+        proximos = abiertos.filter(
+            fecha_vencimiento__gte=max(hoy, estado.proximo_hasta or hoy),
+            fecha_vencimiento__lt=limite_proximo,
+        )
+        revisados = 0
+        for queryset in (vencidos, proximos):
+            revisados += _registrar(
+                queryset.values_list('pk', 'fecha_vencimiento').iterator(chunk_size=CHUNK_SIZE), hoy, ahora,
+            )
+
+        # Cruces por cambios en los registros desde la pasada anterior
+        # (solo por fecha_actualizacion, para que el plan use ese índice y no
+        # recorra la cola de vencidos; el resto de las condiciones se evalúa aquí)
+        if estado.ultima_pasada is not None:
+            modificados = Checklist.objects.filter(
+                fecha_actualizacion__gte=estado.ultima_pasada - MARGEN_ACTUALIZACION,
+            ).order_by().values_list('pk', 'estado', 'fecha_vencimiento')
+            revisados += _registrar(
+                (
+                    (pk, fecha_vencimiento)
+                    for pk, estado_checklist, fecha_vencimiento in modificados.iterator(chunk_size=CHUNK_SIZE)
+                    if estado_checklist in ESTADOS_ABIERTOS and fecha_vencimiento < limite_proximo
+                ),
+                hoy, ahora,
+            )
+
+        estado.vencido_hasta = max(hoy, estado.vencido_hasta or hoy)
+        estado.proximo_hasta = max(limite_proximo, estado.proximo_hasta or limite_proximo)
+        estado.ultima_pasada = ahora
+        estado.save()
+    return revisados
+
+
+# ---------------------------
+# Envío de resúmenes
+# ---------------------------
+
+def _resumen(usuario, avisos):
+    vencidos = [aviso for aviso in avisos if aviso.tipo == 'vencido']
+    proximos = [aviso for aviso in avisos if aviso.tipo == 'proximo']
+    lineas = [f'Hola {usuario.get_full_name() or usuario.username},', '']
+    for titulo, grupo in (('Checklists vencidos', vencidos), ('Checklists por vencer', proximos)):
+        if not grupo:
+            continue
+        lineas.append(f'{titulo} ({len(grupo)}):')
+        for aviso in grupo:
+            checklist = aviso.checklist
+            lineas.append(
+                f'  - {checklist.titulo} ({checklist.area}), vence el '
+                f'{checklist.fecha_vencimiento:%d/%m/%Y} [{checklist.get_estado_display()}]'
+            )
+        lineas.append('')
+    lineas.append('Sistema de Gestión de Seguridad Forestal')
+    return mail.EmailMessage(
+        subject=f'Checklists vencidos o por vencer: {len(avisos)}',
+        body='\n'.join(lineas),
+        to=[usuario.email],
+    )
+
+
+def _vigente(aviso):
+    # El checklist se cerró o cambió de fecha después de detectado el cruce
+    checklist = aviso.checklist
+    return checklist.estado in ESTADOS_ABIERTOS and checklist.fecha_vencimiento == aviso.fecha_vencimiento
+
+
+def _marcar(pks, **valores):
+    for inicio in range(0, len(pks), CHUNK_SIZE // 4):
+        AvisoVencimiento.objects.filter(pk__in=pks[inicio:inicio + CHUNK_SIZE // 4]).update(**valores)
+
+
+def _enviar(conexion, mensaje):
+    """
+    Envía un resumen; devuelve el error si el servidor lo rechazó o la conexión falló
+    """
+    try:
+        conexion.send_messages([mensaje])
+    except (smtplib.SMTPException, OSError) as exc:
+        # La conexión puede haber quedado inutilizable: el próximo envío abre otra
+        conexion.close()
+        return exc
+    return None
+
+
+def enviar_resumenes(lote=None, ahora=None):
+    """
+    Envía los avisos pendientes, un correo por responsable, de a ``lote`` responsables
+
+    Devuelve ``(correos, avisos)`` enviados. Cada correo se envía por
+    separado: los avisos de un resumen se marcan como enviados apenas el
+    servidor lo acepta, y si lo rechaza se registra el fallo en sus avisos,
+    que se reintentan pasados ``CHECKLIST_DIGEST_RETRY_MINUTES`` sin
+    detener la cola de los demás responsables.
+    """
+    lote = lote or getattr(settings, 'CHECKLIST_DIGEST_BATCH', 100)
+    ahora = ahora or timezone.now()
+    reintento = datetime.timedelta(minutes=getattr(settings, 'CHECKLIST_DIGEST_RETRY_MINUTES', 60))
+    pendientes = AvisoVencimiento.objects.filter(
+        Q(fecha_fallo__isnull=True) | Q(fecha_fallo__lt=ahora - reintento),
+        fecha_envio__isnull=True,
+    )
+    correos = avisos_enviados = 0
+
+    with mail.get_connection() as conexion:
+        while True:
+            responsables = list(
+                pendientes.order_by('checklist__responsable_id')
+                .values_list('checklist__responsable_id', flat=True)
+                .distinct()[:lote]
+            )
+            if not responsables:
+                break
+
+            avisos = (
+                pendientes.filter(checklist__responsable_id__in=responsables)
+                .select_related('checklist__responsable')
+                .only(
+                    'tipo', 'fecha_vencimiento', 'checklist', 'checklist__responsable',
+                    'checklist__titulo', 'checklist__area', 'checklist__estado', 'checklist__fecha_vencimiento', 'checklist__responsable__username',
+                    'checklist__responsable__first_name', 'checklist__responsable__last_name',
+                    'checklist__responsable__email',
+                )
+                .order_by('checklist__fecha_vencimiento', 'pk')
+            )
+            por_responsable = {}
+            descartados = []
+            for aviso in avisos:
+                if _vigente(aviso):
+                    por_responsable.setdefault(aviso.checklist.responsable, []).append(aviso)
+                else:
+                    descartados.append(aviso.pk)
+            # Los avisos de checklists cerrados o con otra fecha salen de la cola sin enviarse
+            _marcar(descartados, fecha_envio=ahora)
+
+            for usuario, grupo in por_responsable.items():
+                pks = [aviso.pk for aviso in grupo]
+                if not usuario.email:
+                    logger.warning('El usuario %s no tiene correo; se omiten %s avisos', usuario.username, len(grupo))
+                    _marcar(pks, fecha_envio=ahora)
+                    continue
+                error = _enviar(conexion, _resumen(usuario, grupo))
+                if error is None:
+                    _marcar(pks, fecha_envio=timezone.now())
+                    correos += 1
+                    avisos_enviados += len(grupo)
+                else:
+                    logger.warning('No se pudo enviar el resumen a %s: %s', usuario.email, error)
+                    _marcar(pks, fallos=F('fallos') + 1, fecha_fallo=ahora, ultimo_error=str(error)[:255])
+    return correos, avisos_enviados
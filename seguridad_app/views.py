@@ -6,7 +6,15 @@ Incluye:
 - Gestión de sesiones y autenticación
 - CRUD para Checklist
 - CRUD para Visita
+- Importación masiva desde CSV / JSON Lines
+- Exportación en streaming a CSV / XLSX
+- Métricas de rendimiento en formato Prometheus
 - Rutas protegidas con decoradores
+- Lectura desde réplicas en dashboard, listados y detalles
+- GET condicional (ETag / Last-Modified) en detalles, listados y exportaciones
+- API JSON de sincronización incremental para dispositivos sin conexión
+- Cola de seguimientos (HTML y API JSON) con toma concurrente
+- Fotos de evidencia de las visitas (subida a disco y versiones reducidas)
 """
 
 from django.shortcuts import render, redirect, get_object_or_404
@@ -14,9 +22,187 @@ from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.contrib.auth.models import User
-from django.db.models import Q
-from .models import Checklist, Visita
+from django.conf import settings
+from django.db.models import Count, Max, Q
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag, urlencode
+from django.utils.safestring import mark_safe
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_GET, require_POST
+from .models import Checklist, FotoVisita, Seguimiento, Visita
+from .importacion import IMPORTADORES, detectar_formato, leer_filas
+from .pagination import KeysetPaginator, RankedPaginator
+from .resumen import obtener_resumen
+from .routers import lectura_en_replica
+from . import condicional, exportacion, facetas, fotos, fragmentos, metrics, search, seguimientos, sincronizacion
 from datetime import datetime
+import json
+import zlib
+
+
+# ===========================
+# UTILIDADES
+# ===========================
+
+# Columnas que usa cada template; los TextField grandes (hallazgos,
+# recomendaciones, descripcion, observaciones) solo se cargan en el detalle
+# y en los formularios de edición.
+CAMPOS_CHECKLIST_LISTA = (
+    'titulo', 'area', 'estado', 'prioridad', 'fecha_creacion', 'fecha_vencimiento',
+    'fecha_actualizacion', 'responsable__username',
+)
+CAMPOS_CHECKLIST_RECIENTE = ('titulo', 'estado', 'area')
+CAMPOS_CHECKLIST_ELIMINAR = ('titulo', 'area', 'estado', 'prioridad', 'responsable__username')
+
+CAMPOS_VISITA_LISTA = (
+    'codigo_visita', 'tipo_visita', 'fecha_visita', 'hora_inicio', 'lugar',
+    'resultado', 'requiere_seguimiento', 'fecha_actualizacion', 'inspector__username',
+)
+CAMPOS_VISITA_RECIENTE = ('codigo_visita', 'lugar', 'resultado')
+CAMPOS_VISITA_CHECKLIST = (
+    'codigo_visita', 'fecha_visita', 'lugar', 'resultado', 'checklist', 'fecha_actualizacion',
+)
+CAMPOS_VISITA_ELIMINAR = (
+    'codigo_visita', 'tipo_visita', 'fecha_visita', 'lugar', 'resultado',
+    'requiere_seguimiento', 'inspector__username',
+)
+CAMPOS_SEGUIMIENTO_COLA = (
+    'prioridad', 'fecha_visita', 'area', 'fecha_toma', 'disponible_desde',
+    'visita__codigo_visita', 'visita__lugar', 'visita__resultado', 'tomado_por__username',
+)
+
+
+def _filtros_querystring(**filtros):
+    """
+    Querystring con los filtros activos, para conservarlos en los enlaces de paginación
+    """
+    return urlencode({clave: valor for clave, valor in filtros.items() if valor})
+
+
+def _checklist_seleccionado(checklist_id):
+    """
+    Valida el checklist elegido en el formulario de visitas
+
+    Devuelve ``(checklist, valido)``; un valor vacío es válido y equivale a
+    no asociar checklist.
+    """
+    if not checklist_id:
+        return None, True
+    if not str(checklist_id).isdigit():
+        return None, False
+    checklist = Checklist.objects.only('titulo', 'area').filter(pk=checklist_id).first()
+    return checklist, checklist is not None
+
+
+def _filtrar_checklists(checklists, estado_filter):
+    """
+    Filtros exactos del listado de checklists (compartidos con la exportación)
+    """
+    if estado_filter:
+        checklists = checklists.filter(estado=estado_filter)
+    return checklists
+
+
+def _filtrar_visitas(visitas, tipo_filter, resultado_filter):
+    """
+    Filtros exactos del listado de visitas (compartidos con la exportación)
+    """
+    if tipo_filter:
+        visitas = visitas.filter(tipo_visita=tipo_filter)
+    if resultado_filter:
+        visitas = visitas.filter(resultado=resultado_filter)
+    return visitas
+
+
+def _paginador(queryset, query):
+    """
+    Con búsqueda se ordena por relevancia; sin ella, por cursor sobre el orden del modelo
+    """
+    if query:
+        return RankedPaginator(queryset, search.buscar(queryset.model, query))
+    return KeysetPaginator(queryset, queryset.model._meta.ordering)
+
+
+def _contexto_dashboard(resumen, checklists_recientes, visitas_recientes):
+    return {
+        'total_checklists': resumen['checklists_total'],
+        'checklists_pendientes': resumen['checklists_pendiente'],
+        'checklists_completados': resumen['checklists_completado'],
+        'total_visitas': resumen['visitas_total'],
+        'visitas_criticas': resumen['visitas_critico'],
+        'visitas_seguimiento': resumen['visitas_seguimiento'],
+        'checklists_recientes': checklists_recientes,
+        'visitas_recientes': visitas_recientes,
+    }
+
+
+def _fotos_visita(pk):
+    return (
+        FotoVisita.objects.filter(visita_id=pk)
+        .select_related('foto')
+        .only('nombre', 'foto__sha256', 'foto__estado')
+    )
+
+
+def _contexto_visita_detalle(pk, fragmento):
+    return {
+        'fragmento': fragmento,
+        'contenido': mark_safe(fragmento['html']),
+        'visita_pk': pk,
+        'fotos_max': getattr(settings, 'PHOTO_MAX_PER_UPLOAD', 20),
+        'foto_max_mb': getattr(settings, 'PHOTO_MAX_BYTES', 15 * 1024 * 1024) // (1024 * 1024),
+    }
+
+
+# ---------------------------
+# Validación del GET condicional
+# ---------------------------
+
+def _version_exportacion(queryset, condiciones=None):
+    """
+    Cantidad y última modificación de las filas de una exportación
+
+    Una fila eliminada cambia la cantidad; una creada o editada, el máximo.
+    La exportación recorre todas las filas filtradas, así que esta consulta
+    agregada no cambia su orden de costo. ``condiciones`` son las de
+    ``search.coincidencias`` cuando hay búsqueda.
+    """
+    total, ultima = 0, None
+    for condicion in (condiciones if condiciones is not None else [Q()]):
+        version = queryset.filter(condicion).order_by().aggregate(
+            total=Count('pk'), ultima=Max('fecha_actualizacion'),
+        )
+        total += version['total']
+        if version['ultima'] is not None and (ultima is None or version['ultima'] > ultima):
+            ultima = version['ultima']
+    return (total, ultima), ultima
+
+
+def _fechas_checklist(checklist, visitas):
+    # El detalle incluye la tabla de visitas
+    return (checklist.fecha_actualizacion, max((v.fecha_actualizacion for v in visitas), default=None))
+
+
+def _fechas_visita(visita):
+    # El detalle muestra el título del checklist asociado
+    return (visita.fecha_actualizacion, visita.checklist.fecha_actualizacion if visita.checklist else None)
+
+
+def _version_detalle(fragmento):
+    """
+    Validación de un detalle desde su fragmento, sin consultas
+
+    Las versiones del fragmento cambian con todo lo que lo invalida (también
+    las fotos y las visitas eliminadas); las fechas dan el ``Last-Modified``.
+    Un fragmento que no se guardó (leído de una réplica) no se valida.
+    """
+    if None in fragmento['versiones']:
+        return None
+    fechas = [fecha for fecha in fragmento.get('fechas', ()) if fecha is not None]
+    return (fragmento['versiones'], *fechas), max(fechas, default=None)
 
 
 # ===========================
@@ -62,37 +248,22 @@ def logout_view(request):
 # ===========================
 
 @login_required
+@lectura_en_replica
 def dashboard_view(request):
     """
     Vista principal del dashboard
     Muestra resumen de checklists y visitas
     """
-    # Estadísticas de checklists
-    total_checklists = Checklist.objects.count()
-    checklists_pendientes = Checklist.objects.filter(estado='pendiente').count()
-    checklists_completados = Checklist.objects.filter(estado='completado').count()
-    
-    # Estadísticas de visitas
-    total_visitas = Visita.objects.count()
-    visitas_criticas = Visita.objects.filter(resultado='critico').count()
-    visitas_seguimiento = Visita.objects.filter(requiere_seguimiento=True).count()
+    # Contadores materializados (una sola fila)
+    resumen = obtener_resumen()
     
     # Checklists recientes
-    checklists_recientes = Checklist.objects.all()[:5]
+    checklists_recientes = Checklist.objects.only(*CAMPOS_CHECKLIST_RECIENTE)[:5]
     
     # Visitas recientes
-    visitas_recientes = Visita.objects.all()[:5]
+    visitas_recientes = Visita.objects.only(*CAMPOS_VISITA_RECIENTE)[:5]
     
-    context = {
-        'total_checklists': total_checklists,
-        'checklists_pendientes': checklists_pendientes,
-        'checklists_completados': checklists_completados,
-        'total_visitas': total_visitas,
-        'visitas_criticas': visitas_criticas,
-        'visitas_seguimiento': visitas_seguimiento,
-        'checklists_recientes': checklists_recientes,
-        'visitas_recientes': visitas_recientes,
-    }
+    context = _contexto_dashboard(resumen, checklists_recientes, visitas_recientes)
     
     return render(request, 'dashboard.html', context)
 
@@ -102,6 +273,7 @@ def dashboard_view(request):
 # ===========================
 
 @login_required
+@lectura_en_replica
 def checklist_list_view(request):
     """
     Vista para listar todos los checklists
@@ -110,25 +282,83 @@ def checklist_list_view(request):
     query = request.GET.get('q', '')
     estado_filter = request.GET.get('estado', '')
     
-    checklists = Checklist.objects.all()
-    
-    if query:
-        checklists = checklists.filter(
-            Q(titulo__icontains=query) | 
-            Q(area__icontains=query) |
-            Q(descripcion__icontains=query)
-        )
+    checklists = _filtrar_checklists(
+        Checklist.objects.select_related('responsable').only(*CAMPOS_CHECKLIST_LISTA),
+        estado_filter,
+    )
     
-    if estado_filter:
-        checklists = checklists.filter(estado=estado_filter)
+    page = _paginador(checklists, query).get_page(request.GET.get('cursor'))
+    facetas_checklists = facetas.facetas_checklists(query)
     
     context = {
-        'checklists': checklists,
+        'checklists': page.object_list,
+        'page': page,
+        'filtros': _filtros_querystring(q=query, estado=estado_filter),
+        'facetas': facetas_checklists,
         'query': query,
         'estado_filter': estado_filter,
     }
     
-    return render(request, 'checklist_list.html', context)
+    return condicional.responder(
+        request, condicional.version_pagina(page, facetas_checklists),
+        lambda: render(request, 'checklist_list.html', context),
+    )
+
+
+@login_required
+def checklist_export_view(request):
+    """
+    Vista para exportar en CSV o XLSX los checklists del listado filtrado
+    """
+    query = request.GET.get('q', '')
+    estado_filter = request.GET.get('estado', '')
+    formato = request.GET.get('formato', 'csv')
+    
+    if formato not in exportacion.FORMATOS:
+        formato = 'csv'
+    
+    checklists = _filtrar_checklists(Checklist.objects.all(), estado_filter)
+    # Con búsqueda se exportan todas las coincidencias, no solo las paginables
+    condiciones = search.coincidencias(Checklist, query) if query else None
+    
+    return condicional.responder(
+        request, _version_exportacion(checklists, condiciones),
+        lambda: exportacion.exportar(checklists, formato, 'checklists', condiciones),
+    )
+
+
+@login_required
+def checklist_autocomplete_view(request):
+    """
+    Vista JSON para el selector de checklist del formulario de visitas
+
+    Primero los títulos que comienzan con el texto y luego las áreas, ambos
+    por prefijo sobre su índice, hasta ``limite``. Solo se leen ``titulo`` y
+    ``area``: la descripción no participa.
+    """
+    query = request.GET.get('q', '').strip()
+    limite = getattr(settings, 'AUTOCOMPLETE_LIMIT', 10)
+    
+    resultados = []
+    if query:
+        checklists = Checklist.objects.only('titulo', 'area')
+        resultados = list(
+            checklists.filter(titulo__istartswith=query).order_by('titulo', 'pk')[:limite]
+        )
+        
+        if len(resultados) < limite:
+            resultados += list(
+                checklists.filter(area__istartswith=query)
+                .exclude(pk__in=[checklist.pk for checklist in resultados])
+                .order_by('area', 'titulo', 'pk')[:limite - len(resultados)]
+            )
+    
+    return JsonResponse({
+        'resultados': [
+            {'id': checklist.pk, 'texto': f'{checklist.titulo} - {checklist.area}'}
+            for checklist in resultados
+        ],
+    })
 
 
 @login_required
@@ -203,7 +433,10 @@ def checklist_delete_view(request, pk):
     """
     Vista para eliminar un checklist
     """
-    checklist = get_object_or_404(Checklist, pk=pk)
+    checklist = get_object_or_404(
+        Checklist.objects.select_related('responsable').only(*CAMPOS_CHECKLIST_ELIMINAR),
+        pk=pk,
+    )
     
     if request.method == 'POST':
         titulo = checklist.titulo
@@ -219,19 +452,35 @@ def checklist_delete_view(request, pk):
 
 
 @login_required
+@lectura_en_replica
 def checklist_detail_view(request, pk):
     """
     Vista para ver detalles de un checklist
     """
-    checklist = get_object_or_404(Checklist, pk=pk)
-    visitas = checklist.visitas.all()
+    # El contenido (con la tabla de visitas) se sirve desde la caché de fragmentos
+    fragmento, versiones = fragmentos.obtener('checklist', pk)
+    if fragmento is None:
+        checklist = get_object_or_404(Checklist.objects.select_related('responsable'), pk=pk)
+        visitas = list(checklist.visitas.only(*CAMPOS_VISITA_CHECKLIST))
+        fragmento = fragmentos.guardar(
+            'checklist', pk, versiones,
+            titulo=checklist.titulo,
+            fechas=_fechas_checklist(checklist, visitas),
+            html=render_to_string('checklist_detail_contenido.html', {
+                'checklist': checklist,
+                'visitas': visitas,
+            }),
+        )
     
     context = {
-        'checklist': checklist,
-        'visitas': visitas,
+        'fragmento': fragmento,
+        'contenido': mark_safe(fragmento['html']),
     }
     
-    return render(request, 'checklist_detail.html', context)
+    return condicional.responder(
+        request, _version_detalle(fragmento),
+        lambda: render(request, 'checklist_detail.html', context),
+    )
 
 
 # ===========================
@@ -239,6 +488,7 @@ def checklist_detail_view(request, pk):
 # ===========================
 
 @login_required
+@lectura_en_replica
 def visita_list_view(request):
     """
     Vista para listar todas las visitas
@@ -248,29 +498,51 @@ def visita_list_view(request):
     tipo_filter = request.GET.get('tipo', '')
     resultado_filter = request.GET.get('resultado', '')
     
-    visitas = Visita.objects.all()
-    
-    if query:
-        visitas = visitas.filter(
-            Q(codigo_visita__icontains=query) | 
-            Q(lugar__icontains=query) |
-            Q(hallazgos__icontains=query)
-        )
-    
-    if tipo_filter:
-        visitas = visitas.filter(tipo_visita=tipo_filter)
+    visitas = _filtrar_visitas(
+        Visita.objects.select_related('inspector').only(*CAMPOS_VISITA_LISTA),
+        tipo_filter,
+        resultado_filter,
+    )
     
-    if resultado_filter:
-        visitas = visitas.filter(resultado=resultado_filter)
+    page = _paginador(visitas, query).get_page(request.GET.get('cursor'))
+    facetas_visitas = facetas.facetas_visitas(query, tipo_filter, resultado_filter)
     
     context = {
-        'visitas': visitas,
+        'visitas': page.object_list,
+        'page': page,
+        'filtros': _filtros_querystring(q=query, tipo=tipo_filter, resultado=resultado_filter),
+        'facetas': facetas_visitas,
         'query': query,
         'tipo_filter': tipo_filter,
         'resultado_filter': resultado_filter,
     }
     
-    return render(request, 'visita_list.html', context)
+    return condicional.responder(
+        request, condicional.version_pagina(page, facetas_visitas),
+        lambda: render(request, 'visita_list.html', context),
+    )
+
+
+@login_required
+def visita_export_view(request):
+    """
+    Vista para exportar en CSV o XLSX las visitas del listado filtrado
+    """
+    query = request.GET.get('q', '')
+    tipo_filter = request.GET.get('tipo', '')
+    resultado_filter = request.GET.get('resultado', '')
+    formato = request.GET.get('formato', 'csv')
+    
+    if formato not in exportacion.FORMATOS:
+        formato = 'csv'
+    
+    visitas = _filtrar_visitas(Visita.objects.all(), tipo_filter, resultado_filter)
+    condiciones = search.coincidencias(Visita, query) if query else None
+    
+    return condicional.responder(
+        request, _version_exportacion(visitas, condiciones),
+        lambda: exportacion.exportar(visitas, formato, 'visitas', condiciones),
+    )
 
 
 @login_required
@@ -291,11 +563,9 @@ def visita_create_view(request):
         recomendaciones = request.POST.get('recomendaciones')
         requiere_seguimiento = request.POST.get('requiere_seguimiento') == 'on'
         
-        checklist = None
-        if checklist_id:
-            checklist = Checklist.objects.get(pk=checklist_id)
+        checklist, checklist_valido = _checklist_seleccionado(checklist_id)
         
-        visita = Visita.objects.create(
+        visita = Visita(
             codigo_visita=codigo_visita,
             tipo_visita=tipo_visita,
             fecha_visita=fecha_visita,
@@ -310,15 +580,22 @@ def visita_create_view(request):
             requiere_seguimiento=requiere_seguimiento
         )
         
-        messages.success(request, f'Visita "{visita.codigo_visita}" creada exitosamente.')
-        return redirect('visita_list')
-    
-    checklists = Checklist.objects.all()
+        if checklist_valido:
+            visita.save()
+            messages.success(request, f'Visita "{visita.codigo_visita}" creada exitosamente.')
+            return redirect('visita_list')
+        
+        messages.error(request, 'El checklist seleccionado no existe.')
+        context = {
+            'visita': visita,
+            'tipo_choices': Visita.TIPO_CHOICES,
+            'resultado_choices': Visita.RESULTADO_CHOICES,
+        }
+        return render(request, 'visita_form.html', context)
     
     context = {
         'tipo_choices': Visita.TIPO_CHOICES,
         'resultado_choices': Visita.RESULTADO_CHOICES,
-        'checklists': checklists,
     }
     
     return render(request, 'visita_form.html', context)
@@ -329,7 +606,9 @@ def visita_edit_view(request, pk):
     """
     Vista para editar una visita existente
     """
-    visita = get_object_or_404(Visita, pk=pk)
+    visita = get_object_or_404(Visita.objects.select_related('checklist').defer(
+        'checklist__descripcion', 'checklist__observaciones',
+    ), pk=pk)
     
     if request.method == 'POST':
         visita.codigo_visita = request.POST.get('codigo_visita')
@@ -339,29 +618,25 @@ def visita_edit_view(request, pk):
         visita.hora_fin = request.POST.get('hora_fin')
         visita.lugar = request.POST.get('lugar')
         
-        checklist_id = request.POST.get('checklist')
-        if checklist_id:
-            visita.checklist = Checklist.objects.get(pk=checklist_id)
-        else:
-            visita.checklist = None
+        checklist, checklist_valido = _checklist_seleccionado(request.POST.get('checklist'))
+        visita.checklist = checklist
         
         visita.hallazgos = request.POST.get('hallazgos')
         visita.resultado = request.POST.get('resultado')
         visita.recomendaciones = request.POST.get('recomendaciones')
         visita.requiere_seguimiento = request.POST.get('requiere_seguimiento') == 'on'
         
-        visita.save()
+        if checklist_valido:
+            visita.save()
+            messages.success(request, f'Visita "{visita.codigo_visita}" actualizada exitosamente.')
+            return redirect('visita_list')
         
-        messages.success(request, f'Visita "{visita.codigo_visita}" actualizada exitosamente.')
-        return redirect('visita_list')
-    
-    checklists = Checklist.objects.all()
+        messages.error(request, 'El checklist seleccionado no existe.')
     
     context = {
         'visita': visita,
         'tipo_choices': Visita.TIPO_CHOICES,
         'resultado_choices': Visita.RESULTADO_CHOICES,
-        'checklists': checklists,
         'is_edit': True,
     }
     
@@ -373,7 +648,11 @@ def visita_delete_view(request, pk):
     """
     Vista para eliminar una visita
     """
-    visita = get_object_or_404(Visita, pk=pk)
+    # checklist_id lo usan las señales tras el borrado, cuando ya no se puede cargar
+    visita = get_object_or_404(
+        Visita.objects.select_related('inspector').only(*CAMPOS_VISITA_ELIMINAR, 'checklist'),
+        pk=pk,
+    )
     
     if request.method == 'POST':
         codigo = visita.codigo_visita
@@ -389,14 +668,342 @@ def visita_delete_view(request, pk):
 
 
 @login_required
+@lectura_en_replica
 def visita_detail_view(request, pk):
     """
     Vista para ver detalles de una visita
     """
-    visita = get_object_or_404(Visita, pk=pk)
+    fragmento, versiones = fragmentos.obtener('visita', pk)
+    if fragmento is None:
+        visita = get_object_or_404(
+            Visita.objects.select_related('inspector', 'checklist').defer(
+                'checklist__descripcion', 'checklist__observaciones',
+            ),
+            pk=pk,
+        )
+        fragmento = fragmentos.guardar(
+            'visita', pk, versiones,
+            titulo=visita.codigo_visita,
+            fechas=_fechas_visita(visita),
+            html=render_to_string('visita_detail_contenido.html', {
+                'visita': visita,
+                'fotos': list(_fotos_visita(pk)),
+            }),
+        )
+    
+    context = _contexto_visita_detalle(pk, fragmento)
+    
+    return condicional.responder(
+        request, _version_detalle(fragmento),
+        lambda: render(request, 'visita_detail.html', context),
+    )
+
+
+# ===========================
+# FOTOS DE EVIDENCIA
+# ===========================
+
+@csrf_exempt
+@login_required
+@require_POST
+def visita_fotos_view(request, pk):
+    """
+    Sube fotos de evidencia a una visita
+    
+    El handler de ``fotos.py`` escribe los archivos a disco mientras llegan;
+    se instala antes de que se lea ``request.POST``, por eso la verificación
+    CSRF se hace en ``_adjuntar_fotos`` y no en el middleware.
+    """
+    request.upload_handlers = [fotos.SubidaFotoHandler(request)]
+    return _adjuntar_fotos(request, pk)
+
+
+@csrf_protect
+def _adjuntar_fotos(request, pk):
+    visita = get_object_or_404(Visita.objects.only('pk'), pk=pk)
+    subidas = request.FILES.getlist(fotos.CAMPO)
+    omitidos = request.upload_handlers[0].omitidos
+    
+    adjuntadas, rechazadas = fotos.adjuntar(visita, subidas, request.user)
+    
+    if adjuntadas:
+        messages.success(request, f'{adjuntadas} foto(s) adjuntada(s). Las miniaturas estarán disponibles en unos segundos.')
+    if rechazadas:
+        messages.error(request, f'No son imágenes JPEG, PNG o WEBP: {", ".join(rechazadas)}')
+    if omitidos:
+        messages.error(
+            request,
+            f'Se omitieron por tamaño o cantidad (máximo {getattr(settings, "PHOTO_MAX_PER_UPLOAD", 20)} fotos de '
+            f'{getattr(settings, "PHOTO_MAX_BYTES", 15 * 1024 * 1024) // (1024 * 1024)} MB): {", ".join(omitidos)}',
+        )
+    if not (adjuntadas or rechazadas or omitidos):
+        messages.error(request, 'Seleccione al menos una foto.')
+    
+    return redirect('visita_detail', pk=pk)
+
+
+@login_required
+@require_GET
+def foto_view(request, sha256, version):
+    """
+    Sirve la miniatura o la versión web de una foto (nunca el original)
+    
+    La URL lleva el hash del contenido, así que la respuesta no cambia: el
+    navegador la guarda un año sin revalidar.
+    """
+    etag = quote_etag(f'{sha256}-{version}')
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        try:
+            archivo = open(fotos.ruta(sha256, version), 'rb')
+        except FileNotFoundError:
+            raise Http404('La foto no existe o aún se está procesando')
+        response = FileResponse(archivo, content_type='image/jpeg')
+    
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, max-age=31536000, immutable'
+    
+    return response
+
+
+# ===========================
+# COLA DE SEGUIMIENTOS
+# ===========================
+
+def _seguimiento_json(seguimiento):
+    visita = seguimiento.visita
+    return {
+        'id': seguimiento.pk,
+        'visita': visita.pk,
+        'codigo_visita': visita.codigo_visita,
+        'resultado': visita.resultado,
+        'fecha_visita': seguimiento.fecha_visita,
+        'area': seguimiento.area,
+        'lugar': visita.lugar,
+        'tomado_por': seguimiento.tomado_por.username if seguimiento.tomado_por else None,
+        'fecha_toma': seguimiento.fecha_toma,
+        'disponible_desde': seguimiento.disponible_desde,
+    }
+
+
+def _cola_seguimientos(queryset):
+    return queryset.select_related('visita', 'tomado_por').only(*CAMPOS_SEGUIMIENTO_COLA)
+
+
+@login_required
+def seguimiento_list_view(request):
+    """
+    Vista de la cola de seguimientos: los siguientes disponibles y los tomados por el usuario
+    """
+    page_size = getattr(settings, 'LIST_PAGE_SIZE', 25)
     
     context = {
-        'visita': visita,
+        'seguimientos': _cola_seguimientos(seguimientos.disponibles())[:page_size],
+        'mis_seguimientos': _cola_seguimientos(seguimientos.tomados_por(request.user)),
+        'total_pendientes': obtener_resumen()['visitas_seguimiento'],
+        'plazo_minutos': getattr(settings, 'FOLLOWUP_CLAIM_MINUTES', 30),
     }
     
-    return render(request, 'visita_detail.html', context)
+    return render(request, 'seguimiento_list.html', context)
+
+
+@login_required
+@require_POST
+def seguimiento_tomar_view(request):
+    """
+    Toma el siguiente seguimiento de la cola y abre su visita
+    """
+    seguimiento = seguimientos.tomar(request.user)
+    if seguimiento is None:
+        messages.info(request, 'No hay seguimientos disponibles.')
+        return redirect('seguimiento_list')
+    
+    messages.success(request, 'Seguimiento asignado. Resuélvalo o libérelo desde la cola de seguimientos.')
+    return redirect('visita_detail', pk=seguimiento.visita_id)
+
+
+@login_required
+@require_POST
+def seguimiento_liberar_view(request, pk):
+    """
+    Devuelve a la cola un seguimiento tomado por el usuario
+    """
+    seguimiento = get_object_or_404(seguimientos.tomados_por(request.user), pk=pk)
+    seguimientos.liberar(seguimiento)
+    messages.success(request, 'Seguimiento devuelto a la cola.')
+    return redirect('seguimiento_list')
+
+
+@login_required
+@require_POST
+def seguimiento_resolver_view(request, pk):
+    """
+    Marca como resuelto un seguimiento tomado por el usuario
+    """
+    seguimiento = get_object_or_404(seguimientos.tomados_por(request.user), pk=pk)
+    seguimientos.resolver(seguimiento)
+    messages.success(request, 'Seguimiento resuelto.')
+    return redirect('seguimiento_list')
+
+
+@login_required
+@require_GET
+def api_seguimientos_view(request):
+    """
+    API JSON: siguientes seguimientos disponibles (``?limite=``) y los tomados por el usuario
+    """
+    maximo = getattr(settings, 'LIST_PAGE_SIZE', 25)
+    limite = request.GET.get('limite', '')
+    limite = min(int(limite), 500) if limite.isdigit() and int(limite) > 0 else maximo
+    
+    return JsonResponse({
+        'disponibles': [
+            _seguimiento_json(s) for s in _cola_seguimientos(seguimientos.disponibles())[:limite]
+        ],
+        'tomados': [
+            _seguimiento_json(s) for s in _cola_seguimientos(seguimientos.tomados_por(request.user))
+        ],
+    })
+
+
+@login_required
+@require_POST
+def api_seguimiento_tomar_view(request):
+    """
+    API JSON: toma el siguiente seguimiento (204 si la cola está vacía)
+    """
+    seguimiento = seguimientos.tomar(request.user)
+    if seguimiento is None:
+        return HttpResponse(status=204)
+    seguimiento = _cola_seguimientos(Seguimiento.objects.all()).get(pk=seguimiento.pk)
+    return JsonResponse(_seguimiento_json(seguimiento))
+
+
+# ===========================
+# IMPORTACIÓN MASIVA
+# ===========================
+
+@login_required
+def importar_view(request):
+    """
+    Vista para importar visitas o checklists desde un archivo CSV o JSON Lines
+    """
+    modelo = request.POST.get('modelo', 'visitas')
+    resultado = None
+    
+    if request.method == 'POST':
+        archivo = request.FILES.get('archivo')
+        
+        if modelo not in IMPORTADORES:
+            messages.error(request, 'Tipo de registro no válido.')
+        elif archivo is None:
+            messages.error(request, 'Debe seleccionar un archivo.')
+        else:
+            importador = IMPORTADORES[modelo](usuario_por_defecto=request.user)
+            resultado = importador.importar(
+                leer_filas(archivo.file, detectar_formato(archivo.name))
+            )
+            
+            if resultado.errores:
+                messages.warning(
+                    request,
+                    f'Se importaron {resultado.creadas} registros; '
+                    f'{len(resultado.errores)} fila(s) con errores.'
+                )
+            else:
+                messages.success(request, f'Se importaron {resultado.creadas} registros exitosamente.')
+    
+    context = {
+        'modelo': modelo,
+        'resultado': resultado,
+        'errores': resultado.errores[:100] if resultado else [],
+    }
+    
+    return render(request, 'importar.html', context)
+
+
+# ===========================
+# API DE SINCRONIZACIÓN
+# ===========================
+
+def _cuerpo_json(request):
+    """
+    Lee el cuerpo JSON del request, descomprimiéndolo si viene en gzip
+
+    El tamaño descomprimido se limita a ``DATA_UPLOAD_MAX_MEMORY_SIZE``.
+    """
+    cuerpo = request.body
+    if request.headers.get('Content-Encoding', '').lower() == 'gzip':
+        maximo = settings.DATA_UPLOAD_MAX_MEMORY_SIZE or 2621440
+        descompresor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        try:
+            cuerpo = descompresor.decompress(cuerpo, maximo)
+        except zlib.error:
+            raise ValueError('Cuerpo gzip inválido')
+        if descompresor.unconsumed_tail:
+            raise ValueError('El cuerpo descomprimido supera el tamaño máximo')
+    try:
+        return json.loads(cuerpo)
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        raise ValueError('JSON inválido')
+
+
+@login_required
+@gzip_page
+@require_GET
+def sync_cambios_view(request):
+    """
+    API JSON: checklists, visitas y eliminaciones del usuario posteriores al cursor del dispositivo
+
+    Lee de la base principal (ver ``sincronizacion``): el cursor no puede
+    avanzar sobre filas que una réplica aún no recibió.
+    """
+    maximo = getattr(settings, 'SYNC_PAGE_SIZE', 500)
+    limite = request.GET.get('limite', '')
+    limite = min(int(limite), maximo) if limite.isdigit() and int(limite) > 0 else maximo
+    
+    try:
+        datos = sincronizacion.cambios(request.user, request.GET.get('cursor'), limite)
+    except sincronizacion.CursorVencido as exc:
+        return JsonResponse({'error': str(exc), 'resincronizar': True}, status=410)
+    except sincronizacion.CursorInvalido as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    
+    return JsonResponse(datos)
+
+
+@login_required
+@gzip_page
+@require_POST
+def sync_visitas_view(request):
+    """
+    API JSON: recibe un lote de visitas creadas sin conexión (``{"visitas": [...]}``)
+    """
+    try:
+        datos = _cuerpo_json(request)
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    
+    visitas = datos.get('visitas') if isinstance(datos, dict) else None
+    if not isinstance(visitas, list):
+        return JsonResponse({'error': 'Se esperaba {"visitas": [...]}'}, status=400)
+    maximo = getattr(settings, 'SYNC_MAX_UPLOAD', 500)
+    if len(visitas) > maximo:
+        return JsonResponse({'error': f'El lote supera el máximo de {maximo} visitas'}, status=413)
+    
+    return JsonResponse({'resultados': sincronizacion.recibir_visitas(visitas, request.user)})
+
+
+# ===========================
+# MÉTRICAS DE RENDIMIENTO
+# ===========================
+
+@login_required
+def metricas_view(request):
+    """
+    Vista que expone los histogramas de rendimiento en formato Prometheus
+    """
+    return HttpResponse(
+        metrics.registro.exponer(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
@@ -0,0 +1,299 @@
+"""
+Sistema de Gestión de Seguridad Forestal
+Vistas asíncronas del dashboard, los listados y los detalles
+
+Bajo ASGI (``gestion_forestal/asgi.py``, con ``urls_asgi.py``) estas vistas
+reemplazan a las de ``views.py`` con las mismas rutas y templates. Mientras
+un request espera a la base de datos o a un cliente lento de una conexión de
+campo, el bucle de eventos atiende a los demás sin ocupar un hilo por
+request del servidor.
+
+Las consultas independientes de cada vista (contadores y recientes del
+dashboard, página y facetas de un listado, checklist y sus visitas) se
+lanzan juntas con ``asyncio.gather`` sobre el ORM asíncrono. En Django 4.2
+el ORM ejecuta las consultas de un mismo request en un único hilo y una
+sola conexión, así que gather no las paraleliza entre sí: evita que cada
+espera bloquee el bucle de eventos para los demás requests.
+
+El usuario, la sesión, los mensajes y el render de los templates son
+síncronos y se ejecutan con ``sync_to_async`` en el hilo del request.
+
+``dashboard_eventos_view`` mantiene abierta una conexión Server-Sent Events
+por dashboard y le envía lo que reparte el publicador de ``eventos.py``; solo
+existe bajo ASGI, donde una conexión abierta no ocupa un hilo.
+"""
+
+import asyncio
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
+from django.db import connections
+from django.http import Http404, StreamingHttpResponse
+from django.shortcuts import render
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from . import condicional, eventos, facetas, fragmentos
+from .models import Checklist, Visita
+from .resumen import obtener_resumen
+from .routers import lectura_en_replica
+from .views import (
+    CAMPOS_CHECKLIST_LISTA, CAMPOS_CHECKLIST_RECIENTE, CAMPOS_VISITA_CHECKLIST, CAMPOS_VISITA_LISTA,
+    CAMPOS_VISITA_RECIENTE, _contexto_dashboard, _filtrar_checklists, _filtrar_visitas,
+    _contexto_visita_detalle, _fechas_checklist, _fechas_visita, _filtros_querystring, _fotos_visita,
+    _paginador, _version_detalle,
+)
+
+
+# ===========================
+# UTILIDADES
+# ===========================
+
+def login_required_async(view_func):
+    """
+    ``login_required`` para vistas asíncronas
+
+    ``request.user`` es perezoso y cargarlo lee la sesión (y, si no está en
+    caché, ``auth_user``); se resuelve en el hilo del request antes de entrar
+    a la vista, que después lo usa sin consultas.
+    """
+    @wraps(view_func)
+    async def _wrapped_view(request, *args, **kwargs):
+        if not await sync_to_async(lambda: request.user.is_authenticated)():
+            return redirect_to_login(request.get_full_path(), settings.LOGIN_URL)
+        return await view_func(request, *args, **kwargs)
+    return _wrapped_view
+
+
+async def _lista(queryset):
+    return [obj async for obj in queryset]
+
+
+async def _obtener_o_404(queryset, **filtros):
+    try:
+        return await queryset.aget(**filtros)
+    except queryset.model.DoesNotExist:
+        raise Http404(f'No existe {queryset.model._meta.verbose_name} con {filtros}')
+
+
+async def _render(request, template, context):
+    return await sync_to_async(render)(request, template, context)
+
+
+# ===========================
+# VISTA DASHBOARD
+# ===========================
+
+@login_required_async
+@lectura_en_replica
+async def dashboard_view(request):
+    """
+    Vista principal del dashboard
+    Muestra resumen de checklists y visitas
+    """
+    resumen, checklists_recientes, visitas_recientes = await asyncio.gather(
+        sync_to_async(obtener_resumen)(),
+        _lista(Checklist.objects.only(*CAMPOS_CHECKLIST_RECIENTE)[:5]),
+        _lista(Visita.objects.only(*CAMPOS_VISITA_RECIENTE)[:5]),
+    )
+    
+    context = _contexto_dashboard(resumen, checklists_recientes, visitas_recientes)
+    
+    return await _render(request, 'dashboard.html', context)
+
+
+# ---------------------------
+# Dashboard en vivo
+# ---------------------------
+
+def _resumen_inicial():
+    datos = eventos.datos_resumen()
+    # La conexión queda abierta minutos: no retiene una conexión a la base de datos
+    for conexion in connections.all(initialized_only=True):
+        if not conexion.in_atomic_block:
+            conexion.close()
+    return datos
+
+
+async def _flujo_eventos():
+    loop = asyncio.get_running_loop()
+    suscriptor = eventos.publicador.suscribir()
+    try:
+        # Suscrito antes de leer los contadores para no perder cambios intermedios
+        yield f'retry: {getattr(settings, "SSE_RETRY_MS", 3000)}\n\n'
+        yield eventos.formatear('resumen', await sync_to_async(_resumen_inicial)())
+        
+        # Al vencer, el navegador se reconecta solo; así una conexión que el
+        # servidor no detectó como cerrada no queda suscrita para siempre
+        fin = loop.time() + getattr(settings, 'SSE_MAX_SECONDS', 300)
+        latido = getattr(settings, 'SSE_HEARTBEAT_SECONDS', 15)
+        while loop.time() < fin:
+            pendientes = await suscriptor.esperar(min(latido, fin - loop.time()))
+            if not pendientes:
+                yield ': latido\n\n'
+            for tipo, datos in pendientes:
+                yield eventos.formatear(tipo, datos)
+    finally:
+        eventos.publicador.desuscribir(suscriptor)
+
+
+@login_required_async
+async def dashboard_eventos_view(request):
+    """
+    Contadores del dashboard y visitas críticas nuevas como Server-Sent Events
+    """
+    response = StreamingHttpResponse(_flujo_eventos(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    
+    return response
+
+
+# ===========================
+# CHECKLISTS
+# ===========================
+
+@login_required_async
+@lectura_en_replica
+async def checklist_list_view(request):
+    """
+    Vista para listar todos los checklists
+    """
+    query = request.GET.get('q', '')
+    estado_filter = request.GET.get('estado', '')
+    
+    checklists = _filtrar_checklists(
+        Checklist.objects.select_related('responsable').only(*CAMPOS_CHECKLIST_LISTA),
+        estado_filter,
+    )
+    
+    # La búsqueda puede cargar el índice en memoria desde la base de datos
+    paginator = await sync_to_async(_paginador)(checklists, query)
+    page, facetas_checklists = await asyncio.gather(
+        sync_to_async(paginator.get_page)(request.GET.get('cursor')),
+        sync_to_async(facetas.facetas_checklists)(query),
+    )
+    
+    context = {
+        'checklists': page.object_list,
+        'page': page,
+        'filtros': _filtros_querystring(q=query, estado=estado_filter),
+        'facetas': facetas_checklists,
+        'query': query,
+        'estado_filter': estado_filter,
+    }
+    
+    return await condicional.responder_async(
+        request, condicional.version_pagina(page, facetas_checklists),
+        lambda: _render(request, 'checklist_list.html', context),
+    )
+
+
+@login_required_async
+@lectura_en_replica
+async def checklist_detail_view(request, pk):
+    """
+    Vista para ver detalles de un checklist
+    """
+    fragmento, versiones = await sync_to_async(fragmentos.obtener)('checklist', pk)
+    if fragmento is None:
+        checklist, visitas = await asyncio.gather(
+            _obtener_o_404(Checklist.objects.select_related('responsable'), pk=pk),
+            _lista(Visita.objects.filter(checklist_id=pk).only(*CAMPOS_VISITA_CHECKLIST)),
+        )
+        html = await sync_to_async(render_to_string)('checklist_detail_contenido.html', {
+            'checklist': checklist,
+            'visitas': visitas,
+        })
+        fragmento = await sync_to_async(fragmentos.guardar)(
+            'checklist', pk, versiones,
+            titulo=checklist.titulo, fechas=_fechas_checklist(checklist, visitas), html=html,
+        )
+    
+    context = {
+        'fragmento': fragmento,
+        'contenido': mark_safe(fragmento['html']),
+    }
+    
+    return await condicional.responder_async(
+        request, _version_detalle(fragmento),
+        lambda: _render(request, 'checklist_detail.html', context),
+    )
+
+
+# ===========================
+# VISITAS
+# ===========================
+
+@login_required_async
+@lectura_en_replica
+async def visita_list_view(request):
+    """
+    Vista para listar todas las visitas
+    """
+    query = request.GET.get('q', '')
+    tipo_filter = request.GET.get('tipo', '')
+    resultado_filter = request.GET.get('resultado', '')
+    
+    visitas = _filtrar_visitas(
+        Visita.objects.select_related('inspector').only(*CAMPOS_VISITA_LISTA),
+        tipo_filter,
+        resultado_filter,
+    )
+    
+    paginator = await sync_to_async(_paginador)(visitas, query)
+    page, facetas_visitas = await asyncio.gather(
+        sync_to_async(paginator.get_page)(request.GET.get('cursor')),
+        sync_to_async(facetas.facetas_visitas)(query, tipo_filter, resultado_filter),
+    )
+    
+    context = {
+        'visitas': page.object_list,
+        'page': page,
+        'filtros': _filtros_querystring(q=query, tipo=tipo_filter, resultado=resultado_filter),
+        'facetas': facetas_visitas,
+        'query': query,
+        'tipo_filter': tipo_filter,
+        'resultado_filter': resultado_filter,
+    }
+    
+    return await condicional.responder_async(
+        request, condicional.version_pagina(page, facetas_visitas),
+        lambda: _render(request, 'visita_list.html', context),
+    )
+
+
+@login_required_async
+@lectura_en_replica
+async def visita_detail_view(request, pk):
+    """
+    Vista para ver detalles de una visita
+    """
+    fragmento, versiones = await sync_to_async(fragmentos.obtener)('visita', pk)
+    if fragmento is None:
+        visita, fotos = await asyncio.gather(
+            _obtener_o_404(
+                Visita.objects.select_related('inspector', 'checklist').defer(
+                    'checklist__descripcion', 'checklist__observaciones',
+                ),
+                pk=pk,
+            ),
+            _lista(_fotos_visita(pk)),
+        )
+        html = await sync_to_async(render_to_string)('visita_detail_contenido.html', {
+            'visita': visita,
+            'fotos': fotos,
+        })
+        fragmento = await sync_to_async(fragmentos.guardar)(
+            'visita', pk, versiones,
+            titulo=visita.codigo_visita, fechas=_fechas_visita(visita), html=html,
+        )
+    
+    context = _contexto_visita_detalle(pk, fragmento)
+    
+    return await condicional.responder_async(
+        request, _version_detalle(fragmento),
+        lambda: _render(request, 'visita_detail.html', context),
+    )
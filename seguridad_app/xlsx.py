@@ -0,0 +1,149 @@
+"""
+Sistema de Gestión de Seguridad Forestal
+Escritura de archivos XLSX en streaming
+
+Genera un libro de una hoja con cadenas en línea (sin tabla de cadenas
+compartidas), de modo que la memoria usada no depende del número de filas:
+cada bloque de filas se comprime y se entrega apenas se escribe.
+"""
+
+import datetime
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+
+CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+_CONTROL = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+
+_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{nombre}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+
+_SHEET_INICIO = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<sheetData>'
+)
+
+_SHEET_FIN = '</sheetData></worksheet>'
+
+
+class _Buffer:
+    """
+    Destino no posicionable para ZipFile; acumula los bytes hasta vaciarlo
+    """
+
+    def __init__(self):
+        self._partes = []
+
+    def write(self, datos):
+        self._partes.append(bytes(datos))
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def vaciar(self):
+        datos = b''.join(self._partes)
+        self._partes = []
+        return datos
+
+
+def _columna(indice):
+    letras = ''
+    indice += 1
+    while indice:
+        indice, resto = divmod(indice - 1, 26)
+        letras = chr(65 + resto) + letras
+    return letras
+
+
+def _celda(referencia, valor):
+    if valor is None or valor == '':
+        return ''
+    if isinstance(valor, bool):
+        valor = 'Sí' if valor else 'No'
+    elif isinstance(valor, (int, float)):
+        return f'<c r="{referencia}"><v>{valor}</v></c>'
+    elif isinstance(valor, datetime.datetime):
+        valor = valor.isoformat(sep=' ', timespec='seconds')
+    elif isinstance(valor, (datetime.date, datetime.time)):
+        valor = valor.isoformat()
+    texto = escape(_CONTROL.sub('', str(valor)))
+    return f'<c r="{referencia}" t="inlineStr"><is><t xml:space="preserve">{texto}</t></is></c>'
+
+
+def _fila(numero, valores):
+    celdas = ''.join(
+        _celda(f'{_columna(i)}{numero}', valor) for i, valor in enumerate(valores)
+    )
+    return f'<row r="{numero}">{celdas}</row>'
+
+
+def generar_xlsx(encabezados, filas, nombre_hoja='Hoja1', filas_por_bloque=500):
+    """
+    Generador de los bytes del archivo XLSX
+
+    ``filas`` puede ser cualquier iterable (por ejemplo ``QuerySet.iterator()``);
+    se consume a medida que el cliente recibe la respuesta.
+    """
+    buffer = _Buffer()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as libro:
+        libro.writestr('[Content_Types].xml', _CONTENT_TYPES)
+        libro.writestr('_rels/.rels', _RELS)
+        libro.writestr('xl/workbook.xml', _WORKBOOK.format(nombre=escape(nombre_hoja[:31])))
+        libro.writestr('xl/_rels/workbook.xml.rels', _WORKBOOK_RELS)
+        yield buffer.vaciar()
+
+        with libro.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as hoja:
+            hoja.write(_SHEET_INICIO.encode())
+            hoja.write(_fila(1, encabezados).encode())
+            bloque = []
+            for numero, valores in enumerate(filas, start=2):
+                bloque.append(_fila(numero, valores))
+                if len(bloque) >= filas_por_bloque:
+                    hoja.write(''.join(bloque).encode())
+                    bloque = []
+                    datos = buffer.vaciar()
+                    if datos:
+                        yield datos
+            if bloque:
+                hoja.write(''.join(bloque).encode())
+            hoja.write(_SHEET_FIN.encode())
+    yield buffer.vaciar()